@@ -0,0 +1,61 @@
+"""
+基准脚本公共工具
+
+插件目录及其 nullbr_core 子目录以裸包形式注册（不执行 __init__.py），
+从而可以单独导入各客户端模块。客户端模块依赖 app.log，
+运行时需将 MoviePilot 源码目录加入 PYTHONPATH。
+
+需要驱动插件本身（talk / handle_message_action）的基准使用 load_plugin()，
+它会执行插件 __init__.py，要求 MoviePilot 源码及其配置目录可用。
+"""
+import importlib.util
+import os
+import sys
+import types
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PLUGINS_DIR = os.path.join(ROOT, "plugins.v2")
+
+
+def load_plugin_package(plugin_id: str) -> str:
+    """
+    将插件目录注册为名为 bench_<plugin_id> 的包，返回包名
+
+    :param plugin_id: 插件目录名，如 nullbr_search_pro
+    """
+    name = f"bench_{plugin_id}"
+    if name not in sys.modules:
+        for pkg_name, path in ((name, os.path.join(PLUGINS_DIR, plugin_id)),
+                               (f"{name}.nullbr_core", os.path.join(PLUGINS_DIR, plugin_id, "nullbr_core"))):
+            pkg = types.ModuleType(pkg_name)
+            pkg.__path__ = [path]
+            sys.modules[pkg_name] = pkg
+    return name
+
+
+def load_plugin(plugin_id: str):
+    """
+    完整导入插件包（执行 __init__.py），返回插件类
+
+    :param plugin_id: 插件目录名，同时也是插件类名
+    """
+    name = f"benchplugin_{plugin_id}"
+    module = sys.modules.get(name)
+    if module is None:
+        path = os.path.join(PLUGINS_DIR, plugin_id)
+        spec = importlib.util.spec_from_file_location(
+            name, os.path.join(path, "__init__.py"), submodule_search_locations=[path]
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return getattr(module, plugin_id)
+
+
+def percentile(samples, pct: float) -> float:
+    """计算百分位数（最近秩法）"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
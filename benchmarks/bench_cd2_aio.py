@@ -0,0 +1,64 @@
+"""
+CloudDrive2 同步/异步客户端批量提交对比
+
+在进程内启动 FakeCloudDriveFileSrv（模拟每个 RPC 的服务端延迟），
+分别用 CloudDrive2Client 逐个提交和 CloudDrive2AioFacade 并发提交同一批离线任务，
+校验两者结果一致并输出耗时。
+
+用法: PYTHONPATH=/path/to/MoviePilot python benchmarks/bench_cd2_aio.py [--tasks 100] [--latency 0.05]
+"""
+import argparse
+import importlib
+import time
+
+from _common import load_plugin_package
+from fake_cd2 import start_fake_server
+
+_pkg = load_plugin_package("nullbr_search_pro")
+clouddrive_client = importlib.import_module(f"{_pkg}.clouddrive_client")
+clouddrive_aio = importlib.import_module(f"{_pkg}.clouddrive_aio")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CloudDrive2 同步/异步批量提交对比")
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟服务端延迟（秒）")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    server, servicer, address = start_fake_server(latency=args.latency)
+    urls = [f"magnet:?xt=urn:btih:{i:040x}" for i in range(args.tasks)]
+    try:
+        sync_client = clouddrive_client.CloudDrive2Client(
+            base_url=f"http://{address}", api_token=servicer.api_token
+        )
+        start = time.perf_counter()
+        sync_results = [sync_client.add_offline_files(url) for url in urls]
+        sync_elapsed = time.perf_counter() - start
+        sync_client.close()
+
+        facade = clouddrive_aio.CloudDrive2AioFacade(
+            base_url=f"http://{address}", api_token=servicer.api_token,
+            max_concurrency=args.concurrency
+        )
+        start = time.perf_counter()
+        aio_results = facade.add_offline_files_many(urls)
+        aio_elapsed = time.perf_counter() - start
+        status = facade.get_offline_status_many(["/115/Offline"] * 4)
+        facade.close()
+
+        assert sync_results == aio_results, "同步与异步结果不一致"
+        assert all(r["success"] for r in aio_results)
+        assert all(len(s["offlineFiles"]) == 2 * args.tasks for s in status)
+        assert servicer.calls["AddOfflineFiles"] == 2 * args.tasks
+
+        print(f"任务数: {args.tasks}, 服务端延迟: {args.latency * 1000:.0f}ms, 并发: {args.concurrency}")
+        print(f"同步逐个提交: {sync_elapsed:.3f}s ({args.tasks / sync_elapsed:.1f} req/s)")
+        print(f"异步并发提交: {aio_elapsed:.3f}s ({args.tasks / aio_elapsed:.1f} req/s)")
+        print(f"加速比: {sync_elapsed / aio_elapsed:.1f}x")
+    finally:
+        server.stop(None)
+
+
+if __name__ == "__main__":
+    main()
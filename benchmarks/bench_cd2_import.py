@@ -0,0 +1,79 @@
+"""
+CloudDrive2 gRPC 代码导入开销基准
+
+对比插件加载 CloudDrive2 客户端时的导入耗时与内存占用：
+- full: 导入 grpc 与 protoc 生成的 clouddrive_pb2_grpc（延迟导入前插件启动时的行为，
+  现在发生在首次 RPC 调用时）
+- none: 不导入任何 gRPC 代码的基线（插件启动时的行为）
+
+耗时与内存几乎全部来自 grpc/protobuf 本身，只注册部分 RPC 的精简 Stub 没有可测的收益，
+因此只保留延迟导入。
+
+每种场景在独立子进程中运行，避免模块缓存互相影响。
+需要安装 grpcio 与 protobuf（与插件 requirements.txt 一致）。
+
+用法: python benchmarks/bench_cd2_import.py [--runs 10]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "..", "plugins.v2", "nullbr_search_pro")
+
+# 子进程脚本：将插件目录注册为一个裸包（不执行插件 __init__，避免依赖 MoviePilot），
+# 然后计时导入目标模块
+CHILD = r"""
+import json, resource, sys, time, types
+pkg = types.ModuleType("cd2bench")
+pkg.__path__ = [sys.argv[1]]
+sys.modules["cd2bench"] = pkg
+target = sys.argv[2]
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if target == "full":
+    import grpc
+    __import__("cd2bench.clouddrive_pb2_grpc")
+elapsed = time.perf_counter() - start
+rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"ms": elapsed * 1000, "rss_kb": rss_after - rss_before}))
+"""
+
+
+def run(target: str, runs: int) -> dict:
+    samples, rss = [], []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD, os.path.abspath(PLUGIN_DIR), target],
+            check=True, capture_output=True, text=True
+        ).stdout
+        data = json.loads(out)
+        samples.append(data["ms"])
+        rss.append(data["rss_kb"])
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "rss_kb": statistics.median(rss),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    if importlib.util.find_spec("grpc") is None:
+        sys.exit("未安装 grpcio，请先安装插件依赖: pip install -r plugins.v2/nullbr_search_pro/requirements.txt")
+
+    print(f"{'场景':<6}{'中位耗时(ms)':>14}{'最小耗时(ms)':>14}{'RSS增量(KB)':>14}")
+    for target in ("none", "full"):
+        r = run(target, args.runs)
+        print(f"{target:<6}{r['median_ms']:>14.2f}{r['min_ms']:>14.2f}{r['rss_kb']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
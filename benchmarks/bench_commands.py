@@ -0,0 +1,170 @@
+"""
+命令解析微基准
+
+按真实流量的比例（大部分是与插件无关的普通消息）比较 commands 中的语法与逐条判断的参照实现
+（原 talk / handle_message_action 的判断链，加上新增的 #more、#refresh 和 #N-M）每条消息的解析耗时，
+pro 用户消息另按普通聊天和插件命令分别统计。
+
+两者解析结果一致由 tests/test_commands.py 校验（模糊校验 + 边界用例），
+其中的参照实现和随机输入即本文件中的版本；计时前也会对计时用的消息再校验一次。
+
+用法: python benchmarks/bench_commands.py
+"""
+import argparse
+import importlib
+import random
+import re
+import time
+
+from _common import load_plugin_package
+
+_pkg = load_plugin_package("nullbr_search_pro")
+commands = importlib.import_module(f"{_pkg}.nullbr_core.commands")
+
+TYPES = commands.RESOURCE_TYPES
+_GET = re.compile(r'^(\d+)\.(115|magnet|video|ed2k)$')
+_RANGE = re.compile(r'^(\d+)\s*-\s*(\d+)$')
+
+
+# 参照实现 -------------------------------------------------------------------
+
+def reference_hash(text):
+    """nullbr_search_pro 原 talk 的判断链"""
+    if not text:
+        return None
+    text = text.strip()
+    if not text.startswith('#'):
+        return None
+    clean_text = text[1:].strip()
+    if clean_text.startswith('!'):
+        keyword = clean_text[1:].strip()
+        return ('auto', (keyword,)) if keyword else None
+    if clean_text.lower() in ('next', 'more'):
+        return 'next', ()
+    if clean_text.lower() in ('refresh', '刷新'):
+        return 'refresh', ()
+    match = _GET.match(clean_text)
+    if match:
+        return 'get', (int(match.group(1)), match.group(2))
+    match = _RANGE.match(clean_text)
+    if match:
+        return 'range', (int(match.group(1)), int(match.group(2)))
+    if clean_text.isdecimal():
+        return 'pick', (int(clean_text),)
+    if clean_text:
+        return 'search', (clean_text,)
+    return None
+
+
+def reference_plain(text):
+    """nullbr_search 原 talk 的判断链"""
+    if not text:
+        return None
+    text = text.strip()
+    if not text:
+        return None
+    clean_text = text.rstrip('？?').strip()
+    if clean_text[:1] == '#' and clean_text[1:].strip().lower() in ('next', 'more'):
+        return 'next', ()
+    match = _GET.match(clean_text)
+    if match:
+        return 'get', (int(match.group(1)), match.group(2))
+    match = _RANGE.match(clean_text)
+    if match:
+        return 'range', (int(match.group(1)), int(match.group(2)))
+    if clean_text.isdecimal():
+        return 'pick', (int(clean_text),)
+    if text[-1] in '?？' and clean_text:
+        return 'search', (clean_text,)
+    return None
+
+
+def reference_callback(text):
+    """原 handle_message_action 的 split('_') 解析（非法编号视为未知动作）"""
+    text = (text or '').strip()
+    parts = text.split('_')
+    if parts[0] in ('select', 'transfer') and len(parts) == 2 and parts[1].isdecimal():
+        return parts[0], (int(parts[1]),)
+    if parts[0] == 'get' and len(parts) in (2, 3) and parts[1].isdecimal():
+        if len(parts) == 2:
+            return 'get', (int(parts[1]), '115')
+        if parts[2] in TYPES:
+            return 'get', (int(parts[1]), parts[2])
+        return None
+    if text in ('next', 'offline_refresh', 'back'):
+        return text, ()
+    return None
+
+
+# 随机输入 -------------------------------------------------------------------
+
+FRAGMENTS = (
+    '#', '#', '!', '！', '?', '？', '.', '-', ' - ', '_', ' ', '  ', '\t', '\n', '　', '\xa0',
+    '1', '7', '12', '0', '007', '１', '２３', '²', '٣',
+    '115', 'magnet', 'video', 'ed2k', 'MAGNET', 'next', 'NEXT', 'Next', 'more', 'MoRe', 'nex',
+    'select', 'transfer', 'get', 'offline', 'refresh', 'REFRESH', '刷新', 'back',
+    '流浪地球', '阿凡达', 'Avatar', 'the', 'K', 'ſ', '🎬', 'a', 'z',
+)
+
+
+def random_text(rng: random.Random) -> str:
+    return ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 6)))
+
+
+# 微基准 ---------------------------------------------------------------------
+
+def traffic(rng: random.Random, count: int):
+    """按比例混合的消息：80% 普通聊天，其余为各类插件命令"""
+    chat = ["今天吃什么", "好的", "收到，谢谢", "http://example.com/a?b=1", "明天见!", "ok", "[图片]",
+            "这部电影怎么样", "1月1日开会", "哈哈哈哈哈哈"]
+    pro = ["#流浪地球", "#1", "#2.magnet", "#next", "#!阿凡达", "#1-3"]
+    plain = ["流浪地球?", "1", "2.magnet", "#next", "1-3", "阿凡达？"]
+    items = []
+    for _ in range(count):
+        if rng.random() < 0.8:
+            items.append((rng.choice(chat),) * 2)
+        else:
+            items.append((rng.choice(pro), rng.choice(plain)))
+    return items
+
+
+def bench(fn, texts, repeat: int = 5) -> float:
+    """返回每条消息的最短平均耗时（纳秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="命令解析微基准")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    items = traffic(rng, 20000)
+    pro_texts = [p for p, _ in items]
+    plain_texts = [p for _, p in items]
+    callbacks = [rng.choice(["select_1", "transfer_12", "get_3_magnet", "get_2", "next", "offline_refresh",
+                             "back"]) for _ in range(20000)]
+    rows = (
+        ("pro 用户消息", pro_texts, reference_hash, commands.HASH_TALK.parse),
+        ("其中普通聊天", [t for t in pro_texts if t[0] != '#'], reference_hash, commands.HASH_TALK.parse),
+        ("其中插件命令", [t for t in pro_texts if t[0] == '#'], reference_hash, commands.HASH_TALK.parse),
+        ("普通版用户消息", plain_texts, reference_plain, commands.PLAIN_TALK.parse),
+        ("按钮回调", callbacks, reference_callback, commands.CALLBACKS.parse),
+    )
+    print(f"\n{'':>14}{'判断链(ns)':>14}{'预编译语法(ns)':>18}{'加速':>8}")
+    for name, texts, reference, parse in rows:
+        for text in set(texts):
+            parsed = parse(text)
+            assert ((parsed.verb, parsed.args) if parsed else None) == reference(text), text
+        old, new = bench(reference, texts), bench(parse, texts)
+        print(f"{name:>14}{old:>14.0f}{new:>18.0f}{old / new:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
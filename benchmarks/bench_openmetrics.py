@@ -0,0 +1,112 @@
+"""
+/metrics 序列化基准
+
+构造与实际运行相近的统计（若干计数器、缓存、阶段直方图），测量 OpenMetricsExporter.render()：
+- cold: 首次抓取，全部阶段需要序列化
+- idle: 两次抓取之间没有新记录，全部复用
+- busy: 两次抓取之间约 1/5 的阶段有新记录
+
+并对输出做基本的格式检查（# EOF 结尾、直方图桶单调、+Inf 等于 count）。
+若安装了 prometheus_client，另用其 OpenMetrics 解析器校验。
+
+用法: python benchmarks/bench_openmetrics.py [--stages 40] [--scrapes 200]
+"""
+import argparse
+import importlib
+import random
+import re
+import time
+
+from _common import load_plugin_package
+
+_pkg = load_plugin_package("nullbr_search_pro")
+metrics = importlib.import_module(f"{_pkg}.nullbr_core.metrics")
+openmetrics = importlib.import_module(f"{_pkg}.nullbr_core.openmetrics")
+
+_BUCKET = re.compile(r'_bucket\{.*stage="([^"]+)",le="([^"]+)"\} (\d+)')
+_COUNT = re.compile(r'_count\{.*stage="([^"]+)"\} (\d+)')
+
+
+def build(stages: int, rng: random.Random):
+    stats = metrics.Metrics(counters=('total_searches', 'successful_searches', 'failed_searches',
+                                      'total_resources', 'successful_transfers', 'failed_transfers'))
+    stats.incr('total_searches', 1200)
+    stats.incr('successful_searches', 1100)
+    timings = metrics.Timings()
+    names = [f"{backend}.call{i}" for i in range(stages) for backend in ("nullbr", "p115", "cd2")][:stages]
+    for name in names:
+        for _ in range(500):
+            timings.record(name, rng.lognormvariate(-1.5, 1.0), rng.random() < 0.02)
+    caches = metrics.CacheStats()
+    for name in ("cd2.quota", "offline.dedup", "cms.token"):
+        for _ in range(100):
+            (caches.hit if rng.random() < 0.8 else caches.miss)(name)
+
+    def gauges():
+        return {'outbound_queue_depth': rng.randint(0, 5), 'search_cache_entries': 12}, {'cd2': 'ready'}
+
+    exporter = openmetrics.OpenMetricsExporter("nullbr_search_pro", stats, timings, caches, gauges=gauges)
+    return exporter, timings, names
+
+
+def check(text: str):
+    assert text.endswith("# EOF\n"), "缺少 # EOF"
+    last = {}
+    for stage, le, value in _BUCKET.findall(text):
+        value = int(value)
+        assert value >= last.get(stage, 0), f"{stage} 桶计数不单调"
+        last[stage] = value
+        if le == "+Inf":
+            last[stage, 'inf'] = value
+    for stage, count in _COUNT.findall(text):
+        assert last[stage, 'inf'] == int(count), f"{stage} +Inf 与 count 不一致"
+    try:
+        from prometheus_client.openmetrics.parser import text_string_to_metric_families
+    except ImportError:
+        print("格式检查通过（未安装 prometheus_client，跳过解析器校验）")
+        return
+    families = list(text_string_to_metric_families(text))
+    print(f"格式检查通过，prometheus_client 解析出 {len(families)} 个指标族")
+
+
+def timeit(func, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - start) / n * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/metrics 序列化基准")
+    parser.add_argument("--stages", type=int, default=40)
+    parser.add_argument("--scrapes", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    exporter, timings, names = build(args.stages, rng)
+
+    start = time.perf_counter()
+    text = exporter.render()
+    cold = (time.perf_counter() - start) * 1000
+    check(text)
+
+    idle = timeit(exporter.render, args.scrapes)
+
+    def busy():
+        for name in rng.sample(names, max(1, len(names) // 5)):
+            timings.record(name, rng.lognormvariate(-1.5, 1.0))
+        exporter.render()
+
+    busy_ms = timeit(busy, args.scrapes)
+    check(exporter.render())
+
+    print(f"{args.stages} 个阶段，输出 {len(text.splitlines())} 行 / {len(text.encode())} 字节")
+    print(f"{'场景':>8}{'每次抓取(ms)':>14}")
+    print(f"{'cold':>8}{cold:>14.3f}")
+    print(f"{'idle':>8}{idle:>14.3f}")
+    print(f"{'busy':>8}{busy_ms:>14.3f}")
+    print(f"直方图序列化 {exporter.rendered} 次，复用 {exporter.reused} 次")
+
+
+if __name__ == "__main__":
+    main()
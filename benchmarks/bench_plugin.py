@@ -0,0 +1,257 @@
+"""
+插件端到端基准（离线）
+
+在本地启动 Nullbr API 模拟服务（fake_nullbr）、进程内 CloudDriveFileSrv（fake_cd2），
+并以 fake_p115 替换 p115client，然后用合成的用户流量驱动 nullbr_search_pro 的
+talk / handle_message_action：
+
+- 文本渠道用户（企业微信）: #关键词 -> #1 选择 -> #1 转存（CD2）
+- 按钮渠道用户（Telegram）: #关键词 -> select_1 回调 -> transfer_1 回调（编辑原消息）
+
+消息发送、消息编辑、插件数据存储和回退到 MoviePilot 搜索由基准子类在内存中记录，不经过
+MoviePilot 的通知和搜索链路。输出吞吐量、各步骤处理耗时和首条回复延迟的 p50/p95/p99、
+插件记录的各后端延迟，以及峰值内存。
+
+需要 MoviePilot 源码（插件依赖 app.*）和 grpcio:
+    PYTHONPATH=/path/to/MoviePilot python benchmarks/bench_plugin.py \\
+        [--users 20] [--rounds 5] [--latency 0.08] [--error-rate 0.02] [--throttle-rate 0.02]
+"""
+import argparse
+import importlib
+import os
+import random
+import resource
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+from _common import load_plugin, percentile
+from fake_cd2 import start_fake_server
+from fake_nullbr import start_fake_nullbr
+import fake_p115
+
+# 模拟服务在本机，避免经过系统代理
+os.environ.setdefault("NO_PROXY", "127.0.0.1,localhost")
+
+PLUGIN_ID = "nullbr_search_pro"
+KEYWORDS = [f"电影{i}" for i in range(200)]
+P115_COOKIES = "UID=1_A1_0; CID=bench; SEID=bench; KID=bench"
+
+
+class Recorder:
+    """记录插件发出的消息，计算每个步骤的首条回复延迟"""
+
+    def __init__(self):
+        self.messages = 0
+        self.edits = 0
+        self.bytes = 0
+        self.fallbacks = 0
+        self.first_reply = []
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def begin(self, userid: str):
+        with self._lock:
+            self._pending[userid] = time.perf_counter()
+
+    def reply(self, userid: str, text: str, edit: bool = False):
+        now = time.perf_counter()
+        with self._lock:
+            if edit:
+                self.edits += 1
+            else:
+                self.messages += 1
+            self.bytes += len((text or "").encode())
+            start = self._pending.pop(userid, None)
+            if start is not None:
+                self.first_reply.append(now - start)
+
+
+def bench_plugin_class(plugin_cls, recorder: Recorder):
+    """在内存中处理消息、数据存储和回退搜索的插件子类（类名与原插件一致，按钮回调才能匹配）"""
+
+    class BenchPlugin(plugin_cls):
+        _bench_data = {}
+
+        def get_data(self, key: str = None, plugin_id: str = None):
+            return self._bench_data.get(key)
+
+        def save_data(self, key: str, value, plugin_id: str = None):
+            self._bench_data[key] = value
+
+        def _deliver_message(self, channel, title: str, text: str, userid: str = None, **kwargs):
+            recorder.reply(userid, text)
+
+        def _edit_message(self, channel, source: str, message_id, chat_id,
+                          title: str, text: str, buttons: list = None) -> bool:
+            recorder.reply(chat_id, text, edit=True)
+            return True
+
+        def fallback_to_moviepilot_search(self, keyword: str, channel, userid: str):
+            with recorder._lock:
+                recorder.fallbacks += 1
+
+    BenchPlugin.__name__ = BenchPlugin.__qualname__ = plugin_cls.__name__
+    return BenchPlugin
+
+
+def user_session(plugin, event_cls, types, userid: str, button: bool, rng: random.Random,
+                 think: float, steps: dict, recorder: Recorder):
+    """一个用户的一次完整会话：搜索 -> 选择 -> 转存"""
+    channel = types.MessageChannel.Telegram if button else types.MessageChannel.Wechat
+    keyword = KEYWORDS[min(int(rng.paretovariate(1.2)) - 1, len(KEYWORDS) - 1)]
+
+    def talk(text: str):
+        return event_cls(types.EventType.UserMessage, {"text": text, "userid": userid, "channel": channel})
+
+    def action(text: str, message_id: int):
+        return event_cls(types.EventType.MessageAction, {
+            "plugin_id": PLUGIN_ID, "text": text, "channel": channel, "source": "bench",
+            "userid": userid, "original_message_id": message_id, "original_chat_id": userid,
+        })
+
+    flow = [("search", plugin.talk, talk(f"#{keyword}"))]
+    if button:
+        flow += [("select", plugin.handle_message_action, action("select_1", 1)),
+                 ("transfer", plugin.handle_message_action, action("transfer_1", 1))]
+    else:
+        flow += [("select", plugin.talk, talk("#1")),
+                 ("transfer", plugin.talk, talk("#1"))]
+
+    for step, handler, event in flow:
+        recorder.begin(userid)
+        start = time.perf_counter()
+        handler(event)
+        steps[step].append(time.perf_counter() - start)
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+
+
+class BenchEnv:
+    """基准环境：模拟服务和接入模拟服务的插件实例"""
+
+    def __init__(self, recorder: Recorder, nullbr: dict = None, p115: dict = None, cd2: dict = None):
+        """
+        :param recorder: 消息记录器
+        :param nullbr: FakeNullbrState 参数
+        :param p115: FakeP115Client.configure 参数
+        :param cd2: FakeCloudDriveFileSrv 参数
+        """
+        from app.core.event import Event
+        from app.schemas import types
+
+        self.Event = Event
+        self.types = types
+        plugin_cls = load_plugin(PLUGIN_ID)
+        pkg = plugin_cls.__module__
+        self.metrics = importlib.import_module(f"{pkg}.nullbr_core.metrics")
+        fake_p115.install(importlib.import_module(f"{pkg}.p115_client"), **(p115 or {}))
+
+        self.nullbr_server, self.nullbr, nullbr_url = start_fake_nullbr(**(nullbr or {}))
+        self.cd2_server, self.cd2, cd2_address = start_fake_server(**(cd2 or {}))
+
+        self.plugin = bench_plugin_class(plugin_cls, recorder)()
+        self.plugin.init_plugin({
+            "enabled": True, "app_id": self.nullbr.app_id, "api_key": self.nullbr.api_key,
+            "cd2_enabled": True, "cd2_url": f"http://{cd2_address}", "cd2_api_token": self.cd2.api_token,
+            "p115_enabled": True, "p115_cookies": P115_COOKIES,
+        })
+        self.plugin._client._base_url = nullbr_url
+
+    def print_backends(self):
+        """输出插件记录的各阶段延迟和模拟服务的调用统计"""
+        print(f"\n{'阶段':>24}{'次数':>8}{'错误':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+        for stage, s in self.metrics.TIMINGS.snapshot()['stages'].items():
+            print(f"{stage:>24}{s['count']:>8}{s['errors']:>6}"
+                  f"{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}")
+        print(f"\nNullbr 状态码: {dict(sorted(self.nullbr.statuses.items()))}")
+        print(f"115 调用: {fake_p115.FakeP115Client.calls}")
+        print(f"CD2 调用: {self.cd2.calls}")
+
+    def close(self):
+        """停止插件（发送完出站队列中的消息）和模拟服务"""
+        self.plugin.stop_service()
+        self.nullbr_server.shutdown()
+        self.cd2_server.stop(None)
+
+
+def peak_memory(traced: bool) -> str:
+    """峰值 RSS（及 tracemalloc 统计的 Python 分配峰值）"""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # Linux 下单位为 KB
+    text = f"峰值 RSS {max_rss:.1f} MB"
+    if traced:
+        text += f"，Python 分配峰值 {tracemalloc.get_traced_memory()[1] / 1024 / 1024:.1f} MB"
+        tracemalloc.stop()
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="插件端到端基准（离线）")
+    parser.add_argument("--users", type=int, default=20, help="并发用户数")
+    parser.add_argument("--rounds", type=int, default=5, help="每个用户的会话数")
+    parser.add_argument("--button-ratio", type=float, default=0.5, help="按钮渠道用户比例")
+    parser.add_argument("--think", type=float, default=0.0, help="步骤间平均思考时间（秒）")
+    parser.add_argument("--latency", type=float, default=0.08, help="Nullbr 响应延迟中位数（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Nullbr 500 比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.02, help="Nullbr 429 比例")
+    parser.add_argument("--empty-rate", type=float, default=0.05, help="搜索无结果比例")
+    parser.add_argument("--p115-latency", type=float, default=0.1, help="115 接口延迟（秒）")
+    parser.add_argument("--cd2-latency", type=float, default=0.02, help="CD2 RPC 延迟（秒）")
+    parser.add_argument("--tracemalloc", action="store_true", help="统计 Python 分配的峰值内存（较慢）")
+    args = parser.parse_args()
+
+    recorder = Recorder()
+    env = BenchEnv(
+        recorder,
+        nullbr=dict(latency=args.latency, error_rate=args.error_rate,
+                    throttle_rate=args.throttle_rate, empty_rate=args.empty_rate),
+        p115=dict(latency=args.p115_latency),
+        cd2=dict(latency=args.cd2_latency),
+    )
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    steps = defaultdict(list)
+    rng = random.Random(1)
+
+    def run_user(index: int):
+        user_rng = random.Random(rng.random() + index)
+        button = index < args.users * args.button_ratio
+        for _ in range(args.rounds):
+            user_session(env.plugin, env.Event, env.types, f"user{index}", button, user_rng,
+                         args.think, steps, recorder)
+
+    threads = [threading.Thread(target=run_user, args=(i,)) for i in range(args.users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    handled = time.perf_counter() - start
+    env.plugin.stop_service()          # 发送完出站队列中的消息
+    elapsed = time.perf_counter() - start
+    memory = peak_memory(args.tracemalloc)
+
+    sessions = args.users * args.rounds
+    total_steps = sum(len(v) for v in steps.values())
+    print(f"用户 {args.users}，每人 {args.rounds} 次会话；Nullbr 延迟 {args.latency * 1000:.0f}ms，"
+          f"500 {args.error_rate:.0%}，429 {args.throttle_rate:.0%}")
+    print(f"处理耗时 {handled:.2f}s（含队列排空 {elapsed:.2f}s），"
+          f"{sessions / handled:.1f} 会话/s，{total_steps / handled:.1f} 步骤/s")
+
+    print(f"\n{'步骤':>10}{'次数':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    rows = list(steps.items()) + [("首条回复", recorder.first_reply)]
+    for step, samples in rows:
+        print(f"{step:>10}{len(samples):>8}" + "".join(
+            f"{percentile(samples, p) * 1000:>10.1f}" for p in (50, 95, 99)))
+
+    env.print_backends()
+    print(f"\n消息 {recorder.messages} 条，编辑 {recorder.edits} 次，共 {recorder.bytes / 1024:.0f} KB；"
+          f"回退搜索 {recorder.fallbacks} 次")
+    print(memory)
+    env.close()
+
+
+if __name__ == "__main__":
+    main()
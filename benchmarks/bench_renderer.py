@@ -0,0 +1,77 @@
+"""
+消息渲染基准
+
+对比资源列表的两种渲染方式：
+- legacy: 原 format_and_send_resources 的写法，逐条 += 拼接后按 3400 字符截断
+- renderer: RecordPager 首页（插件实际使用的渲染方式），预编译模板 + 字节上限缓冲区，达到上限即停止；
+  本页待渲染条数不超过 FAST_PATH_ITEMS 时整页渲染后一次性检查长度（快速路径）
+
+分别测试 10/100/1000 条磁力资源，在"最多显示 10 条"和"不限条数、仅受长度限制"两种模式下的耗时。
+
+用法: python benchmarks/bench_renderer.py [--repeat 200]
+"""
+import argparse
+import importlib
+import timeit
+
+from _common import load_plugin_package
+
+_pkg = load_plugin_package("nullbr_search_pro")
+message_renderer = importlib.import_module(f"{_pkg}.nullbr_core.message_renderer")
+
+
+def make_resources(n: int) -> list:
+    return [{
+        'name': f"Movie.Name.{2000 + i % 20}.2160p.WEB-DL.H265.HDR10.DDP5.1-GROUP{i}",
+        'size': f"{10 + i % 50}.{i % 100:02d} GB",
+        'resolution': '2160p' if i % 2 else '1080p',
+        'zh_sub': i % 3 == 0,
+        'magnet': f"magnet:?xt=urn:btih:{i:040x}&dn=Movie.Name",
+    } for i in range(n)]
+
+
+def legacy_render(resource_list: list, title: str, max_items) -> str:
+    reply_text = f"🎯 「{title}」的magnet资源:\n\n"
+    for i, res in enumerate(resource_list[:max_items], 1):
+        reply_text += f"【{i}】{res.get('name', '未知')}\n"
+        reply_text += f"💾 大小: {res.get('size', '未知')}\n"
+        reply_text += f"📺 分辨率: {res.get('resolution', '未知')}\n"
+        reply_text += f"🈴 中文字幕: {'✅' if res.get('zh_sub') else '❌'}\n"
+        reply_text += f"🧲 磁力: {res.get('magnet', '无')}\n"
+        reply_text += f"{'─' * 15}\n"
+    if len(reply_text) > 3500:
+        reply_text = reply_text[:3400] + "...\n\n(内容过长已截断)\n\n"
+    reply_text += f"📊 共找到 {len(resource_list)} 个资源\n\n"
+    return reply_text
+
+
+def renderer_render(resource_list: list, title: str, max_items) -> str:
+    return message_renderer.RecordPager(
+        header=f"🎯 「{title}」的magnet资源:\n\n",
+        items=resource_list,
+        template=message_renderer.RESOURCE_TEMPLATES['magnet'],
+        limit=message_renderer.DEFAULT_BYTE_LIMIT,
+        footer=f"📊 共找到 {len(resource_list)} 个资源\n\n",
+        page_size=max_items,
+        more_text="... 还有 {remaining} 个资源未显示\n\n"
+    ).next_page().text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="消息渲染基准")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'条数':>6}{'模式':>10}{'legacy(µs)':>14}{'renderer(µs)':>14}{'加速比':>8}")
+    for n in (10, 100, 1000):
+        resources = make_resources(n)
+        for mode, max_items in (("top10", 10), ("unbounded", None)):
+            legacy = min(timeit.repeat(lambda: legacy_render(resources, "流浪地球", max_items),
+                                       number=args.repeat, repeat=3)) / args.repeat * 1e6
+            renderer = min(timeit.repeat(lambda: renderer_render(resources, "流浪地球", max_items),
+                                         number=args.repeat, repeat=3)) / args.repeat * 1e6
+            print(f"{n:>6}{mode:>10}{legacy:>14.1f}{renderer:>14.1f}{legacy / renderer:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
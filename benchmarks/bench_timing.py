@@ -0,0 +1,66 @@
+"""
+计时层开销基准
+
+测量 metrics.timed 作为装饰器和上下文管理器时每次调用的额外开销，
+并用对数正态分布的模拟延迟检验直方图 p50/p95/p99 与精确百分位的偏差。
+
+用法: python benchmarks/bench_timing.py [--calls 200000]
+"""
+import argparse
+import importlib
+import random
+import timeit
+
+from _common import load_plugin_package, percentile
+
+_pkg = load_plugin_package("nullbr_search_pro")
+metrics = importlib.import_module(f"{_pkg}.nullbr_core.metrics")
+
+
+def bench_overhead(calls: int):
+    def plain():
+        return None
+
+    decorated = metrics.timed("bench.decorated")(plain)
+    hist = metrics.TIMINGS.histogram("bench.with")
+
+    def with_block():
+        with metrics.timed("bench.with"):
+            return None
+
+    def with_cached():
+        with metrics._Timed(hist):
+            return None
+
+    base = min(timeit.repeat(plain, number=calls, repeat=3)) / calls * 1e9
+    print(f"{'方式':>16}{'每次(ns)':>12}{'额外开销(ns)':>14}")
+    for label, func in (("plain", plain), ("decorator", decorated),
+                        ("with timed()", with_block), ("with 预取直方图", with_cached)):
+        cost = min(timeit.repeat(func, number=calls, repeat=3)) / calls * 1e9
+        print(f"{label:>16}{cost:>12.0f}{cost - base:>14.0f}")
+
+
+def bench_accuracy(samples: int = 100000):
+    rng = random.Random(7)
+    hist = metrics.Histogram()
+    values = [rng.lognormvariate(-1.5, 1.0) for _ in range(samples)]   # 秒，中位数约 220ms
+    for v in values:
+        hist.record(v)
+    ms = [v * 1000 for v in values]
+    print(f"\n{'百分位':>8}{'精确(ms)':>12}{'直方图(ms)':>12}{'相对误差':>10}")
+    for pct in (50, 95, 99):
+        exact = percentile(ms, pct)
+        approx = hist.percentile(pct)
+        print(f"{'p%d' % pct:>8}{exact:>12.1f}{approx:>12.1f}{(approx - exact) / exact:>10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="计时层开销基准")
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+    bench_overhead(args.calls)
+    bench_accuracy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+缓存预热基准（离线）
+
+在本地启动 Nullbr API 模拟服务（fake_nullbr），按 Zipf 分布生成一天的热门关键词统计，
+然后比较"晚间第一个用户"在冷缓存与预热后两种情况下的首次请求延迟：
+一次搜索 + 第一个结果的优先级资源（与 #关键词 -> #1 的请求序列相同）。
+
+输出冷/热两种情况下每个热门关键词的请求耗时 p50/p95、预热本身的 API 调用次数和用时，
+以及模拟服务实际收到的请求数。
+
+需要 MoviePilot 源码（客户端依赖 app.log）:
+    PYTHONPATH=/path/to/MoviePilot python benchmarks/bench_warmer.py \\
+        [--latency 0.3] [--top-k 10] [--budget 30]
+"""
+import argparse
+import importlib
+import os
+import random
+import time
+
+from _common import load_plugin_package, percentile
+from fake_nullbr import start_fake_nullbr
+
+# 模拟服务在本机，避免经过系统代理
+os.environ.setdefault("NO_PROXY", "127.0.0.1,localhost")
+
+_pkg = load_plugin_package("nullbr_search_pro")
+nullbr_client = importlib.import_module(f"{_pkg}.nullbr_core.nullbr_client")
+cache_warmer = importlib.import_module(f"{_pkg}.nullbr_core.cache_warmer")
+metrics = importlib.import_module(f"{_pkg}.nullbr_core.metrics")
+
+PRIORITY = ("115", "magnet", "ed2k", "video")
+KEYWORDS = [f"电影{i}" for i in range(200)]
+
+
+def popular_stats(searches: int, seed: int) -> "metrics.Metrics":
+    """按 Zipf 分布模拟一天的搜索，返回带热门关键词统计的 Metrics"""
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(len(KEYWORDS))]
+    stats = metrics.Metrics()
+    for keyword in rng.choices(KEYWORDS, weights, k=searches):
+        stats.record_keyword(keyword)
+    return stats
+
+
+def first_request(client, keyword: str) -> float:
+    """模拟用户的 #关键词 -> #1：搜索 + 第一个结果按优先级获取资源，返回耗时（秒）"""
+    start = time.perf_counter()
+    result = client.search(keyword)
+    items = (result or {}).get('items') or []
+    if items:
+        selected = items[0]
+        fetch = client.get_movie_resources if selected['media_type'] == 'movie' else client.get_tv_resources
+        for resource_type in PRIORITY:
+            if not selected.get(f"{resource_type}-flg"):
+                continue
+            resources = fetch(selected['tmdbid'], resource_type)
+            if resources and resources.get(resource_type):
+                break
+    return time.perf_counter() - start
+
+
+def measure(state, base_url: str, keywords, warm: bool, budget: int):
+    client = nullbr_client.NullbrApiClient(state.app_id, state.api_key)
+    client._base_url = base_url
+    # 与插件一致：只在开启缓存预热时缓存有结果的查询
+    client.enable_result_cache(warm)
+    summary = None
+    if warm:
+        # 每次运行独立计时，不受模块级的最小间隔限制
+        cache_warmer._last_run = 0.0
+        start = time.perf_counter()
+        summary = cache_warmer.CacheWarmer(client, PRIORITY, budget=budget, jitter=0).run(keywords)
+        summary['seconds'] = time.perf_counter() - start
+    before = sum(state.calls.values())
+    samples = [first_request(client, keyword) for keyword in keywords]
+    requests = sum(state.calls.values()) - before
+    client.close()
+    return samples, requests, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缓存预热基准")
+    parser.add_argument("--latency", type=float, default=0.3, help="模拟服务的中位延迟（秒）")
+    parser.add_argument("--top-k", type=int, default=cache_warmer.WARM_TOP_K)
+    parser.add_argument("--budget", type=int, default=cache_warmer.WARM_BUDGET)
+    parser.add_argument("--searches", type=int, default=2000, help="模拟一天的搜索次数（用于热门统计）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server, state, base_url = start_fake_nullbr(latency=args.latency, seed=args.seed)
+    keywords = [keyword for keyword, _ in popular_stats(args.searches, args.seed).top_keywords(args.top_k)]
+    print(f"热门关键词 {len(keywords)} 个，模拟延迟 {args.latency * 1000:.0f}ms，预热预算 {args.budget} 次\n")
+
+    print(f"{'':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'max(ms)':>10}{'用户请求数':>12}")
+    for name, warm in (("冷缓存", False), ("预热后", True)):
+        samples, requests, summary = measure(state, base_url, keywords, warm, args.budget)
+        ms = [s * 1000 for s in samples]
+        print(f"{name:>8}{percentile(ms, 50):>10.1f}{percentile(ms, 95):>10.1f}{max(ms):>10.1f}{requests:>12}")
+        if summary:
+            print(f"{'':>8}预热: {summary['keywords']} 个关键词，{summary['calls']} 次 API 调用，"
+                  f"用时 {summary['seconds']:.1f}s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
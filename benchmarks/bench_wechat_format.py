@@ -0,0 +1,134 @@
+"""
+企业微信消息格式化基准
+
+对比两种格式化方式：
+- legacy: 原 _format_message_for_wechat，每行多次 in 判断并调用 re.match，
+  post_message 每次发送都重新推导渠道名称
+- formatter: message_formatter 单次遍历 + 预编译正则，按渠道对象缓存格式化函数
+
+两者输出逐字节一致由 tests/test_message_formatter.py 校验（金样语料 + 模糊校验），
+其中的参照实现 legacy_format/legacy_post 即本文件中的版本；计时前也会对计时用的消息再校验一次。
+
+用法: python benchmarks/bench_wechat_format.py [--repeat 200]
+"""
+import argparse
+import importlib
+import re
+import timeit
+
+from _common import load_plugin_package
+
+_pkg = load_plugin_package("nullbr_search_pro")
+message_formatter = importlib.import_module(f"{_pkg}.nullbr_core.message_formatter")
+message_renderer = importlib.import_module(f"{_pkg}.nullbr_core.message_renderer")
+
+
+def legacy_format(text: str) -> str:
+    lines = text.split('\n')
+    formatted_lines = []
+    for i, line in enumerate(lines):
+        stripped_line = line.strip()
+        if not stripped_line:
+            if formatted_lines and formatted_lines[-1] != '':
+                formatted_lines.append('')
+            continue
+        if ('🎬' in stripped_line or '🎯' in stripped_line or '✅' in stripped_line or '❌' in stripped_line) \
+                and '：' in stripped_line:
+            if formatted_lines and formatted_lines[-1] != '':
+                formatted_lines.append('')
+            formatted_lines.append(stripped_line)
+            formatted_lines.append('')
+        elif re.match(r'^\d+\.', stripped_line) or re.match(r'^【\d+】', stripped_line):
+            if formatted_lines and formatted_lines[-1] != '':
+                formatted_lines.append('')
+            formatted_lines.append(stripped_line)
+        elif stripped_line.startswith(' ') or stripped_line.startswith('   '):
+            formatted_lines.append(stripped_line)
+        elif stripped_line.startswith('---') or stripped_line.startswith('💡') or stripped_line.startswith('📋'):
+            if formatted_lines and formatted_lines[-1] != '':
+                formatted_lines.append('')
+            formatted_lines.append(stripped_line)
+        else:
+            formatted_lines.append(stripped_line)
+    return '\n'.join(formatted_lines)
+
+
+def legacy_post(channel, text: str) -> str:
+    if hasattr(channel, 'name'):
+        channel_name = str(channel.name).lower()
+    elif hasattr(channel, 'type'):
+        channel_name = str(channel.type).lower()
+    else:
+        channel_name = str(channel).lower()
+    if 'wechat' in channel_name or 'wecom' in channel_name or 'wework' in channel_name:
+        return legacy_format(text)
+    return text
+
+
+def formatter_post(channel, text: str) -> str:
+    return message_formatter.get_formatter(channel)(text)
+
+
+class FakeChannel:
+    """模拟 MessageChannel 枚举成员"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+def magnet_list(n: int) -> str:
+    resources = [{
+        'name': f"Movie.Name.{2000 + i % 20}.2160p.WEB-DL.H265.HDR10.DDP5.1-GROUP{i}",
+        'size': f"{10 + i % 50}.{i % 100:02d} GB",
+        'resolution': '2160p' if i % 2 else '1080p',
+        'zh_sub': i % 3 == 0,
+        'magnet': f"magnet:?xt=urn:btih:{i:040x}&dn=Movie.Name",
+    } for i in range(n)]
+    return message_renderer.RecordPager(
+        header="🎯 「流浪地球」的magnet资源:\n\n",
+        items=resources,
+        template=message_renderer.RESOURCE_TEMPLATES['magnet'],
+        limit=1 << 30,
+        footer=f"📊 共找到 {n} 个资源\n\n💡 发送「编号.magnet」离线下载\n",
+        page_size=None,
+    ).next_page().text
+
+
+def search_list(n: int) -> str:
+    items = [{
+        'title': f"流浪地球 {i}",
+        'media_type': 'movie' if i % 2 else 'tv',
+        'release_date': f"{2000 + i % 25}-01-01",
+        '115-flg': 1, 'magnet-flg': i % 2, 'ed2k-flg': i % 3 == 0,
+    } for i in range(n)]
+    return message_renderer.RecordPager(
+        header="🎬 搜索结果：流浪地球\n\n",
+        items=items,
+        template=message_renderer.SEARCH_TEMPLATE,
+        limit=1 << 30,
+        footer="📋 使用方法:\n发送数字选择影片，如: 1\n",
+        page_size=None,
+        ctx={'enabled_types': ('115', 'magnet', 'ed2k')},
+    ).next_page().text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="企业微信消息格式化基准")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    channels = (("wechat", FakeChannel("Wechat")), ("telegram", FakeChannel("Telegram")))
+    print(f"{'消息':>14}{'渠道':>10}{'legacy(µs)':>14}{'formatter(µs)':>15}{'加速比':>8}")
+    for label, text in (("magnet×10", magnet_list(10)), ("magnet×100", magnet_list(100)),
+                        ("magnet×1000", magnet_list(1000)), ("search×100", search_list(100))):
+        for channel_label, channel in channels:
+            assert legacy_post(channel, text) == formatter_post(channel, text)
+            legacy = min(timeit.repeat(lambda: legacy_post(channel, text),
+                                       number=args.repeat, repeat=3)) / args.repeat * 1e6
+            formatter = min(timeit.repeat(lambda: formatter_post(channel, text),
+                                          number=args.repeat, repeat=3)) / args.repeat * 1e6
+            print(f"{label:>14}{channel_label:>10}{legacy:>14.1f}{formatter:>15.1f}{legacy / formatter:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+校验两个插件目录下的 nullbr_core 是否一致
+
+插件市场按目录安装插件，nullbr_search 与 nullbr_search_pro 各带一份 nullbr_core，两份应完全相同，
+两个插件的公共行为才能保持一致（每个插件只导入自己的副本，见 nullbr_core/__init__.py）。
+
+用法: python benchmarks/check_core_sync.py   # 不一致时列出差异文件并返回 1
+"""
+import filecmp
+import os
+import sys
+
+from _common import PLUGINS_DIR
+
+PLUGINS = ("nullbr_search", "nullbr_search_pro")
+
+
+def core_files(plugin_id: str) -> set:
+    path = os.path.join(PLUGINS_DIR, plugin_id, "nullbr_core")
+    return {name for name in os.listdir(path) if name.endswith(".py")}
+
+
+def main() -> int:
+    left, right = (os.path.join(PLUGINS_DIR, p, "nullbr_core") for p in PLUGINS)
+    names = core_files(PLUGINS[0]) | core_files(PLUGINS[1])
+    problems = []
+    for name in sorted(names):
+        a, b = os.path.join(left, name), os.path.join(right, name)
+        if not os.path.exists(a) or not os.path.exists(b):
+            problems.append(f"{name}: 只存在于 {PLUGINS[0] if os.path.exists(a) else PLUGINS[1]}")
+        elif not filecmp.cmp(a, b, shallow=False):
+            problems.append(f"{name}: 内容不同")
+    if problems:
+        print("nullbr_core 不一致:")
+        for line in problems:
+            print(f"  {line}")
+        return 1
+    print(f"nullbr_core 一致（{len(names)} 个文件）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
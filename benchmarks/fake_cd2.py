@@ -0,0 +1,108 @@
+"""
+进程内 CloudDriveFileSrv 模拟服务
+
+基于 clouddrive.proto 生成的 CloudDriveFileSrvServicer 实现插件用到的 RPC，
+可配置每个调用的延迟和被拒绝的离线链接，用于基准测试、tests/ 中的测试和手工验证 CloudDrive2 客户端。
+"""
+import importlib
+import random
+import threading
+import time
+from concurrent import futures
+from typing import Sequence
+
+import grpc
+from google.protobuf import empty_pb2
+
+from _common import load_plugin_package
+
+_pkg = load_plugin_package("nullbr_search_pro")
+clouddrive_pb2 = importlib.import_module(f"{_pkg}.clouddrive_pb2")
+clouddrive_pb2_grpc = importlib.import_module(f"{_pkg}.clouddrive_pb2_grpc")
+
+
+class FakeCloudDriveFileSrv(clouddrive_pb2_grpc.CloudDriveFileSrvServicer):
+    """CloudDriveFileSrv 模拟实现，离线任务保存在内存中"""
+
+    def __init__(self, latency: float = 0.0, api_token: str = "bench-token",
+                 quota_total: int = 1000, latency_samples: Sequence[float] = None):
+        """
+        :param latency: 每个调用的固定延迟（秒）
+        :param latency_samples: 延迟样本（秒），给出时每个调用从中随机抽取
+        """
+        self.latency = latency
+        self.latency_samples = list(latency_samples or [])
+        self._rng = random.Random(0)
+        self.api_token = api_token
+        self.quota_total = quota_total
+        self.offline_files = []
+        # 提交时返回 INVALID_ARGUMENT 的离线链接
+        self.rejected_urls = set()
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def _enter(self, name: str, context, auth: bool = True):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if auth:
+            metadata = dict(context.invocation_metadata())
+            if metadata.get("authorization") != f"Bearer {self.api_token}":
+                context.abort(grpc.StatusCode.UNAUTHENTICATED, "invalid token")
+        if self.latency_samples:
+            with self._lock:
+                delay = self._rng.choice(self.latency_samples)
+            time.sleep(delay)
+        elif self.latency:
+            time.sleep(self.latency)
+
+    def GetSystemInfo(self, request, context):
+        self._enter("GetSystemInfo", context, auth=False)
+        return clouddrive_pb2.CloudDriveSystemInfo(IsLogin=True, UserName="bench", SystemReady=True)
+
+    def GetToken(self, request, context):
+        self._enter("GetToken", context, auth=False)
+        return clouddrive_pb2.JWTToken(success=True, token=self.api_token)
+
+    def AddOfflineFiles(self, request, context):
+        self._enter("AddOfflineFiles", context)
+        if self.rejected_urls.intersection(request.urls.split("\n")):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "invalid url")
+        with self._lock:
+            for url in request.urls.split("\n"):
+                if url:
+                    self.offline_files.append(clouddrive_pb2.OfflineFile(
+                        name=url[-32:], url=url, status=1, percendDone=0.0
+                    ))
+        return clouddrive_pb2.FileOperationResult(success=True)
+
+    def ListOfflineFilesByPath(self, request, context):
+        self._enter("ListOfflineFilesByPath", context)
+        with self._lock:
+            files = list(self.offline_files)
+        return clouddrive_pb2.OfflineFileListResult(offlineFiles=files)
+
+    def GetOfflineQuotaInfo(self, request, context):
+        self._enter("GetOfflineQuotaInfo", context)
+        with self._lock:
+            used = len(self.offline_files)
+        return clouddrive_pb2.OfflineQuotaInfo(
+            total=self.quota_total, used=used, left=max(0, self.quota_total - used)
+        )
+
+    def AddSharedLink(self, request, context):
+        self._enter("AddSharedLink", context)
+        return empty_pb2.Empty()
+
+
+def start_fake_server(latency: float = 0.0, max_workers: int = 64, **kwargs):
+    """
+    启动模拟服务
+
+    :return: (server, servicer, address)
+    """
+    servicer = FakeCloudDriveFileSrv(latency=latency, **kwargs)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
+    clouddrive_pb2_grpc.add_CloudDriveFileSrvServicer_to_server(servicer, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, servicer, f"127.0.0.1:{port}"
@@ -0,0 +1,199 @@
+"""
+本地 Nullbr API 模拟服务
+
+按 api_nullbr.md 实现插件用到的接口（/search、/movie/{id}、/tv/{id} 及其资源子路径），
+返回由关键词和 tmdbid 确定性生成的数据。可配置：
+- latency: 响应延迟中位数（秒），按对数正态分布抖动
+- latency_samples: 延迟样本（秒），给出时从中随机抽取（如回放时使用录制的延迟）
+- error_rate: 返回 500 的比例（触发客户端的重试退避）
+- throttle_rate: 返回 429 的比例，附带 Retry-After
+- empty_rate: 搜索无结果的比例（触发回退到 MoviePilot 搜索）
+- items / per_type: 每次搜索的结果数、每种类型的资源数
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Sequence
+from urllib.parse import parse_qs, urlparse
+
+RESOURCE_TYPES = ("115", "magnet", "ed2k", "video")
+
+
+def _seed(*parts) -> int:
+    return int(hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()[:8], 16)
+
+
+class FakeNullbrState:
+    """模拟服务的配置与调用统计（所有请求线程共享）"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 empty_rate: float = 0.0, retry_after: int = 1, items: int = 8, per_type: int = 6,
+                 app_id: str = "bench-app", api_key: str = "bench-key", seed: int = 0,
+                 latency_samples: Sequence[float] = None):
+        self.latency = latency
+        self.latency_samples = list(latency_samples or [])
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.empty_rate = empty_rate
+        self.retry_after = retry_after
+        self.items = items
+        self.per_type = per_type
+        self.app_id = app_id
+        self.api_key = api_key
+        self.calls = {}
+        self.statuses = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def roll(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def delay(self) -> float:
+        if self.latency_samples:
+            with self._lock:
+                return self._rng.choice(self.latency_samples)
+        if not self.latency:
+            return 0.0
+        with self._lock:
+            return self.latency * self._rng.lognormvariate(0, 0.5)
+
+    def count(self, route: str, status: int):
+        with self._lock:
+            self.calls[route] = self.calls.get(route, 0) + 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    # 数据生成 -----------------------------------------------------------------
+
+    def search(self, query: str, page: int) -> dict:
+        rng = random.Random(_seed("search", query, page))
+        items = []
+        for i in range(self.items):
+            tmdbid = _seed(query, i) % 900000 + 1000
+            media_type = "tv" if i % 3 == 2 else "movie"
+            items.append({
+                "media_type": media_type,
+                "tmdbid": tmdbid,
+                "title": f"{query} {i + 1}" if i else query,
+                "poster": f"/poster/{tmdbid}.jpg",
+                "overview": f"{query} 的模拟简介。" * rng.randint(1, 4),
+                "vote_average": round(rng.uniform(5, 9), 1),
+                "release_date": f"{rng.randint(1990, 2025)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+                **{f"{t}-flg": int(rng.random() < 0.8) for t in RESOURCE_TYPES},
+            })
+        return {"page": page, "total_pages": 1, "total_results": len(items), "items": items}
+
+    def metadata(self, media_type: str, tmdbid: int) -> dict:
+        rng = random.Random(_seed(media_type, tmdbid))
+        data = {
+            "id": tmdbid,
+            "media_type": media_type,
+            "title": f"Title {tmdbid}",
+            "overview": "模拟简介",
+            "vote_average": round(rng.uniform(5, 9), 1),
+            "release_date": f"{rng.randint(1990, 2025)}-01-01",
+            **{f"{t}-flg": 1 for t in RESOURCE_TYPES},
+        }
+        if media_type == "tv":
+            data["number_of_seasons"] = rng.randint(1, 8)
+        return data
+
+    def resources(self, media_type: str, tmdbid: int, resource_type: str) -> dict:
+        rng = random.Random(_seed(media_type, tmdbid, resource_type))
+        entries = []
+        for i in range(self.per_type):
+            digest = hashlib.sha1(f"{tmdbid}-{resource_type}-{i}".encode()).hexdigest()
+            resolution = rng.choice(["2160p", "1080p", "720p"])
+            size = f"{rng.uniform(1, 80):.2f} GB"
+            name = f"Title.{tmdbid}.{resolution}.{i}"
+            if resource_type == "115":
+                entry = {"title": name, "size": size, "resolution": resolution, "quality": "HDR10",
+                         "share_link": f"https://115cdn.com/s/sw{digest[:10]}?password={digest[-4:]}"}
+                if media_type == "tv":
+                    entry["season_list"] = ["S1", "S2"]
+            elif resource_type == "magnet":
+                entry = {"name": name, "size": size, "resolution": resolution, "quality": ["WEB-DL"],
+                         "zh_sub": i % 2, "magnet": f"magnet:?xt=urn:btih:{digest}"}
+            elif resource_type == "ed2k":
+                entry = {"name": name, "size": size, "resolution": resolution, "zh_sub": i % 2,
+                         "ed2k": f"ed2k://|file|{name}.mkv|{rng.randint(10 ** 9, 10 ** 10)}|{digest[:32]}|/"}
+            else:
+                entry = {"name": name, "source": "bench", "type": "m3u8",
+                         "link": f"https://video.example/{digest}.m3u8"}
+            entries.append(entry)
+        return {"id": tmdbid, "media_type": media_type, resource_type: entries}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    state: FakeNullbrState = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, route: str, status: int, body: dict = None, headers: dict = None):
+        self.state.count(route, status)
+        payload = json.dumps(body if body is not None else {"error": status}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        state = self.state
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        # 统计用的路由名：只把 tmdbid 位置替换为 {id}（资源类型 115 也是数字）
+        route = "/".join("{id}" if i == 1 and p.isdigit() else p for i, p in enumerate(parts))
+
+        delay = state.delay()
+        if delay:
+            time.sleep(delay)
+
+        if self.headers.get("X-APP-ID") != state.app_id:
+            return self._reply(route, 403)
+        roll = state.roll()
+        if roll < state.throttle_rate:
+            return self._reply(route, 429, headers={"Retry-After": str(state.retry_after)})
+        if roll < state.throttle_rate + state.error_rate:
+            return self._reply(route, 500)
+
+        if parts == ["search"]:
+            query = parse_qs(url.query).get("query", [""])[0]
+            page = int(parse_qs(url.query).get("page", ["1"])[0])
+            if state.roll() < state.empty_rate:
+                return self._reply(route, 200, {"page": page, "total_pages": 0, "total_results": 0, "items": []})
+            return self._reply(route, 200, state.search(query, page))
+
+        if len(parts) >= 2 and parts[0] in ("movie", "tv") and parts[1].isdigit():
+            media_type, tmdbid = parts[0], int(parts[1])
+            if len(parts) == 2:
+                return self._reply(route, 200, state.metadata(media_type, tmdbid))
+            if self.headers.get("X-API-KEY") != state.api_key:
+                return self._reply(route, 401)
+            resource_type = parts[-1]
+            if resource_type in RESOURCE_TYPES:
+                return self._reply(route, 200, state.resources(media_type, tmdbid, resource_type))
+
+        return self._reply(route, 404)
+
+
+def start_fake_nullbr(**kwargs):
+    """
+    启动模拟服务（后台线程）
+
+    :param kwargs: FakeNullbrState 的参数
+    :return: (server, state, base_url)
+    """
+    state = FakeNullbrState(**kwargs)
+    handler = type("FakeNullbrHandler", (_Handler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-nullbr", daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_port}"
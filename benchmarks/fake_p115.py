@@ -0,0 +1,122 @@
+"""
+p115client 模拟实现
+
+提供插件 p115_client 模块用到的 P115Client 方法（user_my、share_snap、share_receive、
+fs_files、fs_mkdir）和 check_response，数据保存在内存中，可配置每次调用的延迟和失败比例。
+
+install() 将 p115_client 模块中的 P115Client/check_response 替换为模拟实现，
+之后创建的 P115ShareClient 都使用模拟客户端。
+"""
+import hashlib
+import random
+import threading
+import time
+from typing import Sequence
+
+
+class FakeP115Error(OSError):
+    """与 p115client 一致：check_response 在 state 为假时抛出的异常"""
+
+
+def check_response(response: dict) -> dict:
+    if not response.get("state"):
+        raise FakeP115Error(response.get("error") or response.get("errno") or "115 请求失败")
+    return response
+
+
+class FakeP115Client:
+    """P115Client 模拟实现（类属性保存配置和全部实例共享的统计）"""
+
+    latency = 0.0
+    latency_samples = []
+    error_rate = 0.0
+    expired = False
+    calls = {}
+    received = []
+    _rng = random.Random(0)
+    _lock = threading.Lock()
+
+    def __init__(self, cookies: str):
+        self.cookies = cookies
+
+    @classmethod
+    def configure(cls, latency: float = 0.0, error_rate: float = 0.0, expired: bool = False, seed: int = 0,
+                  latency_samples: Sequence[float] = None):
+        """
+        :param latency: 调用延迟中位数（秒），按对数正态分布抖动
+        :param latency_samples: 延迟样本（秒），给出时从中随机抽取
+        """
+        cls.latency = latency
+        cls.latency_samples = list(latency_samples or [])
+        cls.error_rate = error_rate
+        cls.expired = expired
+        cls.calls = {}
+        cls.received = []
+        cls._rng = random.Random(seed)
+
+    def _enter(self, name: str) -> dict:
+        """记录调用并模拟延迟，返回错误响应或 None"""
+        cls = type(self)
+        with cls._lock:
+            cls.calls[name] = cls.calls.get(name, 0) + 1
+            roll = cls._rng.random()
+            if cls.latency_samples:
+                delay = cls._rng.choice(cls.latency_samples)
+            else:
+                delay = cls.latency * cls._rng.lognormvariate(0, 0.5) if cls.latency else 0.0
+        if delay:
+            time.sleep(delay)
+        if cls.expired:
+            return {"state": False, "errno": 990001, "error": "登录超时，请重新登录"}
+        if roll < cls.error_rate:
+            return {"state": False, "errno": 4100012, "error": "服务繁忙，请稍后再试"}
+        return None
+
+    def user_my(self, *args, **kwargs) -> dict:
+        return self._enter("user_my") or {"state": True, "data": {"user_name": "bench"}}
+
+    def share_snap(self, payload: dict, *args, **kwargs) -> dict:
+        error = self._enter("share_snap")
+        if error:
+            return error
+        code = payload["share_code"]
+        files = [{"fid": str(int(hashlib.md5(f"{code}{i}".encode()).hexdigest()[:12], 16)),
+                  "n": f"{code}-{i}.mkv", "s": 1 << 30} for i in range(3)]
+        return {"state": True, "data": {"shareinfo": {"snap_id": f"snap-{code}"}, "list": files,
+                                        "count": len(files)}}
+
+    def share_receive(self, payload: dict, *args, **kwargs) -> dict:
+        error = self._enter("share_receive")
+        if error:
+            return error
+        with type(self)._lock:
+            type(self).received.append(payload["share_code"])
+        return {"state": True, "data": {}}
+
+    def fs_files(self, payload: dict, *args, **kwargs) -> dict:
+        error = self._enter("fs_files")
+        if error:
+            return error
+        path = payload.get("path")
+        cid = str(int(hashlib.md5(path.encode()).hexdigest()[:8], 16)) if path else payload.get("cid", "0")
+        return {"state": True, "cid": cid, "path": [{"cid": "0"}, {"cid": cid}], "data": []}
+
+    def fs_mkdir(self, payload: dict, *args, **kwargs) -> dict:
+        error = self._enter("fs_mkdir")
+        if error:
+            return error
+        return {"state": True, "cid": str(int(hashlib.md5(payload["cname"].encode()).hexdigest()[:8], 16))}
+
+
+def install(p115_module, **kwargs):
+    """
+    用模拟实现替换 p115_client 模块中的 p115client 依赖
+
+    :param p115_module: 插件的 p115_client 模块
+    :param kwargs: FakeP115Client.configure 的参数
+    :return: FakeP115Client
+    """
+    FakeP115Client.configure(**kwargs)
+    p115_module.P115Client = FakeP115Client
+    p115_module.check_response = check_response
+    return FakeP115Client
@@ -0,0 +1,221 @@
+"""
+流量回放
+
+读取插件流量录制文件（插件配置中开启"录制交互流量"，文件位于插件数据目录 traffic/ 下），
+按原始时间间隔的 1/speed 将事件重新送入 nullbr_search_pro 的 talk / handle_message_action，
+后端为本地模拟服务（见 bench_plugin.BenchEnv）：
+
+- 模拟服务的延迟从录制中各后端的实际耗时抽样（nullbr.http/nullbr.direct、p115.*、cd2.*）
+- 同一用户的事件按顺序串行处理（会话依赖前一步的缓存），不同用户并发
+- 关键词标记还原为固定的合成关键词，同一标记始终对应同一关键词，缓存命中情况与录制一致
+
+输出回放吞吐量、各类事件处理耗时与录制时的对比、调度延迟（处理跟不上回放速度时增大）和峰值内存。
+
+用法: PYTHONPATH=/path/to/MoviePilot python benchmarks/replay_traffic.py traffic-xxx.jsonl \\
+          [--speed 1|10|100] [--error-rate 0] [--throttle-rate 0]
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List
+
+from _common import percentile
+from bench_plugin import BenchEnv, Recorder, peak_memory
+
+# 录制中的阶段 -> 模拟服务
+BACKEND_STAGES = {
+    'nullbr': ('nullbr.http', 'nullbr.direct'),
+    'p115': ('p115.share_snap', 'p115.share_receive', 'p115.check_alive'),
+    'cd2': ('cd2.',),
+}
+
+
+def load_traffic(path: str):
+    """
+    读取录制文件
+
+    :return: (文件头, 按时间排序的事件列表)
+    """
+    header, events = None, []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            if 'v' in data:
+                header = header or data        # 多次启用录制时文件中可能有多个文件头
+                continue
+            events.append(data)
+    events.sort(key=lambda e: e['t'])
+    return header, events
+
+
+def latency_samples(events: List[dict]) -> Dict[str, List[float]]:
+    """按后端汇总录制中的调用耗时（秒）"""
+    samples = defaultdict(list)
+    for event in events:
+        for stage, ms, _ in event.get('b', []):
+            for backend, prefixes in BACKEND_STAGES.items():
+                if any(stage == p or (p.endswith('.') and stage.startswith(p)) for p in prefixes):
+                    samples[backend].append(ms / 1000)
+    return samples
+
+
+def event_text(event: dict) -> str:
+    """还原事件文本（talk 为用户消息，action 为回调数据）"""
+    kind, args = event['k'], event.get('a', [])
+    if event['s'] == 'talk':
+        if kind == 'search':
+            return f"#kw{args[0]}"
+        if kind == 'auto':
+            return f"#!kw{args[0]}"
+        if kind == 'next':
+            return "#next"
+        if kind == 'get':
+            return f"#{args[0]}.{args[1]}"
+        if kind == 'range':
+            return f"#{args[0]}-{args[1]}"
+        return f"#{args[0]}"
+    if kind in ('select', 'transfer'):
+        return f"{kind}_{args[0]}"
+    if kind == 'get':
+        return f"get_{args[0]}_{args[1]}" if len(args) > 1 else f"get_{args[0]}"
+    return kind
+
+
+class Replayer:
+    """按时间表把事件分发给各用户的工作线程"""
+
+    def __init__(self, env: BenchEnv, recorder: Recorder, speed: float):
+        self.env = env
+        self.recorder = recorder
+        self.speed = speed
+        self.channels = {m.name.lower(): m for m in env.types.MessageChannel}
+        self.durations = defaultdict(list)      # {(来源, 类型): [秒]}
+        self.lag = []
+        self._queues: Dict[str, queue.Queue] = {}
+        self._threads: List[threading.Thread] = []
+
+    def _make_event(self, event: dict, userid: str):
+        types = self.env.types
+        channel = self.channels.get(event.get('c') or '', types.MessageChannel.Wechat)
+        text = event_text(event)
+        if event['s'] == 'talk':
+            return self.env.plugin.talk, self.env.Event(types.EventType.UserMessage, {
+                "text": text, "userid": userid, "channel": channel
+            })
+        data = {"plugin_id": self.env.plugin.__class__.__name__, "text": text, "channel": channel,
+                "source": "replay", "userid": userid}
+        if event.get('e'):
+            data.update(original_message_id=1, original_chat_id=userid)
+        return self.env.plugin.handle_message_action, self.env.Event(types.EventType.MessageAction, data)
+
+    def _worker(self, userid: str, inbox: queue.Queue):
+        while True:
+            item = inbox.get()
+            if item is None:
+                return
+            event, due = item
+            handler, mp_event = self._make_event(event, userid)
+            start = time.perf_counter()
+            self.lag.append(start - due)
+            self.recorder.begin(userid)
+            try:
+                handler(mp_event)
+            except Exception as e:
+                print(f"事件处理异常: {e}")
+            self.durations[event['s'], event['k']].append(time.perf_counter() - start)
+
+    def _inbox(self, userid: str) -> queue.Queue:
+        inbox = self._queues.get(userid)
+        if inbox is None:
+            inbox = self._queues[userid] = queue.Queue()
+            thread = threading.Thread(target=self._worker, args=(userid, inbox), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return inbox
+
+    def run(self, events: List[dict]) -> float:
+        """回放全部事件，返回耗时（秒）"""
+        start = time.perf_counter()
+        offset = events[0]['t'] if events else 0
+        for event in events:
+            due = start + (event['t'] - offset) / self.speed
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            self._inbox(f"r{event.get('u')}").put((event, due))
+        for inbox in self._queues.values():
+            inbox.put(None)
+        for thread in self._threads:
+            thread.join()
+        return time.perf_counter() - start
+
+
+def recorded_durations(events: List[dict]) -> Dict[tuple, List[float]]:
+    durations = defaultdict(list)
+    for event in events:
+        durations[event['s'], event['k']].append(event.get('d', 0) / 1000)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流量回放")
+    parser.add_argument("path", help="流量录制文件")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放速度倍数，如 1、10、100")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="额外注入的 Nullbr 500 比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="额外注入的 Nullbr 429 比例")
+    parser.add_argument("--tracemalloc", action="store_true", help="统计 Python 分配的峰值内存（较慢）")
+    args = parser.parse_args()
+
+    header, events = load_traffic(args.path)
+    if not events:
+        print("录制文件中没有事件")
+        return
+    samples = latency_samples(events)
+    span = events[-1]['t'] - events[0]['t']
+    print(f"录制: {header.get('plugin') if header else '未知插件'}，{len(events)} 个事件，"
+          f"{len({e.get('u') for e in events})} 个用户，时长 {span:.0f}s；回放速度 {args.speed:g}×")
+    print("延迟样本: " + ("，".join(f"{k} {len(v)} 个" for k, v in samples.items()) or "无（使用零延迟）"))
+
+    recorder = Recorder()
+    env = BenchEnv(
+        recorder,
+        nullbr=dict(latency_samples=samples.get('nullbr'), error_rate=args.error_rate,
+                    throttle_rate=args.throttle_rate),
+        p115=dict(latency_samples=samples.get('p115')),
+        cd2=dict(latency_samples=samples.get('cd2')),
+    )
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    replayer = Replayer(env, recorder, args.speed)
+    elapsed = replayer.run(events)
+    memory = peak_memory(args.tracemalloc)
+
+    print(f"\n回放耗时 {elapsed:.2f}s（理论 {span / args.speed:.2f}s），{len(events) / elapsed:.1f} 事件/s")
+    print(f"调度延迟 p50 {percentile(replayer.lag, 50) * 1000:.1f}ms，"
+          f"p99 {percentile(replayer.lag, 99) * 1000:.1f}ms")
+
+    recorded = recorded_durations(events)
+    print(f"\n{'事件':>16}{'次数':>8}{'录制p50':>10}{'回放p50':>10}{'录制p95':>10}{'回放p95':>10}（ms）")
+    for key in sorted(recorded, key=lambda k: -len(recorded[k])):
+        rec, rep = recorded[key], replayer.durations.get(key, [])
+        print(f"{'.'.join(key):>16}{len(rec):>8}"
+              f"{percentile(rec, 50) * 1000:>10.1f}{percentile(rep, 50) * 1000:>10.1f}"
+              f"{percentile(rec, 95) * 1000:>10.1f}{percentile(rep, 95) * 1000:>10.1f}")
+    print(f"首条回复 p50 {percentile(recorder.first_reply, 50) * 1000:.1f}ms，"
+          f"p95 {percentile(recorder.first_reply, 95) * 1000:.1f}ms")
+
+    env.print_backends()
+    print(memory)
+    env.close()
+
+
+if __name__ == "__main__":
+    main()
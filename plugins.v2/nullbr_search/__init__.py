@@ -1,4 +1,3 @@
-import re
 import time
 from typing import Any, List, Dict, Tuple
 
@@ -8,8 +7,16 @@ from app.plugins import _PluginBase
 from app.schemas.types import EventType
 from app.db.systemconfig_oper import SystemConfigOper
 
+from .nullbr_core.commands import PLAIN_TALK
+from .nullbr_core.dashboard import DASHBOARD_REFRESH_SECONDS
+from .nullbr_core.frontend import NullbrFrontend
+from .nullbr_core.message_renderer import RESOURCE_TEMPLATES, SEARCH_TEMPLATE, RecordPager, byte_limit
+from .nullbr_core.metrics import Metrics, timed
+from .nullbr_core.nullbr_client import acquire_client, release_client
+from .nullbr_core.session_store import SessionStore
 
-class nullbr_search(_PluginBase):
+
+class nullbr_search(NullbrFrontend, _PluginBase):
     # 插件基本信息
     plugin_name = "Nullbr资源搜索"
     plugin_desc = "支持nullbr api接口直接搜索影视资源。支持115网盘、磁力、ed2k、m3u8等多种资源类型。）"
@@ -45,88 +52,52 @@ class nullbr_search(_PluginBase):
         self._cms_client = None
         
         # 用户搜索结果缓存和资源缓存
-        self._user_search_cache = {}  # {userid: {'results': [...], 'timestamp': time.time()}}
-        self._user_resource_cache = {}  # {userid: {'resources': [...], 'title': str, 'timestamp': time.time()}}
+        self._user_search_cache = SessionStore()  # {userid: {'results': [...]}}
+        self._user_resource_cache = SessionStore()  # {userid: {'resources': [...], 'title': str}}
+        self._user_page_cache = SessionStore()  # {userid: {'pager': RecordPager, 'title': str}}
         
-        # 统计数据
-        self._stats = {
-            'total_searches': 0,           # 总搜索次数
-            'successful_searches': 0,      # 成功搜索次数  
-            'failed_searches': 0,          # 失败搜索次数
-            'total_resources': 0,          # 获取的总资源数
-            'cms_transfers': 0,            # CMS转存次数
-            'successful_transfers': 0,     # 成功转存次数
-            'failed_transfers': 0,         # 失败转存次数
-            'last_search_time': None,      # 最后搜索时间
-            'last_transfer_time': None,    # 最后转存时间
-            'api_status': 'unknown',       # API状态
-            'cms_status': 'unknown',       # CMS状态
-            'popular_resources': {}        # 热门搜索统计 {keyword: count}
-        }
-
-    def _format_message_for_wechat(self, text: str) -> str:
-        """格式化消息以兼容微信企业应用显示"""
-        # 微信企业应用需要特殊处理换行符和格式
-        # 将连续的换行符合并，并在关键位置添加分隔符
-        lines = text.split('\n')
-        formatted_lines = []
+        # 统计面板（由定时任务刷新，get_page 直接返回）
+        self._dashboard_snapshot = None
+        self._dashboard_page = None
         
-        for i, line in enumerate(lines):
-            stripped_line = line.strip()
-            
-            # 空行处理：连续空行只保留一个
-            if not stripped_line:
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                continue
-            
-            # 对于标题行（包含emoji和中文冒号），前后加空行
-            if ('🎬' in stripped_line or '🎯' in stripped_line or '✅' in stripped_line or '❌' in stripped_line) and '：' in stripped_line:
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                formatted_lines.append(stripped_line)
-                formatted_lines.append('')
-            # 对于编号列表项
-            elif re.match(r'^\d+\.', stripped_line) or re.match(r'^【\d+】', stripped_line):
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                formatted_lines.append(stripped_line)
-            # 对于缩进的详情行
-            elif stripped_line.startswith(' ') or stripped_line.startswith('   '):
-                formatted_lines.append(stripped_line)
-            # 对于分隔符和提示信息
-            elif stripped_line.startswith('---') or stripped_line.startswith('💡') or stripped_line.startswith('📋'):
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                formatted_lines.append(stripped_line)
-            else:
-                formatted_lines.append(stripped_line)
+        # /metrics 导出器（增量序列化），首次抓取时创建
+        self._exporter = None
+        
+        # 命令分派表：PLAIN_TALK 解析出的动词 -> 处理函数(*参数, channel, userid)
+        self._talk_handlers = {
+            'next': self.send_next_page,
+            'get': self.handle_get_resources,
+            'range': self.handle_resource_range,
+            'pick': self._handle_number,
+            'search': self.search_and_reply,
+        }
         
-        return '\n'.join(formatted_lines)
+        # 统计数据（计数器按线程分片，热门关键词使用固定容量的 Top-K 统计）
+        self._stats = Metrics(
+            counters=(
+                'total_searches',       # 总搜索次数
+                'successful_searches',  # 成功搜索次数
+                'failed_searches',      # 失败搜索次数
+                'total_resources',      # 获取的总资源数
+                'cms_transfers',        # CMS转存次数
+                'successful_transfers',  # 成功转存次数
+                'failed_transfers',     # 失败转存次数
+            ),
+            states={
+                'last_search_time': None,           # 最后搜索时间
+                'last_transfer_time': None,         # 最后转存时间
+                'api_status': 'unknown',            # API状态
+                'cms_status': 'unknown',            # CMS状态
+            }
+        )
 
     def post_message(self, channel, title: str, text: str, userid: str = None):
         """发送消息，自动处理微信格式兼容"""
-        # 检测是否为微信通知渠道
-        try:
-            # channel可能是字符串或MessageChannel对象
-            if hasattr(channel, 'name'):
-                channel_name = str(channel.name).lower()
-            elif hasattr(channel, 'type'):
-                channel_name = str(channel.type).lower()
-            else:
-                channel_name = str(channel).lower()
-            
-            # 检测微信相关渠道
-            if 'wechat' in channel_name or 'wecom' in channel_name or 'wework' in channel_name:
-                formatted_text = self._format_message_for_wechat(text)
-            else:
-                formatted_text = text
-        except Exception:
-            # 如果检测失败，使用原文本
-            formatted_text = text
+        formatted_text = self._format_text(channel, text)
         
         # 调用父类的post_message方法
-        super().post_message(channel=channel, title=title, text=formatted_text, userid=userid)
+        with timed("message.send"):
+            super().post_message(channel=channel, title=title, text=formatted_text, userid=userid)
 
     def init_plugin(self, config: dict = None):
         """初始化插件"""
@@ -166,19 +137,18 @@ class nullbr_search(_PluginBase):
             if self._cms_enabled:
                 logger.info(f"CloudSyncMedia已启用: {self._cms_url}")
         
-        # 初始化API客户端
+        # 初始化API客户端（先归还上一次配置的客户端）
+        release_client(self._client)
+        self._client = None
         if self._enabled and self._app_id:
             try:
-                from .nullbr_client import NullbrApiClient
-                self._client = NullbrApiClient(self._app_id, self._api_key)
+                self._client = acquire_client(self._app_id, self._api_key)
                 logger.info("Nullbr API客户端初始化成功")
             except Exception as e:
                 logger.error(f"Nullbr API客户端初始化失败: {str(e)}")
                 self._enabled = False
-        else:
-            if not self._app_id:
-                logger.warning("Nullbr插件配置错误: 缺少APP_ID")
-            self._client = None
+        elif not self._app_id:
+            logger.warning("Nullbr插件配置错误: 缺少APP_ID")
         
         # 初始化CloudSyncMedia客户端
         if self._cms_enabled and self._cms_url and self._cms_username and self._cms_password:
@@ -197,10 +167,6 @@ class nullbr_search(_PluginBase):
         else:
             self._cms_client = None
 
-    def get_state(self) -> bool:
-        """获取插件状态"""
-        return self._enabled
-
     @staticmethod
     def get_command() -> List[Dict[str, Any]]:
         """获取插件命令"""
@@ -208,7 +174,45 @@ class nullbr_search(_PluginBase):
 
     def get_api(self) -> List[Dict[str, Any]]:
         """获取插件API"""
-        pass
+        return [{
+            "path": "/metrics",
+            "endpoint": self.api_metrics,
+            "methods": ["GET"],
+            "auth": "apikey",
+            "summary": "OpenMetrics 指标",
+            "description": "以 OpenMetrics 文本格式导出计数器、缓存命中和各阶段延迟直方图"
+        }]
+
+    def get_service(self) -> List[Dict[str, Any]]:
+        """
+        注册插件公共服务（定时任务）
+        """
+        if not self._enabled:
+            return []
+        return [{
+            "id": "NullbrDashboard",
+            "name": "Nullbr 统计面板刷新",
+            "trigger": "interval",
+            "func": self._refresh_dashboard,
+            "kwargs": {"seconds": DASHBOARD_REFRESH_SECONDS}
+        }]
+
+    def _collect_gauges(self) -> Tuple[Dict[str, int], Dict[str, str]]:
+        """
+        收集即时值和后端状态，供统计面板和 /metrics 使用
+
+        :return: (即时值 {名称: 数值}, 后端状态 {后端: 状态})
+        """
+        states = {
+            'nullbr': '已配置' if self._client else '未配置',
+            'cms': '已连接' if self._cms_client else '未启用',
+        }
+        gauges = {
+            'search_cache_entries': len(self._user_search_cache),
+            'resource_cache_entries': len(self._user_resource_cache),
+            'page_cache_entries': len(self._user_page_cache),
+        }
+        return gauges, states
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -650,15 +654,6 @@ class nullbr_search(_PluginBase):
         "search_timeout": 30
         }
 
-    def get_page(self) -> List[dict]:
-        """
-        拼装插件详情页面，需要返回页面配置，同时附带数据
-        插件详情页面使用Vuetify组件拼装，参考：https://vuetifyjs.com/
-
-        :return: 页面配置（vuetify模式）或 None（vue模式）
-        """
-        pass
-
     @eventmanager.register(EventType.UserMessage)
     def talk(self, event: Event):
         """
@@ -667,104 +662,87 @@ class nullbr_search(_PluginBase):
         if not self._enabled:
             return
         
-        # 第3步测试阶段：即使没有client也要响应，用于测试交互逻辑
-        if not self._client:
-            logger.info("API客户端未初始化，但继续处理用户消息进行测试")
-            
+        # 一次解析：编号、#next、以问号结尾的搜索之外的消息在首尾字符检查处即被拒绝
         text = event.event_data.get("text")
-        userid = event.event_data.get("userid")
-        channel = event.event_data.get("channel")
-        
-        if not text:
+        command = PLAIN_TALK.parse(text)
+        if command is None:
             return
-            
-        logger.info(f"收到用户消息: {text}")
         
         # 检查是否为回退搜索触发的消息，避免无限循环
         if event.event_data.get('source') == 'nullbr_fallback':
             logger.info("检测到回退搜索消息，跳过处理避免循环")
             return
         
-        # 先检查是否为获取资源的请求（包含问号的情况，如 "1.115?" "2.magnet?"）
-        clean_text = text.rstrip('？?').strip()
-        if re.match(r'^\d+\.(115|magnet|video|ed2k)$', clean_text):
-            parts = clean_text.split('.')
-            number = int(parts[0])
-            resource_type = parts[1]
-            logger.info(f"检测到资源获取请求: {number}.{resource_type}")
-            self.handle_get_resources(number, resource_type, channel, userid)
-        
-        # 检查是否为编号选择（纯数字，包含问号的情况）
-        elif clean_text.isdigit():
-            number = int(clean_text)
-            
-            # 先检查是否有资源缓存（直接进行转存）
-            if userid in self._user_resource_cache:
-                cache = self._user_resource_cache[userid]
-                if time.time() - cache['timestamp'] < 3600:  # 1小时内有效
-                    if 1 <= number <= len(cache['resources']):
-                        if self._cms_enabled and self._cms_client:
-                            logger.info(f"检测到资源转存请求: {number}")
-                            self.handle_resource_transfer(number, channel, userid)
-                        else:
-                            # 有资源缓存但CMS未启用，显示资源详情和提示
-                            selected_resource = cache['resources'][number - 1]
-                            resource_detail = f"🎯 选择的资源:\n\n"
-                            resource_detail += f"🎬 影片: 「{cache['title']}」\n"
-                            resource_detail += f"📂 名称: {selected_resource['title']}\n"
-                            resource_detail += f"💾 大小: {selected_resource['size']}\n"
-                            resource_detail += f"🔗 链接: {selected_resource['url']}\n"
-                            resource_detail += f"{'─' * 15}\n"
-                            resource_detail += f"💡 CloudSyncMedia转存功能未启用\n"
-                            resource_detail += f"⚙️ 如需转存功能，请在插件设置中配置CloudSyncMedia"
-                            
-                            self.post_message(
-                                channel=channel,
-                                title="资源详情",
-                                text=resource_detail,
-                                userid=userid
-                            )
-                        return
-                    else:
-                        # 数字超出资源范围，提示用户
-                        self.post_message(
-                            channel=channel,
-                            title="编号错误",
-                            text=f"请输入有效的资源编号 (1-{len(cache['resources'])})。",
-                            userid=userid
-                        )
-                        return
-            
-            # 如果没有资源缓存，检查是否有搜索结果缓存
-            logger.info(f"检测到编号选择: {number}")
-            self.handle_resource_selection(number, channel, userid)
+        # 第3步测试阶段：即使没有client也要响应，用于测试交互逻辑
+        if not self._client:
+            logger.info("API客户端未初始化，但继续处理用户消息进行测试")
         
-        # 检查是否为搜索请求（以？结尾，但不是数字或资源请求）
-        elif text.endswith('？') or text.endswith('?'):
-            # 提取搜索关键词（去掉问号）
-            keyword = clean_text
-            
-            if keyword:
-                logger.info(f"检测到搜索请求: {keyword}")
-                self.search_and_reply(keyword, channel, userid)
+        userid = event.event_data.get("userid")
+        channel = event.event_data.get("channel")
+        logger.info(f"收到用户命令: {text.strip()} -> {command.verb}")
+        self._talk_handlers[command.verb](*command.args, channel, userid)
+
+    def _transfer_enabled(self) -> bool:
+        """资源列表中的编号是否可直接转存"""
+        return bool(self._cms_enabled and self._cms_client)
+
+    def _handle_number(self, number: int, channel, userid: str):
+        """处理编号：有资源列表时转存对应资源，否则选择搜索结果"""
+        # 先检查是否有资源缓存（直接进行转存）
+        cache = self._user_resource_cache.get(userid)
+        if cache:
+            if 1 <= number <= len(cache['resources']):
+                if self._transfer_enabled():
+                    logger.info(f"检测到资源转存请求: {number}")
+                    self.handle_resource_transfer(number, channel, userid)
+                else:
+                    # 有资源缓存但CMS未启用，显示资源详情和提示
+                    selected_resource = cache['resources'][number - 1]
+                    resource_detail = f"🎯 选择的资源:\n\n"
+                    resource_detail += f"🎬 影片: 「{cache['title']}」\n"
+                    resource_detail += f"📂 名称: {selected_resource['title']}\n"
+                    resource_detail += f"💾 大小: {selected_resource['size']}\n"
+                    resource_detail += f"🔗 链接: {selected_resource['url']}\n"
+                    resource_detail += f"{'─' * 15}\n"
+                    resource_detail += f"💡 CloudSyncMedia转存功能未启用\n"
+                    resource_detail += f"⚙️ 如需转存功能，请在插件设置中配置CloudSyncMedia"
+                    
+                    self.post_message(
+                        channel=channel,
+                        title="资源详情",
+                        text=resource_detail,
+                        userid=userid
+                    )
+                return
+            else:
+                # 数字超出资源范围，提示用户
+                self.post_message(
+                    channel=channel,
+                    title="编号错误",
+                    text=f"请输入有效的资源编号 (1-{len(cache['resources'])})。",
+                    userid=userid
+                )
+                return
+    
+        # 如果没有资源缓存，检查是否有搜索结果缓存
+        logger.info(f"检测到编号选择: {number}")
+        self.handle_resource_selection(number, channel, userid)
 
+    @timed("handler.search")
     def search_and_reply(self, keyword: str, channel: str, userid: str):
         """执行搜索并回复结果"""
         try:
             # 更新搜索统计
-            self._stats['total_searches'] += 1
+            self._stats.incr('total_searches')
             self._stats['last_search_time'] = time.time()
             
             # 更新热门搜索统计
-            if keyword in self._stats['popular_resources']:
-                self._stats['popular_resources'][keyword] += 1
-            else:
-                self._stats['popular_resources'][keyword] = 1
+            self._stats.record_keyword(keyword)
             
             # 检查API客户端是否可用
             if not self._client:
                 logger.warning("API客户端未初始化，无法搜索")
-                self._stats['failed_searches'] += 1
+                self._stats.incr('failed_searches')
                 self.post_message(
                     channel=channel,
                     title="配置错误",
@@ -779,7 +757,7 @@ class nullbr_search(_PluginBase):
             if not result or not result.get('items'):
                 # Nullbr没有搜索结果，回退到MoviePilot原始搜索
                 logger.info(f"Nullbr未找到「{keyword}」的搜索结果，回退到MoviePilot搜索")
-                self._stats['failed_searches'] += 1
+                self._stats.incr('failed_searches')
                 self.post_message(
                     channel=channel,
                     title="切换搜索",
@@ -791,58 +769,34 @@ class nullbr_search(_PluginBase):
                 return
             
             # 搜索成功，更新统计
-            self._stats['successful_searches'] += 1
+            self._stats.incr('successful_searches')
             
             # 清理之前的缓存（重要：避免缓存混乱）
-            if userid in self._user_resource_cache:
+            if self._user_resource_cache.pop(userid) is not None:
                 logger.info(f"清理用户 {userid} 的旧资源缓存")
-                del self._user_resource_cache[userid]
             
             # 缓存搜索结果
-            self._user_search_cache[userid] = {
-                'results': result.get('items', []),
-                'timestamp': time.time()
-            }
-            
-            # 构建回复消息
-            reply_text = f"🎬 找到 {len(result.get('items', []))} 个「{keyword}」相关资源:\n\n"
-            
-            # 显示前10个结果
-            for i, item in enumerate(result.get('items', [])[:10], 1):
-                title = item.get('title', '未知标题')
-                year = item.get('release_date', item.get('first_air_date', ''))[:4] if item.get('release_date') or item.get('first_air_date') else ''
-                media_type = '电影' if item.get('media_type') == 'movie' else '剧集' if item.get('media_type') == 'tv' else item.get('media_type', '未知')
-                
-                reply_text += f"【{i}】{title}"
-                if year:
-                    reply_text += f" ({year})"
-                reply_text += f"\n🎭 类型: {media_type}\n"
-                
-                # 显示可用的资源类型标记
-                resource_flags = []
-                if item.get('115-flg') and self._enable_115:
-                    resource_flags.append('💾115')
-                if item.get('magnet-flg') and self._enable_magnet:
-                    resource_flags.append('🧲磁力')
-                if item.get('video-flg') and self._enable_video:
-                    resource_flags.append('🎬在线')
-                if item.get('ed2k-flg') and self._enable_ed2k:
-                    resource_flags.append('📎ed2k')
-                
-                if resource_flags:
-                    reply_text += f"📂 资源: {' | '.join(resource_flags)}\n"
-                reply_text += f"{'─' * 15}\n"
-            
-            # 如果结果超过10个，显示提示
-            if len(result.get('items', [])) > 10:
-                reply_text += f"... 还有 {len(result.get('items', [])) - 10} 个结果\n\n"
+            self._user_search_cache.put(userid, results=result.get('items', []))
             
+            # 构建回复消息（按渠道消息长度分页，其余页面通过 #next 查看）
+            items = result.get('items', [])
             if self._api_key:
-                reply_text += "📋 使用方法:\n"
-                reply_text += f"• 发送数字自动获取资源: 如 \"1\" (优先级: {' > '.join(self._resource_priority)})\n" 
-                reply_text += "• 手动指定资源类型: 如 \"1.115\" \"2.magnet\" (可选)"
+                footer = "📋 使用方法:\n"
+                footer += f"• 发送数字自动获取资源: 如 \"1\" (优先级: {' > '.join(self._resource_priority)})\n"
+                footer += "• 手动指定资源类型: 如 \"1.115\" \"2.magnet\" (可选)"
             else:
-                reply_text += "💡 提示: 请配置API_KEY以获取下载链接"
+                footer = "💡 提示: 请配置API_KEY以获取下载链接"
+            
+            enabled_types = tuple(t for t in ["115", "magnet", "video", "ed2k"] if getattr(self, f"_enable_{t}", True))
+            pager = RecordPager(
+                header=f"🎬 找到 {len(items)} 个「{keyword}」相关资源:\n\n",
+                items=items,
+                template=SEARCH_TEMPLATE,
+                limit=byte_limit(channel),
+                footer=footer,
+                ctx={'enabled_types': enabled_types}
+            )
+            reply_text = self._first_page(pager, "Nullbr搜索结果", userid)
             
             self.post_message(
                 channel=channel,
@@ -861,284 +815,7 @@ class nullbr_search(_PluginBase):
                 userid=userid
             )
 
-    def handle_resource_selection(self, number: int, channel: str, userid: str):
-        """处理用户的编号选择"""
-        try:
-            # 检查缓存
-            cache = self._user_search_cache.get(userid)
-            if not cache or time.time() - cache['timestamp'] > 3600:  # 缓存1小时
-                self.post_message(
-                    channel=channel,
-                    title="提示",
-                    text="搜索结果已过期，请重新搜索。",
-                    userid=userid
-                )
-                return
-            
-            results = cache['results']
-            if number < 1 or number > len(results):
-                self.post_message(
-                    channel=channel,
-                    title="提示",
-                    text=f"请输入有效的编号 (1-{len(results)})。",
-                    userid=userid
-                )
-                return
-            
-            # 获取选中的项目
-            selected = results[number - 1]
-            title = selected.get('title', '未知标题')
-            media_type = selected.get('media_type', 'unknown')
-            year = selected.get('release_date', selected.get('first_air_date', ''))[:4] if selected.get('release_date') or selected.get('first_air_date') else ''
-            tmdbid = selected.get('tmdbid')
-            
-            if not self._api_key:
-                # 如果没有API_KEY，显示详细信息
-                reply_text = f"📺 选择的资源: {title}"
-                if year:
-                    reply_text += f" ({year})"
-                reply_text += f"\n类型: {'电影' if media_type == 'movie' else '剧集' if media_type == 'tv' else media_type}"
-                reply_text += f"\nTMDB ID: {tmdbid}"
-                
-                if selected.get('overview'):
-                    reply_text += f"\n简介: {selected.get('overview')[:100]}..."
-                
-                # 显示可用的资源类型
-                reply_text += f"\n\n🔗 可用资源类型:"
-                resource_options = []
-                
-                if selected.get('115-flg') and self._enable_115:
-                    resource_options.append(f"• 115网盘")
-                if selected.get('magnet-flg') and self._enable_magnet:
-                    resource_options.append(f"• 磁力链接")
-                if selected.get('video-flg') and self._enable_video:
-                    resource_options.append(f"• 在线观看")
-                if selected.get('ed2k-flg') and self._enable_ed2k:
-                    resource_options.append(f"• ED2K链接")
-                
-                if resource_options:
-                    reply_text += f"\n" + "\n".join(resource_options)
-                    reply_text += "\n\n⚠️ 注意: 需要配置API_KEY才能获取具体下载链接"
-                else:
-                    reply_text += f"\n暂无可用资源类型"
-                
-                self.post_message(
-                    channel=channel,
-                    title="资源详情",
-                    text=reply_text,
-                    userid=userid
-                )
-            else:
-                # 清理之前的资源缓存（重要：避免缓存混乱）
-                if userid in self._user_resource_cache:
-                    logger.info(f"清理用户 {userid} 的旧资源缓存")
-                    del self._user_resource_cache[userid]
-                
-                # 如果有API_KEY，直接按优先级获取资源
-                self.post_message(
-                    channel=channel,
-                    title="获取中",
-                    text=f"正在按优先级获取「{title}」的资源...",
-                    userid=userid
-                )
-                
-                self.get_resources_by_priority(selected, channel, userid)
-            
-        except Exception as e:
-            logger.error(f"处理资源选择异常: {str(e)}")
-            self.post_message(
-                channel=channel,
-                title="错误",
-                text=f"处理选择时出现错误: {str(e)}",
-                userid=userid
-            )
-
-    def handle_get_resources(self, number: int, resource_type: str, channel: str, userid: str):
-        """处理获取具体资源链接的请求"""
-        try:
-            # 检查API_KEY
-            if not self._api_key:
-                self.post_message(
-                    channel=channel,
-                    title="配置错误",
-                    text="获取下载链接需要配置API_KEY，请在插件设置中添加。",
-                    userid=userid
-                )
-                return
-            
-            # 检查缓存
-            cache = self._user_search_cache.get(userid)
-            if not cache or time.time() - cache['timestamp'] > 3600:
-                self.post_message(
-                    channel=channel,
-                    title="提示",
-                    text="搜索结果已过期，请重新搜索。",
-                    userid=userid
-                )
-                return
-            
-            results = cache['results']
-            if number < 1 or number > len(results):
-                self.post_message(
-                    channel=channel,
-                    title="提示", 
-                    text=f"请输入有效的编号 (1-{len(results)})。",
-                    userid=userid
-                )
-                return
-            
-            # 获取选中的项目
-            selected = results[number - 1]
-            title = selected.get('title', '未知标题')
-            media_type = selected.get('media_type', 'unknown')
-            tmdbid = selected.get('tmdbid')
-            
-            if not tmdbid:
-                self.post_message(
-                    channel=channel,
-                    title="错误",
-                    text="该资源缺少TMDB ID，无法获取下载链接。",
-                    userid=userid
-                )
-                return
-            
-            # 清理之前的资源缓存（重要：避免缓存混乱）
-            if userid in self._user_resource_cache:
-                logger.info(f"清理用户 {userid} 的旧资源缓存")
-                del self._user_resource_cache[userid]
-            
-            # 发送获取中的提示
-            self.post_message(
-                channel=channel,
-                title="获取中",
-                text=f"正在获取「{title}」的{resource_type}资源...",
-                userid=userid
-            )
-            
-            # 调用相应的API获取资源
-            resources = None
-            if media_type == 'movie':
-                resources = self._client.get_movie_resources(tmdbid, resource_type)
-            elif media_type == 'tv':
-                resources = self._client.get_tv_resources(tmdbid, resource_type)
-            
-            if not resources:
-                # Nullbr没有找到资源，回退到MoviePilot原始搜索
-                logger.info(f"Nullbr未找到「{title}」的{resource_type}资源，回退到MoviePilot搜索")
-                self.post_message(
-                    channel=channel,
-                    title="切换搜索",
-                    text=f"Nullbr没有找到「{title}」的{resource_type}资源，正在使用MoviePilot原始搜索...",
-                    userid=userid
-                )
-                
-                # 调用MoviePilot的原始搜索功能
-                self.fallback_to_moviepilot_search(title, channel, userid)
-                return
-            
-            # 格式化资源链接（第4步完善）
-            self.format_and_send_resources(resources, resource_type, title, channel, userid)
-            
-        except Exception as e:
-            logger.error(f"获取资源链接异常: {str(e)}")
-            self.post_message(
-                channel=channel,
-                title="错误",
-                text=f"获取资源链接时出现错误: {str(e)}",
-                userid=userid
-            )
-
-    def get_resources_by_priority(self, selected: dict, channel: str, userid: str):
-        """按优先级获取资源"""
-        try:
-            title = selected.get('title', '未知标题')
-            media_type = selected.get('media_type', 'unknown')
-            tmdbid = selected.get('tmdbid')
-            
-            if not tmdbid:
-                self.post_message(
-                    channel=channel,
-                    title="错误",
-                    text="该资源缺少TMDB ID，无法获取下载链接。",
-                    userid=userid
-                )
-                return
-            
-            # 清理之前的资源缓存（重要：避免缓存混乱）
-            if userid in self._user_resource_cache:
-                logger.info(f"清理用户 {userid} 的旧资源缓存")
-                del self._user_resource_cache[userid]
-            
-            logger.info(f"按优先级获取资源: {title} (TMDB: {tmdbid})")
-            logger.info(f"优先级顺序: {' > '.join(self._resource_priority)}")
-            
-            # 按优先级尝试获取资源
-            for priority_type in self._resource_priority:
-                # 检查该资源类型是否可用
-                flag_key = f"{priority_type}-flg"
-                if not selected.get(flag_key):
-                    logger.info(f"跳过 {priority_type}: 资源不可用")
-                    continue
-                
-                # 检查该资源类型是否启用
-                enable_key = f"_enable_{priority_type}"
-                if not getattr(self, enable_key, True):
-                    logger.info(f"跳过 {priority_type}: 已在配置中禁用")
-                    continue
-                
-                logger.info(f"尝试获取 {priority_type} 资源...")
-                
-                # 调用相应的API获取资源
-                resources = None
-                if media_type == 'movie':
-                    resources = self._client.get_movie_resources(tmdbid, priority_type)
-                elif media_type == 'tv':
-                    resources = self._client.get_tv_resources(tmdbid, priority_type)
-                
-                if resources and resources.get(priority_type):
-                    # 找到资源，发送结果并结束
-                    resource_name = {
-                        '115': '115网盘',
-                        'magnet': '磁力链接', 
-                        'ed2k': 'ED2K链接',
-                        'video': 'M3U8视频'
-                    }.get(priority_type, priority_type)
-                    
-                    logger.info(f"成功获取 {priority_type} 资源，共 {len(resources[priority_type])} 个")
-                    
-                    self.post_message(
-                        channel=channel,
-                        title="获取成功",
-                        text=f"✅ 已获取「{title}」的{resource_name}资源",
-                        userid=userid
-                    )
-                    
-                    # 格式化并发送资源链接
-                    self.format_and_send_resources(resources, priority_type, title, channel, userid)
-                    return
-                else:
-                    logger.info(f"{priority_type} 资源不可用，尝试下一优先级")
-            
-            # 所有优先级都没有找到资源，回退到MoviePilot搜索
-            logger.info(f"所有优先级资源都不可用，回退到MoviePilot搜索")
-            self.post_message(
-                channel=channel,
-                title="切换搜索",
-                text=f"Nullbr没有找到「{title}」的任何资源，正在使用MoviePilot原始搜索...",
-                userid=userid
-            )
-            
-            self.fallback_to_moviepilot_search(title, channel, userid)
-            
-        except Exception as e:
-            logger.error(f"按优先级获取资源异常: {str(e)}")
-            self.post_message(
-                channel=channel,
-                title="错误",
-                text=f"获取资源时出现错误: {str(e)}",
-                userid=userid
-            )
-
+    @timed("handler.transfer")
     def handle_resource_transfer(self, resource_id: int, channel: str, userid: str):
         """处理资源转存请求"""
         try:
@@ -1154,7 +831,7 @@ class nullbr_search(_PluginBase):
             
             # 获取用户资源缓存
             cache = self._user_resource_cache.get(userid)
-            if not cache or time.time() - cache['timestamp'] > 3600:
+            if not cache:
                 self.post_message(
                     channel=channel,
                     title="缓存过期",
@@ -1195,7 +872,7 @@ class nullbr_search(_PluginBase):
             logger.info(f"开始CMS转存: 用户={userid}, 资源={resource_title}, URL={resource_url}")
             
             # 更新转存统计
-            self._stats['cms_transfers'] += 1
+            self._stats.incr('cms_transfers')
             self._stats['last_transfer_time'] = time.time()
             
             # 发送转存中提示
@@ -1215,7 +892,7 @@ class nullbr_search(_PluginBase):
             # 处理转存结果
             if result.get('code') == 200:
                 # 转存成功统计
-                self._stats['successful_transfers'] += 1
+                self._stats.incr('successful_transfers')
                 success_msg = f"✅ 转存成功!\n"
                 success_msg += f"{'─' * 15}\n"
                 success_msg += f"🎬 影片: 「{title}」\n"
@@ -1244,7 +921,7 @@ class nullbr_search(_PluginBase):
                 
             else:
                 # 转存失败统计
-                self._stats['failed_transfers'] += 1
+                self._stats.incr('failed_transfers')
                 # 转存失败
                 error_msg = result.get('message', '未知错误')
                 failure_msg = f"❌ 转存失败\n"
@@ -1272,10 +949,23 @@ class nullbr_search(_PluginBase):
                 userid=userid
             )
 
+    @staticmethod
+    def _resource_url(res: dict, resource_type: str) -> str:
+        """获取资源链接"""
+        if resource_type == "115":
+            return res.get('share_link', '')
+        if resource_type == "magnet":
+            return res.get('magnet', '')
+        if resource_type in ["video", "ed2k"]:
+            return res.get('url', res.get('link', ''))
+        return ''
+    
     def format_and_send_resources(self, resources: dict, resource_type: str, title: str, channel: str, userid: str):
         """格式化并发送资源链接"""
         try:
-            resource_list = resources.get(resource_type, [])
+            # 丢弃没有链接的资源：分页显示、转存缓存（编号转存、#N-M）和总数都基于这一个列表，编号一致
+            resource_list = [res for res in resources.get(resource_type) or []
+                             if self._resource_url(res, resource_type)]
             if not resource_list:
                 self.post_message(
                     channel=channel,
@@ -1286,72 +976,36 @@ class nullbr_search(_PluginBase):
                 return
             
             # 更新资源统计
-            self._stats['total_resources'] += len(resource_list)
+            self._stats.incr('total_resources', len(resource_list))
             
-            # 缓存资源到用户缓存中，用于CMS转存
-            resource_cache = []
-            for res in resource_list[:10]:  # 最多缓存10个
-                if resource_type == "115":
-                    url = res.get('share_link', '')
-                elif resource_type == "magnet":
-                    url = res.get('magnet', '')
-                elif resource_type in ["video", "ed2k"]:
-                    url = res.get('url', res.get('link', ''))
-                else:
-                    url = ''
-                
-                if url:
-                    resource_cache.append({
-                        'url': url,
-                        'title': res.get('title', res.get('name', '未知')),
-                        'size': res.get('size', '未知'),
-                        'type': resource_type
-                    })
+            # 缓存资源到用户缓存中，用于CMS转存（第 N 项即分页显示的第 N 个资源）
+            resource_cache = [{
+                'url': self._resource_url(res, resource_type),
+                'title': res.get('title', res.get('name', '未知')),
+                'size': res.get('size', '未知'),
+                'type': resource_type
+            } for res in resource_list]
             
             # 保存到用户资源缓存
-            self._user_resource_cache[userid] = {
-                'resources': resource_cache,
-                'title': title,
-                'resource_type': resource_type,
-                'timestamp': time.time()
-            }
-            
-            # 格式化显示文本
-            reply_text = f"🎯 「{title}」的{resource_type}资源:\n\n"
+            self._user_resource_cache.put(userid, resources=resource_cache, title=title,
+                                          resource_type=resource_type)
             
-            if resource_type == "115":
-                for i, res in enumerate(resource_list[:10], 1):
-                    reply_text += f"【{i}】{res.get('title', '未知')}\n"
-                    reply_text += f"💾 大小: {res.get('size', '未知')}\n"
-                    reply_text += f"🔗 链接: {res.get('share_link', '无')}\n"
-                    reply_text += f"{'─' * 15}\n"
-                    
-            elif resource_type == "magnet":
-                for i, res in enumerate(resource_list[:10], 1):
-                    reply_text += f"【{i}】{res.get('name', '未知')}\n"
-                    reply_text += f"💾 大小: {res.get('size', '未知')}\n"
-                    reply_text += f"📺 分辨率: {res.get('resolution', '未知')}\n"
-                    reply_text += f"🈴 中文字幕: {'✅' if res.get('zh_sub') else '❌'}\n"
-                    reply_text += f"🧲 磁力: {res.get('magnet', '无')}\n"
-                    reply_text += f"{'─' * 15}\n"
-                    
-            elif resource_type in ["video", "ed2k"]:
-                for i, res in enumerate(resource_list[:10], 1):
-                    reply_text += f"【{i}】{res.get('name', res.get('title', '未知'))}\n"
-                    if res.get('size'):
-                        reply_text += f"💾 大小: {res.get('size')}\n"
-                    reply_text += f"🔗 链接: {res.get('url', res.get('link', '无'))}\n"
-                    reply_text += f"{'─' * 15}\n"
-            
-            if len(reply_text) > 3500:  # 留出空间给CMS提示
-                reply_text = reply_text[:3400] + "...\n\n(内容过长已截断)\n\n"
-            
-            reply_text += f"📊 共找到 {len(resource_list)} 个资源\n\n"
+            # 格式化显示文本（按渠道消息长度分页，其余页面通过 #next 查看）
+            footer = f"📊 共找到 {len(resource_list)} 个资源\n\n"
             
             # 如果启用了CloudSyncMedia，添加转存提示
             if self._cms_enabled and self._cms_client and resource_type == "115":
-                reply_text += "🚀 CloudSyncMedia转存:\n"
-                reply_text += "发送资源编号进行转存，如: 1、2、3..."
+                footer += "🚀 CloudSyncMedia转存:\n"
+                footer += "发送资源编号进行转存，如: 1、2、3..."
+            
+            pager = RecordPager(
+                header=f"🎯 「{title}」的{resource_type}资源:\n\n",
+                items=resource_list,
+                template=RESOURCE_TEMPLATES.get(resource_type, RESOURCE_TEMPLATES['video']),
+                limit=byte_limit(channel),
+                footer=footer
+            )
+            reply_text = self._first_page(pager, f"{resource_type.upper()}资源", userid)
             
             self.post_message(
                 channel=channel,
@@ -1369,77 +1023,13 @@ class nullbr_search(_PluginBase):
                 userid=userid
             )
 
-    def fallback_to_moviepilot_search(self, title: str, channel: str, userid: str):
-        """回退到MoviePilot原始搜索功能"""
-        logger.info(f"启动MoviePilot原始搜索: {title}")
-        
-        # 尝试其他搜索方式
-        self.try_alternative_search(title, channel, userid)
-
-    def try_alternative_search(self, title: str, channel: str, userid: str):
-        """尝试其他搜索方式"""
-        try:
-            logger.info(f"尝试MoviePilot原始搜索: {title}")
-            
-            # 简化策略：直接发送搜索建议和提示
-            # 避免复杂的模块调用导致的错误
-            
-            success = False
-            
-            # 方法1: 尝试调用站点助手的简单方法
-            try:
-                from app.helper.sites import SitesHelper
-                sites_helper = SitesHelper()
-                
-                # 只是检查是否有配置的站点
-                if hasattr(sites_helper, 'get_indexers'):
-                    indexers = sites_helper.get_indexers()
-                    if indexers:
-                        logger.info(f"检测到 {len(indexers)} 个配置的站点")
-                        
-                        self.post_message(
-                            channel=channel,
-                            title="搜索提示",
-                            text=f"🔍 Nullbr未找到「{title}」的资源\n\n" +
-                                 f"💡 系统检测到您已配置 {len(indexers)} 个搜索站点\n" +
-                                 f"建议通过以下方式继续搜索:\n\n" +
-                                 f"🌐 MoviePilot Web界面搜索\n" +
-                                 f"📱 其他搜索渠道\n" +
-                                 f"⚙️ 检查站点配置状态",
-                            userid=userid
-                        )
-                        success = True
-                
-            except Exception as e:
-                logger.warning(f"站点检测失败: {str(e)}")
-            
-            # 如果上面的方法也失败，发送通用建议
-            if not success:
-                self.send_manual_search_suggestion(title, channel, userid)
-            
-        except Exception as e:
-            logger.error(f"备用搜索失败: {str(e)}")
-            self.send_manual_search_suggestion(title, channel, userid)
-
-    def send_manual_search_suggestion(self, title: str, channel: str, userid: str):
-        """发送手动搜索建议"""
-        self.post_message(
-            channel=channel,
-            title="搜索建议",
-            text=f"📋 「{title}」未找到资源，建议:\n\n" +
-                 f"🔍 在MoviePilot Web界面搜索\n" +
-                 f"⚙️ 检查资源站点配置\n" +
-                 f"🔄 尝试其他关键词\n" +
-                 f"📱 使用其他搜索渠道",
-            userid=userid
-        )
-
     def stop_service(self):
         """停止插件服务"""
         try:
             # 清理客户端连接
             if self._client:
                 logger.info("清理Nullbr客户端")
+                release_client(self._client)
                 self._client = None
             
             if self._cms_client:
@@ -1451,6 +1041,7 @@ class nullbr_search(_PluginBase):
             # 清理缓存
             self._user_search_cache.clear()
             self._user_resource_cache.clear()
+            self._user_page_cache.clear()
             
             self._enabled = False
             logger.info("Nullbr资源搜索插件已停止")
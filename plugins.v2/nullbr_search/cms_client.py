@@ -2,6 +2,11 @@ import requests
 import time
 from app.log import logger
 
+try:
+    from .nullbr_core.metrics import CACHES, timed
+except ImportError:
+    from nullbr_core.metrics import CACHES, timed
+
 
 class CloudSyncMediaClient:
     """CloudSyncMedia客户端"""
@@ -29,6 +34,7 @@ class CloudSyncMediaClient:
         # 初始化时获取token
         self._ensure_valid_token()
     
+    @timed("cms.login")
     def _login(self) -> dict:
         """登录CMS系统获取token"""
         try:
@@ -58,6 +64,7 @@ class CloudSyncMediaClient:
         
         # 如果token不存在或距离过期时间不到1小时，重新获取token
         if not self.token or current_time >= (self.token_expiry - 3600):
+            CACHES.miss("cms.token")
             login_data = self._login()
             self.token = login_data['token']
             
@@ -70,7 +77,10 @@ class CloudSyncMediaClient:
             })
             
             logger.info("CMS token已更新")
+        else:
+            CACHES.hit("cms.token")
     
+    @timed("cms.add_share_down")
     def add_share_down(self, url: str) -> dict:
         """添加分享链接到CMS系统进行转存"""
         if not url:
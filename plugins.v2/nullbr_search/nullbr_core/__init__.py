@@ -0,0 +1,19 @@
+"""
+Nullbr 插件公共核心
+
+nullbr_search 与 nullbr_search_pro 共用的部分：
+- nullbr_client: Nullbr API 客户端，acquire_client/release_client 按 APP_ID/API_KEY 共享连接池
+- session_store: 用户会话（搜索结果、资源列表、分页器）
+- message_formatter / message_renderer: 渠道格式化与分页渲染
+- metrics / dashboard / openmetrics: 统计、延迟直方图、统计面板与 /metrics 导出
+- commands: 用户消息与按钮回调的命令语法（预编译解析器）
+- cache_warmer: 按热门关键词预热客户端的结果缓存
+- frontend: 与转存后端无关的交互流程（NullbrFrontend 混入类）
+
+插件市场按目录安装插件，因此两个插件目录下各带一份完全相同的 nullbr_core，修改时需同步两份
+（benchmarks/check_core_sync.py 校验一致）。
+
+每个插件只以相对导入（from .nullbr_core import ...）使用自己目录下的副本，两个插件同时启用时
+各自加载、互不替换，客户端（连接池）、统计和缓存也各自独立。只更新了其中一个插件时，两份核心
+内容不同也不会相互影响。
+"""
@@ -0,0 +1,143 @@
+"""
+缓存预热
+
+按热门关键词（Metrics.top_keywords）在闲时刷新 Nullbr 客户端的结果缓存：对每个关键词重新搜索，
+并为第一个结果按资源优先级获取资源列表。晚间第一个搜索热门影片的用户可直接命中缓存，不必等待
+Nullbr 的冷请求。
+
+每次运行有 API 调用预算，相邻两次调用之间随机间隔（抖动）；同一时段只运行一次。
+"""
+import random
+import re
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+from app.log import logger
+
+# 默认预热的热门关键词数
+WARM_TOP_K = 10
+
+# 默认每次运行最多调用 API 的次数
+WARM_BUDGET = 30
+
+# 相邻两次 API 调用之间的随机间隔上限（秒）
+WARM_JITTER = 3.0
+
+# 定时任务触发时间的随机偏移上限（秒），避免大量实例在同一时刻请求 Nullbr
+WARM_START_JITTER = 600
+
+# 两次预热的最小间隔（秒）
+WARM_MIN_INTERVAL = 1800
+
+# 默认预热时段（小时，cron 的 hour 字段），在晚间高峰前
+WARM_HOURS = "17"
+
+_HOURS_PATTERN = re.compile(r'^\d{1,2}(-\d{1,2})?(,\d{1,2}(-\d{1,2})?)*$')
+
+_run_lock = threading.Lock()
+_last_run = 0.0
+
+
+def parse_hours(text: str) -> Optional[str]:
+    """
+    校验预热时段
+
+    :param text: 小时列表或区间，如 "17"、"4,17"、"2-5"
+    :return: 可用作 cron hour 字段的字符串，格式错误时返回 None
+    """
+    text = (text or '').replace(' ', '')
+    if not _HOURS_PATTERN.match(text):
+        return None
+    if any(int(hour) > 23 for hour in re.findall(r'\d+', text)):
+        return None
+    return text
+
+
+class CacheWarmer:
+    """按热门关键词刷新搜索结果和优先级资源缓存"""
+
+    def __init__(self, client, types: Sequence[str], budget: int = WARM_BUDGET, jitter: float = WARM_JITTER,
+                 stop: threading.Event = None):
+        """
+        :param client: NullbrApiClient
+        :param types: 按优先级排列的已启用资源类型，为空时只预热搜索结果
+        :param budget: 本次运行最多调用 API 的次数
+        :param jitter: 相邻两次调用之间的随机间隔上限（秒）
+        :param stop: 置位时尽快结束（插件停止）
+        """
+        self.client = client
+        self.types = tuple(types)
+        self.budget = budget
+        self.jitter = jitter
+        self.calls = 0
+        self._stop = stop or threading.Event()
+
+    def _spend(self) -> bool:
+        """占用一次调用预算（调用前随机等待），预算用完或收到停止信号时返回 False"""
+        if self.calls >= self.budget:
+            return False
+        if self.calls and self.jitter > 0 and self._stop.wait(random.uniform(0, self.jitter)):
+            return False
+        if self._stop.is_set():
+            return False
+        self.calls += 1
+        return True
+
+    def warm_keyword(self, keyword: str) -> bool:
+        """
+        刷新一个关键词的搜索结果，以及第一个结果按优先级第一个有资源的类型
+
+        :return: 是否完整处理（预算用完或停止时返回 False）
+        """
+        if not self._spend():
+            return False
+        result = self.client.search(keyword, warm=True)
+        items = [item for item in (result or {}).get('items', [])
+                 if item.get('media_type') in ('movie', 'tv') and item.get('tmdbid')]
+        if not items:
+            return True
+
+        # 刚刷新的搜索结果中的资源标记是最新的，无需再查询详情
+        selected = items[0]
+        if selected['media_type'] == 'movie':
+            fetch = self.client.get_movie_resources
+        else:
+            fetch = self.client.get_tv_resources
+        for resource_type in self.types:
+            if not selected.get(f"{resource_type}-flg"):
+                continue
+            if not self._spend():
+                return False
+            resources = fetch(selected['tmdbid'], resource_type, warm=True)
+            if resources and resources.get(resource_type):
+                break
+        return True
+
+    def run(self, keywords: Sequence[str]) -> Optional[Dict[str, int]]:
+        """
+        按顺序预热关键词，直到处理完或预算用完
+
+        :param keywords: 关键词（热门程度从高到低）
+        :return: {'keywords': 完整预热的关键词数, 'calls': API 调用次数}，已有预热在运行或间隔过短时返回 None
+        """
+        global _last_run
+        if not _run_lock.acquire(blocking=False):
+            logger.info("缓存预热正在运行，跳过本次")
+            return None
+        try:
+            if time.time() - _last_run < WARM_MIN_INTERVAL:
+                logger.info("距上次缓存预热时间过短，跳过本次")
+                return None
+            start = time.time()
+            warmed = 0
+            for keyword in keywords:
+                if not self.warm_keyword(keyword):
+                    break
+                warmed += 1
+            _last_run = time.time()
+            logger.info(f"缓存预热完成: {warmed}/{len(keywords)} 个关键词，"
+                        f"调用 API {self.calls}/{self.budget} 次，用时 {time.time() - start:.1f}s")
+            return {'keywords': warmed, 'calls': self.calls}
+        finally:
+            _run_lock.release()
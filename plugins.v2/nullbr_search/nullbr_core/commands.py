@@ -0,0 +1,164 @@
+"""
+命令语法
+
+用户消息和按钮回调都先经 Grammar.parse 解析为 Command(verb, args)，插件再按 verb 查分派表调用处理函数：
+
+    command = HASH_TALK.parse(text)
+    if command:
+        handlers[command.verb](*command.args, channel, userid)
+
+Grammar 将全部规则合并为一个预编译正则（每条规则一个命名分组），一次匹配即可确定命令和参数，
+参数按规则给出的转换函数转为 int 等类型。gate 是匹配前的廉价检查（如首字符必须是 #），
+绝大多数与插件无关的消息在这一步就被拒绝，不会进入正则匹配。
+"""
+import re
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+RESOURCE_TYPES = ('115', 'magnet', 'video', 'ed2k')
+_TYPES = '|'.join(RESOURCE_TYPES)
+
+# 一次区间操作（#N-M）最多包含的编号数
+MAX_RANGE = 10
+
+# 一次批量查询（/nullbr_batch）最多包含的片名数
+MAX_BATCH = 10
+
+# 批量查询的片名分隔符
+_TITLE_SEPARATORS = re.compile(r'[,，、;；|\n]+')
+
+
+class Command(NamedTuple):
+    """解析结果：动词与已转换类型的参数"""
+    verb: str
+    args: tuple = ()
+
+
+class Rule(NamedTuple):
+    """语法规则：动词、正则（用位置分组捕获参数）、各参数的转换函数"""
+    verb: str
+    pattern: str
+    converters: Tuple[Callable[[str], object], ...] = ()
+
+
+class Grammar:
+    """由多条规则编译成的命令解析器，规则按顺序优先匹配"""
+
+    def __init__(self, rules: Sequence[Rule], gate: Callable[[str], bool] = None, prefix: str = ''):
+        """
+        :param rules: 规则列表，靠前的规则优先
+        :param gate: 匹配前的廉价检查（参数为去掉首尾空白的非空文本），返回 False 时直接拒绝
+        :param prefix: 所有规则共有的前缀（不含分组），提到分支之外只匹配一次
+        """
+        self.rules = tuple(rules)
+        self.gate = gate
+        parts = []
+        # {分组名: (无参数命令, 动词, ((转换函数, 参数分组序号), ...))}
+        self._slots = {}
+        index = 0
+        for i, rule in enumerate(self.rules):
+            count = re.compile(rule.pattern).groups
+            if count != len(rule.converters):
+                raise ValueError(f"规则 {rule.verb} 有 {count} 个分组，但给出了 {len(rule.converters)} 个转换函数")
+            name = f"r{i}"
+            parts.append(f"(?P<{name}>{rule.pattern})")
+            constant = Command(rule.verb) if not count else None
+            args = tuple((conv, index + 2 + k) for k, conv in enumerate(rule.converters))
+            self._slots[name] = (constant, rule.verb, args)
+            index += 1 + count
+        self._regex = re.compile(r'\A' + prefix + r'(?:' + '|'.join(parts) + r')\Z', re.S)
+
+    def parse(self, text: str) -> Optional[Command]:
+        """
+        解析文本
+
+        :param text: 用户消息或回调数据
+        :return: Command，不是插件命令时返回 None
+        """
+        if not text:
+            return None
+        text = text.strip()
+        if not text or (self.gate is not None and not self.gate(text)):
+            return None
+        match = self._regex.match(text)
+        if match is None:
+            return None
+        constant, verb, args = self._slots[match.lastgroup]
+        if constant is not None:
+            return constant
+        group = match.group
+        return Command._make((verb, tuple([conv(group(i)) for conv, i in args])))
+
+
+def _question(value: str) -> str:
+    """去掉结尾的问号和空白"""
+    return value.rstrip('?？').strip()
+
+
+def _type_or_115(value: Optional[str]) -> str:
+    return value or '115'
+
+
+# nullbr_search_pro：以 # 开头的消息
+#   #next / #more        下一页
+#   #refresh / #刷新     忽略缓存重新执行上一次搜索
+#   #N.类型              获取指定类型资源（如 #1.115、#2.magnet）
+#   #N-M                 转存资源列表中第 N 到 M 个资源
+#   #N                   选择搜索结果 / 转存资源
+#   #!关键词             一键获取
+#   #关键词              搜索
+HASH_TALK = Grammar((
+    Rule('next', r'(?i:next|more)'),
+    Rule('refresh', r'(?i:refresh)|刷新'),
+    Rule('get', rf'(\d+)\.({_TYPES})', (int, str)),
+    Rule('range', r'(\d+)\s*-\s*(\d+)', (int, int)),
+    Rule('pick', r'(\d+)', (int,)),
+    Rule('auto', r'!\s*(\S.*)', (str,)),
+    Rule('search', r'([^\s!].*)', (str,)),
+), gate=lambda text: text[0] == '#', prefix=r'#\s*')
+
+# nullbr_search：编号不带前缀，搜索以问号结尾
+#   #next / #more        下一页
+#   N.类型[?]            获取指定类型资源
+#   N-M[?]               转存资源列表中第 N 到 M 个资源
+#   N[?]                 选择搜索结果 / 转存资源
+#   关键词?              搜索
+_Q = r'\s*[?？]*'
+PLAIN_TALK = Grammar((
+    Rule('next', rf'#\s*(?i:next|more){_Q}'),
+    Rule('get', rf'(\d+)\.({_TYPES}){_Q}', (int, str)),
+    Rule('range', rf'(\d+)\s*-\s*(\d+){_Q}', (int, int)),
+    Rule('pick', rf'(\d+){_Q}', (int,)),
+    Rule('search', r'(?![?？]*\Z)(.*[?？])', (_question,)),
+), gate=lambda text: text[0] == '#' or text[0].isdigit() or text[-1] in '?？')
+
+# 按钮回调数据（[PLUGIN]插件名|回调数据 中的回调数据部分）
+CALLBACKS = Grammar((
+    Rule('select', r'select_(\d+)', (int,)),
+    Rule('transfer', r'transfer_(\d+)', (int,)),
+    Rule('get', rf'get_(\d+)(?:_({_TYPES}))?', (int, _type_or_115)),
+    Rule('next', r'next'),
+    Rule('offline_refresh', r'offline_refresh'),
+    Rule('back', r'back'),
+))
+
+
+def parse_title_list(text: str) -> Tuple[List[str], bool]:
+    """
+    解析批量查询的片名列表（/nullbr_batch 流浪地球, 三体, 狂飙）
+
+    以 ! 开头表示同时转存每部影片的最佳资源（与 #! 一键获取一致）。片名按逗号、顿号、分号、竖线或
+    换行分隔，去重后保持原顺序。
+
+    :param text: 命令参数
+    :return: (片名列表, 是否转存)
+    """
+    text = (text or '').strip()
+    transfer = text.startswith(('!', '！'))
+    if transfer:
+        text = text[1:]
+    titles = []
+    for title in _TITLE_SEPARATORS.split(text):
+        title = title.strip()
+        if title and title not in titles:
+            titles.append(title)
+    return titles, transfer
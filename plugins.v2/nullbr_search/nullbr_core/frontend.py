@@ -0,0 +1,613 @@
+"""
+插件公共前端逻辑
+
+NullbrFrontend 是两个插件共用的混入类，包含与转存后端无关的交互流程：分页翻页、编号选择、
+按类型/优先级获取资源（先以影片详情刷新资源标记）、批量查询、回退到 MoviePilot 搜索，以及统计面板和 /metrics 接口。
+
+插件类需继承 NullbrFrontend 与 _PluginBase，并提供以下属性和方法：
+- _client、_api_key、_resource_priority、_enable_<资源类型>
+- _user_search_cache、_user_resource_cache、_user_page_cache（SessionStore）
+- _stats、_exporter、_dashboard_snapshot、_dashboard_page
+- post_message、search_and_reply、format_and_send_resources、_collect_gauges
+- handle_resource_transfer、_transfer_enabled（资源列表中的编号能否直接转存）
+"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+from fastapi import Response
+
+from app.log import logger
+
+try:
+    from .commands import MAX_RANGE, RESOURCE_TYPES
+    from .dashboard import build_page, build_snapshot
+    from .message_formatter import get_formatter
+    from .message_renderer import RecordPager
+    from .metrics import CACHES, TIMINGS, timed
+    from .openmetrics import CONTENT_TYPE, OpenMetricsExporter
+except ImportError:
+    from commands import MAX_RANGE, RESOURCE_TYPES
+    from dashboard import build_page, build_snapshot
+    from message_formatter import get_formatter
+    from message_renderer import RecordPager
+    from metrics import CACHES, TIMINGS, timed
+    from openmetrics import CONTENT_TYPE, OpenMetricsExporter
+
+# 站点数量缓存有效期（秒）：回退搜索只用站点数量生成提示，不必每次实例化 SitesHelper 查询
+INDEXER_COUNT_TTL = 600
+
+# 批量查询（lookup_titles）的并发数，请求速率另由客户端限速
+BATCH_WORKERS = 4
+
+# 从影片详情刷新到搜索结果条目的字段
+DETAIL_FIELDS = tuple(f"{t}-flg" for t in RESOURCE_TYPES) + ('number_of_seasons',)
+
+_indexer_count = None
+_indexer_time = 0.0
+_indexer_lock = threading.Lock()
+
+
+def indexer_count() -> int:
+    """
+    MoviePilot 已配置的搜索站点数量（带缓存，查询失败按 0 计）
+
+    并发的回退搜索只有一个线程实际查询，其余等待并复用结果。
+    """
+    global _indexer_count, _indexer_time
+    with _indexer_lock:
+        if _indexer_count is not None and time.time() - _indexer_time < INDEXER_COUNT_TTL:
+            CACHES.hit("sites.indexers")
+            return _indexer_count
+        CACHES.miss("sites.indexers")
+        count = 0
+        try:
+            from app.helper.sites import SitesHelper
+            sites_helper = SitesHelper()
+            if hasattr(sites_helper, 'get_indexers'):
+                count = len(sites_helper.get_indexers() or [])
+        except Exception as e:
+            logger.warning(f"站点检测失败: {str(e)}")
+        _indexer_count, _indexer_time = count, time.time()
+        return count
+
+
+def best_match(query: str, items: Sequence[dict]) -> Optional[dict]:
+    """
+    从搜索结果中选出与查询词最匹配的影视条目：标题完全相同（忽略大小写、空白和标点）的优先，否则取第一个
+
+    :param query: 查询词
+    :param items: 搜索结果
+    :return: 条目，没有可用的影视条目时返回 None
+    """
+    candidates = [item for item in items if item.get('media_type') in ('movie', 'tv') and item.get('tmdbid')]
+    if not candidates:
+        return None
+    key = re.sub(r'\W+', '', query).casefold()
+    for item in candidates:
+        if re.sub(r'\W+', '', item.get('title') or '').casefold() == key:
+            return item
+    return candidates[0]
+
+
+class NullbrFrontend:
+    """两个插件共用的交互流程（混入类）"""
+
+    @staticmethod
+    def _format_text(channel, text: str) -> str:
+        """按渠道格式化消息文本，格式化失败时返回原文本"""
+        try:
+            # 按渠道查表获取格式化函数（按渠道对象缓存）
+            return get_formatter(channel)(text)
+        except Exception:
+            return text
+
+    def get_state(self) -> bool:
+        """获取插件状态"""
+        return self._enabled
+
+    def api_metrics(self):
+        """/metrics 接口：OpenMetrics 文本"""
+        if self._exporter is None:
+            self._exporter = OpenMetricsExporter(self.__class__.__name__, self._stats, TIMINGS, CACHES,
+                                                 gauges=self._collect_gauges)
+        return Response(content=self._exporter.render(), media_type=CONTENT_TYPE)
+
+    def _refresh_dashboard(self):
+        """生成统计面板快照和页面配置"""
+        try:
+            gauges, states = self._collect_gauges()
+            snapshot = build_snapshot(self._stats, TIMINGS, CACHES, gauges=gauges, states=states,
+                                      previous=self._dashboard_snapshot)
+            self._dashboard_page = build_page(snapshot)
+            self._dashboard_snapshot = snapshot
+        except Exception as e:
+            logger.error(f"刷新统计面板失败: {str(e)}")
+
+    def get_page(self) -> List[dict]:
+        """
+        拼装插件详情页面，需要返回页面配置，同时附带数据
+        插件详情页面使用Vuetify组件拼装，参考：https://vuetifyjs.com/
+
+        :return: 页面配置（vuetify模式）或 None（vue模式）
+        """
+        if self._dashboard_page is None:
+            self._refresh_dashboard()
+        return self._dashboard_page
+
+    def _first_page(self, pager: RecordPager, title: str, userid: str) -> str:
+        """
+        渲染首页，还有后续页面时将分页器保存到用户会话，供 #next 翻页
+
+        :param pager: 分页器
+        :param title: 后续页面的消息标题
+        :param userid: 用户ID
+        :return: 首页文本
+        """
+        text = pager.next_page().text
+        if pager.has_next:
+            self._user_page_cache.put(userid, pager=pager, title=title)
+        else:
+            self._user_page_cache.pop(userid)
+        return text
+
+    @timed("handler.next_page")
+    def send_next_page(self, channel, userid: str):
+        """发送用户当前列表的下一页"""
+        cache = self._user_page_cache.get(userid)
+        if not cache:
+            self.post_message(
+                channel=channel,
+                title="没有更多内容",
+                text="没有可翻页的列表，请先搜索或查看资源。",
+                userid=userid
+            )
+            return
+        
+        pager = cache['pager']
+        page = pager.next_page()
+        if not pager.has_next:
+            self._user_page_cache.pop(userid)
+        else:
+            self._user_page_cache.touch(userid)
+        
+        self.post_message(
+            channel=channel,
+            title=f"{cache['title']} (第{pager.page}页)",
+            text=page.text,
+            userid=userid
+        )
+
+    def refresh_flags(self, selected: dict) -> Optional[dict]:
+        """
+        用 Nullbr 影片详情刷新搜索结果条目中的资源标记和季数
+
+        搜索结果中的标记可能已过时，获取资源前以详情（客户端长期缓存）为准，跳过确定不存在的资源类型。
+
+        :param selected: 搜索结果条目（原地更新）
+        :return: 影片详情，获取失败时返回 None（条目保持不变）
+        """
+        media_type = selected.get('media_type')
+        tmdbid = selected.get('tmdbid')
+        if not self._client or not tmdbid:
+            return None
+        info = None
+        if media_type == 'movie':
+            info = self._client.get_movie_info(tmdbid)
+        elif media_type == 'tv':
+            info = self._client.get_tv_info(tmdbid)
+        if not info:
+            return None
+        selected.update({key: info[key] for key in DETAIL_FIELDS if key in info})
+        return info
+
+    def lookup_titles(self, titles: Sequence[str]) -> List[dict]:
+        """
+        并发查询多个片名，取各自的最佳匹配并以影片详情刷新资源标记
+
+        :param titles: 片名列表
+        :return: 与输入顺序一致的 [{'query': 片名, 'item': 最佳匹配条目或 None}]
+        """
+        def lookup(title: str) -> dict:
+            try:
+                result = self._client.search(title)
+                item = best_match(title, (result or {}).get('items') or [])
+                if item is not None:
+                    self.refresh_flags(item)
+            except Exception as e:
+                logger.error(f"批量查询「{title}」异常: {str(e)}")
+                item = None
+            return {'query': title, 'item': item}
+
+        if not titles:
+            return []
+        with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(titles))) as executor:
+            return list(executor.map(lookup, titles))
+
+    @timed("handler.select")
+    def handle_resource_selection(self, number: int, channel: str, userid: str):
+        """处理用户的编号选择"""
+        try:
+            # 检查缓存
+            cache = self._user_search_cache.get(userid)
+            if not cache:
+                self.post_message(
+                    channel=channel,
+                    title="提示",
+                    text="搜索结果已过期，请重新搜索。",
+                    userid=userid
+                )
+                return
+            
+            results = cache['results']
+            if number < 1 or number > len(results):
+                self.post_message(
+                    channel=channel,
+                    title="提示",
+                    text=f"请输入有效的编号 (1-{len(results)})。",
+                    userid=userid
+                )
+                return
+            
+            # 获取选中的项目
+            selected = results[number - 1]
+            title = selected.get('title', '未知标题')
+            media_type = selected.get('media_type', 'unknown')
+            year = selected.get('release_date', selected.get('first_air_date', ''))[:4] if selected.get('release_date') or selected.get('first_air_date') else ''
+            tmdbid = selected.get('tmdbid')
+            
+            if not self._api_key:
+                # 如果没有API_KEY，显示详细信息
+                reply_text = f"📺 选择的资源: {title}"
+                if year:
+                    reply_text += f" ({year})"
+                reply_text += f"\n类型: {'电影' if media_type == 'movie' else '剧集' if media_type == 'tv' else media_type}"
+                reply_text += f"\nTMDB ID: {tmdbid}"
+                
+                if selected.get('overview'):
+                    reply_text += f"\n简介: {selected.get('overview')[:100]}..."
+                
+                # 显示可用的资源类型
+                reply_text += f"\n\n🔗 可用资源类型:"
+                resource_options = []
+                
+                if selected.get('115-flg') and self._enable_115:
+                    resource_options.append(f"• 115网盘")
+                if selected.get('magnet-flg') and self._enable_magnet:
+                    resource_options.append(f"• 磁力链接")
+                if selected.get('video-flg') and self._enable_video:
+                    resource_options.append(f"• 在线观看")
+                if selected.get('ed2k-flg') and self._enable_ed2k:
+                    resource_options.append(f"• ED2K链接")
+                
+                if resource_options:
+                    reply_text += f"\n" + "\n".join(resource_options)
+                    reply_text += "\n\n⚠️ 注意: 需要配置API_KEY才能获取具体下载链接"
+                else:
+                    reply_text += f"\n暂无可用资源类型"
+                
+                self.post_message(
+                    channel=channel,
+                    title="资源详情",
+                    text=reply_text,
+                    userid=userid
+                )
+            else:
+                # 清理之前的资源缓存（重要：避免缓存混乱）
+                if self._user_resource_cache.pop(userid) is not None:
+                    logger.info(f"清理用户 {userid} 的旧资源缓存")
+                
+                # 如果有API_KEY，直接按优先级获取资源
+                self.post_message(
+                    channel=channel,
+                    title="获取中",
+                    text=f"正在按优先级获取「{title}」的资源...",
+                    userid=userid
+                )
+                
+                self.get_resources_by_priority(selected, channel, userid)
+            
+        except Exception as e:
+            logger.error(f"处理资源选择异常: {str(e)}")
+            self.post_message(
+                channel=channel,
+                title="错误",
+                text=f"处理选择时出现错误: {str(e)}",
+                userid=userid
+            )
+
+    @timed("handler.get_resources")
+    def handle_get_resources(self, number: int, resource_type: str, channel: str, userid: str):
+        """处理获取具体资源链接的请求"""
+        try:
+            # 检查API_KEY
+            if not self._api_key:
+                self.post_message(
+                    channel=channel,
+                    title="配置错误",
+                    text="获取下载链接需要配置API_KEY，请在插件设置中添加。",
+                    userid=userid
+                )
+                return
+            
+            # 检查缓存
+            cache = self._user_search_cache.get(userid)
+            if not cache:
+                self.post_message(
+                    channel=channel,
+                    title="提示",
+                    text="搜索结果已过期，请重新搜索。",
+                    userid=userid
+                )
+                return
+            
+            results = cache['results']
+            if number < 1 or number > len(results):
+                self.post_message(
+                    channel=channel,
+                    title="提示", 
+                    text=f"请输入有效的编号 (1-{len(results)})。",
+                    userid=userid
+                )
+                return
+            
+            # 获取选中的项目
+            selected = results[number - 1]
+            title = selected.get('title', '未知标题')
+            media_type = selected.get('media_type', 'unknown')
+            tmdbid = selected.get('tmdbid')
+            
+            if not tmdbid:
+                self.post_message(
+                    channel=channel,
+                    title="错误",
+                    text="该资源缺少TMDB ID，无法获取下载链接。",
+                    userid=userid
+                )
+                return
+            
+            # 清理之前的资源缓存（重要：避免缓存混乱）
+            if self._user_resource_cache.pop(userid) is not None:
+                logger.info(f"清理用户 {userid} 的旧资源缓存")
+            
+            # 发送获取中的提示
+            self.post_message(
+                channel=channel,
+                title="获取中",
+                text=f"正在获取「{title}」的{resource_type}资源...",
+                userid=userid
+            )
+            
+            # 调用相应的API获取资源（详情确认没有该类型资源时不再请求）
+            resources = None
+            info = self.refresh_flags(selected)
+            flag_key = f"{resource_type}-flg"
+            if info is not None and flag_key in info and not info[flag_key]:
+                logger.info(f"跳过 {resource_type}: 详情显示「{title}」没有该类型资源")
+            elif media_type == 'movie':
+                resources = self._client.get_movie_resources(tmdbid, resource_type)
+            elif media_type == 'tv':
+                resources = self._client.get_tv_resources(tmdbid, resource_type)
+            
+            if not resources:
+                # Nullbr没有找到资源，回退到MoviePilot原始搜索
+                logger.info(f"Nullbr未找到「{title}」的{resource_type}资源，回退到MoviePilot搜索")
+                self.post_message(
+                    channel=channel,
+                    title="切换搜索",
+                    text=f"Nullbr没有找到「{title}」的{resource_type}资源，正在使用MoviePilot原始搜索...",
+                    userid=userid
+                )
+                
+                # 调用MoviePilot的原始搜索功能
+                self.fallback_to_moviepilot_search(title, channel, userid)
+                return
+            
+            # 格式化资源链接（第4步完善）
+            self.format_and_send_resources(resources, resource_type, title, channel, userid)
+            
+        except Exception as e:
+            logger.error(f"获取资源链接异常: {str(e)}")
+            self.post_message(
+                channel=channel,
+                title="错误",
+                text=f"获取资源链接时出现错误: {str(e)}",
+                userid=userid
+            )
+
+    def get_resources_by_priority(self, selected: dict, channel: str, userid: str):
+        """按优先级获取资源"""
+        try:
+            title = selected.get('title', '未知标题')
+            media_type = selected.get('media_type', 'unknown')
+            tmdbid = selected.get('tmdbid')
+            
+            if not tmdbid:
+                self.post_message(
+                    channel=channel,
+                    title="错误",
+                    text="该资源缺少TMDB ID，无法获取下载链接。",
+                    userid=userid
+                )
+                return
+            
+            # 清理之前的资源缓存（重要：避免缓存混乱）
+            if self._user_resource_cache.pop(userid) is not None:
+                logger.info(f"清理用户 {userid} 的旧资源缓存")
+            
+            logger.info(f"按优先级获取资源: {title} (TMDB: {tmdbid})")
+            logger.info(f"优先级顺序: {' > '.join(self._resource_priority)}")
+            
+            # 以影片详情中的资源标记为准，跳过确定不存在的资源类型
+            self.refresh_flags(selected)
+            seasons = selected.get('number_of_seasons') if media_type == 'tv' else None
+            
+            # 按优先级尝试获取资源
+            for priority_type in self._resource_priority:
+                # 检查该资源类型是否可用
+                flag_key = f"{priority_type}-flg"
+                if not selected.get(flag_key):
+                    logger.info(f"跳过 {priority_type}: 资源不可用")
+                    continue
+                
+                # 检查该资源类型是否启用
+                enable_key = f"_enable_{priority_type}"
+                if not getattr(self, enable_key, True):
+                    logger.info(f"跳过 {priority_type}: 已在配置中禁用")
+                    continue
+                
+                logger.info(f"尝试获取 {priority_type} 资源...")
+                
+                # 调用相应的API获取资源
+                resources = None
+                if media_type == 'movie':
+                    resources = self._client.get_movie_resources(tmdbid, priority_type)
+                elif media_type == 'tv':
+                    resources = self._client.get_tv_resources(tmdbid, priority_type)
+                
+                if resources and resources.get(priority_type):
+                    # 找到资源，发送结果并结束
+                    resource_name = {
+                        '115': '115网盘',
+                        'magnet': '磁力链接', 
+                        'ed2k': 'ED2K链接',
+                        'video': 'M3U8视频'
+                    }.get(priority_type, priority_type)
+                    
+                    logger.info(f"成功获取 {priority_type} 资源，共 {len(resources[priority_type])} 个")
+                    
+                    self.post_message(
+                        channel=channel,
+                        title="获取成功",
+                        text=f"✅ 已获取「{title}」{f'(共{seasons}季)' if seasons else ''}的{resource_name}资源",
+                        userid=userid
+                    )
+                    
+                    # 格式化并发送资源链接
+                    self.format_and_send_resources(resources, priority_type, title, channel, userid)
+                    return
+                else:
+                    logger.info(f"{priority_type} 资源不可用，尝试下一优先级")
+            
+            # 所有优先级都没有找到资源，回退到MoviePilot搜索
+            logger.info(f"所有优先级资源都不可用，回退到MoviePilot搜索")
+            self.post_message(
+                channel=channel,
+                title="切换搜索",
+                text=f"Nullbr没有找到「{title}」的任何资源，正在使用MoviePilot原始搜索...",
+                userid=userid
+            )
+            
+            self.fallback_to_moviepilot_search(title, channel, userid)
+            
+        except Exception as e:
+            logger.error(f"按优先级获取资源异常: {str(e)}")
+            self.post_message(
+                channel=channel,
+                title="错误",
+                text=f"获取资源时出现错误: {str(e)}",
+                userid=userid
+            )
+
+    @timed("handler.range")
+    def handle_resource_range(self, start: int, end: int, channel, userid: str):
+        """
+        处理区间转存（#N-M）：依次转存资源列表中第 N 到第 M 个资源
+
+        :param start: 起始编号
+        :param end: 结束编号（可小于起始编号）
+        """
+        cache = self._user_resource_cache.get(userid)
+        if not cache:
+            self.post_message(
+                channel=channel,
+                title="提示",
+                text="资源列表已过期或尚未获取，请先选择影片获取资源后再批量转存。",
+                userid=userid
+            )
+            return
+        
+        start, end = min(start, end), max(start, end)
+        total = len(cache['resources'])
+        if start < 1 or end > total:
+            self.post_message(
+                channel=channel,
+                title="编号错误",
+                text=f"请输入有效的资源编号范围 (1-{total})。",
+                userid=userid
+            )
+            return
+        if end - start + 1 > MAX_RANGE:
+            self.post_message(
+                channel=channel,
+                title="提示",
+                text=f"一次最多转存 {MAX_RANGE} 个资源，请缩小编号范围。",
+                userid=userid
+            )
+            return
+        if not self._transfer_enabled():
+            self.post_message(
+                channel=channel,
+                title="提示",
+                text="转存功能未启用，请在插件设置中配置后再试。",
+                userid=userid
+            )
+            return
+        
+        logger.info(f"批量转存资源: {start}-{end}")
+        for number in range(start, end + 1):
+            self.handle_resource_transfer(number, channel, userid)
+
+    def fallback_to_moviepilot_search(self, title: str, channel: str, userid: str):
+        """回退到MoviePilot原始搜索功能"""
+        logger.info(f"启动MoviePilot原始搜索: {title}")
+        
+        # 尝试其他搜索方式
+        self.try_alternative_search(title, channel, userid)
+
+    def try_alternative_search(self, title: str, channel: str, userid: str):
+        """尝试其他搜索方式"""
+        try:
+            logger.info(f"尝试MoviePilot原始搜索: {title}")
+            
+            # 简化策略：直接发送搜索建议和提示
+            # 避免复杂的模块调用导致的错误
+            
+            # 只检查是否有配置的站点（站点数量带缓存，重复的无结果查询不再查询站点）
+            count = indexer_count()
+            if count:
+                logger.info(f"检测到 {count} 个配置的站点")
+                
+                self.post_message(
+                    channel=channel,
+                    title="搜索提示",
+                    text=f"🔍 Nullbr未找到「{title}」的资源\n\n" +
+                         f"💡 系统检测到您已配置 {count} 个搜索站点\n" +
+                         f"建议通过以下方式继续搜索:\n\n" +
+                         f"🌐 MoviePilot Web界面搜索\n" +
+                         f"📱 其他搜索渠道\n" +
+                         f"⚙️ 检查站点配置状态",
+                    userid=userid
+                )
+            else:
+                # 没有配置站点或检测失败，发送通用建议
+                self.send_manual_search_suggestion(title, channel, userid)
+            
+        except Exception as e:
+            logger.error(f"备用搜索失败: {str(e)}")
+            self.send_manual_search_suggestion(title, channel, userid)
+
+    def send_manual_search_suggestion(self, title: str, channel: str, userid: str):
+        """发送手动搜索建议"""
+        self.post_message(
+            channel=channel,
+            title="搜索建议",
+            text=f"📋 「{title}」未找到资源，建议:\n\n" +
+                 f"🔍 在MoviePilot Web界面搜索\n" +
+                 f"⚙️ 检查资源站点配置\n" +
+                 f"🔄 尝试其他关键词\n" +
+                 f"📱 使用其他搜索渠道",
+            userid=userid
+        )
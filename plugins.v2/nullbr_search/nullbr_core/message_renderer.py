@@ -0,0 +1,265 @@
+"""
+消息渲染
+
+搜索结果、资源列表、离线任务列表等长消息按记录逐条渲染：
+- 每种记录对应一个渲染函数（单个 f-string 一次生成整条记录），按资源类型查表选择
+- 渲染结果写入按字节计数的缓冲区，达到渠道上限时立即停止，不再渲染后续记录
+- 超出一条消息的记录按记录边界分页，首页立即发送，后续页面在翻页（#next）时才渲染
+
+本页待渲染条数不超过 FAST_PATH_ITEMS（每页 10 条等常见情况）时先整体渲染，总长度只计算一次，在上限内即直接拼接返回；
+超限时才逐条按字节计数，因此短列表不为逐条计数付出额外开销。只需一条消息时取 RecordPager 的首页即可。
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+try:
+    from .message_formatter import channel_key
+except ImportError:
+    from message_formatter import channel_key
+
+# 记录渲染函数签名: (编号, 记录, 上下文) -> 文本
+RecordRenderer = Callable[[int, Any, dict], str]
+
+SEPARATOR = '─' * 15
+
+# 各渠道单条消息的字节上限（UTF-8）
+CHANNEL_BYTE_LIMITS = {
+    'wechat': 2048,      # 企业微信文本消息上限 2048 字节
+    'telegram': 4096,    # Telegram 上限 4096 字符，按字节计数以保证不超限
+    'slack': 12000,
+}
+DEFAULT_BYTE_LIMIT = 10000   # 约等于此前 3400 个中文字符的截断长度
+
+DEFAULT_PAGE_SIZE = 10       # 每页最多记录数
+FAST_PATH_ITEMS = 20         # 本页待渲染条数不超过此值时先整体渲染再一次性检查长度
+PAGE_MORE_TEXT = "📄 第 {page} 页，还有 {remaining} 条，发送 #next 查看下一页\n\n"
+
+
+def byte_limit(channel) -> int:
+    """获取渠道单条消息的字节上限"""
+    return CHANNEL_BYTE_LIMITS.get(channel_key(channel), DEFAULT_BYTE_LIMIT)
+
+
+class RenderResult(NamedTuple):
+    """渲染结果"""
+    text: str
+    rendered: int      # 实际渲染的记录数
+    total: int         # 记录总数
+
+
+class RenderBuffer:
+    """按 UTF-8 字节计数的文本缓冲区"""
+
+    __slots__ = ('_parts', '_size', 'limit')
+
+    def __init__(self, limit: int):
+        self._parts: List[str] = []
+        self._size = 0
+        self.limit = limit
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def append(self, text: str):
+        """无条件追加"""
+        self._parts.append(text)
+        self._size += len(text.encode('utf-8'))
+
+    def try_append(self, text: str, reserve: int = 0) -> bool:
+        """在上限内时追加，返回是否追加成功"""
+        size = len(text.encode('utf-8'))
+        if self._size + size + reserve > self.limit:
+            return False
+        self._parts.append(text)
+        self._size += size
+        return True
+
+    def getvalue(self) -> str:
+        return ''.join(self._parts)
+
+
+class RecordPager:
+    """按记录边界分页
+
+    每页不超过字节上限和条数上限，记录在翻页时才渲染，首页可立即发送。
+    单条记录超过字节上限时独占一页，保证不丢记录、分页不停滞。
+    """
+
+    def __init__(self, header: str, items: Sequence, template: RecordRenderer, limit: int,
+                 footer: str = '', page_size: Optional[int] = DEFAULT_PAGE_SIZE,
+                 more_text: str = PAGE_MORE_TEXT, ctx: Optional[dict] = None, start: int = 1):
+        """
+        :param header: 每页的消息头
+        :param items: 记录列表
+        :param template: 记录渲染函数
+        :param limit: 每页字节上限
+        :param footer: 每页的消息尾
+        :param page_size: 每页最多记录数，None 表示仅受字节上限限制
+        :param more_text: 还有后续页面时的提示，可使用 {page} {remaining}
+        :param ctx: 传给渲染函数的上下文
+        :param start: 起始编号
+        """
+        self._items = items
+        self._template = template
+        self._ctx = ctx or {}
+        self._start = start
+        self._pos = 0
+        self.header = header
+        self.footer = footer
+        self.limit = limit
+        self.page_size = page_size
+        self.more_text = more_text
+        self.page = 0
+
+    @property
+    def total(self) -> int:
+        return len(self._items)
+
+    @property
+    def remaining(self) -> int:
+        """尚未发送的记录数"""
+        return self.total - self._pos
+
+    @property
+    def has_next(self) -> bool:
+        return self._pos < self.total
+
+    def next_page(self) -> Optional[RenderResult]:
+        """
+        渲染下一页
+
+        :return: RenderResult（rendered 为本页记录数），没有更多页面时返回 None
+        """
+        if not self.has_next:
+            return None
+        self.page += 1
+        total = self.total
+        reserve = len(self.footer.encode('utf-8')) \
+            + len(self.more_text.format(page=self.page, remaining=total).encode('utf-8'))
+
+        texts = None
+        end = total if self.page_size is None else min(total, self._pos + self.page_size)
+        if end - self._pos <= FAST_PATH_ITEMS:
+            texts = [self._template(self._start + i, self._items[i], self._ctx) for i in range(self._pos, end)]
+            body = ''.join(texts)
+            if len(self.header.encode('utf-8')) + len(body.encode('utf-8')) + reserve <= self.limit:
+                self._pos = end
+                more = self.more_text.format(page=self.page, remaining=self.remaining) if self.has_next else ''
+                return RenderResult(f"{self.header}{body}{more}{self.footer}", len(texts), total)
+
+        buffer = RenderBuffer(self.limit)
+        buffer.append(self.header)
+        rendered = 0
+        while self._pos < total:
+            if self.page_size is not None and rendered >= self.page_size:
+                break
+            if texts is not None:
+                text = texts[rendered]
+            else:
+                text = self._template(self._start + self._pos, self._items[self._pos], self._ctx)
+            if not buffer.try_append(text, reserve):
+                if rendered:
+                    break
+                buffer.append(text)
+            self._pos += 1
+            rendered += 1
+
+        if self.has_next:
+            buffer.append(self.more_text.format(page=self.page, remaining=self.remaining))
+        buffer.append(self.footer)
+        return RenderResult(buffer.getvalue(), rendered, total)
+
+
+# ---------------------------------------------------------------------------
+# 记录渲染函数
+# ---------------------------------------------------------------------------
+
+_MEDIA_TYPES = {'movie': '电影', 'tv': '剧集'}
+
+# (资源标记字段, 显示文本, 启用开关名)
+_RESOURCE_FLAGS = (
+    ('115-flg', '💾115', '115'),
+    ('magnet-flg', '🧲磁力', 'magnet'),
+    ('video-flg', '🎬在线', 'video'),
+    ('ed2k-flg', '📎ed2k', 'ed2k'),
+)
+
+
+def render_search_item(index: int, item: dict, ctx: dict) -> str:
+    """搜索结果"""
+    date = item.get('release_date') or item.get('first_air_date')
+    year = f" ({date[:4]})" if date else ''
+    media_type = item.get('media_type', '未知')
+    enabled = ctx.get('enabled_types', ())
+    flags = [text for flag, text, rtype in _RESOURCE_FLAGS if item.get(flag) and rtype in enabled]
+    flags_line = f"📂 资源: {' | '.join(flags)}\n" if flags else ''
+    return (f"【{index}】{item.get('title', '未知标题')}{year}\n"
+            f"🎭 类型: {_MEDIA_TYPES.get(media_type, media_type)}\n"
+            f"{flags_line}{SEPARATOR}\n")
+
+
+def render_115_item(index: int, res: dict, ctx: dict) -> str:
+    """115 网盘资源"""
+    return (f"【{index}】{res.get('title', '未知')}\n"
+            f"💾 大小: {res.get('size', '未知')}\n"
+            f"🔗 链接: {res.get('share_link', '无')}\n"
+            f"{SEPARATOR}\n")
+
+
+def render_magnet_item(index: int, res: dict, ctx: dict) -> str:
+    """磁力资源"""
+    return (f"【{index}】{res.get('name', '未知')}\n"
+            f"💾 大小: {res.get('size', '未知')}\n"
+            f"📺 分辨率: {res.get('resolution', '未知')}\n"
+            f"🈴 中文字幕: {'✅' if res.get('zh_sub') else '❌'}\n"
+            f"🧲 磁力: {res.get('magnet', '无')}\n"
+            f"{SEPARATOR}\n")
+
+
+def render_link_item(index: int, res: dict, ctx: dict) -> str:
+    """M3U8/ED2K 资源"""
+    size_line = f"💾 大小: {res.get('size')}\n" if res.get('size') else ''
+    link = res.get('ed2k') or res.get('url', res.get('link', '无'))
+    return (f"【{index}】{res.get('name', res.get('title', '未知'))}\n"
+            f"{size_line}🔗 链接: {link}\n"
+            f"{SEPARATOR}\n")
+
+
+# 批量查询表格中的资源类型简称
+_BATCH_LABELS = {'115': '115', 'magnet': '磁力', 'video': '在线', 'ed2k': 'ed2k'}
+
+
+def render_batch_item(index: int, row: dict, ctx: dict) -> str:
+    """批量查询的一行：查询词 → 匹配的影片，各已启用类型的资源标记（ctx['enabled_types']）"""
+    item = row.get('item')
+    if not item:
+        return f"{index}. {row['query']} → ❌ 未找到\n"
+    date = item.get('release_date') or item.get('first_air_date')
+    year = f" ({date[:4]})" if date else ''
+    media_type = item.get('media_type', '未知')
+    enabled = ctx.get('enabled_types', ())
+    flags = ' '.join(f"{_BATCH_LABELS[rtype]}{'✅' if item.get(flag) else '❌'}"
+                     for flag, _, rtype in _RESOURCE_FLAGS if rtype in enabled)
+    line = f"{index}. {row['query']} → {item.get('title', '未知标题')}{year} {_MEDIA_TYPES.get(media_type, media_type)}\n"
+    line += f"   {flags}\n" if flags else ''
+    if row.get('transfer'):
+        line += f"   {row['transfer']}\n"
+    return line
+
+
+def render_offline_item(index: int, task, ctx: dict) -> str:
+    """离线任务（ctx['format_progress'] 格式化大小/状态/进度）"""
+    name = str(getattr(task, 'name', '未知') or '未知')[:30]
+    return f"**{index}.** {name}\n   {ctx['format_progress'](task)}\n"
+
+
+# 资源类型 -> 渲染函数
+RESOURCE_TEMPLATES: Dict[str, RecordRenderer] = {
+    '115': render_115_item,
+    'magnet': render_magnet_item,
+    'video': render_link_item,
+    'ed2k': render_link_item,
+}
+SEARCH_TEMPLATE: RecordRenderer = render_search_item
+OFFLINE_TEMPLATE: RecordRenderer = render_offline_item
+BATCH_TEMPLATE: RecordRenderer = render_batch_item
@@ -0,0 +1,91 @@
+"""
+用户会话存储
+
+按用户保存交互过程中的中间状态（搜索结果、资源列表、分页器），供后续的 #编号、#next
+等命令使用。条目超过有效期即视为不存在；写入时顺带清理过期条目，长期运行时不会
+因不再交互的用户而持续增长。
+
+Nullbr 客户端的无结果缓存也用 SessionStore 保存（键为查询，不带字段）。
+"""
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# 会话有效期（秒）
+SESSION_TTL = 3600
+
+# 每写入多少次清理一次过期条目
+SWEEP_EVERY = 64
+
+
+class SessionStore:
+    """按用户ID保存会话数据的字典，条目带时间戳，超过有效期自动失效"""
+
+    def __init__(self, ttl: float = SESSION_TTL):
+        """
+        :param ttl: 有效期（秒）
+        """
+        self.ttl = ttl
+        self._data: Dict[Any, dict] = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, userid) -> bool:
+        return self.get(userid) is not None
+
+    def get(self, userid) -> Optional[dict]:
+        """
+        获取用户的会话数据，不存在或已过期时返回 None
+
+        :param userid: 用户ID
+        :return: 会话数据（含 timestamp 字段）
+        """
+        entry = self._data.get(userid)
+        if entry is None:
+            return None
+        if time.time() - entry['timestamp'] > self.ttl:
+            with self._lock:
+                if self._data.get(userid) is entry:
+                    del self._data[userid]
+            return None
+        return entry
+
+    def put(self, userid, **fields) -> dict:
+        """
+        保存用户的会话数据（替换原有数据）
+
+        :param userid: 用户ID
+        :param fields: 会话字段
+        :return: 保存的会话数据
+        """
+        now = time.time()
+        entry = dict(fields, timestamp=now)
+        with self._lock:
+            self._data[userid] = entry
+            self._writes += 1
+            if self._writes % SWEEP_EVERY == 0:
+                expired = [k for k, v in self._data.items() if now - v['timestamp'] > self.ttl]
+                for k in expired:
+                    del self._data[k]
+        return entry
+
+    def touch(self, userid):
+        """刷新用户会话的时间戳"""
+        entry = self._data.get(userid)
+        if entry is not None:
+            entry['timestamp'] = time.time()
+
+    def pop(self, userid) -> Optional[dict]:
+        """移除并返回用户的会话数据（已过期时返回 None）"""
+        with self._lock:
+            entry = self._data.pop(userid, None)
+        if entry is None or time.time() - entry['timestamp'] > self.ttl:
+            return None
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -1,15 +1,34 @@
-import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, List, Dict, Tuple
 
 from app.core.event import eventmanager, Event
 from app.log import logger
 from app.plugins import _PluginBase
-from app.schemas.types import EventType
+from app.schemas.types import EventType, NotificationType
 from app.db.systemconfig_oper import SystemConfigOper
 
+from .nullbr_core.cache_warmer import (
+    WARM_BUDGET, WARM_HOURS, WARM_START_JITTER, WARM_TOP_K, CacheWarmer, parse_hours
+)
+from .nullbr_core.commands import CALLBACKS, HASH_TALK, MAX_BATCH, parse_title_list
+from .nullbr_core.dashboard import DASHBOARD_REFRESH_SECONDS
+from .nullbr_core.frontend import BATCH_WORKERS, NullbrFrontend
+from .nullbr_core.message_renderer import (
+    BATCH_TEMPLATE, OFFLINE_TEMPLATE, RESOURCE_TEMPLATES, SEARCH_TEMPLATE, RecordPager, byte_limit
+)
+from .nullbr_core.metrics import CACHES, Metrics, timed
+from .nullbr_core.nullbr_client import acquire_client, release_client
+from .nullbr_core.session_store import SessionStore
+from .message_queue import OutboundQueue
+from .message_updater import EDIT_IN_PLACE_ACTIONS, MessageUpdater, is_editable
+from .offline_index import OfflineIndex, parse_resource_hash
+from .resource_ranker import parse_weights, rank_resources
+from .traffic_recorder import TrafficRecorder
 
-class nullbr_search_pro(_PluginBase):
+
+class nullbr_search_pro(NullbrFrontend, _PluginBase):
     # 插件基本信息
     plugin_name = "Nullbr资源搜索Pro"
     plugin_desc = "支持Nullbr API搜索影视资源，集成CloudDrive2实现115转存和磁力/ED2K离线下载"
@@ -33,6 +52,8 @@ class nullbr_search_pro(_PluginBase):
         self._enable_video = True
         self._enable_ed2k = True
         self._search_timeout = 30
+        self._rank_enabled = True                 # 资源智能排序
+        self._rank_weights = None                 # 排序权重，None 表示默认
         
         # CloudDrive2配置 (仅用于磁力/ED2K离线)
         self._cd2_enabled = False
@@ -44,101 +65,154 @@ class nullbr_search_pro(_PluginBase):
         self._p115_enabled = False
         self._p115_cookies = ""                   # 115 Cookie
         self._p115_save_cid = ""                  # 转存目标 CID
+        self._p115_check_interval = 30            # Cookie 存活检测间隔（分钟）
         
         # 客户端实例
         self._client = None
         self._cd2_client = None
+        self._cd2_aio = None                      # 批量离线用的异步客户端，首次使用时创建
+        self._cd2_aio_lock = threading.Lock()
         self._p115_client = None                  # 115分享转存客户端
         
+        # 离线任务去重索引
+        self._offline_index = None
+        
+        # 出站消息队列（合并、限速、异步发送），init_plugin 时创建
+        self._outbound = None
+        
+        # 按钮回调期间的原消息更新器（线程内有效），见 handle_message_action
+        self._reply_context = threading.local()
+        
         # 用户搜索结果缓存和资源缓存
-        self._user_search_cache = {}  # {userid: {'results': [...], 'timestamp': time.time()}}
-        self._user_resource_cache = {}  # {userid: {'resources': [...], 'title': str, 'timestamp': time.time()}}
-        
-        # 统计数据
-        self._stats = {
-            'total_searches': 0,           # 总搜索次数
-            'successful_searches': 0,      # 成功搜索次数  
-            'failed_searches': 0,          # 失败搜索次数
-            'total_resources': 0,          # 获取的总资源数
-            'cd2_transfers': 0,            # CloudDrive2转存次数
-            'cd2_offline': 0,              # 离线任务次数
-            'successful_transfers': 0,     # 成功转存次数
-            'failed_transfers': 0,         # 失败转存次数
-            'last_search_time': None,      # 最后搜索时间
-            'last_transfer_time': None,    # 最后转存时间
-            'api_status': 'unknown',       # API状态
-            'cd2_status': 'unknown',       # CloudDrive2状态
-            'popular_resources': {}        # 热门搜索统计 {keyword: count}
+        self._user_search_cache = SessionStore()  # {userid: {'results': [...]}}
+        self._user_resource_cache = SessionStore()  # {userid: {'resources': [...], 'title': str}}
+        self._user_page_cache = SessionStore()  # {userid: {'pager': RecordPager, 'title': str}}
+        
+        # 统计面板（由定时任务刷新，get_page 直接返回）
+        self._dashboard_snapshot = None
+        self._dashboard_page = None
+        
+        # /metrics 导出器（增量序列化），首次抓取时创建
+        self._exporter = None
+        
+        # 流量录制（可选，匿名化后写入插件数据目录）
+        self._traffic_record = False
+        self._recorder = None
+        
+        # 热门缓存预热（定时按热门关键词刷新 Nullbr 结果缓存）
+        self._warm_enabled = False
+        self._warm_hours = WARM_HOURS
+        self._warm_top_k = WARM_TOP_K
+        self._warm_budget = WARM_BUDGET
+        self._warm_stop = threading.Event()
+        
+        # 命令分派表：HASH_TALK / CALLBACKS 解析出的动词 -> 处理函数(*参数, channel, userid)
+        self._talk_handlers = {
+            'next': self.send_next_page,
+            'refresh': self._handle_refresh,
+            'get': self.handle_get_resources,
+            'range': self.handle_resource_range,
+            'pick': self._handle_number,
+            'auto': self.auto_pick_and_transfer,
+            'search': self.search_and_reply,
+        }
+        self._action_handlers = {
+            'select': self.handle_resource_selection,
+            'transfer': self.handle_resource_transfer,
+            'get': self.handle_get_resources,
+            'next': self.send_next_page,
+            'offline_refresh': self._handle_offline_refresh,
+            'back': self._handle_back,
         }
+        
+        # 统计数据（计数器按线程分片，热门关键词使用固定容量的 Top-K 统计）
+        self._stats = Metrics(
+            counters=(
+                'total_searches',       # 总搜索次数
+                'successful_searches',  # 成功搜索次数
+                'failed_searches',      # 失败搜索次数
+                'total_resources',      # 获取的总资源数
+                'cd2_transfers',        # CloudDrive2转存次数
+                'p115_transfers',       # 115分享转存次数
+                'cd2_offline',          # 离线任务次数
+                'successful_transfers',  # 成功转存次数
+                'failed_transfers',     # 失败转存次数
+            ),
+            states={
+                'last_search_time': None,           # 最后搜索时间
+                'last_transfer_time': None,         # 最后转存时间
+                'api_status': 'unknown',            # API状态
+                'cd2_status': 'unknown',            # CloudDrive2状态
+                'p115_status': 'unknown',           # 115 Cookie状态
+            }
+        )
 
-    def _format_message_for_wechat(self, text: str) -> str:
-        """格式化消息以兼容微信企业应用显示"""
-        # 微信企业应用需要特殊处理换行符和格式
-        # 将连续的换行符合并，并在关键位置添加分隔符
-        lines = text.split('\n')
-        formatted_lines = []
+    def post_message(self, channel=None, title: str = None, text: str = None, userid: str = None,
+                     mtype: NotificationType = None, **kwargs):
+        """发送消息，自动处理微信格式兼容；原地更新类按钮回调期间发给同一用户的消息改为编辑原消息"""
+        formatted_text = self._format_text(channel, text)
         
-        for i, line in enumerate(lines):
-            stripped_line = line.strip()
-            
-            # 空行处理：连续空行只保留一个
-            if not stripped_line:
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                continue
-            
-            # 对于标题行（包含emoji和中文冒号），前后加空行
-            if ('🎬' in stripped_line or '🎯' in stripped_line or '✅' in stripped_line or '❌' in stripped_line) and '：' in stripped_line:
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                formatted_lines.append(stripped_line)
-                formatted_lines.append('')
-            # 对于编号列表项
-            elif re.match(r'^\d+\.', stripped_line) or re.match(r'^【\d+】', stripped_line):
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                formatted_lines.append(stripped_line)
-            # 对于缩进的详情行
-            elif stripped_line.startswith(' ') or stripped_line.startswith('   '):
-                formatted_lines.append(stripped_line)
-            # 对于分隔符和提示信息
-            elif stripped_line.startswith('---') or stripped_line.startswith('💡') or stripped_line.startswith('📋'):
-                if formatted_lines and formatted_lines[-1] != '':
-                    formatted_lines.append('')
-                formatted_lines.append(stripped_line)
-            else:
-                formatted_lines.append(stripped_line)
+        updater = getattr(self._reply_context, 'updater', None)
+        if updater is not None and mtype is None and userid == updater.userid:
+            updater.update(title, formatted_text, kwargs.get('buttons'))
+            return
         
-        return '\n'.join(formatted_lines)
+        # 经出站队列异步发送，队列未启动时直接发送
+        if self._outbound is not None:
+            try:
+                self._outbound.submit(channel, title, formatted_text, userid, mtype=mtype, **kwargs)
+                return
+            except RuntimeError:
+                pass
+        self._deliver_message(channel, title, formatted_text, userid, mtype=mtype, **kwargs)
 
-    def post_message(self, channel, title: str, text: str, userid: str = None):
-        """发送消息，自动处理微信格式兼容"""
-        # 检测是否为微信通知渠道
+    @timed("message.send")
+    def _deliver_message(self, channel, title: str, text: str, userid: str = None, **kwargs):
+        """调用父类的post_message方法发送消息"""
         try:
-            # channel可能是字符串或MessageChannel对象
-            if hasattr(channel, 'name'):
-                channel_name = str(channel.name).lower()
-            elif hasattr(channel, 'type'):
-                channel_name = str(channel.type).lower()
-            else:
-                channel_name = str(channel).lower()
-            
-            # 检测微信相关渠道
-            if 'wechat' in channel_name or 'wecom' in channel_name or 'wework' in channel_name:
-                formatted_text = self._format_message_for_wechat(text)
-            else:
-                formatted_text = text
-        except Exception:
-            # 如果检测失败，使用原文本
-            formatted_text = text
-        
-        # 调用父类的post_message方法
-        super().post_message(channel=channel, title=title, text=formatted_text, userid=userid)
+            super().post_message(channel=channel, title=title, text=text, userid=userid, **kwargs)
+        except TypeError:
+            if 'buttons' not in kwargs:
+                raise
+            # MoviePilot 版本不支持 buttons 参数，降级为普通消息
+            kwargs.pop('buttons')
+            super().post_message(channel=channel, title=title, text=text, userid=userid, **kwargs)
+
+    def _edit_message(self, channel, source: str, message_id, chat_id,
+                      title: str, text: str, buttons: list = None) -> bool:
+        """
+        编辑已发送的消息
+
+        :return: 是否编辑成功，渠道或 MoviePilot 版本不支持时返回 False
+        """
+        try:
+            kwargs = {'buttons': buttons} if buttons else {}
+            with timed("message.edit"):
+                return bool(self.chain.edit_message(
+                    channel=channel, source=source, message_id=message_id, chat_id=chat_id,
+                    title=title, text=text, **kwargs
+                ))
+        except Exception as e:
+            logger.debug(f"编辑消息失败，改为发送新消息: {str(e)}")
+            return False
+
+    def _create_updater(self, channel, source: str, message_id, chat_id, userid: str) -> MessageUpdater:
+        """创建原消息更新器，编辑失败时退回为发送新消息"""
+        def edit(title, text, buttons):
+            return self._edit_message(channel, source, message_id, chat_id, title, text, buttons)
+
+        def send(title, text, buttons):
+            kwargs = {'buttons': buttons} if buttons else {}
+            self._deliver_message(channel, title, text, userid, **kwargs)
+
+        return MessageUpdater.for_channel(channel, edit, send, userid=userid)
 
     def init_plugin(self, config: dict = None):
         """初始化插件"""
         logger.info(f"正在初始化 {self.plugin_name} v{self.plugin_version}")
         config_oper = SystemConfigOper()
+        if self._outbound is None:
+            self._outbound = OutboundQueue(self._deliver_message)
         if config:
             self._enabled = config.get("enabled", False)
             self._app_id = config.get("app_id")
@@ -162,6 +236,22 @@ class nullbr_search_pro(_PluginBase):
             self._enable_video = config.get("enable_video", True)
             self._enable_ed2k = config.get("enable_ed2k", True)
             self._search_timeout = config.get("search_timeout", 30)
+            self._rank_enabled = config.get("rank_enabled", True)
+            self._rank_weights = parse_weights(config.get("rank_weights", ""))
+            self._traffic_record = config.get("traffic_record", False)
+            
+            # 缓存预热配置
+            self._warm_enabled = config.get("warm_enabled", False)
+            self._warm_hours = parse_hours(str(config.get("warm_hours", WARM_HOURS)))
+            if not self._warm_hours:
+                logger.warning(f"预热时段格式错误: {config.get('warm_hours')}，使用默认值 {WARM_HOURS}")
+                self._warm_hours = WARM_HOURS
+            try:
+                self._warm_top_k = max(1, int(config.get("warm_top_k") or WARM_TOP_K))
+                self._warm_budget = max(1, int(config.get("warm_budget") or WARM_BUDGET))
+            except (TypeError, ValueError):
+                logger.warning("预热关键词数或API预算格式错误，使用默认值")
+                self._warm_top_k, self._warm_budget = WARM_TOP_K, WARM_BUDGET
             
             # CloudDrive2配置
             self._cd2_enabled = config.get("cd2_enabled", False)
@@ -173,19 +263,45 @@ class nullbr_search_pro(_PluginBase):
             if self._cd2_enabled:
                 logger.info(f"CloudDrive2已启用: {self._cd2_url}")
         
-        # 初始化API客户端
+        # 初始化API客户端（先归还上一次配置的客户端）
+        release_client(self._client)
+        self._client = None
         if self._enabled and self._app_id:
             try:
-                from .nullbr_client import NullbrApiClient
-                self._client = NullbrApiClient(self._app_id, self._api_key)
+                self._client = acquire_client(self._app_id, self._api_key)
+                # 有结果的查询只在开启缓存预热时缓存，用户请求的结果有效期为分钟级
+                self._client.enable_result_cache(self._warm_enabled)
                 logger.info("Nullbr API客户端初始化成功")
             except Exception as e:
                 logger.error(f"Nullbr API客户端初始化失败: {str(e)}")
                 self._enabled = False
-        else:
-            if not self._app_id:
-                logger.warning("Nullbr插件配置错误: 缺少APP_ID")
-            self._client = None
+        elif not self._app_id:
+            logger.warning("Nullbr插件配置错误: 缺少APP_ID")
+        
+        # 结束上一次配置下进行中的缓存预热
+        self._warm_stop.set()
+        self._warm_stop = threading.Event()
+        
+        # 流量录制：每次启用写入新文件
+        if self._recorder:
+            self._recorder.close()
+            self._recorder = None
+        if self._enabled and self._traffic_record:
+            try:
+                path = self.get_data_path() / "traffic" / f"traffic-{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+                self._recorder = TrafficRecorder(str(path), self.__class__.__name__)
+                logger.info(f"流量录制已开启: {path}")
+            except Exception as e:
+                logger.error(f"流量录制开启失败: {str(e)}")
+        
+        # 加载离线去重索引
+        self._offline_index = OfflineIndex(self.get_data('offline_index') or {})
+        
+        # 释放旧的CloudDrive2客户端（channel 按地址缓存，同一地址重载时直接复用连接）
+        if self._cd2_client:
+            self._cd2_client.close()
+            self._cd2_client = None
+        self._close_cd2_aio()
         
         # 初始化CloudDrive2客户端 (仅支持 API Token)
         if self._cd2_enabled and self._cd2_url:
@@ -215,11 +331,19 @@ class nullbr_search_pro(_PluginBase):
         if self._p115_enabled and self._p115_cookies:
             try:
                 from .p115_client import P115ShareClient
+                # 构造时不访问 115，登录状态由后台存活检测更新
                 self._p115_client = P115ShareClient(
                     cookies=self._p115_cookies,
                     save_cid=self._p115_save_cid
                 )
-                logger.info(f"115 分享转存客户端已初始化，目标 CID: {self._p115_save_cid or '0'}")
+                self._stats['p115_status'] = 'unknown'
+                logger.info(f"115 分享转存客户端已创建，目标 CID: {self._p115_save_cid or '0'}")
+                # 首次存活检测放到后台线程，避免阻塞插件启动和配置保存
+                threading.Thread(
+                    target=self._check_p115_liveness,
+                    name="nullbr-p115-liveness",
+                    daemon=True
+                ).start()
             except ImportError:
                 logger.warning("p115client 未安装，115分享转存功能不可用。请安装: pip install p115client")
                 self._p115_client = None
@@ -231,9 +355,44 @@ class nullbr_search_pro(_PluginBase):
             if self._p115_enabled and not self._p115_cookies:
                 logger.warning("115 分享转存已启用但未配置 Cookie")
 
-    def get_state(self) -> bool:
-        """获取插件状态"""
-        return self._enabled
+    def _check_p115_liveness(self):
+        """后台检测 115 Cookie 存活状态，失效时主动通知管理员"""
+        client = self._p115_client
+        if not client:
+            return
+        
+        was_alive = client.is_alive
+        try:
+            alive = client.check_alive()
+        except Exception as e:
+            # 网络异常不代表 Cookie 失效，保留原状态等待下次检测
+            logger.warning(f"115 Cookie 存活检测异常: {str(e)}")
+            return
+        
+        # 配置已重载，丢弃旧客户端的检测结果
+        if client is not self._p115_client:
+            return
+        
+        self._stats['p115_status'] = 'online' if alive else 'expired'
+        if alive:
+            if was_alive is False:
+                logger.info("115 Cookie 已恢复有效")
+            return
+        
+        # 仅在状态变为失效时通知一次，避免每个检测周期重复打扰
+        if was_alive is not False:
+            self._notify_p115_expired()
+
+    def _notify_p115_expired(self):
+        """发送 115 Cookie 失效的管理员通知"""
+        logger.warning("115 Cookie 已失效，发送管理员通知")
+        self.post_message(
+            mtype=NotificationType.Plugin,
+            title=f"【{self.plugin_name}】115 Cookie 已失效",
+            text="❌ 115 分享转存 Cookie 已过期或无效，转存功能暂不可用\n\n"
+                 "💡 请重新获取 Cookie: 浏览器登录 115.com -> F12 -> Application -> Cookies，"
+                 "并在插件设置中更新"
+        )
 
     @staticmethod
     def get_command() -> List[Dict[str, Any]]:
@@ -248,6 +407,20 @@ class nullbr_search_pro(_PluginBase):
                 "category": "资源搜索",
                 "data": {"action": "nullbr_search"}
             },
+            {
+                "cmd": "/nullbr_get",
+                "event": EventType.PluginAction,
+                "desc": "一键获取最佳资源并转存",
+                "category": "资源搜索",
+                "data": {"action": "nullbr_get"}
+            },
+            {
+                "cmd": "/nullbr_batch",
+                "event": EventType.PluginAction,
+                "desc": "批量查询多部影片的资源",
+                "category": "资源搜索",
+                "data": {"action": "nullbr_batch"}
+            },
             {
                 "cmd": "/nullbr_offline",
                 "event": EventType.PluginAction,
@@ -266,7 +439,82 @@ class nullbr_search_pro(_PluginBase):
 
     def get_api(self) -> List[Dict[str, Any]]:
         """获取插件API"""
-        pass
+        return [{
+            "path": "/metrics",
+            "endpoint": self.api_metrics,
+            "methods": ["GET"],
+            "auth": "apikey",
+            "summary": "OpenMetrics 指标",
+            "description": "以 OpenMetrics 文本格式导出计数器、缓存命中、队列深度和各阶段延迟直方图"
+        }]
+
+    def get_service(self) -> List[Dict[str, Any]]:
+        """
+        注册插件公共服务（定时任务）
+        """
+        services = []
+        if self._enabled and self._p115_client:
+            services.append({
+                "id": "NullbrPro115Liveness",
+                "name": "115 Cookie 存活检测",
+                "trigger": "interval",
+                "func": self._check_p115_liveness,
+                "kwargs": {"minutes": self._p115_check_interval}
+            })
+        if self._enabled:
+            services.append({
+                "id": "NullbrProDashboard",
+                "name": "Nullbr 统计面板刷新",
+                "trigger": "interval",
+                "func": self._refresh_dashboard,
+                "kwargs": {"seconds": DASHBOARD_REFRESH_SECONDS}
+            })
+        if self._enabled and self._warm_enabled and self._client:
+            services.append({
+                "id": "NullbrProCacheWarmer",
+                "name": "Nullbr 热门缓存预热",
+                "trigger": "cron",
+                "func": self._warm_cache,
+                "kwargs": {"hour": self._warm_hours, "minute": 0, "jitter": WARM_START_JITTER}
+            })
+        return services
+
+    def _warm_cache(self):
+        """定时任务：按热门关键词预热 Nullbr 搜索结果和资源缓存"""
+        if not self._client:
+            return
+        keywords = [keyword for keyword, _ in self._stats.top_keywords(self._warm_top_k)]
+        if not keywords:
+            logger.info("暂无热门关键词，跳过缓存预热")
+            return
+        # 获取资源需要 API_KEY，未配置时只预热搜索结果
+        types = [t for t in self._resource_priority if getattr(self, f"_enable_{t}", True)] if self._api_key else []
+        warmer = CacheWarmer(self._client, types, budget=self._warm_budget, stop=self._warm_stop)
+        warmer.run(keywords)
+
+    def _collect_gauges(self) -> Tuple[Dict[str, int], Dict[str, str]]:
+        """
+        收集即时值和后端状态，供统计面板和 /metrics 使用
+
+        :return: (即时值 {名称: 数值}, 后端状态 {后端: 状态})
+        """
+        if self._cd2_enabled and self._cd2_client:
+            cd2_state = self._cd2_client.channel_state
+        else:
+            cd2_state = '未启用'
+        states = {
+            'nullbr': '已配置' if self._client else '未配置',
+            'cd2': cd2_state,
+            'p115': self._stats['p115_status'] if self._p115_enabled else '未启用',
+        }
+        gauges = {
+            'outbound_queue_depth': self._outbound.pending if self._outbound else 0,
+            'search_cache_entries': len(self._user_search_cache),
+            'resource_cache_entries': len(self._user_resource_cache),
+            'page_cache_entries': len(self._user_page_cache),
+            'offline_index_entries': len(self._offline_index) if self._offline_index is not None else 0,
+        }
+        return gauges, states
 
     def _is_button_supported(self, channel) -> bool:
         """
@@ -577,6 +825,132 @@ class nullbr_search_pro(_PluginBase):
                                             }
                                         ]
                                     },
+                                    {
+                                        'component': 'VRow',
+                                        'content': [
+                                            {
+                                                'component': 'VCol',
+                                                'props': {'cols': 12, 'md': 4},
+                                                'content': [
+                                                    {
+                                                        'component': 'VSwitch',
+                                                        'props': {
+                                                            'model': 'rank_enabled',
+                                                            'label': '资源智能排序',
+                                                            'hint': '按分辨率、字幕、片源质量和体积对资源排序',
+                                                            'persistent-hint': True
+                                                        }
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {'cols': 12, 'md': 8},
+                                                'content': [
+                                                    {
+                                                        'component': 'VTextField',
+                                                        'props': {
+                                                            'model': 'rank_weights',
+                                                            'label': '排序权重',
+                                                            'placeholder': 'resolution=3, zh_sub=2, quality=2, size=1',
+                                                            'hint': '留空使用默认权重，设为0表示忽略该项',
+                                                            'persistent-hint': True
+                                                        }
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    },
+                                    {
+                                        'component': 'VRow',
+                                        'content': [
+                                            {
+                                                'component': 'VCol',
+                                                'props': {'cols': 12, 'md': 4},
+                                                'content': [
+                                                    {
+                                                        'component': 'VSwitch',
+                                                        'props': {
+                                                            'model': 'traffic_record',
+                                                            'label': '录制交互流量',
+                                                            'hint': '匿名记录命令类型和后端耗时，用于本地回放压测',
+                                                            'persistent-hint': True
+                                                        }
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    },
+                                    {
+                                        'component': 'VRow',
+                                        'content': [
+                                            {
+                                                'component': 'VCol',
+                                                'props': {'cols': 12, 'md': 3},
+                                                'content': [
+                                                    {
+                                                        'component': 'VSwitch',
+                                                        'props': {
+                                                            'model': 'warm_enabled',
+                                                            'label': '热门缓存预热',
+                                                            'hint': '定时刷新热门关键词的搜索和资源缓存',
+                                                            'persistent-hint': True
+                                                        }
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {'cols': 12, 'md': 3},
+                                                'content': [
+                                                    {
+                                                        'component': 'VTextField',
+                                                        'props': {
+                                                            'model': 'warm_hours',
+                                                            'label': '预热时段(小时)',
+                                                            'placeholder': WARM_HOURS,
+                                                            'hint': '如 17 或 4,17，建议在使用高峰前的闲时',
+                                                            'persistent-hint': True
+                                                        }
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {'cols': 12, 'md': 3},
+                                                'content': [
+                                                    {
+                                                        'component': 'VTextField',
+                                                        'props': {
+                                                            'model': 'warm_top_k',
+                                                            'label': '预热关键词数',
+                                                            'placeholder': str(WARM_TOP_K),
+                                                            'hint': '按搜索次数取前N个关键词',
+                                                            'persistent-hint': True,
+                                                            'type': 'number'
+                                                        }
+                                                    }
+                                                ]
+                                            },
+                                            {
+                                                'component': 'VCol',
+                                                'props': {'cols': 12, 'md': 3},
+                                                'content': [
+                                                    {
+                                                        'component': 'VTextField',
+                                                        'props': {
+                                                            'model': 'warm_budget',
+                                                            'label': '每次API调用上限',
+                                                            'placeholder': str(WARM_BUDGET),
+                                                            'hint': '单次预热最多请求Nullbr的次数',
+                                                            'persistent-hint': True,
+                                                            'type': 'number'
+                                                        }
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    },
                                     {
                                         'component': 'VRow',
                                         'content': [
@@ -810,6 +1184,13 @@ class nullbr_search_pro(_PluginBase):
         "priority_2": "magnet",
         "priority_3": "ed2k",
         "priority_4": "video",
+        "rank_enabled": True,
+        "rank_weights": "",
+        "traffic_record": False,
+        "warm_enabled": False,
+        "warm_hours": WARM_HOURS,
+        "warm_top_k": WARM_TOP_K,
+        "warm_budget": WARM_BUDGET,
         "cd2_enabled": False,
         "cd2_url": "",
         "cd2_api_token": "",
@@ -820,105 +1201,87 @@ class nullbr_search_pro(_PluginBase):
         "p115_save_cid": ""
         }
 
-    def get_page(self) -> List[dict]:
-        """
-        拼装插件详情页面，需要返回页面配置，同时附带数据
-        插件详情页面使用Vuetify组件拼装，参考：https://vuetifyjs.com/
-
-        :return: 页面配置（vuetify模式）或 None（vue模式）
-        """
-        pass
-
     @eventmanager.register(EventType.UserMessage)
     def talk(self, event: Event):
         """
         监听用户消息，识别搜索请求和编号选择
         """
+        recorder = self._recorder
+        if recorder is None or not self._enabled or not event.event_data:
+            return self._on_talk(event)
+        with recorder.record('talk', event.event_data):
+            self._on_talk(event)
+
+    def _on_talk(self, event: Event):
+        """处理用户消息"""
         if not self._enabled:
             return
         
-        # 第3步测试阶段：即使没有client也要响应，用于测试交互逻辑
-        if not self._client:
-            logger.info("API客户端未初始化，但继续处理用户消息进行测试")
-            
+        # 一次解析：不是插件交互命令（不以 # 开头）的消息在首字符检查处即被拒绝
         text = event.event_data.get("text")
-        userid = event.event_data.get("userid")
-        channel = event.event_data.get("channel")
-        
-        if not text:
+        command = HASH_TALK.parse(text)
+        if command is None:
             return
-            
-        logger.info(f"收到用户消息: {text}")
         
         # 检查是否为回退搜索触发的消息，避免无限循环
         if event.event_data.get('source') == 'nullbr_fallback':
             logger.info("检测到回退搜索消息，跳过处理避免循环")
             return
         
-        # 检查是否为 Nullbr 插件的交互命令（以 # 开头）
-        if not text.startswith('#'):
-            return  # 不是插件交互，跳过
-        
-        # 去掉 # 前缀
-        clean_text = text[1:].strip()
-        
-        # 检查是否为获取资源的请求（如 "#1.115" "#2.magnet"）
-        if re.match(r'^\d+\.(115|magnet|video|ed2k)$', clean_text):
-            parts = clean_text.split('.')
-            number = int(parts[0])
-            resource_type = parts[1]
-            logger.info(f"检测到资源获取请求: #{number}.{resource_type}")
-            self.handle_get_resources(number, resource_type, channel, userid)
-        
-        # 检查是否为编号选择（如 "#1" "#2"）
-        elif clean_text.isdigit():
-            number = int(clean_text)
-            
-            # 先检查是否有资源缓存（直接进行转存）
-            if userid in self._user_resource_cache:
-                cache = self._user_resource_cache[userid]
-                if time.time() - cache['timestamp'] < 3600:  # 1小时内有效
-                    if 1 <= number <= len(cache['resources']):
-                        if self._cd2_enabled and self._cd2_client:
-                            logger.info(f"检测到资源转存请求: #{number}")
-                            self.handle_resource_transfer(number, channel, userid)
-                        else:
-                            # 有资源缓存但CD2未启用，显示资源详情和提示
-                            selected_resource = cache['resources'][number - 1]
-                            resource_detail = f"🎯 选择的资源:\n\n"
-                            resource_detail += f"🎬 影片: 「{cache['title']}」\n"
-                            resource_detail += f"📂 名称: {selected_resource['title']}\n"
-                            resource_detail += f"💾 大小: {selected_resource['size']}\n"
-                            resource_detail += f"🔗 链接: {selected_resource['url']}\n"
-                            resource_detail += f"{'─' * 15}\n"
-                            resource_detail += f"💡 CloudDrive2转存功能未启用\n"
-                            resource_detail += f"⚙️ 如需转存功能，请在插件设置中配置CloudDrive2"
-                            
-                            self.post_message(
-                                channel=channel,
-                                title="资源详情",
-                                text=resource_detail,
-                                userid=userid
-                            )
-                        return
-                    else:
-                        # 数字超出资源范围，提示用户
-                        self.post_message(
-                            channel=channel,
-                            title="编号错误",
-                            text=f"请输入有效的资源编号 (#1 - #{len(cache['resources'])})。",
-                            userid=userid
-                        )
-                        return
-            
-            # 如果没有资源缓存，检查是否有搜索结果缓存
-            logger.info(f"检测到编号选择: #{number}")
-            self.handle_resource_selection(number, channel, userid)
+        # 第3步测试阶段：即使没有client也要响应，用于测试交互逻辑
+        if not self._client:
+            logger.info("API客户端未初始化，但继续处理用户消息进行测试")
         
-        # 不是数字也不是资源类型请求，作为搜索关键词处理
-        elif clean_text:
-            logger.info(f"检测到搜索请求: #{clean_text}")
-            self.search_and_reply(clean_text, channel, userid)
+        userid = event.event_data.get("userid")
+        channel = event.event_data.get("channel")
+        logger.info(f"收到用户命令: {text.strip()} -> {command.verb}")
+        self._talk_handlers[command.verb](*command.args, channel, userid)
+
+    def _transfer_enabled(self) -> bool:
+        """资源列表中的编号是否可直接转存"""
+        return bool(self._cd2_enabled and self._cd2_client)
+
+    def _handle_number(self, number: int, channel, userid: str):
+        """处理编号（#N）：有资源列表时转存对应资源，否则选择搜索结果"""
+        # 先检查是否有资源缓存（直接进行转存）
+        cache = self._user_resource_cache.get(userid)
+        if cache:
+            if 1 <= number <= len(cache['resources']):
+                if self._transfer_enabled():
+                    logger.info(f"检测到资源转存请求: #{number}")
+                    self.handle_resource_transfer(number, channel, userid)
+                else:
+                    # 有资源缓存但CD2未启用，显示资源详情和提示
+                    selected_resource = cache['resources'][number - 1]
+                    resource_detail = f"🎯 选择的资源:\n\n"
+                    resource_detail += f"🎬 影片: 「{cache['title']}」\n"
+                    resource_detail += f"📂 名称: {selected_resource['title']}\n"
+                    resource_detail += f"💾 大小: {selected_resource['size']}\n"
+                    resource_detail += f"🔗 链接: {selected_resource['url']}\n"
+                    resource_detail += f"{'─' * 15}\n"
+                    resource_detail += f"💡 CloudDrive2转存功能未启用\n"
+                    resource_detail += f"⚙️ 如需转存功能，请在插件设置中配置CloudDrive2"
+                    
+                    self.post_message(
+                        channel=channel,
+                        title="资源详情",
+                        text=resource_detail,
+                        userid=userid
+                    )
+                return
+            else:
+                # 数字超出资源范围，提示用户
+                self.post_message(
+                    channel=channel,
+                    title="编号错误",
+                    text=f"请输入有效的资源编号 (#1 - #{len(cache['resources'])})。",
+                    userid=userid
+                )
+                return
+    
+        # 如果没有资源缓存，检查是否有搜索结果缓存
+        logger.info(f"检测到编号选择: #{number}")
+        self.handle_resource_selection(number, channel, userid)
 
     @eventmanager.register(EventType.PluginAction)
     def handle_command(self, event: Event):
@@ -932,7 +1295,7 @@ class nullbr_search_pro(_PluginBase):
         action = event_data.get("action")
         
         # 检查是否为本插件的命令
-        if action not in ["nullbr_search", "nullbr_offline", "nullbr_help"]:
+        if action not in ["nullbr_search", "nullbr_get", "nullbr_batch", "nullbr_offline", "nullbr_help"]:
             return
         
         if not self._enabled:
@@ -945,13 +1308,18 @@ class nullbr_search_pro(_PluginBase):
         # 根据命令类型分发处理
         if action == "nullbr_search":
             self._handle_search_command(event_data, channel, userid)
+        elif action == "nullbr_get":
+            self._handle_get_command(event_data, channel, userid)
+        elif action == "nullbr_batch":
+            self._handle_batch_command(event_data, channel, userid)
         elif action == "nullbr_offline":
             self._handle_offline_command(event_data, channel, userid)
         elif action == "nullbr_help":
             self._handle_help_command(channel, userid)
     
-    def _handle_search_command(self, event_data: dict, channel, userid: str):
-        """处理搜索命令 /nullbr"""
+    @staticmethod
+    def _extract_keyword(event_data: dict, cmd: str) -> str:
+        """从命令事件中提取关键词"""
         # 尝试多种方式获取搜索关键词
         keyword = None
         
@@ -963,13 +1331,19 @@ class nullbr_search_pro(_PluginBase):
         # 方式2: 从 text 字段提取 (格式: "/nullbr 关键词")
         if not keyword:
             text = event_data.get("text", "")
-            if text and text.startswith("/nullbr"):
-                keyword = text[7:].strip()
+            if text and text.startswith(cmd):
+                keyword = text[len(cmd):].strip()
         
         # 方式3: 从 arg_str 字段获取
         if not keyword:
             keyword = event_data.get("arg_str", "").strip()
         
+        return keyword
+    
+    def _handle_search_command(self, event_data: dict, channel, userid: str):
+        """处理搜索命令 /nullbr"""
+        keyword = self._extract_keyword(event_data, "/nullbr")
+        
         logger.info(f"收到 /nullbr 命令, 关键词: {keyword}, 用户: {userid}")
         
         if not keyword:
@@ -979,86 +1353,146 @@ class nullbr_search_pro(_PluginBase):
         # 执行搜索
         self.search_and_reply(keyword, channel, userid)
     
-    def _handle_offline_command(self, event_data: dict, channel, userid: str):
-        """处理离线命令 /nullbr_offline"""
-        if not self._cd2_enabled or not self._cd2_client:
+    def _handle_get_command(self, event_data: dict, channel, userid: str):
+        """处理一键获取命令 /nullbr_get"""
+        keyword = self._extract_keyword(event_data, "/nullbr_get")
+        
+        logger.info(f"收到 /nullbr_get 命令, 关键词: {keyword}, 用户: {userid}")
+        
+        if not keyword:
+            self._handle_help_command(channel, userid)
+            return
+        
+        self.auto_pick_and_transfer(keyword, channel, userid)
+    
+    @timed("handler.batch")
+    def _handle_batch_command(self, event_data: dict, channel, userid: str):
+        """
+        处理批量查询命令 /nullbr_batch 片名1, 片名2, ...
+        
+        并发搜索每个片名并取最佳匹配，回复一张资源标记表；以 ! 开头时同时转存每部影片的最佳资源
+        """
+        titles, transfer = parse_title_list(self._extract_keyword(event_data, "/nullbr_batch"))
+        
+        logger.info(f"收到 /nullbr_batch 命令, 片名: {titles}, 转存: {transfer}, 用户: {userid}")
+        
+        if not titles:
+            self._handle_help_command(channel, userid)
+            return
+        
+        if not self._client or not self._api_key:
             self.post_message(
                 channel=channel,
-                title="离线任务",
-                text="❌ CloudDrive2 未配置，无法查询离线任务\n\n"
-                     "请在插件设置中配置 CloudDrive2",
+                title="配置错误",
+                text="❌ 批量查询需要配置 APP_ID 和 API_KEY",
                 userid=userid
             )
             return
         
+        start_time = time.time()
+        titles, skipped = titles[:MAX_BATCH], titles[MAX_BATCH:]
         try:
-            # 使用配置的离线路径获取离线任务列表
-            offline_path = getattr(self, '_cd2_offline_path', '/115/Offline')
-            result = self._cd2_client.get_offline_status(path=offline_path)
-            tasks = result.get('offlineFiles', [])
-            
-            if not tasks:
-                self.post_message(
-                    channel=channel,
-                    title="离线任务",
-                    text="📭 当前没有离线任务",
+            for title in titles:
+                self._record_search(title)
+            rows = self.lookup_titles(titles)
+            found = sum(1 for row in rows if row['item'])
+            self._stats.incr('successful_searches', found)
+            self._stats.incr('failed_searches', len(rows) - found)
+            
+            if transfer:
+                self._batch_transfer(rows)
+            
+            footer = ""
+            if skipped:
+                footer += f"\n⚠️ 一次最多查询 {MAX_BATCH} 部，已忽略: {'、'.join(skipped)}"
+            footer += f"\n⏱️ 用时 {time.time() - start_time:.1f}s"
+            pager = RecordPager(
+                header=f"📋 批量查询 {len(rows)} 部，找到 {found} 部\n\n",
+                items=rows,
+                template=BATCH_TEMPLATE,
+                limit=byte_limit(channel),
+                footer=footer,
+                ctx={'enabled_types': self._enabled_types()}
+            )
+            self.post_message(
+                channel=channel,
+                title="批量查询",
+                text=self._first_page(pager, "批量查询", userid),
+                userid=userid
+            )
+            logger.info(f"批量查询完成: {found}/{len(rows)} 部, 用时 {time.time() - start_time:.2f}s")
+        except Exception as e:
+            logger.error(f"批量查询异常: {str(e)}")
+            self.post_message(
+                channel=channel,
+                title="错误",
+                text=f"批量查询时出现错误: {str(e)}",
+                userid=userid
+            )
+    
+    @timed("handler.offline")
+    def _handle_offline_command(self, event_data: dict, channel, userid: str):
+        """处理离线命令 /nullbr_offline"""
+        if not self._cd2_enabled or not self._cd2_client:
+            self.post_message(
+                channel=channel,
+                title="离线任务",
+                text="❌ CloudDrive2 未配置，无法查询离线任务\n\n"
+                     "请在插件设置中配置 CloudDrive2",
+                userid=userid
+            )
+            return
+        
+        try:
+            # 使用配置的离线路径获取离线任务列表
+            offline_path = getattr(self, '_cd2_offline_path', '/115/Offline')
+            result = self._cd2_client.get_offline_status(path=offline_path)
+            tasks = result.get('offlineFiles', [])
+            
+            # 离线配额（查询失败时不显示）
+            quota = self._cd2_client.get_offline_quota(path=offline_path)
+            quota_text = f"📊 离线配额: 剩余 {quota['left']} / 总计 {quota['total']}\n\n" if quota else ""
+            
+            if not tasks:
+                self.post_message(
+                    channel=channel,
+                    title="离线任务",
+                    text=f"{quota_text}📭 当前没有离线任务",
                     userid=userid
                 )
                 return
             
-            # 离线任务状态码映射
-            status_map = {
-                0: "等待中",
-                1: "下载中",
-                2: "已完成",
-                3: "失败",
-                4: "暂停中",
-                5: "已取消",
-            }
+            # 同步去重索引
+            if self._offline_index is not None and self._offline_index.sync(tasks):
+                self._save_offline_index()
             
             # 格式化任务列表
-            text = f"📥 离线任务列表 (共 {len(tasks)} 个)\n\n"
-            for i, task in enumerate(tasks[:10], 1):
-                # 从 gRPC 对象中获取属性（注意 protobuf 中的拼写）
-                name = getattr(task, 'name', '未知')[:30] if hasattr(task, 'name') else str(task)[:30]
-                # percendDone 是 protobuf 中的实际字段名（注意拼写）
-                progress = getattr(task, 'percendDone', 0) if hasattr(task, 'percendDone') else 0
-                # 获取文件大小并格式化
-                size_bytes = getattr(task, 'size', 0) if hasattr(task, 'size') else 0
-                if size_bytes > 0:
-                    if size_bytes >= 1024 ** 3:
-                        size_str = f"{size_bytes / (1024 ** 3):.2f}GB"
-                    elif size_bytes >= 1024 ** 2:
-                        size_str = f"{size_bytes / (1024 ** 2):.2f}MB"
-                    elif size_bytes >= 1024:
-                        size_str = f"{size_bytes / 1024:.2f}KB"
-                    else:
-                        size_str = f"{size_bytes}B"
-                else:
-                    size_str = ""
-                status_code = getattr(task, 'status', -1) if hasattr(task, 'status') else -1
-                
-                # 将状态码转换为可读文本
-                if isinstance(status_code, int):
-                    status_text = status_map.get(status_code, f"未知({status_code})")
-                else:
-                    status_text = str(status_code)
-                
-                # 根据状态添加对应图标
-                status_icon = "✅" if status_code == 2 else "⏳" if status_code in [0, 1] else "❌" if status_code == 3 else "⏸️"
-                
-                # 格式化进度（百分比显示）
-                progress_str = f"{progress:.1f}%" if isinstance(progress, float) else f"{progress}%"
-                
-                text += f"**{i}.** {name}\n"
-                if size_str:
-                    text += f"   💾 {size_str} | {status_icon} {status_text} | 📊 {progress_str}\n"
-                else:
-                    text += f"   {status_icon} {status_text} | 📊 {progress_str}\n"
-            
-            if len(tasks) > 10:
-                text += f"\n... 还有 {len(tasks) - 10} 个任务"
-            
+            pager = RecordPager(
+                header=f"{quota_text}📥 离线任务列表 (共 {len(tasks)} 个)\n\n",
+                items=tasks,
+                template=OFFLINE_TEMPLATE,
+                limit=byte_limit(channel),
+                ctx={'format_progress': self._format_offline_progress}
+            )
+            text = self._first_page(pager, "离线任务", userid)
+
+            # 支持按钮的渠道附带刷新按钮，刷新时直接更新本条消息
+            if self._is_button_supported(channel):
+                try:
+                    self.post_message(
+                        channel=channel,
+                        title="离线任务",
+                        text=text,
+                        userid=userid,
+                        buttons=[[{
+                            "text": "🔄 刷新",
+                            "callback_data": f"[PLUGIN]{self.__class__.__name__}|offline_refresh"
+                        }]]
+                    )
+                    return
+                except TypeError:
+                    logger.info("当前 MoviePilot 版本不支持按钮交互，使用普通消息")
+
             self.post_message(
                 channel=channel,
                 title="离线任务",
@@ -1074,6 +1508,116 @@ class nullbr_search_pro(_PluginBase):
                 userid=userid
             )
     
+    @staticmethod
+    def _format_offline_progress(task) -> str:
+        """格式化离线任务的大小、状态和进度"""
+        # 离线任务状态码映射
+        status_map = {
+            0: "等待中",
+            1: "下载中",
+            2: "已完成",
+            3: "失败",
+            4: "暂停中",
+            5: "已取消",
+        }
+        
+        # percendDone 是 protobuf 中的实际字段名（注意拼写）
+        progress = getattr(task, 'percendDone', 0) if hasattr(task, 'percendDone') else 0
+        # 获取文件大小并格式化
+        size_bytes = getattr(task, 'size', 0) if hasattr(task, 'size') else 0
+        if size_bytes > 0:
+            if size_bytes >= 1024 ** 3:
+                size_str = f"{size_bytes / (1024 ** 3):.2f}GB"
+            elif size_bytes >= 1024 ** 2:
+                size_str = f"{size_bytes / (1024 ** 2):.2f}MB"
+            elif size_bytes >= 1024:
+                size_str = f"{size_bytes / 1024:.2f}KB"
+            else:
+                size_str = f"{size_bytes}B"
+        else:
+            size_str = ""
+        status_code = getattr(task, 'status', -1) if hasattr(task, 'status') else -1
+        
+        # 将状态码转换为可读文本
+        if isinstance(status_code, int):
+            status_text = status_map.get(status_code, f"未知({status_code})")
+        else:
+            status_text = str(status_code)
+        
+        # 根据状态添加对应图标
+        status_icon = "✅" if status_code == 2 else "⏳" if status_code in [0, 1] else "❌" if status_code == 3 else "⏸️"
+        
+        # 格式化进度（百分比显示）
+        progress_str = f"{progress:.1f}%" if isinstance(progress, float) else f"{progress}%"
+        
+        if size_str:
+            return f"💾 {size_str} | {status_icon} {status_text} | 📊 {progress_str}"
+        return f"{status_icon} {status_text} | 📊 {progress_str}"
+    
+    def _save_offline_index(self):
+        """持久化离线去重索引"""
+        try:
+            self.save_data('offline_index', self._offline_index.to_dict())
+        except Exception as e:
+            logger.warning(f"保存离线去重索引失败: {str(e)}")
+    
+    def _find_offline_task(self, resource_key: str):
+        """
+        按去重索引查找已提交且仍在离线列表中的任务
+        
+        索引命中时刷新一次离线列表确认任务仍存在，任务已被删除时移除索引条目。
+        离线列表刷新失败时无法确认，按未提交处理（允许提交，索引条目保留）。
+        
+        :param resource_key: 资源哈希（parse_resource_hash）
+        :return: 离线列表中的任务（OfflineFile），未提交或无法确认时返回 None
+        """
+        if not resource_key or self._offline_index is None or resource_key not in self._offline_index:
+            CACHES.miss("offline.dedup")
+            return None
+        
+        try:
+            result = self._cd2_client.get_offline_status(path=self._cd2_offline_path)
+        except Exception as e:
+            logger.warning(f"刷新离线列表失败，无法确认是否重复提交，按新任务处理: {str(e)}")
+            CACHES.miss("offline.dedup")
+            return None
+        changed = self._offline_index.sync(result.get('offlineFiles', []))
+        
+        task = self._offline_index.progress(resource_key)
+        if task is None:
+            # 任务已从离线列表中删除，允许重新提交
+            self._offline_index.remove(resource_key)
+            changed = True
+        if changed:
+            self._save_offline_index()
+        if task is None:
+            CACHES.miss("offline.dedup")
+            return None
+        
+        logger.info(f"离线任务重复提交，跳过: {resource_key}")
+        CACHES.hit("offline.dedup")
+        return task
+    
+    def _check_offline_duplicate(self, resource_key: str, resource_title: str,
+                                 channel, userid: str) -> bool:
+        """
+        检查资源是否已在离线列表中，是则回复已有任务的进度（见 _find_offline_task）
+        
+        :return: 是否为重复提交（已回复用户）
+        """
+        task = self._find_offline_task(resource_key)
+        if task is None:
+            return False
+        
+        self.post_message(
+            channel=channel,
+            title="已在离线列表",
+            text=f"📥 已在离线列表: {getattr(task, 'name', '') or resource_title}\n\n"
+                 f"{self._format_offline_progress(task)}",
+            userid=userid
+        )
+        return True
+
     def _handle_help_command(self, channel, userid: str):
         """处理帮助命令 /nullbr_help"""
         # 判断是否支持按钮的平台
@@ -1088,12 +1632,21 @@ class nullbr_search_pro(_PluginBase):
 `/nullbr 影片名` - 搜索资源
   示例: `/nullbr 流浪地球`
 
+`/nullbr_get 影片名` - 一键获取最佳资源并转存
+  示例: `/nullbr_get 流浪地球`
+
+`/nullbr_batch 片名1, 片名2` - 批量查询多部影片的资源
+  示例: `/nullbr_batch 流浪地球, 三体, 狂飙`
+  以 ! 开头同时转存每部的最佳资源: `/nullbr_batch !流浪地球, 三体`
+
 `/nullbr_offline` - 查询离线任务状态
 
 `/nullbr_help` - 显示帮助信息
 
 **💡 提示**
 - 搜索后点击按钮选择结果
+- 列表较长时发送 `#next` 查看下一页
+- 发送 `#刷新` 忽略缓存重新获取上一次搜索的最新结果
 - 115 链接支持自动转存
 - 磁力/ED2K 链接支持离线下载
 """
@@ -1113,8 +1666,22 @@ class nullbr_search_pro(_PluginBase):
   示例: `#1.115` 获取115链接
   类型: 115, magnet, ed2k, video
 
+`#数字-数字` - 批量转存资源列表中的多个资源
+  示例: `#1-3` 转存第1到第3个资源
+
+`#!影片名` - 一键获取最佳资源并转存
+  示例: `#!流浪地球`
+
+`#next` 或 `#more` - 查看列表下一页
+
+`#refresh` 或 `#刷新` - 忽略缓存，重新获取上一次搜索的最新结果
+
 **📋 其他命令**
 
+`/nullbr_batch 片名1, 片名2` - 批量查询多部影片的资源
+  示例: `/nullbr_batch 流浪地球, 三体, 狂飙`
+  以 ! 开头同时转存每部的最佳资源: `/nullbr_batch !流浪地球, 三体`
+
 `/nullbr_offline` - 查询离线任务状态
 
 `/nullbr_help` - 显示帮助信息
@@ -1138,6 +1705,16 @@ class nullbr_search_pro(_PluginBase):
         
         回调数据格式: [PLUGIN]nullbr_search_pro|action
         """
+        recorder = self._recorder
+        event_data = event.event_data
+        if (recorder is None or not self._enabled or not event_data
+                or event_data.get("plugin_id") != self.__class__.__name__):
+            return self._on_message_action(event)
+        with recorder.record('action', event_data):
+            self._on_message_action(event)
+
+    def _on_message_action(self, event: Event):
+        """处理按钮回调"""
         if not self._enabled:
             return
         
@@ -1162,37 +1739,21 @@ class nullbr_search_pro(_PluginBase):
         
         logger.info(f"收到按钮回调: {text}, 用户: {userid}")
         
+        # 解析回调动作（select_N、transfer_N、get_N_类型、next、offline_refresh、back）
+        command = CALLBACKS.parse(text)
+        
+        # 刷新类回调在支持编辑的渠道上直接更新原消息；其余回调的结果以新消息发送，原列表和按钮保留
+        if (command is not None and command.verb in EDIT_IN_PLACE_ACTIONS
+                and original_message_id and original_chat_id and is_editable(channel)):
+            self._reply_context.updater = self._create_updater(
+                channel, source, original_message_id, original_chat_id, userid
+            )
+        
         try:
-            # 解析回调动作
-            if text.startswith("select_"):
-                # 选择搜索结果: select_1, select_2, ...
-                number = int(text.split("_")[1])
-                self.handle_resource_selection(number, channel, userid)
-                
-            elif text.startswith("transfer_"):
-                # 转存资源: transfer_1, transfer_2, ...
-                parts = text.split("_")
-                resource_id = int(parts[1])
-                self.handle_resource_transfer(resource_id, channel, userid)
-                
-            elif text.startswith("get_"):
-                # 获取指定类型资源: get_1_115, get_2_magnet, ...
-                parts = text.split("_")
-                number = int(parts[1])
-                resource_type = parts[2] if len(parts) > 2 else "115"
-                self.handle_get_resources(number, resource_type, channel, userid)
-                
-            elif text == "back":
-                # 返回操作
-                self.post_message(
-                    channel=channel,
-                    title="已返回",
-                    text="请发送搜索关键词（以？结尾）开始新的搜索",
-                    userid=userid
-                )
-                
-            else:
+            if command is None:
                 logger.warning(f"未知的回调动作: {text}")
+            else:
+                self._action_handlers[command.verb](*command.args, channel, userid)
                 
         except Exception as e:
             logger.error(f"处理按钮回调异常: {str(e)}")
@@ -1202,24 +1763,68 @@ class nullbr_search_pro(_PluginBase):
                 text=f"处理操作时出现错误: {str(e)}",
                 userid=userid
             )
+        finally:
+            self._reply_context.updater = None
+
+    def _handle_offline_refresh(self, channel, userid: str):
+        """按钮回调：刷新离线任务列表"""
+        self._handle_offline_command({}, channel, userid)
+
+    def _handle_refresh(self, channel, userid: str):
+        """#refresh：忽略缓存重新执行用户上一次的搜索，并清除其结果中各影片的资源列表缓存"""
+        cache = self._user_search_cache.get(userid)
+        keyword = cache.get('keyword') if cache else None
+        if not keyword:
+            self.post_message(
+                channel=channel,
+                title="没有可刷新的搜索",
+                text="请先发送 #影片名 搜索，再发送 #刷新 获取最新结果",
+                userid=userid
+            )
+            return
+        if self._client:
+            for item in cache['results']:
+                if item.get('media_type') in ('movie', 'tv') and item.get('tmdbid'):
+                    self._client.forget_title(item['media_type'], item['tmdbid'])
+        logger.info(f"用户 {userid} 刷新搜索: {keyword}")
+        self.search_and_reply(keyword, channel, userid, refresh=True)
+
+    def _handle_back(self, channel, userid: str):
+        """按钮回调：返回"""
+        self.post_message(
+            channel=channel,
+            title="已返回",
+            text="请发送搜索关键词（以？结尾）开始新的搜索",
+            userid=userid
+        )
+
+    def _enabled_types(self) -> Tuple[str, ...]:
+        """已启用的资源类型"""
+        return tuple(t for t in ["115", "magnet", "video", "ed2k"] if getattr(self, f"_enable_{t}", True))
+
+    def _record_search(self, keyword: str):
+        """更新搜索统计"""
+        self._stats.incr('total_searches')
+        self._stats['last_search_time'] = time.time()
+        
+        # 更新热门搜索统计
+        self._stats.record_keyword(keyword)
+
+    @timed("handler.search")
+    def search_and_reply(self, keyword: str, channel: str, userid: str, refresh: bool = False):
+        """
+        执行搜索并回复结果
 
-    def search_and_reply(self, keyword: str, channel: str, userid: str):
-        """执行搜索并回复结果"""
+        :param refresh: 忽略 Nullbr 客户端的结果缓存重新搜索（#refresh）
+        """
         try:
             # 更新搜索统计
-            self._stats['total_searches'] += 1
-            self._stats['last_search_time'] = time.time()
-            
-            # 更新热门搜索统计
-            if keyword in self._stats['popular_resources']:
-                self._stats['popular_resources'][keyword] += 1
-            else:
-                self._stats['popular_resources'][keyword] = 1
+            self._record_search(keyword)
             
             # 检查API客户端是否可用
             if not self._client:
                 logger.warning("API客户端未初始化，无法搜索")
-                self._stats['failed_searches'] += 1
+                self._stats.incr('failed_searches')
                 self.post_message(
                     channel=channel,
                     title="配置错误",
@@ -1229,12 +1834,12 @@ class nullbr_search_pro(_PluginBase):
                 return
             
             # 调用Nullbr API搜索
-            result = self._client.search(keyword)
+            result = self._client.search(keyword, refresh=refresh)
             
             if not result or not result.get('items'):
                 # Nullbr没有搜索结果，回退到MoviePilot原始搜索
                 logger.info(f"Nullbr未找到「{keyword}」的搜索结果，回退到MoviePilot搜索")
-                self._stats['failed_searches'] += 1
+                self._stats.incr('failed_searches')
                 self.post_message(
                     channel=channel,
                     title="切换搜索",
@@ -1246,66 +1851,41 @@ class nullbr_search_pro(_PluginBase):
                 return
             
             # 搜索成功，更新统计
-            self._stats['successful_searches'] += 1
+            self._stats.incr('successful_searches')
             
             # 清理之前的缓存（重要：避免缓存混乱）
-            if userid in self._user_resource_cache:
+            if self._user_resource_cache.pop(userid) is not None:
                 logger.info(f"清理用户 {userid} 的旧资源缓存")
-                del self._user_resource_cache[userid]
             
             # 缓存搜索结果
-            self._user_search_cache[userid] = {
-                'results': result.get('items', []),
-                'timestamp': time.time()
-            }
-            
-            # 构建回复消息
-            reply_text = f"🎬 找到 {len(result.get('items', []))} 个「{keyword}」相关资源:\n\n"
-            
-            # 显示前10个结果
-            for i, item in enumerate(result.get('items', [])[:10], 1):
-                title = item.get('title', '未知标题')
-                year = item.get('release_date', item.get('first_air_date', ''))[:4] if item.get('release_date') or item.get('first_air_date') else ''
-                media_type = '电影' if item.get('media_type') == 'movie' else '剧集' if item.get('media_type') == 'tv' else item.get('media_type', '未知')
-                
-                reply_text += f"【{i}】{title}"
-                if year:
-                    reply_text += f" ({year})"
-                reply_text += f"\n🎭 类型: {media_type}\n"
-                
-                # 显示可用的资源类型标记
-                resource_flags = []
-                if item.get('115-flg') and self._enable_115:
-                    resource_flags.append('💾115')
-                if item.get('magnet-flg') and self._enable_magnet:
-                    resource_flags.append('🧲磁力')
-                if item.get('video-flg') and self._enable_video:
-                    resource_flags.append('🎬在线')
-                if item.get('ed2k-flg') and self._enable_ed2k:
-                    resource_flags.append('📎ed2k')
-                
-                if resource_flags:
-                    reply_text += f"📂 资源: {' | '.join(resource_flags)}\n"
-                reply_text += f"{'─' * 15}\n"
-            
-            # 如果结果超过10个，显示提示
-            if len(result.get('items', [])) > 10:
-                reply_text += f"... 还有 {len(result.get('items', [])) - 10} 个结果\n\n"
+            items = result.get('items', [])
+            self._user_search_cache.put(userid, results=items, keyword=keyword)
             
+            # 构建回复消息（按渠道消息长度分页，其余页面通过 #next 查看）
             if self._api_key:
-                reply_text += "📋 使用方法:\n"
-                reply_text += f"• 发送 #数字 选择资源: 如 \"#1\" (优先级: {' > '.join(self._resource_priority)})\n"
-                reply_text += "• 手动指定资源类型: 如 \"#1.115\" \"#2.magnet\" (可选)"
+                footer = "📋 使用方法:\n"
+                footer += f"• 发送 #数字 选择资源: 如 \"#1\" (优先级: {' > '.join(self._resource_priority)})\n"
+                footer += "• 手动指定资源类型: 如 \"#1.115\" \"#2.magnet\" (可选)"
             else:
-                reply_text += "💡 提示: 请配置API_KEY以获取下载链接"
+                footer = "💡 提示: 请配置API_KEY以获取下载链接"
+            
+            pager = RecordPager(
+                header=f"🎬 找到 {len(items)} 个「{keyword}」相关资源:\n\n",
+                items=items,
+                template=SEARCH_TEMPLATE,
+                limit=byte_limit(channel),
+                footer=footer,
+                ctx={'enabled_types': self._enabled_types()}
+            )
+            reply_text = self._first_page(pager, "Nullbr搜索结果", userid)
             
             # 构建按钮（最多显示5个按钮，每行2个）
             buttons = []
-            items_count = min(len(result.get('items', [])), 5)
+            items_count = min(len(items), 5)
             for i in range(1, items_count + 1, 2):
                 row = []
                 # 第一个按钮
-                item = result['items'][i - 1]
+                item = items[i - 1]
                 title_short = item.get('title', '未知')[:15]
                 row.append({
                     "text": f"📥 {i}. {title_short}",
@@ -1313,7 +1893,7 @@ class nullbr_search_pro(_PluginBase):
                 })
                 # 第二个按钮（如果存在）
                 if i < items_count:
-                    item2 = result['items'][i]
+                    item2 = items[i]
                     title_short2 = item2.get('title', '未知')[:15]
                     row.append({
                         "text": f"📥 {i+1}. {title_short2}",
@@ -1349,284 +1929,353 @@ class nullbr_search_pro(_PluginBase):
                 userid=userid
             )
 
-    def handle_resource_selection(self, number: int, channel: str, userid: str):
-        """处理用户的编号选择"""
+    # 一键获取时可直接转存/离线的资源类型
+    AUTO_PICK_TYPES = ("115", "magnet", "ed2k")
+    
+    # 批量查询结果中的转存类型名称
+    _TRANSFER_LABELS = {'115': '115', 'magnet': '磁力', 'ed2k': 'ED2K'}
+    
+    @staticmethod
+    def _resource_url(res: dict, resource_type: str) -> str:
+        """获取资源链接"""
+        if resource_type == "115":
+            return res.get('share_link', '')
+        if resource_type == "magnet":
+            return res.get('magnet', '')
+        if resource_type in ["video", "ed2k"]:
+            return res.get(resource_type) or res.get('url', res.get('link', ''))
+        return ''
+    
+    def _fetch_resources(self, selected: dict, resource_type: str) -> list:
+        """获取指定类型的资源列表"""
+        media_type = selected.get('media_type')
+        tmdbid = selected.get('tmdbid')
+        resources = None
+        if media_type == 'movie':
+            resources = self._client.get_movie_resources(tmdbid, resource_type)
+        elif media_type == 'tv':
+            resources = self._client.get_tv_resources(tmdbid, resource_type)
+        return (resources or {}).get(resource_type) or []
+    
+    def _can_auto_transfer(self, resource_type: str) -> bool:
+        """资源类型是否有可用的转存/离线后端"""
+        if resource_type == "115":
+            return bool(self._p115_client) and self._p115_client.is_alive is not False
+        if resource_type in ["magnet", "ed2k"]:
+            return bool(self._cd2_enabled and self._cd2_client)
+        return False
+    
+    def _submit_resource(self, resource_type: str, url: str, resource_title: str) -> Tuple[bool, str]:
+        """
+        提交转存/离线任务，不发送消息
+        
+        :return: (是否成功, 结果说明)
+        """
+        self._stats['last_transfer_time'] = time.time()
+        
+        if resource_type == "115":
+            self._stats.incr('p115_transfers')
+            try:
+                result = self._p115_client.save_share_link(share_url=url)
+            except ValueError as e:
+                self._stats.incr('failed_transfers')
+                return False, str(e)
+            except ConnectionError as e:
+                self._stats.incr('failed_transfers')
+                self._stats['p115_status'] = 'expired'
+                self._notify_p115_expired()
+                return False, f"{str(e)}，已通知管理员"
+            self._stats.incr('successful_transfers')
+            return True, result.get('message', '转存成功')
+        
+        # 磁力/ED2K 离线：去重 → 配额 → 提交
+        resource_key = parse_resource_hash(url)
+        task = self._find_offline_task(resource_key)
+        if task is not None:
+            return True, f"已在离线列表: {self._format_offline_progress(task)}"
+        
+        accepted, _, quota = self._cd2_client.trim_to_quota([url], path=self._cd2_offline_path)
+        if not accepted:
+            return False, f"115 离线配额已用完 (已用 {quota['used']} / 总计 {quota['total']})"
+        
+        self._stats.incr('cd2_offline')
         try:
-            # 检查缓存
-            cache = self._user_search_cache.get(userid)
-            if not cache or time.time() - cache['timestamp'] > 3600:  # 缓存1小时
-                self.post_message(
-                    channel=channel,
-                    title="提示",
-                    text="搜索结果已过期，请重新搜索。",
-                    userid=userid
-                )
-                return
-            
-            results = cache['results']
-            if number < 1 or number > len(results):
-                self.post_message(
-                    channel=channel,
-                    title="提示",
-                    text=f"请输入有效的编号 (1-{len(results)})。",
-                    userid=userid
-                )
-                return
-            
-            # 获取选中的项目
-            selected = results[number - 1]
-            title = selected.get('title', '未知标题')
-            media_type = selected.get('media_type', 'unknown')
-            year = selected.get('release_date', selected.get('first_air_date', ''))[:4] if selected.get('release_date') or selected.get('first_air_date') else ''
-            tmdbid = selected.get('tmdbid')
-            
-            if not self._api_key:
-                # 如果没有API_KEY，显示详细信息
-                reply_text = f"📺 选择的资源: {title}"
-                if year:
-                    reply_text += f" ({year})"
-                reply_text += f"\n类型: {'电影' if media_type == 'movie' else '剧集' if media_type == 'tv' else media_type}"
-                reply_text += f"\nTMDB ID: {tmdbid}"
-                
-                if selected.get('overview'):
-                    reply_text += f"\n简介: {selected.get('overview')[:100]}..."
-                
-                # 显示可用的资源类型
-                reply_text += f"\n\n🔗 可用资源类型:"
-                resource_options = []
-                
-                if selected.get('115-flg') and self._enable_115:
-                    resource_options.append(f"• 115网盘")
-                if selected.get('magnet-flg') and self._enable_magnet:
-                    resource_options.append(f"• 磁力链接")
-                if selected.get('video-flg') and self._enable_video:
-                    resource_options.append(f"• 在线观看")
-                if selected.get('ed2k-flg') and self._enable_ed2k:
-                    resource_options.append(f"• ED2K链接")
-                
-                if resource_options:
-                    reply_text += f"\n" + "\n".join(resource_options)
-                    reply_text += "\n\n⚠️ 注意: 需要配置API_KEY才能获取具体下载链接"
-                else:
-                    reply_text += f"\n暂无可用资源类型"
-                
-                self.post_message(
-                    channel=channel,
-                    title="资源详情",
-                    text=reply_text,
-                    userid=userid
-                )
+            result = self._cd2_client.add_offline_files(urls=url, to_folder=self._cd2_offline_path)
+        except ValueError as e:
+            self._stats.incr('failed_transfers')
+            return False, str(e)
+        if not result.get('success', True):
+            self._stats.incr('failed_transfers')
+            return False, result.get('message') or '未知错误'
+        
+        self._stats.incr('successful_transfers')
+        if resource_key and self._offline_index is not None:
+            self._offline_index.add(resource_key, resource_title)
+            self._save_offline_index()
+        return True, f"离线任务已添加到 {self._cd2_offline_path}"
+    
+    def _auto_candidates(self, selected: dict) -> List[str]:
+        """一键获取的候选类型：按优先级，需有资源标记、已启用且有可用的转存后端"""
+        return [
+            t for t in self._resource_priority
+            if t in self.AUTO_PICK_TYPES
+            and selected.get(f"{t}-flg")
+            and getattr(self, f"_enable_{t}", True)
+            and self._can_auto_transfer(t)
+        ]
+    
+    def _pick_best_resource(self, selected: dict, candidates: List[str]) -> Tuple[str, dict]:
+        """
+        按优先级依次获取候选类型的资源，取第一个有可用链接的类型中排序最靠前的资源
+        
+        高优先级类型没有可用资源时才请求下一个类型，通常一次 API 调用即可
+        
+        :return: (资源类型, 资源)，没有可转存的资源时返回 (None, None)
+        """
+        for t in candidates:
+            resource_list = self._fetch_resources(selected, t)
+            if not resource_list:
+                continue
+            self._stats.incr('total_resources', len(resource_list))
+            if self._rank_enabled and len(resource_list) > 1:
+                resource_list = rank_resources(resource_list, self._rank_weights)
+            for res in resource_list:
+                if self._resource_url(res, t):
+                    return t, res
+        return None, None
+    
+    def _batch_transfer(self, rows: List[dict]):
+        """
+        批量查询的转存：为每部匹配的影片选取最佳资源，115 逐个转存，磁力/ED2K 合并为一次批量离线提交
+        
+        结果说明写入各行的 'transfer'
+        """
+        def pick(row: dict) -> Tuple[str, dict]:
+            if not row['item']:
+                return None, None
+            candidates = self._auto_candidates(row['item'])
+            if not candidates:
+                return None, None
+            return self._pick_best_resource(row['item'], candidates)
+        
+        with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as executor:
+            picks = list(executor.map(pick, rows))
+        
+        offline = []  # [(行, 资源标题, 链接)]
+        for row, (resource_type, best) in zip(rows, picks):
+            if not row['item']:
+                continue
+            if not best:
+                row['transfer'] = "⚠️ 没有可自动转存的资源"
+                continue
+            resource_title = best.get('title', best.get('name', '未知'))
+            url = self._resource_url(best, resource_type)
+            row['transfer'] = f"{self._TRANSFER_LABELS.get(resource_type, resource_type)}: {resource_title}"
+            if resource_type == "115":
+                success, detail = self._submit_resource(resource_type, url, resource_title)
+                row['transfer'] = f"{'✅' if success else '❌'} {row['transfer']} · {detail}"
             else:
-                # 清理之前的资源缓存（重要：避免缓存混乱）
-                if userid in self._user_resource_cache:
-                    logger.info(f"清理用户 {userid} 的旧资源缓存")
-                    del self._user_resource_cache[userid]
-                
-                # 如果有API_KEY，直接按优先级获取资源
-                self.post_message(
-                    channel=channel,
-                    title="获取中",
-                    text=f"正在按优先级获取「{title}」的资源...",
-                    userid=userid
-                )
-                
-                self.get_resources_by_priority(selected, channel, userid)
-            
-        except Exception as e:
-            logger.error(f"处理资源选择异常: {str(e)}")
-            self.post_message(
-                channel=channel,
-                title="错误",
-                text=f"处理选择时出现错误: {str(e)}",
-                userid=userid
-            )
-
-    def handle_get_resources(self, number: int, resource_type: str, channel: str, userid: str):
-        """处理获取具体资源链接的请求"""
+                offline.append((row, resource_title, url))
+        
+        if offline:
+            results = self._submit_offline_many([(url, resource_title) for _, resource_title, url in offline])
+            for (row, _, _), (success, detail) in zip(offline, results):
+                row['transfer'] = f"{'✅' if success else '❌'} {row['transfer']} · {detail}"
+    
+    def _submit_offline_many(self, entries: List[Tuple[str, str]]) -> List[Tuple[bool, str]]:
+        """
+        批量提交磁力/ED2K 离线任务：去重 → 按配额截断 → 并发提交，不发送消息
+        
+        :param entries: [(链接, 资源标题)]
+        :return: 与输入顺序一致的 [(是否成功, 结果说明)]
+        """
+        results = [None] * len(entries)
+        pending = []  # [(序号, 链接, 资源标题, 去重键)]
+        seen = {}
+        for i, (url, resource_title) in enumerate(entries):
+            if url in seen:
+                results[i] = (True, f"与第 {seen[url] + 1} 项为同一资源")
+                continue
+            seen[url] = i
+            resource_key = parse_resource_hash(url)
+            if resource_key and self._offline_index is not None and resource_key in self._offline_index:
+                # 已在去重索引中的走单条流程（刷新离线列表后确认是否仍在）
+                results[i] = self._submit_resource("magnet", url, resource_title)
+                continue
+            pending.append((i, url, resource_title, resource_key))
+        if not pending:
+            return results
+        
+        self._stats['last_transfer_time'] = time.time()
+        accepted, _, quota = self._cd2_client.trim_to_quota(
+            [url for _, url, _, _ in pending], path=self._cd2_offline_path
+        )
+        for i, _, _, _ in pending[len(accepted):]:
+            results[i] = (False, f"115 离线配额已用完 (已用 {quota['used']} / 总计 {quota['total']})")
+        pending = pending[:len(accepted)]
+        if not pending:
+            return results
+        
+        self._stats.incr('cd2_offline', len(pending))
+        responses = self._add_offline_files_many(accepted)
+        indexed = False
+        for (i, _, resource_title, resource_key), response in zip(pending, responses):
+            if not response.get('success', True):
+                self._stats.incr('failed_transfers')
+                results[i] = (False, response.get('message') or '未知错误')
+                continue
+            self._stats.incr('successful_transfers')
+            if resource_key and self._offline_index is not None:
+                self._offline_index.add(resource_key, resource_title)
+                indexed = True
+            results[i] = (True, f"离线任务已添加到 {self._cd2_offline_path}")
+        if indexed:
+            self._save_offline_index()
+        return results
+    
+    def _add_offline_files_many(self, urls: List[str]) -> List[dict]:
+        """
+        在同一连接上并发添加多个离线任务，异步客户端不可用时逐个提交
+        
+        :return: 与输入顺序一致的结果列表，失败项为 {'success': False, 'message': 错误信息}
+        """
+        if len(urls) > 1:
+            try:
+                responses = self._get_cd2_aio().add_offline_files_many(urls, to_folder=self._cd2_offline_path)
+                # 异步客户端不维护配额缓存，在同步客户端上扣减
+                self._cd2_client.consume_offline_quota(sum(1 for r in responses if r.get('success', True)))
+                return responses
+            except Exception as e:
+                logger.warning(f"批量提交离线任务失败，改为逐个提交: {str(e)}")
+        
+        responses = []
+        for url in urls:
+            try:
+                responses.append(self._cd2_client.add_offline_files(urls=url, to_folder=self._cd2_offline_path))
+            except ValueError as e:
+                responses.append({'success': False, 'message': str(e)})
+        return responses
+    
+    def _get_cd2_aio(self):
+        """获取批量离线用的异步客户端（首次调用时创建）"""
+        with self._cd2_aio_lock:
+            if self._cd2_aio is None:
+                from .clouddrive_aio import CloudDrive2AioFacade
+                self._cd2_aio = CloudDrive2AioFacade(base_url=self._cd2_url, api_token=self._cd2_api_token)
+            return self._cd2_aio
+    
+    def _close_cd2_aio(self):
+        """关闭异步客户端及其事件循环线程"""
+        with self._cd2_aio_lock:
+            aio, self._cd2_aio = self._cd2_aio, None
+        if aio is not None:
+            aio.close()
+    
+    @timed("handler.auto_pick")
+    def auto_pick_and_transfer(self, keyword: str, channel: str, userid: str):
+        """
+        一键获取：搜索 → 取首个结果 → 按优先级逐个获取资源直到有可用链接 → 排序 → 转存最佳资源
+        
+        整个流程只回复一条汇总消息
+        """
+        start_time = time.time()
         try:
-            # 检查API_KEY
-            if not self._api_key:
+            if not self._client or not self._api_key:
                 self.post_message(
                     channel=channel,
                     title="配置错误",
-                    text="获取下载链接需要配置API_KEY，请在插件设置中添加。",
-                    userid=userid
-                )
-                return
-            
-            # 检查缓存
-            cache = self._user_search_cache.get(userid)
-            if not cache or time.time() - cache['timestamp'] > 3600:
-                self.post_message(
-                    channel=channel,
-                    title="提示",
-                    text="搜索结果已过期，请重新搜索。",
+                    text="❌ 一键获取需要配置 APP_ID 和 API_KEY",
                     userid=userid
                 )
                 return
             
-            results = cache['results']
-            if number < 1 or number > len(results):
+            self._record_search(keyword)
+            result = self._client.search(keyword)
+            items = [item for item in (result or {}).get('items', [])
+                     if item.get('media_type') in ['movie', 'tv'] and item.get('tmdbid')]
+            if not items:
+                self._stats.incr('failed_searches')
                 self.post_message(
                     channel=channel,
-                    title="提示", 
-                    text=f"请输入有效的编号 (1-{len(results)})。",
+                    title="一键获取",
+                    text=f"❌ Nullbr没有找到「{keyword}」的影视资源\n\n💡 可尝试 #{keyword} 查看完整搜索结果",
                     userid=userid
                 )
                 return
+            self._stats.incr('successful_searches')
             
-            # 获取选中的项目
-            selected = results[number - 1]
+            selected = items[0]
             title = selected.get('title', '未知标题')
-            media_type = selected.get('media_type', 'unknown')
-            tmdbid = selected.get('tmdbid')
-            
-            if not tmdbid:
-                self.post_message(
-                    channel=channel,
-                    title="错误",
-                    text="该资源缺少TMDB ID，无法获取下载链接。",
-                    userid=userid
-                )
-                return
+            year = (selected.get('release_date') or selected.get('first_air_date') or '')[:4]
+            display_title = f"{title} ({year})" if year else title
             
-            # 清理之前的资源缓存（重要：避免缓存混乱）
-            if userid in self._user_resource_cache:
-                logger.info(f"清理用户 {userid} 的旧资源缓存")
-                del self._user_resource_cache[userid]
-            
-            # 发送获取中的提示
-            self.post_message(
-                channel=channel,
-                title="获取中",
-                text=f"正在获取「{title}」的{resource_type}资源...",
-                userid=userid
-            )
+            # 以影片详情中的资源标记为准，避免为标记过时的类型发起请求
+            self.refresh_flags(selected)
             
-            # 调用相应的API获取资源
-            resources = None
-            if media_type == 'movie':
-                resources = self._client.get_movie_resources(tmdbid, resource_type)
-            elif media_type == 'tv':
-                resources = self._client.get_tv_resources(tmdbid, resource_type)
-            
-            if not resources:
-                # Nullbr没有找到资源，回退到MoviePilot原始搜索
-                logger.info(f"Nullbr未找到「{title}」的{resource_type}资源，回退到MoviePilot搜索")
+            candidates = self._auto_candidates(selected)
+            if not candidates:
                 self.post_message(
                     channel=channel,
-                    title="切换搜索",
-                    text=f"Nullbr没有找到「{title}」的{resource_type}资源，正在使用MoviePilot原始搜索...",
+                    title="一键获取",
+                    text=f"❌ 「{display_title}」没有可自动转存的资源\n\n"
+                         f"💡 请确认已配置 115 Cookie 或 CloudDrive2，或发送 #{keyword} 手动选择",
                     userid=userid
                 )
-                
-                # 调用MoviePilot的原始搜索功能
-                self.fallback_to_moviepilot_search(title, channel, userid)
                 return
             
-            # 格式化资源链接（第4步完善）
-            self.format_and_send_resources(resources, resource_type, title, channel, userid)
-            
-        except Exception as e:
-            logger.error(f"获取资源链接异常: {str(e)}")
-            self.post_message(
-                channel=channel,
-                title="错误",
-                text=f"获取资源链接时出现错误: {str(e)}",
-                userid=userid
-            )
-
-    def get_resources_by_priority(self, selected: dict, channel: str, userid: str):
-        """按优先级获取资源"""
-        try:
-            title = selected.get('title', '未知标题')
-            media_type = selected.get('media_type', 'unknown')
-            tmdbid = selected.get('tmdbid')
-            
-            if not tmdbid:
+            resource_type, best = self._pick_best_resource(selected, candidates)
+            if not best:
                 self.post_message(
                     channel=channel,
-                    title="错误",
-                    text="该资源缺少TMDB ID，无法获取下载链接。",
+                    title="一键获取",
+                    text=f"❌ Nullbr没有找到「{display_title}」的可转存资源\n\n"
+                         f"💡 可发送 #{keyword} 查看完整搜索结果",
                     userid=userid
                 )
                 return
             
-            # 清理之前的资源缓存（重要：避免缓存混乱）
-            if userid in self._user_resource_cache:
-                logger.info(f"清理用户 {userid} 的旧资源缓存")
-                del self._user_resource_cache[userid]
-            
-            logger.info(f"按优先级获取资源: {title} (TMDB: {tmdbid})")
-            logger.info(f"优先级顺序: {' > '.join(self._resource_priority)}")
+            resource_title = best.get('title', best.get('name', '未知'))
+            success, detail = self._submit_resource(
+                resource_type, self._resource_url(best, resource_type), resource_title
+            )
             
-            # 按优先级尝试获取资源
-            for priority_type in self._resource_priority:
-                # 检查该资源类型是否可用
-                flag_key = f"{priority_type}-flg"
-                if not selected.get(flag_key):
-                    logger.info(f"跳过 {priority_type}: 资源不可用")
-                    continue
-                
-                # 检查该资源类型是否启用
-                enable_key = f"_enable_{priority_type}"
-                if not getattr(self, enable_key, True):
-                    logger.info(f"跳过 {priority_type}: 已在配置中禁用")
-                    continue
-                
-                logger.info(f"尝试获取 {priority_type} 资源...")
-                
-                # 调用相应的API获取资源
-                resources = None
-                if media_type == 'movie':
-                    resources = self._client.get_movie_resources(tmdbid, priority_type)
-                elif media_type == 'tv':
-                    resources = self._client.get_tv_resources(tmdbid, priority_type)
-                
-                if resources and resources.get(priority_type):
-                    # 找到资源，发送结果并结束
-                    resource_name = {
-                        '115': '115网盘',
-                        'magnet': '磁力链接', 
-                        'ed2k': 'ED2K链接',
-                        'video': 'M3U8视频'
-                    }.get(priority_type, priority_type)
-                    
-                    logger.info(f"成功获取 {priority_type} 资源，共 {len(resources[priority_type])} 个")
-                    
-                    self.post_message(
-                        channel=channel,
-                        title="获取成功",
-                        text=f"✅ 已获取「{title}」的{resource_name}资源",
-                        userid=userid
-                    )
-                    
-                    # 格式化并发送资源链接
-                    self.format_and_send_resources(resources, priority_type, title, channel, userid)
-                    return
-                else:
-                    logger.info(f"{priority_type} 资源不可用，尝试下一优先级")
+            resource_name = {
+                '115': '115网盘',
+                'magnet': '磁力链接',
+                'ed2k': 'ED2K链接'
+            }.get(resource_type, resource_type)
+            text = f"{'✅' if success else '❌'} 「{display_title}」{'已提交' if success else '提交失败'}\n"
+            text += f"{'─' * 15}\n"
+            text += f"📂 类型: {resource_name}\n"
+            text += f"📁 资源: {resource_title}\n"
+            text += f"💾 大小: {best.get('size', '未知')}\n"
+            if best.get('resolution'):
+                text += f"📺 分辨率: {best.get('resolution')}\n"
+            text += f"{'─' * 15}\n"
+            text += f"💡 {detail}\n"
+            text += f"⏱️ 用时 {time.time() - start_time:.1f}s"
+            if len(items) > 1:
+                text += f"\n\n🔍 不是这部？发送 #{keyword} 查看全部 {len(items)} 个结果"
             
-            # 所有优先级都没有找到资源，回退到MoviePilot搜索
-            logger.info(f"所有优先级资源都不可用，回退到MoviePilot搜索")
             self.post_message(
                 channel=channel,
-                title="切换搜索",
-                text=f"Nullbr没有找到「{title}」的任何资源，正在使用MoviePilot原始搜索...",
+                title="一键获取",
+                text=text,
                 userid=userid
             )
-            
-            self.fallback_to_moviepilot_search(title, channel, userid)
+            logger.info(f"一键获取完成: {display_title} -> {resource_type} {resource_title}, "
+                        f"成功={success}, 用时 {time.time() - start_time:.2f}s")
             
         except Exception as e:
-            logger.error(f"按优先级获取资源异常: {str(e)}")
+            logger.error(f"一键获取异常: {str(e)}")
             self.post_message(
                 channel=channel,
                 title="错误",
-                text=f"获取资源时出现错误: {str(e)}",
+                text=f"一键获取「{keyword}」时出现错误: {str(e)}",
                 userid=userid
             )
 
+    @timed("handler.transfer")
     def handle_resource_transfer(self, resource_id: int, channel: str, userid: str):
         """处理资源转存/离线请求
         
@@ -1637,7 +2286,7 @@ class nullbr_search_pro(_PluginBase):
         try:
             # 获取用户资源缓存
             cache = self._user_resource_cache.get(userid)
-            if not cache or time.time() - cache['timestamp'] > 3600:
+            if not cache:
                 self.post_message(
                     channel=channel,
                     title="缓存过期",
@@ -1749,10 +2398,21 @@ class nullbr_search_pro(_PluginBase):
             )
             return
         
+        # Cookie 已被后台检测判定为失效，直接提示，无需再请求 115
+        if self._p115_client.is_alive is False:
+            self.post_message(
+                channel=channel,
+                title="转存失败",
+                text="❌ 115 Cookie 已失效，暂时无法转存\n\n"
+                     "💡 已通知管理员更新 Cookie，请稍后再试",
+                userid=userid
+            )
+            return
+        
         # 使用 p115client 转存
         logger.info(f"开始115转存: 用户={userid}, 资源={resource_title}, URL={resource_url}")
         
-        self._stats['cd2_transfers'] += 1
+        self._stats.incr('p115_transfers')
         self._stats['last_transfer_time'] = time.time()
         
         self.post_message(
@@ -1791,6 +2451,17 @@ class nullbr_search_pro(_PluginBase):
                      f"📁 {resource_title}",
                 userid=userid
             )
+        except ConnectionError as e:
+            # Cookie 在两次检测之间失效
+            self._stats['p115_status'] = 'expired'
+            self._notify_p115_expired()
+            self.post_message(
+                channel=channel,
+                title="转存失败",
+                text=f"❌ {str(e)}\n\n"
+                     "💡 已通知管理员更新 Cookie，请稍后再试",
+                userid=userid
+            )
         except Exception as e:
             logger.error(f"115 转存异常: {str(e)}")
             raise
@@ -1812,9 +2483,28 @@ class nullbr_search_pro(_PluginBase):
             return
         
         task_type = "磁力" if resource_type == "magnet" else "ED2K"
+        
+        # 同一资源（按 infohash/ED2K 哈希）已在离线列表中时直接返回进度
+        resource_key = parse_resource_hash(resource_url)
+        if resource_key and self._check_offline_duplicate(resource_key, resource_title, channel, userid):
+            return
+        
+        # 提交前检查离线配额（配额有短期缓存，不会每次都请求 CloudDrive2）
+        accepted, _, quota = self._cd2_client.trim_to_quota([resource_url], path=self._cd2_offline_path)
+        if not accepted:
+            self.post_message(
+                channel=channel,
+                title="离线配额不足",
+                text=f"❌ 115 离线配额已用完，无法添加{task_type}离线任务\n\n"
+                     f"📊 配额: 已用 {quota['used']} / 总计 {quota['total']}\n"
+                     f"💡 请等待配额重置后再试",
+                userid=userid
+            )
+            return
+        
         logger.info(f"开始离线: 用户={userid}, 资源={resource_title}, 类型={resource_type}")
         
-        self._stats['cd2_offline'] += 1
+        self._stats.incr('cd2_offline')
         self._stats['last_transfer_time'] = time.time()
         
         self.post_message(
@@ -1833,6 +2523,10 @@ class nullbr_search_pro(_PluginBase):
             to_folder=self._cd2_offline_path
         )
         
+        if resource_key and result.get('success', True) and self._offline_index is not None:
+            self._offline_index.add(resource_key, resource_title)
+            self._save_offline_index()
+        
         # 处理离线结果
         self._handle_cd2_result(result, title, resource_title, resource_size, f"{task_type}离线", channel, userid)
     
@@ -1840,9 +2534,10 @@ class nullbr_search_pro(_PluginBase):
                            resource_size: str, action_type: str, channel: str, userid: str):
         """处理CloudDrive2 API返回结果"""
         try:
-            # CloudDrive2 API 成功通常直接返回结果，失败会抛出异常
-            # 这里简化处理，如果没有异常就认为成功
-            self._stats['successful_transfers'] += 1
+            # CloudDrive2 API 网络错误会抛出异常，业务失败通过 success 字段返回
+            if not result.get('success', True):
+                raise ValueError(result.get('message') or '未知错误')
+            self._stats.incr('successful_transfers')
             
             success_msg = f"✅ {action_type}任务已添加!\n"
             success_msg += f"{'─' * 15}\n"
@@ -1863,7 +2558,7 @@ class nullbr_search_pro(_PluginBase):
             
         except Exception as e:
             # 处理失败
-            self._stats['failed_transfers'] += 1
+            self._stats.incr('failed_transfers')
             
             failure_msg = f"❌ {action_type}失败\n"
             failure_msg += f"{'─' * 15}\n"
@@ -1884,7 +2579,9 @@ class nullbr_search_pro(_PluginBase):
     def format_and_send_resources(self, resources: dict, resource_type: str, title: str, channel: str, userid: str):
         """格式化并发送资源链接"""
         try:
-            resource_list = resources.get(resource_type, [])
+            # 丢弃没有链接的资源：分页显示、转存缓存（#N、transfer_N、#N-M）和总数都基于这一个列表，编号一致
+            resource_list = [res for res in resources.get(resource_type) or []
+                             if self._resource_url(res, resource_type)]
             if not resource_list:
                 self.post_message(
                     channel=channel,
@@ -1895,81 +2592,49 @@ class nullbr_search_pro(_PluginBase):
                 return
             
             # 更新资源统计
-            self._stats['total_resources'] += len(resource_list)
+            self._stats.incr('total_resources', len(resource_list))
             
-            # 缓存资源到用户缓存中，用于CMS转存
-            resource_cache = []
-            for res in resource_list[:10]:  # 最多缓存10个
-                if resource_type == "115":
-                    url = res.get('share_link', '')
-                elif resource_type == "magnet":
-                    url = res.get('magnet', '')
-                elif resource_type in ["video", "ed2k"]:
-                    url = res.get('url', res.get('link', ''))
-                else:
-                    url = ''
-                
-                if url:
-                    resource_cache.append({
-                        'url': url,
-                        'title': res.get('title', res.get('name', '未知')),
-                        'size': res.get('size', '未知'),
-                        'type': resource_type
-                    })
+            # 按得分排序，展示列表和 #N 转存缓存都使用排序后的顺序
+            if self._rank_enabled and len(resource_list) > 1:
+                resource_list = rank_resources(resource_list, self._rank_weights)
+            
+            # 缓存资源到用户缓存中，用于转存（第 N 项即分页显示的第 N 个资源）
+            resource_cache = [{
+                'url': self._resource_url(res, resource_type),
+                'title': res.get('title', res.get('name', '未知')),
+                'size': res.get('size', '未知'),
+                'type': resource_type
+            } for res in resource_list]
             
             # 保存到用户资源缓存
-            self._user_resource_cache[userid] = {
-                'resources': resource_cache,
-                'title': title,
-                'resource_type': resource_type,
-                'timestamp': time.time()
-            }
+            self._user_resource_cache.put(userid, resources=resource_cache, title=title,
+                                          resource_type=resource_type)
             
             # 格式化显示文本
-            reply_text = f"🎯 「{title}」的{resource_type}资源:\n\n"
-            
-            if resource_type == "115":
-                for i, res in enumerate(resource_list[:10], 1):
-                    reply_text += f"【{i}】{res.get('title', '未知')}\n"
-                    reply_text += f"💾 大小: {res.get('size', '未知')}\n"
-                    reply_text += f"🔗 链接: {res.get('share_link', '无')}\n"
-                    reply_text += f"{'─' * 15}\n"
-                    
-            elif resource_type == "magnet":
-                for i, res in enumerate(resource_list[:10], 1):
-                    reply_text += f"【{i}】{res.get('name', '未知')}\n"
-                    reply_text += f"💾 大小: {res.get('size', '未知')}\n"
-                    reply_text += f"📺 分辨率: {res.get('resolution', '未知')}\n"
-                    reply_text += f"🈴 中文字幕: {'✅' if res.get('zh_sub') else '❌'}\n"
-                    reply_text += f"🧲 磁力: {res.get('magnet', '无')}\n"
-                    reply_text += f"{'─' * 15}\n"
-                    
-            elif resource_type in ["video", "ed2k"]:
-                for i, res in enumerate(resource_list[:10], 1):
-                    reply_text += f"【{i}】{res.get('name', res.get('title', '未知'))}\n"
-                    if res.get('size'):
-                        reply_text += f"💾 大小: {res.get('size')}\n"
-                    reply_text += f"🔗 链接: {res.get('url', res.get('link', '无'))}\n"
-                    reply_text += f"{'─' * 15}\n"
-            
-            if len(reply_text) > 3500:  # 留出空间给CMS提示
-                reply_text = reply_text[:3400] + "...\n\n(内容过长已截断)\n\n"
-            
-            reply_text += f"📊 共找到 {len(resource_list)} 个资源\n\n"
+            footer = f"📊 共找到 {len(resource_list)} 个资源\n\n"
             
             # 如果启用了CloudDrive2，添加转存提示
             if self._cd2_enabled and self._cd2_client and resource_type in ["115", "magnet", "ed2k"]:
                 if resource_type == "115":
-                    reply_text += "🚀 CloudDrive2转存:\n"
-                    reply_text += "发送资源编号进行转存，如: 1、2、3...\n"
+                    footer += "🚀 CloudDrive2转存:\n"
+                    footer += "发送资源编号进行转存，如: 1、2、3...\n"
                 else:
-                    reply_text += "🚀 CloudDrive2离线下载:\n"
-                    reply_text += "发送资源编号添加离线任务，如: 1、2、3..."
+                    footer += "🚀 CloudDrive2离线下载:\n"
+                    footer += "发送资源编号添加离线任务，如: 1、2、3..."
+            
+            pager = RecordPager(
+                header=f"🎯 「{title}」的{resource_type}资源:\n\n",
+                items=resource_list,
+                template=RESOURCE_TEMPLATES.get(resource_type, RESOURCE_TEMPLATES['video']),
+                limit=byte_limit(channel),
+                footer=footer
+            )
+            page_title = f"{resource_type.upper()}资源"
             
             self.post_message(
                 channel=channel,
-                title=f"{resource_type.upper()}资源",
-                text=reply_text,
+                title=page_title,
+                text=self._first_page(pager, page_title, userid),
                 userid=userid
             )
             
@@ -1982,88 +2647,37 @@ class nullbr_search_pro(_PluginBase):
                 userid=userid
             )
 
-    def fallback_to_moviepilot_search(self, title: str, channel: str, userid: str):
-        """回退到MoviePilot原始搜索功能"""
-        logger.info(f"启动MoviePilot原始搜索: {title}")
-        
-        # 尝试其他搜索方式
-        self.try_alternative_search(title, channel, userid)
-
-    def try_alternative_search(self, title: str, channel: str, userid: str):
-        """尝试其他搜索方式"""
-        try:
-            logger.info(f"尝试MoviePilot原始搜索: {title}")
-            
-            # 简化策略：直接发送搜索建议和提示
-            # 避免复杂的模块调用导致的错误
-            
-            success = False
-            
-            # 方法1: 尝试调用站点助手的简单方法
-            try:
-                from app.helper.sites import SitesHelper
-                sites_helper = SitesHelper()
-                
-                # 只是检查是否有配置的站点
-                if hasattr(sites_helper, 'get_indexers'):
-                    indexers = sites_helper.get_indexers()
-                    if indexers:
-                        logger.info(f"检测到 {len(indexers)} 个配置的站点")
-                        
-                        self.post_message(
-                            channel=channel,
-                            title="搜索提示",
-                            text=f"🔍 Nullbr未找到「{title}」的资源\n\n" +
-                                 f"💡 系统检测到您已配置 {len(indexers)} 个搜索站点\n" +
-                                 f"建议通过以下方式继续搜索:\n\n" +
-                                 f"🌐 MoviePilot Web界面搜索\n" +
-                                 f"📱 其他搜索渠道\n" +
-                                 f"⚙️ 检查站点配置状态",
-                            userid=userid
-                        )
-                        success = True
-                
-            except Exception as e:
-                logger.warning(f"站点检测失败: {str(e)}")
-            
-            # 如果上面的方法也失败，发送通用建议
-            if not success:
-                self.send_manual_search_suggestion(title, channel, userid)
-            
-        except Exception as e:
-            logger.error(f"备用搜索失败: {str(e)}")
-            self.send_manual_search_suggestion(title, channel, userid)
-
-    def send_manual_search_suggestion(self, title: str, channel: str, userid: str):
-        """发送手动搜索建议"""
-        self.post_message(
-            channel=channel,
-            title="搜索建议",
-            text=f"📋 「{title}」未找到资源，建议:\n\n" +
-                 f"🔍 在MoviePilot Web界面搜索\n" +
-                 f"⚙️ 检查资源站点配置\n" +
-                 f"🔄 尝试其他关键词\n" +
-                 f"📱 使用其他搜索渠道",
-            userid=userid
-        )
-
     def stop_service(self):
         """停止插件服务"""
         try:
             # 清理客户端连接
             if self._client:
                 logger.info("清理Nullbr客户端")
+                release_client(self._client)
                 self._client = None
             
             if self._cd2_client:
                 logger.info("清理CloudDrive2客户端连接")
-                if hasattr(self._cd2_client, 'session'):
-                    self._cd2_client.session.close()
+                self._cd2_client.close()
                 self._cd2_client = None
+            self._close_cd2_aio()
+            
+            # 发送完队列中的消息
+            if self._outbound:
+                self._outbound.close()
+                self._outbound = None
+            
+            if self._recorder:
+                self._recorder.close()
+                self._recorder = None
+            
+            # 结束进行中的缓存预热
+            self._warm_stop.set()
             
             # 清理缓存
             self._user_search_cache.clear()
             self._user_resource_cache.clear()
+            self._user_page_cache.clear()
             
             self._enabled = False
             logger.info("Nullbr资源搜索Pro插件已停止")
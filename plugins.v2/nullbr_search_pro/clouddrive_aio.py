@@ -0,0 +1,289 @@
+"""
+CloudDrive2 异步 gRPC 客户端（grpc.aio）
+
+批量提交离线任务、批量查询任务状态时，同步客户端只能逐个阻塞调用。
+本模块基于 grpc.aio 在同一个 HTTP/2 连接上并发发起多个 RPC：
+- AsyncCloudDrive2Client: 协程接口，与 CloudDrive2Client 的方法一一对应
+- CloudDrive2AioFacade: 同步门面，在独立事件循环线程中运行异步客户端，供插件直接调用
+"""
+import asyncio
+import threading
+from typing import List, Optional
+
+from app.log import logger
+
+try:
+    from . import clouddrive_client as cd2
+    from .nullbr_core.metrics import timed
+except ImportError:
+    import clouddrive_client as cd2
+    from nullbr_core.metrics import timed
+
+
+class AsyncCloudDrive2Client:
+    """CloudDrive2 异步 gRPC 客户端
+
+    channel 在首次调用时于当前事件循环中建立，之后所有 RPC 复用同一连接
+    """
+
+    def __init__(self, base_url: str, username: str = None, password: str = None,
+                 api_token: str = None, max_concurrency: int = 16):
+        """
+        初始化客户端
+
+        :param base_url: CloudDrive2 服务器地址，如 http://localhost:19798
+        :param username: 用户名（密码认证时必填）
+        :param password: 密码（密码认证时必填）
+        :param api_token: API Token（优先使用，推荐）
+        :param max_concurrency: 批量调用时的最大并发 RPC 数
+        """
+        if not api_token and not (username and password):
+            raise ValueError("CloudDrive2 认证失败: 需要提供用户名密码或 API Token")
+
+        self.address = base_url.replace('http://', '').replace('https://', '').rstrip('/')
+        self.username = username
+        self.password = password
+        self.api_token = api_token
+        self._jwt_token = api_token
+        self._max_concurrency = max_concurrency
+
+        self._channel = None
+        self._stub = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _ensure_channel(self):
+        """在当前事件循环中建立 channel（grpc.aio channel 不能跨事件循环使用）"""
+        if self._channel is None:
+            cd2._load_grpc()
+            self._channel = cd2.grpc.aio.insecure_channel(self.address, options=cd2.CHANNEL_OPTIONS)
+            self._stub = cd2.clouddrive_pb2_grpc.CloudDriveFileSrvStub(self._channel)
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+
+    async def _login(self):
+        """登录获取 JWT Token"""
+        request = cd2.clouddrive_pb2.GetTokenRequest(userName=self.username, password=self.password)
+        response = await self._call("GetToken", request, auth=False)
+        if not response.success:
+            raise ValueError(f"CloudDrive2 登录失败: {response.errorMessage}")
+        self._jwt_token = response.token
+        logger.info(f"CloudDrive2 登录成功，过期时间: {response.expiration}")
+
+    async def _call(self, method: str, request, auth: bool = True):
+        """调用 RPC，附带超时和授权元数据，并发数受信号量限制"""
+        self._ensure_channel()
+        if auth and not self._jwt_token:
+            await self._login()
+        metadata = [('authorization', f'Bearer {self._jwt_token}')] if auth and self._jwt_token else None
+        async with self._semaphore:
+            with timed(f"cd2.{method}"):
+                return await getattr(self._stub, method)(
+                    request,
+                    metadata=metadata,
+                    timeout=cd2.RPC_TIMEOUTS.get(method, cd2.DEFAULT_RPC_TIMEOUT),
+                    wait_for_ready=True
+                )
+
+    async def add_shared_link(self, share_url: str, password: str = "",
+                              to_folder: str = "/115/Downloads") -> dict:
+        """
+        添加 115 分享链接进行转存
+
+        :param share_url: 115 分享链接
+        :param password: 分享密码（可选）
+        :param to_folder: 转存目标路径
+        :return: 操作结果
+        """
+        if not share_url:
+            raise ValueError("分享链接不能为空")
+
+        self._ensure_channel()
+        request = cd2.clouddrive_pb2.AddSharedLinkRequest(
+            sharedLinkUrl=share_url,
+            sharedPassword=password,
+            toFolder=to_folder
+        )
+        try:
+            await self._call("AddSharedLink", request)
+            return {'success': True}
+        except cd2.grpc.RpcError as e:
+            logger.error(f"CloudDrive2 分享链接转存失败: {e.details()}")
+            raise ValueError(f"转存失败: {e.details()}")
+
+    async def add_offline_files(self, urls: str, to_folder: str = "/115/Offline") -> dict:
+        """
+        添加离线任务（支持磁力链接、ED2K 等）
+
+        :param urls: 资源链接（磁力/ED2K/HTTP等）
+        :param to_folder: 下载保存路径
+        :return: 操作结果
+        """
+        if not urls:
+            raise ValueError("资源链接不能为空")
+
+        logger.info(f"CloudDrive2 添加{cd2.describe_link(urls)}离线任务: {urls[:50]}... -> {to_folder}")
+        self._ensure_channel()
+        request = cd2.clouddrive_pb2.AddOfflineFileRequest(
+            urls=urls,
+            toFolder=to_folder,
+            checkFolderAfterSecs=0
+        )
+        try:
+            result = await self._call("AddOfflineFiles", request)
+            return cd2.offline_files_result(result)
+        except cd2.grpc.RpcError as e:
+            logger.error(f"CloudDrive2 离线任务添加失败: {e.details()}")
+            raise ValueError(f"离线任务添加失败: {e.details()}")
+
+    async def get_offline_status(self, path: str = "/115/Offline") -> dict:
+        """
+        获取离线任务状态
+
+        :param path: 离线任务路径
+        :return: 任务状态列表
+        """
+        self._ensure_channel()
+        request = cd2.clouddrive_pb2.FileRequest(path=path)
+        try:
+            result = await self._call("ListOfflineFilesByPath", request)
+            return cd2.offline_status_result(result)
+        except cd2.grpc.RpcError as e:
+            logger.error(f"CloudDrive2 查询离线状态失败: {e.details()}")
+            raise ValueError(f"查询失败: {e.details()}")
+
+    async def get_system_info(self) -> dict:
+        """
+        获取系统信息（无需认证）
+
+        :return: 系统信息
+        """
+        from google.protobuf import empty_pb2
+        try:
+            result = await self._call("GetSystemInfo", empty_pb2.Empty(), auth=False)
+            return cd2.system_info_result(result)
+        except cd2.grpc.RpcError as e:
+            logger.error(f"CloudDrive2 获取系统信息失败: {e.details()}")
+            raise ValueError(f"获取系统信息失败: {e.details()}")
+
+    async def add_offline_files_many(self, urls_list: List[str],
+                                     to_folder: str = "/115/Offline") -> List[dict]:
+        """
+        并发添加多个离线任务
+
+        :param urls_list: 资源链接列表
+        :param to_folder: 下载保存路径
+        :return: 与输入顺序一致的结果列表，失败项为 {'success': False, 'message': 错误信息}
+        """
+        results = await asyncio.gather(
+            *(self.add_offline_files(urls, to_folder) for urls in urls_list),
+            return_exceptions=True
+        )
+        return [
+            {'success': False, 'message': str(r)} if isinstance(r, Exception) else r
+            for r in results
+        ]
+
+    async def get_offline_status_many(self, paths: List[str]) -> List[dict]:
+        """
+        并发查询多个路径的离线任务状态
+
+        :param paths: 离线任务路径列表
+        :return: 与输入顺序一致的结果列表，失败项为 {'offlineFiles': [], 'error': 错误信息}
+        """
+        results = await asyncio.gather(
+            *(self.get_offline_status(path) for path in paths),
+            return_exceptions=True
+        )
+        return [
+            {'offlineFiles': [], 'status': None, 'error': str(r)} if isinstance(r, Exception) else r
+            for r in results
+        ]
+
+    async def close(self):
+        """关闭 channel"""
+        if self._channel is not None:
+            await self._channel.close()
+            self._channel = None
+            self._stub = None
+
+
+class CloudDrive2AioFacade:
+    """AsyncCloudDrive2Client 的同步门面
+
+    在独立的守护线程中运行事件循环，插件的同步处理函数通过本类提交协程并等待结果。
+    事件循环线程在首次调用时启动。
+    """
+
+    def __init__(self, base_url: str, username: str = None, password: str = None,
+                 api_token: str = None, max_concurrency: int = 16):
+        self._client = AsyncCloudDrive2Client(
+            base_url=base_url,
+            username=username,
+            password=password,
+            api_token=api_token,
+            max_concurrency=max_concurrency
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """启动事件循环线程"""
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(
+                        target=loop.run_forever,
+                        name="nullbr-cd2-aio",
+                        daemon=True
+                    )
+                    self._thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def _run(self, coro, timeout: float = None):
+        """在事件循环线程中执行协程并同步等待结果"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        return future.result(timeout)
+
+    def add_shared_link(self, share_url: str, password: str = "",
+                        to_folder: str = "/115/Downloads") -> dict:
+        """添加 115 分享链接进行转存"""
+        return self._run(self._client.add_shared_link(share_url, password, to_folder))
+
+    def add_offline_files(self, urls: str, to_folder: str = "/115/Offline") -> dict:
+        """添加离线任务"""
+        return self._run(self._client.add_offline_files(urls, to_folder))
+
+    def get_offline_status(self, path: str = "/115/Offline") -> dict:
+        """获取离线任务状态"""
+        return self._run(self._client.get_offline_status(path))
+
+    def get_system_info(self) -> dict:
+        """获取系统信息"""
+        return self._run(self._client.get_system_info())
+
+    def add_offline_files_many(self, urls_list: List[str],
+                               to_folder: str = "/115/Offline") -> List[dict]:
+        """并发添加多个离线任务，结果顺序与输入一致"""
+        return self._run(self._client.add_offline_files_many(urls_list, to_folder))
+
+    def get_offline_status_many(self, paths: List[str]) -> List[dict]:
+        """并发查询多个路径的离线任务状态，结果顺序与输入一致"""
+        return self._run(self._client.get_offline_status_many(paths))
+
+    def close(self):
+        """关闭 channel 并停止事件循环线程"""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._client.close(), loop).result(5)
+        except Exception as e:
+            logger.warning(f"关闭 CloudDrive2 异步客户端异常: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        loop.close()
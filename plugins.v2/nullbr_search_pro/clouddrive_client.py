@@ -7,18 +7,187 @@ CloudDrive2 gRPC 客户端
 - 任务状态查询
 
 使用 gRPC 协议与 CloudDrive2 通信
+
+grpc 及 protobuf 生成代码在首次 RPC 调用时才导入，
+避免插件加载时为未使用的 CloudDrive2 功能付出导入开销
+
+gRPC channel 按地址缓存并在插件重载之间复用，
+配置了 keepalive、消息大小上限和重连退避，每个 RPC 均带超时
 """
-import grpc
-from typing import Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 from app.log import logger
 
-# 导入生成的 gRPC 代码
 try:
-    from . import clouddrive_pb2
-    from . import clouddrive_pb2_grpc
+    from .nullbr_core.metrics import CACHES, timed
 except ImportError:
-    import clouddrive_pb2
-    import clouddrive_pb2_grpc
+    from nullbr_core.metrics import CACHES, timed
+
+# 延迟导入的模块，由 _load_grpc() 填充
+grpc = None
+clouddrive_pb2 = None
+clouddrive_pb2_grpc = None
+
+
+def _load_grpc():
+    """按需导入 grpc 与生成的消息定义、Stub（仅首次调用时执行）"""
+    global grpc, clouddrive_pb2, clouddrive_pb2_grpc
+    if clouddrive_pb2_grpc is not None:
+        return
+    import grpc as _grpc
+    try:
+        from . import clouddrive_pb2 as _pb2
+        from . import clouddrive_pb2_grpc as _pb2_grpc
+    except ImportError:
+        import clouddrive_pb2 as _pb2
+        import clouddrive_pb2_grpc as _pb2_grpc
+    grpc, clouddrive_pb2 = _grpc, _pb2
+    clouddrive_pb2_grpc = _pb2_grpc
+
+
+# gRPC channel 参数
+CHANNEL_OPTIONS = (
+    # keepalive：空闲时也定期 ping，及时发现被 NAT/代理断开的连接
+    ("grpc.keepalive_time_ms", 30 * 1000),
+    ("grpc.keepalive_timeout_ms", 10 * 1000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    # 消息大小：离线任务列表可能较大
+    ("grpc.max_send_message_length", 16 * 1024 * 1024),
+    ("grpc.max_receive_message_length", 64 * 1024 * 1024),
+    # 重连退避
+    ("grpc.initial_reconnect_backoff_ms", 1000),
+    ("grpc.min_reconnect_backoff_ms", 1000),
+    ("grpc.max_reconnect_backoff_ms", 30 * 1000),
+)
+
+# 各 RPC 超时时间（秒）
+RPC_TIMEOUTS = {
+    "GetSystemInfo": 5,
+    "GetToken": 10,
+    "AddOfflineFiles": 30,
+    "AddSharedLink": 30,
+    "ListOfflineFilesByPath": 15,
+    "GetOfflineQuotaInfo": 10,
+}
+DEFAULT_RPC_TIMEOUT = 15
+
+# 离线配额缓存有效期（秒），期间提交任务只在本地扣减
+QUOTA_CACHE_TTL = 60
+
+
+def describe_link(urls: str) -> str:
+    """判断离线链接类型，用于日志"""
+    if urls.startswith("magnet:"):
+        return "磁力"
+    if urls.lower().startswith("ed2k://"):
+        return "ED2K"
+    if urls.startswith("http"):
+        return "HTTP"
+    return "未知"
+
+
+def offline_files_result(result) -> dict:
+    """转换 AddOfflineFiles 响应（FileOperationResult）"""
+    return {
+        'success': result.success if hasattr(result, 'success') else True,
+        'message': result.errorMessage if hasattr(result, 'errorMessage') else ''
+    }
+
+
+def split_offline_urls(urls: str) -> List[str]:
+    """拆分换行分隔的多个离线链接"""
+    return [u.strip() for u in urls.split("\n") if u.strip()]
+
+
+def offline_status_result(result) -> dict:
+    """转换 ListOfflineFilesByPath 响应"""
+    return {
+        'offlineFiles': list(result.offlineFiles) if hasattr(result, 'offlineFiles') else [],
+        'status': result.status if hasattr(result, 'status') else None
+    }
+
+
+def system_info_result(result) -> dict:
+    """转换 GetSystemInfo 响应"""
+    return {
+        'systemReady': result.SystemReady,
+        'userName': result.UserName if hasattr(result, 'UserName') else '',
+        'version': result.Version if hasattr(result, 'Version') else ''
+    }
+
+
+class _CachedChannel:
+    """缓存的 gRPC channel，记录连接状态和引用计数"""
+    
+    def __init__(self, address: str):
+        self.address = address
+        self.refs = 0
+        self.state = None
+        self.channel = grpc.insecure_channel(address, options=CHANNEL_OPTIONS)
+        self.stub = clouddrive_pb2_grpc.CloudDriveFileSrvStub(self.channel)
+        self.channel.subscribe(self._on_state_change)
+    
+    def _on_state_change(self, state):
+        """channel 连接状态回调"""
+        if state != self.state:
+            logger.debug(f"CloudDrive2 channel {self.address} 状态: {state}")
+        self.state = state
+    
+    @property
+    def healthy(self) -> bool:
+        """channel 是否可复用（未关闭且不处于连接失败状态）"""
+        return self.state not in (grpc.ChannelConnectivity.TRANSIENT_FAILURE,
+                                  grpc.ChannelConnectivity.SHUTDOWN)
+    
+    def close(self):
+        """关闭 channel"""
+        try:
+            self.channel.unsubscribe(self._on_state_change)
+        except Exception:
+            pass
+        self.channel.close()
+        self.state = grpc.ChannelConnectivity.SHUTDOWN
+
+
+# channel 缓存 {address: _CachedChannel}
+_channels: Dict[str, _CachedChannel] = {}
+_channels_lock = threading.Lock()
+
+
+def _acquire_channel(address: str) -> _CachedChannel:
+    """
+    获取指定地址的 channel，优先复用缓存中健康的连接
+    
+    无引用的其他地址 channel（如修改配置后遗留的）会在此时关闭
+    """
+    with _channels_lock:
+        for addr in list(_channels):
+            cached = _channels[addr]
+            if addr != address and cached.refs <= 0:
+                logger.info(f"关闭未使用的 CloudDrive2 channel: {addr}")
+                cached.close()
+                del _channels[addr]
+        
+        cached = _channels.get(address)
+        if cached and not cached.healthy and cached.refs <= 0:
+            logger.info(f"CloudDrive2 channel {address} 状态异常({cached.state})，重新建立连接")
+            cached.close()
+            cached = None
+        if not cached:
+            cached = _CachedChannel(address)
+            _channels[address] = cached
+        else:
+            logger.debug(f"复用 CloudDrive2 channel: {address}")
+        cached.refs += 1
+        return cached
+
+
+def _release_channel(cached: _CachedChannel):
+    """释放 channel 引用（保留连接以便插件重载时复用）"""
+    with _channels_lock:
+        cached.refs -= 1
 
 
 class CloudDrive2Client:
@@ -49,15 +218,53 @@ class CloudDrive2Client:
         # 认证模式
         self._use_api_token = bool(api_token)
         
-        # 创建 gRPC channel
-        self.channel = grpc.insecure_channel(self.address)
+        # 离线配额缓存 {'total', 'used', 'left'}，及其获取时间
+        self._quota: Optional[dict] = None
+        self._quota_time = 0.0
+        self._quota_lock = threading.Lock()
         
-        # 创建服务 stub (所有方法都在 CloudDriveFileSrv 中)
-        self.file_stub = clouddrive_pb2_grpc.CloudDriveFileSrvStub(self.channel)
+        # gRPC channel 在首次调用时从缓存获取
+        self._cached_channel: Optional[_CachedChannel] = None
+        self._channel_lock = threading.Lock()
         
         # 初始化认证
         self._init_auth()
     
+    def _get_cached_channel(self) -> _CachedChannel:
+        """获取（必要时建立）本客户端使用的缓存 channel"""
+        if self._cached_channel is None:
+            with self._channel_lock:
+                if self._cached_channel is None:
+                    _load_grpc()
+                    self._cached_channel = _acquire_channel(self.address)
+        return self._cached_channel
+    
+    @property
+    def channel(self):
+        """gRPC channel（首次访问时导入 grpc 并建立）"""
+        return self._get_cached_channel().channel
+    
+    @property
+    def file_stub(self):
+        """CloudDriveFileSrv stub（按地址缓存，与 channel 一同复用）"""
+        return self._get_cached_channel().stub
+    
+    def _call(self, method: str, request, auth: bool = True):
+        """
+        调用 RPC，附带超时和授权元数据
+        
+        wait_for_ready 使调用在 channel 重连期间等待而非立即失败，
+        等待时间受该 RPC 的超时限制
+        """
+        rpc = getattr(self.file_stub, method)
+        with timed(f"cd2.{method}"):
+            return rpc(
+                request,
+                metadata=self._create_metadata() if auth else None,
+                timeout=RPC_TIMEOUTS.get(method, DEFAULT_RPC_TIMEOUT),
+                wait_for_ready=True
+            )
+    
     def _init_auth(self):
         """初始化认证"""
         if self._use_api_token:
@@ -73,13 +280,14 @@ class CloudDrive2Client:
     
     def _login(self):
         """登录获取 JWT Token"""
+        _load_grpc()
         try:
             request = clouddrive_pb2.GetTokenRequest(
                 userName=self.username,
                 password=self.password
             )
             
-            response = self.file_stub.GetToken(request)
+            response = self._call("GetToken", request, auth=False)
             
             if response.success:
                 self._jwt_token = response.token
@@ -98,10 +306,40 @@ class CloudDrive2Client:
         return [('authorization', f'Bearer {self._jwt_token}')]
     
     def close(self):
-        """关闭 gRPC channel"""
-        if self.channel:
-            self.channel.close()
-            logger.info("CloudDrive2 客户端已关闭")
+        """释放 gRPC channel（连接保留在缓存中，供插件重载后复用）"""
+        with self._channel_lock:
+            if self._cached_channel:
+                _release_channel(self._cached_channel)
+                self._cached_channel = None
+                logger.info("CloudDrive2 客户端已关闭")
+    
+    @property
+    def channel_state(self) -> str:
+        """channel 连接状态名称，未建立连接时为 idle"""
+        cached = self._cached_channel
+        if not cached or cached.state is None:
+            return "idle"
+        return cached.state.name.lower()
+    
+    @property
+    def is_ready(self) -> bool:
+        """channel 是否已就绪"""
+        cached = self._cached_channel
+        return bool(cached and cached.state == grpc.ChannelConnectivity.READY)
+    
+    def wait_ready(self, timeout: float = 5) -> bool:
+        """
+        等待 channel 就绪
+        
+        :param timeout: 最长等待秒数
+        :return: 是否在超时前就绪
+        """
+        channel = self.channel
+        try:
+            grpc.channel_ready_future(channel).result(timeout=timeout)
+            return True
+        except grpc.FutureTimeoutError:
+            return False
     
     def add_shared_link(self, share_url: str, password: str = "", 
                         to_folder: str = "/115/Downloads") -> dict:
@@ -118,6 +356,7 @@ class CloudDrive2Client:
         
         logger.info(f"CloudDrive2 添加分享链接转存: {share_url[:50]}... -> {to_folder}")
         
+        _load_grpc()
         try:
             request = clouddrive_pb2.AddSharedLinkRequest(
                 sharedLinkUrl=share_url,
@@ -125,8 +364,7 @@ class CloudDrive2Client:
                 toFolder=to_folder
             )
             
-            metadata = self._create_metadata()
-            self.file_stub.AddSharedLink(request, metadata=metadata)
+            self._call("AddSharedLink", request)
             
             logger.info("CloudDrive2 分享链接转存请求已发送")
             return {'success': True}
@@ -147,17 +385,10 @@ class CloudDrive2Client:
         if not urls:
             raise ValueError("资源链接不能为空")
         
-        # 判断链接类型
-        link_type = "未知"
-        if urls.startswith("magnet:"):
-            link_type = "磁力"
-        elif urls.lower().startswith("ed2k://"):
-            link_type = "ED2K"
-        elif urls.startswith("http"):
-            link_type = "HTTP"
-        
+        link_type = describe_link(urls)
         logger.info(f"CloudDrive2 添加{link_type}离线任务: {urls[:50]}... -> {to_folder}")
         
+        _load_grpc()
         try:
             request = clouddrive_pb2.AddOfflineFileRequest(
                 urls=urls,
@@ -165,14 +396,13 @@ class CloudDrive2Client:
                 checkFolderAfterSecs=0
             )
             
-            metadata = self._create_metadata()
-            result = self.file_stub.AddOfflineFiles(request, metadata=metadata)
+            result = self._call("AddOfflineFiles", request)
             
             logger.info("CloudDrive2 离线任务请求已发送")
-            return {
-                'success': result.result.success if hasattr(result, 'result') else True,
-                'message': result.result.errorMessage if hasattr(result, 'result') else ''
-            }
+            response = offline_files_result(result)
+            if response['success']:
+                self.consume_offline_quota(len(split_offline_urls(urls)))
+            return response
             
         except grpc.RpcError as e:
             logger.error(f"CloudDrive2 离线任务添加失败: {e.details()}")
@@ -187,37 +417,84 @@ class CloudDrive2Client:
         """
         logger.debug(f"CloudDrive2 查询离线任务状态: {path}")
         
+        _load_grpc()
         try:
             request = clouddrive_pb2.FileRequest(path=path)
             
-            metadata = self._create_metadata()
-            result = self.file_stub.ListOfflineFilesByPath(request, metadata=metadata)
+            result = self._call("ListOfflineFilesByPath", request)
             
-            return {
-                'offlineFiles': list(result.offlineFiles) if hasattr(result, 'offlineFiles') else [],
-                'status': result.status if hasattr(result, 'status') else None
-            }
+            return offline_status_result(result)
             
         except grpc.RpcError as e:
             logger.error(f"CloudDrive2 查询离线状态失败: {e.details()}")
             raise ValueError(f"查询失败: {e.details()}")
     
+    def get_offline_quota(self, path: str = None, force: bool = False) -> Optional[dict]:
+        """
+        获取离线配额（带短期缓存）
+        
+        :param path: 离线任务路径，用于确定对应的云盘账号
+        :param force: 是否忽略缓存强制刷新
+        :return: {'total', 'used', 'left'}，CloudDrive2 不支持、未报告配额上限（total <= 0）
+                 或查询失败时返回 None
+        """
+        with self._quota_lock:
+            if not force and self._quota and time.time() - self._quota_time < QUOTA_CACHE_TTL:
+                CACHES.hit("cd2.quota")
+                return dict(self._quota) if self._quota['total'] > 0 else None
+        CACHES.miss("cd2.quota")
+        
+        _load_grpc()
+        try:
+            request = clouddrive_pb2.OfflineQuotaRequest(path=path) if path \
+                else clouddrive_pb2.OfflineQuotaRequest()
+            result = self._call("GetOfflineQuotaInfo", request)
+        except grpc.RpcError as e:
+            logger.warning(f"CloudDrive2 查询离线配额失败: {e.details()}")
+            return None
+        
+        quota = {'total': result.total, 'used': result.used, 'left': result.left}
+        with self._quota_lock:
+            self._quota = quota
+            self._quota_time = time.time()
+        logger.debug(f"CloudDrive2 离线配额: {quota}")
+        # 部分后端不支持配额查询，返回全零的 OfflineQuotaInfo，视为配额未知
+        return dict(quota) if quota['total'] > 0 else None
+    
+    def consume_offline_quota(self, count: int = 1):
+        """提交成功后在本地扣减缓存的配额，避免每次提交都重新查询"""
+        with self._quota_lock:
+            if self._quota:
+                self._quota['used'] += count
+                self._quota['left'] = max(0, self._quota['left'] - count)
+    
+    def trim_to_quota(self, urls_list: List[str], path: str = None) -> Tuple[List[str], List[str], Optional[dict]]:
+        """
+        按剩余配额截断待提交的离线链接
+        
+        :param urls_list: 待提交的链接列表
+        :param path: 离线任务路径
+        :return: (可提交的链接, 超出配额的链接, 配额信息)，配额未知时全部可提交
+        """
+        quota = self.get_offline_quota(path=path)
+        if not quota or quota['total'] <= 0:
+            return list(urls_list), [], None
+        left = max(0, quota['left'])
+        return list(urls_list[:left]), list(urls_list[left:]), quota
+    
     def get_system_info(self) -> dict:
         """
         获取系统信息（无需认证）
         
         :return: 系统信息
         """
+        _load_grpc()
         try:
             from google.protobuf import empty_pb2
             # GetSystemInfo 在 CloudDriveFileSrv 中
-            result = self.file_stub.GetSystemInfo(empty_pb2.Empty())
+            result = self._call("GetSystemInfo", empty_pb2.Empty(), auth=False)
             
-            return {
-                'systemReady': result.SystemReady,
-                'userName': result.UserName if hasattr(result, 'UserName') else '',
-                'version': result.Version if hasattr(result, 'Version') else ''
-            }
+            return system_info_result(result)
             
         except grpc.RpcError as e:
             logger.error(f"CloudDrive2 获取系统信息失败: {e.details()}")
@@ -244,4 +521,4 @@ class CloudDrive2Client:
     @property  
     def session(self):
         """兼容旧代码的属性"""
-        return self.channel
+        return self
@@ -0,0 +1,203 @@
+"""
+出站消息队列
+
+处理一次选择可能连续发出"获取成功"、资源列表、转存结果等多条消息，多个用户同时操作时
+容易触发渠道侧的频率限制。本模块在 post_message 与通知后端之间加一层队列：
+- 合并：短时间窗口内发给同一用户、同一渠道的连续消息合并为一条（不超过渠道单条上限）
+- 限速：每个渠道一个令牌桶，超出速率的消息在队列中等待
+- 异步：由后台线程发送，处理函数不会阻塞在通知后端上
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from app.log import logger
+
+try:
+    from .nullbr_core.message_formatter import channel_key
+    from .nullbr_core.message_renderer import byte_limit
+except ImportError:
+    from nullbr_core.message_formatter import channel_key
+    from nullbr_core.message_renderer import byte_limit
+
+# 合并窗口（秒）：消息入队后等待该时间再发送，期间发给同一用户的消息合并到一起
+COALESCE_WINDOW = 0.3
+
+# 各渠道发送速率 (每秒令牌数, 桶容量)
+CHANNEL_RATES = {
+    'telegram': (25.0, 30),    # Bot API 全局约 30 条/秒
+    'slack': (5.0, 10),
+    'wechat': (10.0, 20),      # 企业微信应用消息接口
+}
+DEFAULT_RATE = (10.0, 20)
+
+# 发送函数: (渠道, 标题, 文本, 用户ID, 其他参数) -> None
+SendFunc = Callable[..., None]
+
+
+class TokenBucket:
+    """令牌桶（非线程安全，由 OutboundQueue 在锁内使用）"""
+
+    __slots__ = ('rate', 'capacity', '_tokens', '_stamp')
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._stamp = time.monotonic()
+
+    def take(self, now: float = None) -> float:
+        """
+        取一个令牌
+
+        :return: 0 表示取到令牌，否则为需要等待的秒数
+        """
+        now = time.monotonic() if now is None else now
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class _Outgoing:
+    """待发送消息"""
+
+    __slots__ = ('key', 'channel', 'title', 'text', 'userid', 'kwargs', 'due', 'size', 'limit')
+
+    def __init__(self, key, channel, title, text, userid, kwargs, due):
+        self.key = key
+        self.channel = channel
+        self.title = title
+        self.text = text or ''
+        self.userid = userid
+        self.kwargs = kwargs
+        self.due = due
+        self.size = len(self.text.encode('utf-8'))
+        self.limit = byte_limit(channel)
+
+    def merge(self, title: Optional[str], text: str) -> bool:
+        """合并后续消息，超过渠道单条上限时返回 False"""
+        text = text or ''
+        part = f"\n\n{title}\n{text}" if title and title != self.title else f"\n\n{text}"
+        size = len(part.encode('utf-8'))
+        if self.size + size > self.limit:
+            return False
+        self.text += part
+        self.size += size
+        return True
+
+
+class OutboundQueue:
+    """出站消息队列：按用户合并、按渠道限速、后台线程发送"""
+
+    def __init__(self, send: SendFunc, window: float = COALESCE_WINDOW,
+                 rates: Dict[str, Tuple[float, int]] = None):
+        """
+        :param send: 实际发送函数
+        :param window: 合并窗口（秒）
+        :param rates: 各渠道速率，默认 CHANNEL_RATES
+        """
+        self._send = send
+        self.window = window
+        self._rates = rates or CHANNEL_RATES
+        self._queue: Deque[_Outgoing] = deque()
+        self._open: Dict[tuple, _Outgoing] = {}      # 仍可合并的消息 {(渠道, 用户): 消息}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="nullbr-outbound", daemon=True)
+        self._thread.start()
+        # 统计
+        self.submitted = 0
+        self.merged = 0
+        self.sent = 0
+
+    @property
+    def pending(self) -> int:
+        """待发送的消息数"""
+        return len(self._queue)
+
+    def submit(self, channel, title: Optional[str], text: str, userid: str = None, **kwargs):
+        """
+        提交消息，立即返回
+
+        带按钮、通知类型等额外参数的消息不参与合并
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("出站消息队列已关闭")
+            self.submitted += 1
+            key = (str(channel), userid)
+            kwargs = {k: v for k, v in kwargs.items() if v is not None}
+            entry = self._open.get(key)
+            if entry is not None and not kwargs and not entry.kwargs and entry.merge(title, text):
+                self.merged += 1
+                return
+            entry = _Outgoing(key, channel, title, text, userid, kwargs, time.monotonic() + self.window)
+            self._queue.append(entry)
+            if kwargs:
+                self._open.pop(key, None)
+            else:
+                self._open[key] = entry
+            self._cond.notify()
+
+    def _bucket(self, channel) -> TokenBucket:
+        key = channel_key(channel) or str(channel)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(*self._rates.get(key, DEFAULT_RATE))
+        return bucket
+
+    def _next_ready(self, now: float) -> Tuple[Optional[_Outgoing], Optional[float]]:
+        """
+        取出下一条可发送的消息（锁内调用）
+
+        :return: (消息, None) 或 (None, 需要等待的秒数，None 表示等待新消息)
+        """
+        blocked = set()
+        wait = None
+        for entry in self._queue:
+            if entry.due > now and not self._closed:
+                # 入队顺序即到期顺序，之后的消息都未到期
+                wait = entry.due - now if wait is None else min(wait, entry.due - now)
+                break
+            bucket = self._bucket(entry.channel)
+            if id(bucket) in blocked:
+                continue
+            delay = bucket.take(now)
+            if delay:
+                # 该渠道暂无令牌，跳过其全部消息（保持同一用户的消息顺序），继续看其他渠道
+                blocked.add(id(bucket))
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            self._queue.remove(entry)
+            if self._open.get(entry.key) is entry:
+                del self._open[entry.key]
+            return entry, None
+        return None, wait
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not self._queue:
+                        return
+                    entry, wait = self._next_ready(time.monotonic())
+                    if entry is not None:
+                        break
+                    self._cond.wait(wait)
+            try:
+                self._send(entry.channel, entry.title, entry.text, entry.userid, **entry.kwargs)
+                self.sent += 1
+            except Exception as e:
+                logger.error(f"发送消息失败: {str(e)}")
+
+    def close(self, timeout: float = 5):
+        """发送完队列中的消息后停止后台线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
@@ -0,0 +1,133 @@
+"""
+消息原地更新
+
+Telegram/Slack 等渠道的按钮回调会带上原消息ID。按钮所在消息本身就是该操作的状态视图时
+（如离线任务列表上的刷新按钮），刷新结果直接编辑原消息，不必再发一条新消息；其余回调
+（选择搜索结果、获取资源、翻页、转存）产生的是新内容，仍以新消息发送，原列表和按钮保留，
+用户可以回到原列表继续选择。MessageUpdater 对同一条消息的更新做合并限速：
+- 距上次编辑不足最小间隔时，只保留最新内容，到时间后一次性发出，最新内容总会送达
+- 渠道不支持编辑（或编辑失败）时退回为发送新消息
+"""
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+try:
+    from .nullbr_core.message_formatter import channel_key
+except ImportError:
+    from nullbr_core.message_formatter import channel_key
+
+# 同一条消息两次编辑的最小间隔（秒），Telegram 同一会话约每秒 1 次，Slack chat.update 约每分钟 50 次
+EDIT_INTERVALS = {
+    'telegram': 1.0,
+    'slack': 1.2,
+}
+DEFAULT_EDIT_INTERVAL = 1.0
+
+# 支持编辑原消息的渠道
+EDITABLE_CHANNELS = frozenset(EDIT_INTERVALS)
+
+# 原地更新按钮所在消息的回调动作（该消息即此操作的状态视图）
+EDIT_IN_PLACE_ACTIONS = frozenset({'offline_refresh'})
+
+# 编辑函数: (标题, 文本, 按钮) -> 是否成功；发送函数: (标题, 文本, 按钮) -> None
+EditFunc = Callable[[Optional[str], str, Optional[list]], bool]
+SendFunc = Callable[[Optional[str], str, Optional[list]], None]
+
+
+def is_editable(channel) -> bool:
+    """渠道是否支持编辑原消息"""
+    return channel_key(channel) in EDITABLE_CHANNELS
+
+
+def progress_bar(done: int, total: int, width: int = 10) -> str:
+    """
+    文本进度条
+
+    :param done: 已完成数
+    :param total: 总数
+    :param width: 进度条宽度（字符数）
+    :return: 如 "▓▓▓▓░░░░░░ 4/10 (40%)"
+    """
+    ratio = min(1.0, done / total) if total else 1.0
+    filled = int(round(ratio * width))
+    return f"{'▓' * filled}{'░' * (width - filled)} {done}/{total} ({ratio:.0%})"
+
+
+class MessageUpdater:
+    """同一条消息的合并限速更新"""
+
+    def __init__(self, edit: EditFunc, send: SendFunc, min_interval: float = DEFAULT_EDIT_INTERVAL,
+                 userid: str = None):
+        """
+        :param edit: 编辑原消息的函数
+        :param send: 发送新消息的函数（编辑不可用时使用）
+        :param min_interval: 两次编辑的最小间隔（秒）
+        :param userid: 原消息所属用户，用于判断后续消息是否可以合并到原消息
+        """
+        self._edit = edit
+        self._send = send
+        self.min_interval = min_interval
+        self.userid = userid
+        self._lock = threading.Lock()
+        self._deliver_lock = threading.Lock()   # 保证按更新顺序送达
+        self._pending: Optional[Tuple[Optional[str], str, Optional[list]]] = None
+        self._timer: Optional[threading.Timer] = None
+        self._last = 0.0
+        self._editable = True
+        self.edits = 0     # 编辑次数
+        self.sent = 0      # 退回为发送新消息的次数
+
+    @classmethod
+    def for_channel(cls, channel, edit: EditFunc, send: SendFunc, userid: str = None) -> "MessageUpdater":
+        """按渠道的编辑频率限制创建"""
+        return cls(edit, send, EDIT_INTERVALS.get(channel_key(channel), DEFAULT_EDIT_INTERVAL), userid)
+
+    @property
+    def editable(self) -> bool:
+        """原消息是否仍可编辑（编辑失败后不再尝试）"""
+        return self._editable
+
+    def update(self, title: Optional[str], text: str, buttons: Optional[list] = None):
+        """
+        更新消息内容，距上次编辑不足最小间隔时延迟发送，期间的多次更新合并为最新一次
+
+        :param title: 标题
+        :param text: 文本
+        :param buttons: 按钮
+        """
+        with self._lock:
+            self._pending = (title, text, buttons)
+            if self._timer is not None:
+                return
+            wait = self._last + self.min_interval - time.monotonic()
+            if wait > 0:
+                self._timer = threading.Timer(wait, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+        self._flush()
+
+    def flush(self):
+        """立即发出待发送的内容"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self._flush()
+
+    def _flush(self):
+        with self._deliver_lock:
+            with self._lock:
+                self._timer = None
+                pending, self._pending = self._pending, None
+                if pending is None:
+                    return
+                self._last = time.monotonic()
+            title, text, buttons = pending
+            if self._editable:
+                if self._edit(title, text, buttons):
+                    self.edits += 1
+                    return
+                self._editable = False
+            self._send(title, text, buttons)
+            self.sent += 1
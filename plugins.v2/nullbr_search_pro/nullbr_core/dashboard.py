@@ -0,0 +1,228 @@
+"""
+统计面板
+
+插件详情页（get_page）展示请求速率、缓存命中率、各后端延迟、后端状态、队列深度、
+转存成功率和热门关键词。
+
+面板数据由定时任务预先生成：build_snapshot() 汇总统计数据并计算速率，build_page() 将快照
+拼装为 Vuetify 页面配置。打开详情页时直接返回最近一次生成的页面，不扫描任何缓存。
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    from .metrics import CacheStats, Metrics, Timings
+except ImportError:
+    from metrics import CacheStats, Metrics, Timings
+
+# 快照刷新间隔（秒）
+DASHBOARD_REFRESH_SECONDS = 30
+
+# 各后端的显示名称
+BACKEND_NAMES = {
+    'nullbr': 'Nullbr API',
+    'p115': '115 网盘',
+    'cd2': 'CloudDrive2',
+    'cms': 'CloudSyncMedia',
+    'message': '消息发送',
+    'handler': '消息处理',
+}
+
+# 即时值的显示名称
+GAUGE_NAMES = {
+    'outbound_queue_depth': '出站队列',
+    'search_cache_entries': '搜索结果缓存',
+    'resource_cache_entries': '资源列表缓存',
+    'page_cache_entries': '分页缓存',
+    'offline_index_entries': '离线任务索引',
+}
+
+
+def build_snapshot(stats: Metrics, timings: Timings, caches: CacheStats,
+                   gauges: Dict[str, int] = None, states: Dict[str, str] = None,
+                   previous: Optional[dict] = None) -> Dict[str, Any]:
+    """
+    生成面板快照
+
+    :param stats: 插件统计
+    :param timings: 延迟直方图
+    :param caches: 缓存命中统计
+    :param gauges: 队列深度、缓存条目数等即时值 {名称: 数值}
+    :param states: 后端状态 {名称: 状态}
+    :param previous: 上一次快照，用于计算速率
+    :return: 快照
+    """
+    now = time.time()
+    counters = stats.counters()
+
+    # 每分钟速率（与上一次快照的差值）
+    rates = {}
+    if previous:
+        elapsed = now - previous['time']
+        if elapsed > 0:
+            rates = {
+                name: max(0, value - previous['counters'].get(name, 0)) * 60 / elapsed
+                for name, value in counters.items()
+            }
+
+    searches = counters.get('successful_searches', 0) + counters.get('failed_searches', 0)
+    transfers = counters.get('successful_transfers', 0) + counters.get('failed_transfers', 0)
+    latency = timings.snapshot()
+    stages = latency['stages']
+
+    return {
+        'time': now,
+        'counters': counters,
+        'rates': rates,
+        'search_success': counters.get('successful_searches', 0) / searches if searches else None,
+        'transfer_success': counters.get('successful_transfers', 0) / transfers if transfers else None,
+        'latency': latency,
+        # Nullbr 请求路由：经代理 / 代理失败后直连
+        'routes': {
+            'proxy': stages.get('nullbr.http', {}).get('count', 0),
+            'direct': stages.get('nullbr.direct', {}).get('count', 0),
+        },
+        'caches': caches.snapshot(),
+        'gauges': dict(gauges or {}),
+        'states': dict(states or {}),
+        'top_keywords': stats.top_keywords(10),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Vuetify 页面
+# ---------------------------------------------------------------------------
+
+def _percent(value: Optional[float]) -> str:
+    return '-' if value is None else f"{value:.1%}"
+
+
+def _ms(value: float) -> str:
+    if value >= 1000:
+        return f"{value / 1000:.2f} s"
+    return f"{value:.0f} ms"
+
+
+def _stat_card(label: str, value: str) -> dict:
+    return {
+        'component': 'VCol',
+        'props': {'cols': 6, 'md': 2},
+        'content': [{
+            'component': 'VCard',
+            'props': {'variant': 'tonal'},
+            'content': [{
+                'component': 'VCardText',
+                'content': [
+                    {'component': 'div', 'props': {'class': 'text-caption'}, 'text': label},
+                    {'component': 'div', 'props': {'class': 'text-h6'}, 'text': value},
+                ]
+            }]
+        }]
+    }
+
+
+def _table(title: str, headers: List[str], rows: List[List[Any]], md: int = 6) -> dict:
+    body = [{
+        'component': 'tr',
+        'content': [{'component': 'td', 'text': str(cell)} for cell in row]
+    } for row in rows] or [{
+        'component': 'tr',
+        'content': [{'component': 'td', 'props': {'colspan': len(headers)}, 'text': '暂无数据'}]
+    }]
+    return {
+        'component': 'VCol',
+        'props': {'cols': 12, 'md': md},
+        'content': [{
+            'component': 'VCard',
+            'props': {'variant': 'outlined'},
+            'content': [
+                {'component': 'VCardTitle', 'props': {'class': 'text-subtitle-1'}, 'text': title},
+                {
+                    'component': 'VTable',
+                    'props': {'density': 'compact', 'hover': True},
+                    'content': [
+                        {
+                            'component': 'thead',
+                            'content': [{
+                                'component': 'tr',
+                                'content': [{'component': 'th', 'text': h} for h in headers]
+                            }]
+                        },
+                        {'component': 'tbody', 'content': body}
+                    ]
+                }
+            ]
+        }]
+    }
+
+
+def _latency_rows(entries: Dict[str, Dict[str, float]], names: Dict[str, str] = None) -> List[list]:
+    names = names or {}
+    return [[
+        names.get(key, key),
+        int(s['count']),
+        int(s['errors']),
+        _ms(s['p50_ms']),
+        _ms(s['p95_ms']),
+        _ms(s['p99_ms']),
+    ] for key, s in entries.items() if s['count']]
+
+
+def build_page(snapshot: Dict[str, Any]) -> List[dict]:
+    """
+    将快照拼装为 Vuetify 页面配置
+
+    :param snapshot: build_snapshot() 的结果
+    """
+    counters = snapshot['counters']
+    rates = snapshot['rates']
+    routes = snapshot['routes']
+    latency_headers = ['名称', '次数', '错误', 'p50', 'p95', 'p99']
+
+    cards = [
+        _stat_card('搜索/分钟', f"{rates.get('total_searches', 0):.1f}"),
+        _stat_card('总搜索', str(counters.get('total_searches', 0))),
+        _stat_card('搜索成功率', _percent(snapshot['search_success'])),
+        _stat_card('转存/分钟', f"{rates.get('successful_transfers', 0) + rates.get('failed_transfers', 0):.1f}"),
+        _stat_card('转存成功率', _percent(snapshot['transfer_success'])),
+        _stat_card('获取资源数', str(counters.get('total_resources', 0))),
+    ]
+
+    states = [[BACKEND_NAMES.get(name, name), state] for name, state in snapshot['states'].items()]
+    if routes['proxy'] or routes['direct']:
+        states.append(['Nullbr 路由', f"代理 {routes['proxy']} / 直连回退 {routes['direct']}"])
+
+    caches = [[name, int(c['hits']), int(c['misses']), _percent(c['ratio'])]
+              for name, c in snapshot['caches'].items()]
+
+    updated = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot['time']))
+    return [
+        {'component': 'VRow', 'content': cards},
+        {
+            'component': 'VRow',
+            'content': [
+                _table('后端延迟', latency_headers,
+                       _latency_rows(snapshot['latency']['backends'], BACKEND_NAMES), md=7),
+                _table('后端状态', ['后端', '状态'], states, md=5),
+            ]
+        },
+        {
+            'component': 'VRow',
+            'content': [
+                _table('缓存命中率', ['缓存', '命中', '未命中', '命中率'], caches),
+                _table('队列与缓存', ['名称', '数量'], [[GAUGE_NAMES.get(k, k), v] for k, v in snapshot['gauges'].items()]),
+            ]
+        },
+        {
+            'component': 'VRow',
+            'content': [
+                _table('阶段延迟', latency_headers, _latency_rows(snapshot['latency']['stages']), md=8),
+                _table('热门关键词', ['关键词', '次数'], [list(kv) for kv in snapshot['top_keywords']], md=4),
+            ]
+        },
+        {
+            'component': 'div',
+            'props': {'class': 'text-caption text-right'},
+            'text': f"更新时间: {updated}（每 {DASHBOARD_REFRESH_SECONDS} 秒刷新）"
+        },
+    ]
@@ -0,0 +1,102 @@
+"""
+渠道消息格式化
+
+企业微信应用消息对换行和段落的显示与其他渠道不同，发送前需要整理格式。
+格式化函数按渠道查表选择，并按渠道对象缓存，每次发送只做一次字典查找。
+"""
+import re
+from typing import Callable, Dict
+
+# 标题行：包含以下 emoji 且带中文冒号，前后加空行
+_TITLE_EMOJI = re.compile('[🎬🎯✅❌]')
+# 段落起始行：编号列表项、分隔符、提示信息，前面加空行
+_BLOCK_START = re.compile(r'\d+\.|【\d+】|---|💡|📋')
+
+# 渠道名称关键字 -> 渠道类型
+_CHANNEL_KEYWORDS = (
+    ('wechat', 'wechat'),
+    ('wecom', 'wechat'),
+    ('wework', 'wechat'),
+    ('telegram', 'telegram'),
+    ('slack', 'slack'),
+)
+
+
+def channel_key(channel) -> str:
+    """
+    识别消息渠道类型
+
+    :param channel: 渠道，可能是字符串或 MessageChannel 对象
+    :return: wechat/telegram/slack 等，无法识别时返回 ''
+    """
+    if channel is None:
+        return ''
+    if hasattr(channel, 'name'):
+        name = str(channel.name).lower()
+    elif hasattr(channel, 'type'):
+        name = str(channel.type).lower()
+    else:
+        name = str(channel).lower()
+    for keyword, key in _CHANNEL_KEYWORDS:
+        if keyword in name:
+            return key
+    return ''
+
+
+def format_for_wechat(text: str) -> str:
+    """
+    格式化消息以兼容微信企业应用显示
+
+    单次遍历所有行：去除行首尾空白，连续空行只保留一个，
+    标题行前后、段落起始行前补充空行
+    """
+    out = []
+    append = out.append
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            # 空行处理：连续空行只保留一个
+            if out and out[-1]:
+                append('')
+        elif '：' in line and _TITLE_EMOJI.search(line):
+            if out and out[-1]:
+                append('')
+            append(line)
+            append('')
+        elif _BLOCK_START.match(line):
+            if out and out[-1]:
+                append('')
+            append(line)
+        else:
+            append(line)
+    return '\n'.join(out)
+
+
+def _unchanged(text: str) -> str:
+    return text
+
+
+# 渠道类型 -> 格式化函数，未列出的渠道不做处理
+FORMATTERS: Dict[str, Callable[[str], str]] = {
+    'wechat': format_for_wechat,
+}
+
+# 渠道对象 -> 格式化函数
+_formatter_cache: Dict[object, Callable[[str], str]] = {}
+
+
+def get_formatter(channel) -> Callable[[str], str]:
+    """
+    获取渠道对应的格式化函数（按渠道对象缓存）
+
+    :param channel: 渠道，可能是字符串或 MessageChannel 对象
+    """
+    try:
+        return _formatter_cache[channel]
+    except KeyError:
+        formatter = FORMATTERS.get(channel_key(channel), _unchanged)
+        _formatter_cache[channel] = formatter
+        return formatter
+    except TypeError:
+        # 不可哈希的渠道对象，不缓存
+        return FORMATTERS.get(channel_key(channel), _unchanged)
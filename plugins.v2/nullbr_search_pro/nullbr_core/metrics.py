@@ -0,0 +1,435 @@
+"""
+插件统计
+
+处理函数运行在多个事件线程中，`stats['x'] += 1` 这类读-改-写操作并不是原子的。本模块提供：
+- 按线程分片的计数器：每个线程只写自己的分片，无需加锁；读取时汇总所有分片
+- 状态值（最后搜索时间、各后端状态等）：单次赋值，天然原子
+- 热门关键词：Space-Saving 算法的 Top-K 统计，内存占用固定，不随关键词数量增长
+- 缓存命中：各缓存的命中/未命中计数，见 CACHES
+- 延迟直方图：按阶段（如 nullbr.search、p115.share_receive、cd2.AddOfflineFiles）记录耗时，
+  对数分桶，可按阶段和后端（阶段名第一段）给出 p50/p95/p99
+
+计时使用 timed(stage)，既可作为上下文管理器，也可作为装饰器：
+
+    with timed("p115.share_snap"):
+        ...
+
+    @timed("nullbr.search")
+    def search(...):
+        ...
+
+capture() 可收集当前线程在一段代码内记录的全部计时，供流量录制保存每个事件的后端耗时。
+"""
+import functools
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+# 热门关键词统计容量（同时跟踪的关键词数），Top-K 结果在 K 远小于容量时足够准确
+TOP_KEYWORDS_CAPACITY = 200
+
+
+class SpaceSaving:
+    """Space-Saving Top-K 频率统计
+
+    最多跟踪 capacity 个键。新键到来且已满时替换计数最小的键，并继承其计数（记为误差上界），
+    出现频率高于 N/capacity 的键一定会被保留。
+    """
+
+    def __init__(self, capacity: int = TOP_KEYWORDS_CAPACITY):
+        self.capacity = capacity
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, key: str, count: int = 1):
+        """记录一次出现"""
+        with self._lock:
+            if key in self._counts:
+                self._counts[key] += count
+            elif len(self._counts) < self.capacity:
+                self._counts[key] = count
+                self._errors[key] = 0
+            else:
+                victim = min(self._counts, key=self._counts.__getitem__)
+                floor = self._counts.pop(victim)
+                del self._errors[victim]
+                self._counts[key] = floor + count
+                self._errors[key] = floor
+
+    def top(self, n: int = 10) -> List[Tuple[str, int]]:
+        """
+        出现次数最多的 n 个键
+
+        :return: [(键, 估计次数)]，估计次数不小于真实次数，误差不超过被替换时继承的计数
+        """
+        with self._lock:
+            items = list(self._counts.items())
+        items.sort(key=lambda kv: kv[1], reverse=True)
+        return items[:n]
+
+    def error(self, key: str) -> int:
+        """键计数的误差上界"""
+        return self._errors.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+            self._errors.clear()
+
+
+class Metrics:
+    """插件统计：线程分片计数器 + 状态值 + 热门关键词
+
+    counters: 计数器名称，incr() 累加，stats[name] 读取汇总值
+    states: 状态值及初始值，stats[name] = value 赋值
+    """
+
+    def __init__(self, counters: Tuple[str, ...] = (), states: Dict[str, Any] = None,
+                 keyword_capacity: int = TOP_KEYWORDS_CAPACITY):
+        self._counter_names = tuple(counters)
+        self._states: Dict[str, Any] = dict(states or {})
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, Dict[str, int]]] = []
+        self._retired: Dict[str, int] = {}       # 已退出线程的分片汇总
+        self._lock = threading.Lock()            # 仅在注册/回收分片时使用
+        self.keywords = SpaceSaving(keyword_capacity)
+
+    def _shard(self) -> Dict[str, int]:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def incr(self, name: str, value: int = 1):
+        """计数器累加（只写当前线程的分片）"""
+        shard = self._shard()
+        shard[name] = shard.get(name, 0) + value
+
+    def counters(self) -> Dict[str, int]:
+        """所有计数器的汇总值"""
+        with self._lock:
+            # 回收已退出线程的分片，避免分片列表随线程数增长
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    for name, value in dict(shard).items():
+                        self._retired[name] = self._retired.get(name, 0) + value
+            self._shards = alive
+            totals = dict.fromkeys(self._counter_names, 0)
+            totals.update(self._retired)
+            shards = [dict(shard) for _, shard in alive]
+        for shard in shards:
+            for name, value in shard.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def record_keyword(self, keyword: str):
+        """记录一次关键词搜索"""
+        self.keywords.add(keyword)
+
+    def top_keywords(self, n: int = 10) -> List[Tuple[str, int]]:
+        """热门关键词 [(关键词, 次数)]"""
+        return self.keywords.top(n)
+
+    def __getitem__(self, name: str):
+        if name in self._states:
+            return self._states[name]
+        return self.counters().get(name, 0)
+
+    def __setitem__(self, name: str, value):
+        """设置状态值"""
+        self._states[name] = value
+
+    def get(self, name: str, default=None):
+        if name in self._states:
+            return self._states[name]
+        return self.counters().get(name, default)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """计数器、状态值和热门关键词的快照"""
+        data: Dict[str, Any] = self.counters()
+        data.update(self._states)
+        data['popular_resources'] = dict(self.top_keywords())
+        return data
+
+
+class CacheStats:
+    """各缓存的命中/未命中计数（按线程分片）"""
+
+    def __init__(self):
+        self._metrics = Metrics()
+
+    def hit(self, name: str):
+        self._metrics.incr(f"{name}:hit")
+
+    def miss(self, name: str):
+        self._metrics.incr(f"{name}:miss")
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """{缓存名: {'hits', 'misses', 'ratio'}}"""
+        caches: Dict[str, Dict[str, float]] = {}
+        for key, value in self._metrics.counters().items():
+            name, _, kind = key.rpartition(':')
+            entry = caches.setdefault(name, {'hits': 0, 'misses': 0, 'ratio': 0.0})
+            entry['hits' if kind == 'hit' else 'misses'] += value
+        for entry in caches.values():
+            total = entry['hits'] + entry['misses']
+            entry['ratio'] = entry['hits'] / total if total else 0.0
+        return dict(sorted(caches.items()))
+
+
+# 插件内共享的缓存命中统计
+CACHES = CacheStats()
+
+
+# ---------------------------------------------------------------------------
+# 延迟直方图
+# ---------------------------------------------------------------------------
+
+# 桶边界（毫秒）：第 i 个桶的上界为 HISTOGRAM_MIN_MS * HISTOGRAM_FACTOR ** i，
+# 每档增长 2^(1/4)，相对误差约 19%，80 个桶覆盖 0.1ms ~ 105s
+HISTOGRAM_MIN_MS = 0.1
+HISTOGRAM_FACTOR = 2 ** 0.25
+HISTOGRAM_BUCKETS = 80
+_INV_LOG_FACTOR = 1 / math.log(HISTOGRAM_FACTOR)
+BUCKET_BOUNDS_MS = tuple(HISTOGRAM_MIN_MS * HISTOGRAM_FACTOR ** i for i in range(HISTOGRAM_BUCKETS))
+
+
+class Histogram:
+    """对数分桶的延迟直方图"""
+
+    __slots__ = ('counts', 'count', 'sum_ms', 'max_ms', 'errors', '_lock')
+
+    def __init__(self):
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, error: bool = False):
+        """记录一次耗时"""
+        ms = seconds * 1000
+        if ms <= HISTOGRAM_MIN_MS:
+            index = 0
+        else:
+            index = min(HISTOGRAM_BUCKETS - 1, int(math.log(ms / HISTOGRAM_MIN_MS) * _INV_LOG_FACTOR) + 1)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+            if error:
+                self.errors += 1
+
+    def merge(self, other: "Histogram"):
+        """合并另一个直方图"""
+        with other._lock:
+            counts = list(other.counts)
+            count, sum_ms, max_ms, errors = other.count, other.sum_ms, other.max_ms, other.errors
+        with self._lock:
+            self.counts = [a + b for a, b in zip(self.counts, counts)]
+            self.count += count
+            self.sum_ms += sum_ms
+            self.max_ms = max(self.max_ms, max_ms)
+            self.errors += errors
+
+    def read(self) -> Tuple[List[int], int, float, int]:
+        """一致的读取：(各桶计数, 总数, 耗时总和ms, 错误数)"""
+        with self._lock:
+            return list(self.counts), self.count, self.sum_ms, self.errors
+
+    def percentile(self, pct: float) -> float:
+        """
+        百分位延迟（毫秒）
+
+        :return: 在所在桶内按排名线性插值（不超过观测到的最大值），无数据时返回 0
+        """
+        with self._lock:
+            counts = list(self.counts)
+            total = self.count
+            max_ms = self.max_ms
+        if not total:
+            return 0.0
+        rank = max(1, math.ceil(total * pct / 100))
+        seen = 0
+        for index, n in enumerate(counts):
+            if seen + n >= rank:
+                lower = BUCKET_BOUNDS_MS[index - 1] if index else 0.0
+                upper = BUCKET_BOUNDS_MS[index]
+                return min(lower + (upper - lower) * (rank - seen) / n, max_ms)
+            seen += n
+        return max_ms
+
+    def snapshot(self) -> Dict[str, float]:
+        """计数、错误数、平均/最大值和 p50/p95/p99（毫秒）"""
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': self.sum_ms / self.count if self.count else 0.0,
+            'max_ms': self.max_ms,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+        }
+
+
+class _CaptureLocal(threading.local):
+    calls = None
+
+
+# 当前线程的计时捕获列表，见 capture()
+_capture = _CaptureLocal()
+# 进行中的捕获数（所有线程），为 0 时计时路径只做一次整数判断
+_capturing = 0
+_capturing_lock = threading.Lock()
+
+
+class capture:
+    """
+    捕获当前线程内记录的计时（供流量录制使用）
+
+        with capture() as calls:
+            handler(...)
+        # calls: [(阶段, 秒, 是否出错), ...]
+    """
+
+    __slots__ = ('calls', '_outer')
+
+    def __enter__(self) -> List[Tuple[str, float, bool]]:
+        global _capturing
+        with _capturing_lock:
+            _capturing += 1
+        self._outer = _capture.calls
+        self.calls = _capture.calls = []
+        return self.calls
+
+    def __exit__(self, exc_type, exc, tb):
+        global _capturing
+        _capture.calls = self._outer
+        with _capturing_lock:
+            _capturing -= 1
+        return False
+
+
+def _captured(stage: str, seconds: float, error: bool):
+    calls = _capture.calls
+    if calls is not None:
+        calls.append((stage, seconds, error))
+
+
+class _Timed:
+    """timed() 的返回值：上下文管理器或装饰器"""
+
+    __slots__ = ('_hist', '_stage', '_start')
+
+    def __init__(self, hist: Histogram, stage: str = ''):
+        self._hist = hist
+        self._stage = stage
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        self._hist.record(seconds, exc_type is not None)
+        if _capturing:
+            _captured(self._stage, seconds, exc_type is not None)
+        return False
+
+    def __call__(self, func: Callable) -> Callable:
+        hist = self._hist
+        stage = self._stage
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                seconds = time.perf_counter() - start
+                hist.record(seconds, True)
+                if _capturing:
+                    _captured(stage, seconds, True)
+                raise
+            seconds = time.perf_counter() - start
+            hist.record(seconds)
+            if _capturing:
+                _captured(stage, seconds, False)
+            return result
+
+        return wrapper
+
+
+class Timings:
+    """按阶段登记的延迟直方图"""
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        """获取阶段的直方图，不存在时创建"""
+        hist = self._histograms.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(stage, Histogram())
+        return hist
+
+    def record(self, stage: str, seconds: float, error: bool = False):
+        """记录一次耗时"""
+        self.histogram(stage).record(seconds, error)
+
+    def timed(self, stage: str) -> _Timed:
+        """计时上下文管理器/装饰器"""
+        return _Timed(self.histogram(stage), stage)
+
+    def stages(self) -> Dict[str, Histogram]:
+        """所有阶段的直方图"""
+        with self._lock:
+            return dict(self._histograms)
+
+    def backends(self) -> Dict[str, Histogram]:
+        """按后端（阶段名第一段）合并的直方图"""
+        merged: Dict[str, Histogram] = {}
+        for stage, hist in self.stages().items():
+            backend = stage.split('.', 1)[0]
+            merged.setdefault(backend, Histogram()).merge(hist)
+        return merged
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """{'stages': {阶段: 统计}, 'backends': {后端: 统计}}"""
+        return {
+            'stages': {stage: hist.snapshot() for stage, hist in sorted(self.stages().items())},
+            'backends': {backend: hist.snapshot() for backend, hist in sorted(self.backends().items())},
+        }
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+# 插件内共享的计时登记表，客户端模块和插件处理函数都记录到这里
+TIMINGS = Timings()
+
+
+def timed(stage: str) -> _Timed:
+    """
+    计时上下文管理器/装饰器，记录到 TIMINGS
+
+    :param stage: 阶段名，第一段为后端名，如 "nullbr.search"、"cd2.AddOfflineFiles"
+    """
+    return TIMINGS.timed(stage)
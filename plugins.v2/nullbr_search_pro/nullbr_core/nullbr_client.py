@@ -0,0 +1,479 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Optional, Tuple
+from app.log import logger
+
+try:
+    from .commands import RESOURCE_TYPES
+    from .metrics import CACHES, TIMINGS, timed
+    from .session_store import SessionStore
+except ImportError:
+    from commands import RESOURCE_TYPES
+    from metrics import CACHES, TIMINGS, timed
+    from session_store import SessionStore
+
+# 请求限速：平均每秒请求数与允许的突发请求数（同一客户端的所有请求共用）
+NULLBR_RATE = 10.0
+NULLBR_BURST = 20
+
+# 无结果缓存有效期（秒）：期间重复的无结果搜索/资源查询直接返回，不再请求 API
+NEGATIVE_CACHE_TTL = 300
+
+# 影片详情缓存有效期（秒）：详情中的资源标记和季数变化很慢
+METADATA_CACHE_TTL = 6 * 3600
+
+# 用户请求的搜索结果与资源列表缓存有效期（秒），只在开启缓存预热时缓存（enable_result_cache）
+RESULT_CACHE_TTL = 10 * 60
+
+# 缓存预热（cache_warmer）写入的结果有效期（秒），需覆盖预热时段到晚间使用高峰的间隔
+WARM_CACHE_TTL = 6 * 3600
+
+
+class RateLimiter:
+    """令牌桶限速：平均每秒 rate 次，最多 burst 次突发"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._time = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> float:
+        """
+        取得一个令牌，没有可用令牌时等待（先到先得）
+        
+        :return: 等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._time) * self.rate)
+            self._time = now
+            # 令牌可以预支为负数，等待时间即补足所需的时间，各线程在锁外各自等待
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class NullbrApiClient:
+    """Nullbr API客户端"""
+    
+    def __init__(self, app_id: str, api_key: str = None):
+        self._app_id = app_id
+        self._api_key = api_key
+        self._base_url = "https://api.nullbr.eu.org"
+        
+        # 确认无结果的查询：('search', 关键词, 页码) / (movie|tv, TMDB ID, 资源类型)
+        # 只记录 API 明确返回空结果或 404 的查询，网络错误、限流等失败不缓存
+        self._misses = SessionStore(ttl=NEGATIVE_CACHE_TTL)
+        # 影片详情：(movie|tv, TMDB ID) -> {'data': 详情}
+        self._metadata = SessionStore(ttl=METADATA_CACHE_TTL)
+        # 有结果的查询（键同 _misses）-> {'data': 响应}，用户请求的结果与预热的结果分开保存，有效期不同
+        # 默认不缓存，开启缓存预热时由插件调用 enable_result_cache 启用
+        self._cache_results = False
+        self._results = SessionStore(ttl=RESULT_CACHE_TTL)
+        self._warmed = SessionStore(ttl=WARM_CACHE_TTL)
+        
+        # 请求限速（批量查询并发请求时避免触发 API 的 429 限流）
+        self._limiter = RateLimiter(NULLBR_RATE, NULLBR_BURST)
+        
+        # 配置请求会话
+        self._session = requests.Session()
+        self._session.headers.update({
+            'User-Agent': 'MoviePilot-NullbrSearch/1.0.4',
+            'Content-Type': 'application/json'
+        })
+        
+        # 配置重试策略
+        try:
+            retry_strategy = Retry(
+                total=3,
+                status_forcelist=[429, 500, 502, 503, 504, 408],
+                backoff_factor=1,
+                allowed_methods=["HEAD", "GET", "OPTIONS"]
+            )
+            
+            adapter = HTTPAdapter(max_retries=retry_strategy)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        except Exception as e:
+            logger.warning(f"重试策略配置失败: {str(e)}")
+    
+    def close(self):
+        """关闭连接池"""
+        self._session.close()
+    
+    def enable_result_cache(self, enabled: bool):
+        """
+        开启或关闭有结果查询的缓存（无结果查询的缓存始终开启）
+
+        :param enabled: 是否开启，关闭时清空已缓存的结果
+        """
+        self._cache_results = enabled
+        if not enabled:
+            self._results.clear()
+            self._warmed.clear()
+    
+    def forget_title(self, media_type: str, tmdbid: int):
+        """清除一部影片的详情和各类型资源列表的缓存（含无结果记录），下次查询时重新请求"""
+        self._metadata.pop((media_type, tmdbid))
+        self._misses.pop(('info', media_type, tmdbid))
+        for resource_type in RESOURCE_TYPES:
+            key = (media_type, tmdbid, resource_type)
+            self._results.pop(key)
+            self._warmed.pop(key)
+            self._misses.pop(key)
+    
+    def _make_request(self, url: str, params: dict, headers: dict, use_proxy: bool = True) -> requests.Response:
+        """发起HTTP请求，支持代理重试机制"""
+        session = self._session
+        
+        # 如果不使用代理，创建临时session
+        if not use_proxy:
+            session = requests.Session()
+            session.headers.update(self._session.headers)
+            session.proxies = {'http': None, 'https': None}
+        
+        timeout = 5 if use_proxy else (10, 30)
+        
+        waited = self._limiter.acquire()
+        if waited:
+            TIMINGS.record("limiter.nullbr", waited)
+        
+        # 直连重试单独计时，便于区分代理与直连的延迟
+        with timed("nullbr.http" if use_proxy else "nullbr.direct"):
+            return session.get(url, params=params, headers=headers, timeout=timeout)
+    
+    def _known_miss(self, key: tuple) -> bool:
+        """查询是否在近期确认过无结果"""
+        if key in self._misses:
+            CACHES.hit("nullbr.negative")
+            logger.info(f"近期已确认无结果，跳过请求: {key}")
+            return True
+        CACHES.miss("nullbr.negative")
+        return False
+    
+    def _cached(self, key: tuple, refresh: bool):
+        """
+        查询缓存
+
+        :return: (是否命中, 缓存的响应)，确认无结果时响应为 None
+        """
+        if refresh:
+            return False, None
+        if self._cache_results:
+            entry = self._results.get(key) or self._warmed.get(key)
+            if entry is not None:
+                CACHES.hit("nullbr.results")
+                return True, entry['data']
+            CACHES.miss("nullbr.results")
+        return self._known_miss(key), None
+    
+    def _remember(self, key: tuple, result: Optional[Dict], found: bool, warm: bool = False):
+        """
+        记录请求结果：有结果的缓存响应（开启结果缓存时），确认无结果的记入 _misses，请求失败时保留原缓存
+
+        :param warm: 是否为缓存预热的请求，结果按 WARM_CACHE_TTL 保存
+        """
+        if result is None:
+            return
+        if not found:
+            self._remember_miss(key)
+        elif self._cache_results:
+            # 新结果替换另一份缓存中的旧结果，避免用户刷新后的结果过期时又读到更早的预热结果
+            store, other = (self._warmed, self._results) if warm else (self._results, self._warmed)
+            other.pop(key)
+            store.put(key, data=result)
+    
+    def _remember_miss(self, key: tuple):
+        self._results.pop(key)
+        self._warmed.pop(key)
+        self._misses.put(key)
+    
+    def search(self, query: str, page: int = 1, refresh: bool = False, warm: bool = False) -> Optional[Dict]:
+        """
+        搜索媒体资源（开启结果缓存时带缓存，近期无结果的关键词直接返回空结果）
+
+        :param refresh: 忽略缓存重新请求，并用新结果更新缓存
+        :param warm: 缓存预热的请求（同时忽略缓存），结果按 WARM_CACHE_TTL 保存
+        """
+        key = ('search', query, page)
+        hit, cached = self._cached(key, refresh or warm)
+        if hit:
+            return cached if cached is not None else {'items': []}
+        result = self._search(query, page)
+        self._remember(key, result, bool(result and result.get('items')), warm)
+        return result
+    
+    def get_movie_resources(self, tmdbid: int, resource_type: str = "115", refresh: bool = False,
+                            warm: bool = False) -> Optional[Dict]:
+        """获取电影资源链接（开启结果缓存时带缓存，近期无该类型资源的影片直接返回 None）"""
+        return self._get_resources('movie', tmdbid, resource_type, self._get_movie_resources, refresh, warm)
+    
+    def get_tv_resources(self, tmdbid: int, resource_type: str = "115", refresh: bool = False,
+                         warm: bool = False) -> Optional[Dict]:
+        """获取剧集资源链接（开启结果缓存时带缓存，近期无该类型资源的剧集直接返回 None）"""
+        return self._get_resources('tv', tmdbid, resource_type, self._get_tv_resources, refresh, warm)
+    
+    def get_movie_info(self, tmdbid: int) -> Optional[Dict]:
+        """获取电影详情（含各类型资源标记 <类型>-flg），带缓存"""
+        return self._get_info('movie', tmdbid)
+    
+    def get_tv_info(self, tmdbid: int) -> Optional[Dict]:
+        """获取剧集详情（含各类型资源标记 <类型>-flg 和 number_of_seasons），带缓存"""
+        return self._get_info('tv', tmdbid)
+    
+    def _get_info(self, media_type: str, tmdbid: int) -> Optional[Dict]:
+        key = (media_type, tmdbid)
+        entry = self._metadata.get(key)
+        if entry is not None:
+            CACHES.hit("nullbr.metadata")
+            return entry['data']
+        CACHES.miss("nullbr.metadata")
+        if self._known_miss(('info',) + key):
+            return None
+        result = self._fetch_info(media_type, tmdbid)
+        if result is not None:
+            self._metadata.put(key, data=result)
+        return result
+    
+    @timed("nullbr.metadata")
+    def _fetch_info(self, media_type: str, tmdbid: int) -> Optional[Dict]:
+        try:
+            headers = {'X-APP-ID': self._app_id}
+            if self._api_key:
+                headers['X-API-KEY'] = self._api_key
+            url = f"{self._base_url}/{media_type}/{tmdbid}"
+            
+            # 首先尝试使用系统代理
+            try:
+                response = self._make_request(url, {}, headers, use_proxy=True)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectTimeout, 
+                   requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as e:
+                logger.warning(f"系统代理访问失败: {str(e)}，尝试直连")
+                response = self._make_request(url, {}, headers, use_proxy=False)
+            
+            response.raise_for_status()
+            result = response.json()
+            logger.debug(f"获取详情成功: {media_type} TMDB={tmdbid}")
+            return result
+            
+        except requests.exceptions.HTTPError as e:
+            if response.status_code == 404:
+                logger.warning(f"未找到详情: {media_type} TMDB={tmdbid}")
+                self._misses.put(('info', media_type, tmdbid))
+            else:
+                logger.error(f"获取详情失败: {e}")
+            return None
+            
+        except Exception as e:
+            logger.error(f"获取详情异常: {str(e)}")
+            return None
+    
+    def _get_resources(self, media_type: str, tmdbid: int, resource_type: str, fetch,
+                       refresh: bool = False, warm: bool = False) -> Optional[Dict]:
+        if not self._api_key:
+            logger.warning("获取资源链接需要API_KEY")
+            return None
+        key = (media_type, tmdbid, resource_type)
+        hit, cached = self._cached(key, refresh or warm)
+        if hit:
+            return cached
+        result = fetch(tmdbid, resource_type)
+        self._remember(key, result, bool(result and result.get(resource_type)), warm)
+        return result
+    
+    @timed("nullbr.search")
+    def _search(self, query: str, page: int = 1) -> Optional[Dict]:
+        try:
+            headers = {'X-APP-ID': self._app_id}
+            
+            if self._api_key:
+                headers['X-API-KEY'] = self._api_key
+            
+            params = {
+                'query': query,
+                'page': page
+            }
+            
+            logger.info(f"搜索请求: {query}")
+            logger.debug(f"请求参数: {params}")
+            logger.debug(f"请求头: X-APP-ID={self._app_id}, X-API-KEY={'已设置' if self._api_key else '未设置'}")
+            
+            url = f"{self._base_url}/search"
+            
+            # 首先尝试使用系统代理
+            try:
+                logger.debug("尝试使用系统代理访问Nullbr API")
+                response = self._make_request(url, params, headers, use_proxy=True)
+                logger.info(f"使用系统代理请求成功，状态码: {response.status_code}")
+                
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectTimeout, 
+                   requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as e:
+                logger.warning(f"系统代理访问失败: {str(e)}，尝试直连")
+                try:
+                    response = self._make_request(url, params, headers, use_proxy=False)
+                    logger.info(f"直连请求成功，状态码: {response.status_code}")
+                    
+                except Exception as direct_error:
+                    logger.error(f"直连也失败: {str(direct_error)}")
+                    raise direct_error
+            
+            # 检查响应状态
+            response.raise_for_status()
+            
+            # 解析JSON响应
+            result = response.json()
+            logger.info(f"搜索完成，找到 {len(result.get('items', []))} 个结果")
+            
+            return result
+            
+        except requests.exceptions.HTTPError as e:
+            if response.status_code == 401:
+                logger.error("API认证失败，请检查APP_ID和API_KEY")
+            elif response.status_code == 403:
+                logger.error("API访问被禁止，请检查权限")
+            elif response.status_code == 429:
+                logger.error("API请求频率超限，请稍后再试")
+            else:
+                logger.error(f"HTTP错误: {e}")
+            return None
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"网络请求失败: {str(e)}")
+            return None
+            
+        except Exception as e:
+            logger.error(f"搜索异常: {str(e)}")
+            return None
+    
+    @timed("nullbr.movie_resources")
+    def _get_movie_resources(self, tmdbid: int, resource_type: str) -> Optional[Dict]:
+        try:
+            headers = {'X-APP-ID': self._app_id, 'X-API-KEY': self._api_key}
+            url = f"{self._base_url}/movie/{tmdbid}/{resource_type}"
+            
+            # 首先尝试使用系统代理
+            try:
+                logger.debug("尝试使用系统代理获取电影资源")
+                response = self._make_request(url, {}, headers, use_proxy=True)
+                logger.info(f"使用系统代理请求成功，状态码: {response.status_code}")
+                
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectTimeout, 
+                   requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as e:
+                logger.warning(f"系统代理访问失败: {str(e)}，尝试直连")
+                try:
+                    response = self._make_request(url, {}, headers, use_proxy=False)
+                    logger.info(f"直连请求成功，状态码: {response.status_code}")
+                    
+                except Exception as direct_error:
+                    logger.error(f"直连也失败: {str(direct_error)}")
+                    raise direct_error
+            
+            response.raise_for_status()
+            result = response.json()
+            
+            logger.info(f"获取电影资源成功: TMDB={tmdbid}, 类型={resource_type}")
+            return result
+            
+        except requests.exceptions.HTTPError as e:
+            if response.status_code == 404:
+                logger.warning(f"未找到电影资源: TMDB={tmdbid}, 类型={resource_type}")
+                self._remember_miss(('movie', tmdbid, resource_type))
+            else:
+                logger.error(f"获取电影资源失败: {e}")
+            return None
+            
+        except Exception as e:
+            logger.error(f"获取电影资源异常: {str(e)}")
+            return None
+    
+    @timed("nullbr.tv_resources")
+    def _get_tv_resources(self, tmdbid: int, resource_type: str) -> Optional[Dict]:
+        try:
+            headers = {'X-APP-ID': self._app_id, 'X-API-KEY': self._api_key}
+            url = f"{self._base_url}/tv/{tmdbid}/{resource_type}"
+            
+            # 首先尝试使用系统代理
+            try:
+                logger.debug("尝试使用系统代理获取剧集资源")
+                response = self._make_request(url, {}, headers, use_proxy=True)
+                logger.info(f"使用系统代理请求成功，状态码: {response.status_code}")
+                
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectTimeout, 
+                   requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as e:
+                logger.warning(f"系统代理访问失败: {str(e)}，尝试直连")
+                try:
+                    response = self._make_request(url, {}, headers, use_proxy=False)
+                    logger.info(f"直连请求成功，状态码: {response.status_code}")
+                    
+                except Exception as direct_error:
+                    logger.error(f"直连也失败: {str(direct_error)}")
+                    raise direct_error
+            
+            response.raise_for_status()
+            result = response.json()
+            
+            logger.info(f"获取剧集资源成功: TMDB={tmdbid}, 类型={resource_type}")
+            return result
+            
+        except requests.exceptions.HTTPError as e:
+            if response.status_code == 404:
+                logger.warning(f"未找到剧集资源: TMDB={tmdbid}, 类型={resource_type}")
+                self._remember_miss(('tv', tmdbid, resource_type))
+            else:
+                logger.error(f"获取剧集资源失败: {e}")
+            return None
+            
+        except Exception as e:
+            logger.error(f"获取剧集资源异常: {str(e)}")
+            return None
+
+
+# 共享客户端：插件内同一 APP_ID/API_KEY 共用一个客户端（连接池），按引用计数在最后一个使用者归还时关闭
+_shared_clients: Dict[Tuple[str, Optional[str]], NullbrApiClient] = {}
+_shared_refs: Dict[Tuple[str, Optional[str]], int] = {}
+_shared_lock = threading.Lock()
+
+
+def acquire_client(app_id: str, api_key: str = None) -> NullbrApiClient:
+    """
+    获取共享的 Nullbr 客户端，用完后调用 release_client 归还
+
+    :param app_id: APP_ID
+    :param api_key: API_KEY
+    """
+    key = (app_id, api_key or None)
+    with _shared_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = _shared_clients[key] = NullbrApiClient(app_id, api_key)
+            _shared_refs[key] = 0
+        _shared_refs[key] += 1
+        return client
+
+
+def release_client(client: NullbrApiClient):
+    """
+    归还共享客户端，没有其他使用者时关闭连接池
+
+    :param client: acquire_client 返回的客户端
+    """
+    if client is None:
+        return
+    key = (client._app_id, client._api_key or None)
+    with _shared_lock:
+        if _shared_clients.get(key) is not client:
+            return
+        _shared_refs[key] -= 1
+        if _shared_refs[key] > 0:
+            return
+        del _shared_clients[key]
+        del _shared_refs[key]
+    client.close()
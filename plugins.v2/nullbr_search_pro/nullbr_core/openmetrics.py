@@ -0,0 +1,194 @@
+"""
+OpenMetrics 导出
+
+将插件统计以 OpenMetrics 文本格式导出，供 Prometheus 等监控系统通过 get_api 注册的
+/metrics 接口抓取：
+- nullbr_events_total          插件计数器（搜索、转存等），标签 event
+- nullbr_cache_requests_total  缓存命中/未命中，标签 cache、result
+- nullbr_<gauge>               队列深度、缓存条目数等即时值
+- nullbr_backend_info          后端状态，标签 backend、state
+- nullbr_stage_duration_seconds / nullbr_stage_errors_total
+                               各阶段（Nullbr、115、CD2 调用及消息发送）的延迟直方图和错误数，标签 stage
+
+序列化是增量的：每个阶段直方图的文本按其记录次数缓存，两次抓取之间没有新记录的阶段直接复用
+上一次的文本；计数器和缓存统计同样在数值不变时复用。所有序列都带 plugin 标签，两个插件的
+指标可以由同一个抓取任务汇总。
+"""
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from .metrics import BUCKET_BOUNDS_MS, HISTOGRAM_BUCKETS, CacheStats, Metrics, Timings
+except ImportError:
+    from metrics import BUCKET_BOUNDS_MS, HISTOGRAM_BUCKETS, CacheStats, Metrics, Timings
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+METRIC_PREFIX = "nullbr"
+
+# 导出的直方图桶：每 4 个内部桶取一个边界（逐档翻倍，约 0.17ms ~ 44s 共 19 档）
+EXPORT_BUCKET_STEP = 4
+# 最后一个内部桶同时容纳超出上界的值，归入 +Inf
+_EXPORT_BUCKETS = tuple(range(EXPORT_BUCKET_STEP - 1, HISTOGRAM_BUCKETS - 1, EXPORT_BUCKET_STEP))
+_EXPORT_LE = tuple(f"{BUCKET_BOUNDS_MS[i] / 1000:.6g}" for i in _EXPORT_BUCKETS)
+
+_INVALID_NAME = re.compile(r'[^a-zA-Z0-9_]')
+
+# 即时值提供函数: () -> (即时值 {名称: 数值}, 后端状态 {后端: 状态})
+GaugeFunc = Callable[[], Tuple[Dict[str, float], Dict[str, str]]]
+
+
+def escape_label(value) -> str:
+    """转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def metric_name(name: str) -> str:
+    """将任意名称转换为合法的指标名片段"""
+    return _INVALID_NAME.sub('_', name).strip('_').lower()
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class OpenMetricsExporter:
+    """插件统计的 OpenMetrics 导出器（带增量序列化缓存）"""
+
+    def __init__(self, plugin: str, stats: Metrics, timings: Timings, caches: CacheStats,
+                 gauges: Optional[GaugeFunc] = None, prefix: str = METRIC_PREFIX):
+        """
+        :param plugin: 插件名，作为所有序列的 plugin 标签
+        :param stats: 插件统计
+        :param timings: 延迟直方图
+        :param caches: 缓存命中统计
+        :param gauges: 即时值提供函数
+        :param prefix: 指标名前缀
+        """
+        self._stats = stats
+        self._timings = timings
+        self._caches = caches
+        self._gauges = gauges
+        self.prefix = prefix
+        self._base = f'plugin="{escape_label(plugin)}"'
+        self._lock = threading.Lock()
+        # 增量缓存 {键: (版本, 文本)}
+        self._stage_text: Dict[str, Tuple[int, str]] = {}
+        self._counter_text: Tuple[Optional[tuple], str] = (None, '')
+        self._cache_text: Tuple[Optional[tuple], str] = (None, '')
+        # 统计：完整渲染和复用的直方图数量
+        self.rendered = 0
+        self.reused = 0
+
+    # 各指标族 -----------------------------------------------------------------
+
+    def _counters(self) -> str:
+        counters = self._stats.counters()
+        version = tuple(sorted(counters.items()))
+        cached_version, text = self._counter_text
+        if version == cached_version:
+            return text
+        name = f"{self.prefix}_events"
+        lines = [f"# HELP {name} Plugin events (searches, transfers, resources).", f"# TYPE {name} counter"]
+        for event, value in version:
+            lines.append(f'{name}_total{{{self._base},event="{escape_label(event)}"}} {_number(value)}')
+        text = '\n'.join(lines) + '\n'
+        self._counter_text = (version, text)
+        return text
+
+    def _cache_requests(self) -> str:
+        caches = self._caches.snapshot()
+        version = tuple((cache, c['hits'], c['misses']) for cache, c in caches.items())
+        cached_version, text = self._cache_text
+        if version == cached_version:
+            return text
+        name = f"{self.prefix}_cache_requests"
+        lines = [f"# HELP {name} Cache lookups by result.", f"# TYPE {name} counter"]
+        for cache, hits, misses in version:
+            label = f'{self._base},cache="{escape_label(cache)}"'
+            lines.append(f'{name}_total{{{label},result="hit"}} {_number(hits)}')
+            lines.append(f'{name}_total{{{label},result="miss"}} {_number(misses)}')
+        text = '\n'.join(lines) + '\n'
+        self._cache_text = (version, text)
+        return text
+
+    def _gauges_and_states(self) -> str:
+        if self._gauges is None:
+            return ''
+        gauges, states = self._gauges()
+        lines: List[str] = []
+        for gauge, value in sorted(gauges.items()):
+            name = f"{self.prefix}_{metric_name(gauge)}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{{{self._base}}} {_number(value)}")
+        if states:
+            name = f"{self.prefix}_backend"
+            lines.append(f"# HELP {name} Backend connection state.")
+            lines.append(f"# TYPE {name} info")
+            for backend, state in sorted(states.items()):
+                lines.append(f'{name}_info{{{self._base},backend="{escape_label(backend)}",'
+                             f'state="{escape_label(state)}"}} 1')
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def _stage(self, stage: str, hist) -> Tuple[str, str]:
+        """单个阶段的 (直方图文本, 错误数文本)，记录次数不变时复用"""
+        count = hist.count
+        cached = self._stage_text.get(stage)
+        if cached is not None and cached[0] == count:
+            self.reused += 1
+            return cached[1]
+        counts, count, sum_ms, errors = hist.read()
+        name = f"{self.prefix}_stage_duration_seconds"
+        label = f'{self._base},stage="{escape_label(stage)}"'
+        lines = []
+        cumulative = 0
+        start = 0
+        for index, le in zip(_EXPORT_BUCKETS, _EXPORT_LE):
+            cumulative += sum(counts[start:index + 1])
+            start = index + 1
+            lines.append(f'{name}_bucket{{{label},le="{le}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{label},le="+Inf"}} {count}')
+        lines.append(f'{name}_count{{{label}}} {count}')
+        lines.append(f'{name}_sum{{{label}}} {repr(sum_ms / 1000)}')
+        text = ('\n'.join(lines) + '\n',
+                f'{self.prefix}_stage_errors_total{{{label}}} {errors}\n')
+        self._stage_text[stage] = (count, text)
+        self.rendered += 1
+        return text
+
+    def _stages(self) -> str:
+        stages = sorted(self._timings.stages().items())
+        if not stages:
+            return ''
+        durations, errors = [], []
+        for stage, hist in stages:
+            duration, error = self._stage(stage, hist)
+            durations.append(duration)
+            errors.append(error)
+        name = f"{self.prefix}_stage_duration_seconds"
+        errors_name = f"{self.prefix}_stage_errors"
+        return ''.join([
+            f"# HELP {name} Latency of backend calls and handlers by stage.\n",
+            f"# TYPE {name} histogram\n",
+            f"# UNIT {name} seconds\n",
+            *durations,
+            f"# HELP {errors_name} Failed calls by stage.\n",
+            f"# TYPE {errors_name} counter\n",
+            *errors,
+        ])
+
+    # 导出 ---------------------------------------------------------------------
+
+    def render(self) -> str:
+        """生成完整的 OpenMetrics 文本（以 # EOF 结尾）"""
+        with self._lock:
+            return ''.join((
+                self._counters(),
+                self._cache_requests(),
+                self._gauges_and_states(),
+                self._stages(),
+                "# EOF\n",
+            ))
@@ -0,0 +1,170 @@
+"""
+离线任务去重索引
+
+按资源哈希（磁力 infohash / ED2K 文件哈希）记录已提交的离线任务，
+重复提交同一资源时可直接返回已有任务的进度，不再消耗离线配额。
+
+索引来源：
+- 插件提交离线任务成功后写入
+- /nullbr_offline 或去重检查时从 CloudDrive2 离线列表（OfflineFile.infoHash/url）同步
+"""
+import base64
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+# magnet:?xt=urn:btih:<40位十六进制 或 32位 Base32>
+_BTIH_PATTERN = re.compile(r'xt=urn:btih:([0-9a-zA-Z]{32,40})', re.IGNORECASE)
+# ed2k://|file|名称|大小|哈希|/
+_ED2K_PATTERN = re.compile(r'^ed2k://\|file\|[^|]*\|\d+\|([0-9a-fA-F]{32})\|', re.IGNORECASE)
+
+
+def parse_resource_hash(url: str) -> Optional[str]:
+    """
+    从磁力/ED2K 链接中提取资源哈希
+
+    :param url: 磁力或 ED2K 链接
+    :return: 'btih:<40位小写十六进制>' 或 'ed2k:<32位小写十六进制>'，无法解析时返回 None
+    """
+    if not url:
+        return None
+    url = url.strip()
+
+    match = _BTIH_PATTERN.search(url)
+    if match:
+        infohash = match.group(1)
+        if len(infohash) == 32:
+            # Base32 编码的 infohash 转为十六进制
+            try:
+                infohash = base64.b32decode(infohash.upper()).hex()
+            except Exception:
+                return None
+        elif len(infohash) != 40:
+            return None
+        return f"btih:{infohash.lower()}"
+
+    match = _ED2K_PATTERN.match(url)
+    if match:
+        return f"ed2k:{match.group(1).lower()}"
+
+    return None
+
+
+def normalize_timestamp(value) -> float:
+    """
+    将 OfflineFile.add_time 等时间戳统一为秒
+
+    不同 CloudDrive2 版本/云盘返回秒或毫秒（甚至微秒），按数量级换算；缺失、非法或晚于当前时间的值
+    视为当前时间
+
+    :param value: 时间戳
+    :return: Unix 时间（秒）
+    """
+    now = time.time()
+    try:
+        value = float(value or 0)
+    except (TypeError, ValueError):
+        return now
+    # 秒级时间戳在 5138 年之前都小于 1e11
+    while value > 1e11:
+        value /= 1000
+    if value <= 0 or value > now:
+        return now
+    return value
+
+
+def normalize_infohash(infohash: str) -> Optional[str]:
+    """将 OfflineFile.infoHash 字段规范化为索引键"""
+    if not infohash:
+        return None
+    infohash = infohash.strip().lower()
+    if len(infohash) == 40:
+        return f"btih:{infohash}"
+    if len(infohash) == 32:
+        return f"ed2k:{infohash}"
+    return None
+
+
+class OfflineIndex:
+    """离线任务去重索引
+
+    entries: {资源哈希: {'title': 资源名称, 'time': 提交时间（秒）}}，按加入索引的先后排列
+    progress: 最近一次离线列表同步得到的任务快照 {资源哈希: OfflineFile}，不持久化
+    """
+
+    # 最多保留的索引条目数，超出时淘汰最早加入索引的条目
+    MAX_ENTRIES = 5000
+
+    def __init__(self, entries: Dict[str, dict] = None):
+        # 载入时统一时间单位并按提交时间排序一次，之后按插入顺序淘汰
+        loaded = [(key, {**entry, 'time': normalize_timestamp(entry.get('time'))})
+                  for key, entry in (entries or {}).items()]
+        loaded.sort(key=lambda kv: kv[1]['time'])
+        self._entries: "OrderedDict[str, dict]" = OrderedDict(loaded)
+        self._evict()
+        self._progress: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        """获取索引条目"""
+        return self._entries.get(key)
+
+    def _evict(self):
+        """淘汰超出 MAX_ENTRIES 的最早条目（调用方持有锁或在构造期间）"""
+        while len(self._entries) > self.MAX_ENTRIES:
+            self._entries.popitem(last=False)
+
+    def add(self, key: str, title: str = "", added: float = None):
+        """记录已提交的资源"""
+        with self._lock:
+            self._entries[key] = {'title': title, 'time': normalize_timestamp(added)}
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def remove(self, key: str):
+        """移除索引条目（对应任务已不在离线列表中）"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._progress.pop(key, None)
+
+    def sync(self, offline_files: Iterable) -> int:
+        """
+        从 CloudDrive2 离线列表同步索引和任务进度快照
+
+        :param offline_files: OfflineFile 列表
+        :return: 新增的索引条目数
+        """
+        progress = {}
+        for task in offline_files:
+            key = normalize_infohash(getattr(task, 'infoHash', '')) \
+                or parse_resource_hash(getattr(task, 'url', ''))
+            if key:
+                progress[key] = task
+
+        added = 0
+        with self._lock:
+            self._progress = progress
+            for key, task in progress.items():
+                if key not in self._entries:
+                    added_time = normalize_timestamp(getattr(task, 'add_time', 0))
+                    self._entries[key] = {'title': getattr(task, 'name', ''), 'time': added_time}
+                    added += 1
+            self._evict()
+        return added
+
+    def progress(self, key: str):
+        """获取最近一次同步的任务快照（OfflineFile），不在列表中时返回 None"""
+        return self._progress.get(key)
+
+    def to_dict(self) -> Dict[str, dict]:
+        """导出索引用于持久化"""
+        with self._lock:
+            return dict(self._entries)
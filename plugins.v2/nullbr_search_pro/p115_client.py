@@ -10,9 +10,16 @@ Cookie 必要参数: UID, CID, SEID, KID
 获取方式: 浏览器登录 115.com 后，在开发者工具 Application > Cookies 中获取
 """
 import re
+import threading
+import time
 from typing import Optional, Tuple
 from app.log import logger
 
+try:
+    from .nullbr_core.metrics import timed
+except ImportError:
+    from nullbr_core.metrics import timed
+
 try:
     from p115client import P115Client, check_response
 except ImportError:
@@ -60,12 +67,13 @@ class P115ShareClient:
         :param cookies: 115 Cookie 字符串，必须包含 UID, CID, SEID, KID
         :param save_cid: 转存目标文件夹 CID（在浏览器 URL 中获取，0 或空表示根目录）
         :raises ValueError: Cookie 格式不正确或缺少必要字段
-        :raises ConnectionError: 无法连接 115 服务器或 Cookie 已过期
+
+        构造时不访问 115 服务器，登录状态由 check_alive() 在后台探测
         """
         if P115Client is None:
             raise ImportError("p115client 未安装，请运行: pip install p115client")
         
-        # 验证 Cookie 格式
+        # 验证 Cookie 格式（仅本地检查，不发起网络请求）
         self._validate_cookies(cookies)
         
         self.cookies = cookies
@@ -73,8 +81,10 @@ class P115ShareClient:
         self._save_cid: str = (save_cid or "0").strip()  # 转存目标 CID
         self._user_name: Optional[str] = None
         
-        # 初始化客户端
-        self._init_client()
+        # 存活状态：None=未检测, True=有效, False=已失效
+        self._alive: Optional[bool] = None
+        self._last_check: Optional[float] = None
+        self._lock = threading.Lock()
     
     def _validate_cookies(self, cookies: str):
         """
@@ -101,41 +111,30 @@ class P115ShareClient:
         
         logger.debug(f"Cookie 验证通过，包含所有必要字段")
     
-    def _init_client(self):
-        """初始化 p115client 并验证登录状态"""
-        try:
-            self._client = P115Client(self.cookies)
-            logger.info("115 分享转存客户端初始化成功")
-            
-            # 验证登录状态
-            if not self._verify_login():
-                raise ConnectionError(
-                    "Cookie 已过期或无效，请重新获取 Cookie\n"
-                    "获取方式: 浏览器登录 115.com -> F12 开发者工具 -> Application -> Cookies"
-                )
-            
-            logger.info(f"115 转存目标 CID: {self._save_cid}")
-            
-        except ConnectionError:
-            raise
-        except Exception as e:
-            error_msg = str(e)
-            if "登录" in error_msg or "990001" in error_msg:
-                raise ConnectionError(
-                    f"Cookie 已过期或无效: {error_msg}\n"
-                    "请重新获取 Cookie: 浏览器登录 115.com -> F12 -> Application -> Cookies"
-                )
-            logger.error(f"115 分享转存客户端初始化失败: {error_msg}")
-            raise
+    @property
+    def client(self) -> "P115Client":
+        """按需创建 p115client 实例（不做登录校验，避免阻塞插件初始化）"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = P115Client(self.cookies)
+                    logger.info(f"115 分享转存客户端初始化成功，目标 CID: {self._save_cid}")
+        return self._client
+    
+    @staticmethod
+    def _is_login_error(error_msg: str) -> bool:
+        """判断错误信息是否为登录失效"""
+        return "登录" in error_msg or "990001" in error_msg
     
     def _verify_login(self) -> bool:
         """
         验证登录状态
         
         :return: 是否已登录
+        :raises Exception: 登录失效以外的错误（网络异常、超时等）原样抛出，不能据此判断 Cookie 状态
         """
         try:
-            response = self._client.user_my()
+            response = self.client.user_my()
             result = check_response(response)
             
             # 获取用户名
@@ -148,11 +147,30 @@ class P115ShareClient:
             
         except Exception as e:
             error_msg = str(e)
-            logger.error(f"115 登录验证失败: {error_msg}")
-            if "登录" in error_msg or "990001" in error_msg:
+            if self._is_login_error(error_msg):
+                logger.error(f"115 登录验证失败: {error_msg}")
                 return False
-            # 其他错误也返回 False
-            return False
+            raise
+    
+    @timed("p115.check_alive")
+    def check_alive(self) -> bool:
+        """
+        探测 Cookie 是否仍然有效，并更新存活状态
+        
+        由插件的后台定时任务调用，不应在用户请求路径上同步执行。
+        网络异常等无法判断 Cookie 状态的错误会原样抛出，存活状态保持不变。
+        
+        :return: Cookie 是否有效
+        """
+        alive = self._verify_login()
+        self._alive = alive
+        self._last_check = time.time()
+        return alive
+    
+    def mark_expired(self):
+        """标记 Cookie 已失效（转存时遇到登录错误时调用）"""
+        self._alive = False
+        self._last_check = time.time()
     
     def _get_or_create_folder_cid(self, folder_path: str) -> str:
         """
@@ -170,12 +188,12 @@ class P115ShareClient:
             logger.debug(f"尝试获取文件夹 CID: {folder_path}")
             
             # 先尝试列出根目录来验证登录
-            response = self._client.fs_files({"cid": "0", "limit": 1})
+            response = self.client.fs_files({"cid": "0", "limit": 1})
             result = check_response(response)
             logger.debug(f"根目录访问成功")
             
             # 然后尝试用路径获取目录
-            response = self._client.fs_files({"path": folder_path, "limit": 1})
+            response = self.client.fs_files({"path": folder_path, "limit": 1})
             result = check_response(response)
             
             # 从响应中获取 cid
@@ -194,7 +212,7 @@ class P115ShareClient:
             logger.warning(f"获取文件夹失败: {folder_path}, 错误: {error_msg}")
             
             # 如果是登录问题，不尝试创建
-            if "登录" in error_msg or "990001" in error_msg:
+            if self._is_login_error(error_msg):
                 return "0"
         
         # 文件夹不存在，尝试创建
@@ -217,7 +235,7 @@ class P115ShareClient:
         for part in parts:
             try:
                 logger.debug(f"创建/获取文件夹: {part} in CID: {current_cid}")
-                response = self._client.fs_mkdir({"cname": part, "pid": int(current_cid)})
+                response = self.client.fs_mkdir({"cname": part, "pid": int(current_cid)})
                 result = check_response(response)
                 new_cid = str(result.get("cid", ""))
                 if new_cid:
@@ -230,7 +248,7 @@ class P115ShareClient:
                 if "已存在" in error_str or "exists" in error_str.lower():
                     logger.debug(f"文件夹已存在: {part}，尝试获取 CID")
                     try:
-                        list_resp = self._client.fs_files({"cid": current_cid, "limit": 1000})
+                        list_resp = self.client.fs_files({"cid": current_cid, "limit": 1000})
                         list_result = check_response(list_resp)
                         for item in list_result.get("data", []):
                             if item.get("n") == part:
@@ -287,12 +305,13 @@ class P115ShareClient:
         logger.debug(f"获取分享信息: share_code={share_code}, password={'***' if password else '无'}")
         
         try:
-            response = self._client.share_snap({
-                "share_code": share_code,
-                "receive_code": password,
-                "offset": 0,
-                "limit": 100
-            })
+            with timed("p115.share_snap"):
+                response = self.client.share_snap({
+                    "share_code": share_code,
+                    "receive_code": password,
+                    "offset": 0,
+                    "limit": 100
+                })
             result = check_response(response)
             
             # 详细记录返回数据结构
@@ -380,13 +399,14 @@ class P115ShareClient:
             # 3. 执行转存
             logger.debug(f"执行转存: share_code={share_code}, snap_id={snap_id}, cid={target_cid}, file_ids={len(file_ids)}")
             
-            response = self._client.share_receive({
-                "share_code": share_code,
-                "receive_code": password,
-                "snap_id": snap_id,
-                "cid": target_cid,
-                "file_id": ",".join(file_ids)
-            })
+            with timed("p115.share_receive"):
+                response = self.client.share_receive({
+                    "share_code": share_code,
+                    "receive_code": password,
+                    "snap_id": snap_id,
+                    "cid": target_cid,
+                    "file_id": ",".join(file_ids)
+                })
             
             result = check_response(response)
             logger.debug(f"转存响应: {result}")
@@ -413,7 +433,8 @@ class P115ShareClient:
                 raise ValueError("分享密码错误")
             elif "limit" in error_msg.lower() or "上限" in error_msg:
                 raise ValueError("接收人次已达上限")
-            elif "登录" in error_msg or "990001" in error_msg:
+            elif self._is_login_error(error_msg):
+                self.mark_expired()
                 raise ConnectionError("Cookie 已过期，请重新获取")
             else:
                 raise ValueError(f"转存失败: {error_msg}")
@@ -424,12 +445,26 @@ class P115ShareClient:
         
         :return: 连接是否成功
         """
-        return self._verify_login()
+        try:
+            return self.check_alive()
+        except Exception as e:
+            logger.error(f"115 连接测试失败: {str(e)}")
+            return False
     
     @property
     def is_available(self) -> bool:
         """客户端是否可用"""
-        return self._client is not None
+        return P115Client is not None
+    
+    @property
+    def is_alive(self) -> Optional[bool]:
+        """Cookie 存活状态：None 表示尚未检测"""
+        return self._alive
+    
+    @property
+    def last_check(self) -> Optional[float]:
+        """最近一次存活检测时间戳"""
+        return self._last_check
     
     @property
     def user_name(self) -> Optional[str]:
@@ -0,0 +1,165 @@
+"""
+资源排序
+
+Nullbr 返回的资源列表按 API 顺序排列，最优资源经常排在前 10 条之外。
+本模块将 size/resolution/quality/zh_sub 等字段规范化为数值特征，
+按可配置权重打分后排序。
+
+打分按列批量进行：先一次性提取所有资源的特征列，再按列归一化并加权求和，
+剧集整季磁力等几百条资源的列表也能快速完成排序。
+"""
+import math
+import re
+from typing import Dict, List, Optional, Sequence
+
+# 默认权重：分辨率 > 中文字幕 ≈ 片源质量 > 体积
+DEFAULT_WEIGHTS = {
+    'resolution': 3.0,
+    'zh_sub': 2.0,
+    'quality': 2.0,
+    'size': 1.0,
+}
+
+# 数字必须以数字开头，可带千位分隔符（1,024 MB）
+_SIZE_PATTERN = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*([KMGTP]?)(i?)B?', re.IGNORECASE)
+_SIZE_UNITS = {'': 0, 'K': 1, 'M': 2, 'G': 3, 'T': 4, 'P': 5}
+
+_RESOLUTION_PATTERN = re.compile(r'(2160|1080|720|576|480)[pi]|\b(4k|uhd)\b', re.IGNORECASE)
+_RESOLUTION_SCORES = {'2160': 1.0, '1080': 0.75, '720': 0.5, '576': 0.25, '480': 0.25}
+
+_ZH_SUB_PATTERN = re.compile(r'中字|中文字幕|简繁|简中|繁中|chs|cht|双语', re.IGNORECASE)
+
+# 片源质量关键字得分，多个关键字累加后截断到 [-1, 1]
+_QUALITY_SCORES = (
+    (re.compile(r'remux', re.IGNORECASE), 0.6),
+    (re.compile(r'blu-?ray|bdrip', re.IGNORECASE), 0.4),
+    (re.compile(r'web-?dl', re.IGNORECASE), 0.3),
+    (re.compile(r'webrip', re.IGNORECASE), 0.2),
+    (re.compile(r'hdr10\+?|hdr|dolby\s*vision|\bdv\b|dovi', re.IGNORECASE), 0.3),
+    (re.compile(r'hdtv', re.IGNORECASE), 0.1),
+    (re.compile(r'complete|全集|全\d+集', re.IGNORECASE), 0.2),
+    (re.compile(r'\bcam\b|\bts\b|hdcam|tc\b|枪版', re.IGNORECASE), -1.0),
+)
+
+
+def parse_size(size) -> int:
+    """
+    解析体积字符串为字节数
+
+    :param size: 如 "83.03 GB"、"700MB"、"1.2 TiB"、"1,024 MB"，数字按字节处理
+    :return: 字节数，无法解析时返回 0
+    """
+    try:
+        if isinstance(size, (int, float)):
+            return int(size)
+        if not size:
+            return 0
+        match = _SIZE_PATTERN.search(str(size))
+        if not match:
+            return 0
+        value = float(match.group(1).replace(',', ''))
+        unit = match.group(2).upper()
+        base = 1024 if match.group(3) or unit else 1000
+        return int(value * (base ** _SIZE_UNITS[unit]))
+    except (ValueError, OverflowError):
+        return 0
+
+
+def _text_of(res: dict) -> str:
+    """资源名称（115 为 title，磁力/ED2K 为 name）"""
+    return res.get('name') or res.get('title') or ''
+
+
+def _quality_text(res: dict) -> str:
+    quality = res.get('quality')
+    if isinstance(quality, (list, tuple)):
+        quality = ' '.join(str(q) for q in quality)
+    return f"{quality or ''} {_text_of(res)}"
+
+
+def resolution_score(res: dict) -> float:
+    """分辨率得分 [0, 1]，优先使用 resolution 字段，缺失时从名称中识别"""
+    for text in (str(res.get('resolution') or ''), _text_of(res)):
+        match = _RESOLUTION_PATTERN.search(text)
+        if match:
+            return _RESOLUTION_SCORES.get(match.group(1), 1.0)
+    return 0.0
+
+
+def quality_score(res: dict) -> float:
+    """片源质量得分 [-1, 1]"""
+    text = _quality_text(res)
+    score = sum(weight for pattern, weight in _QUALITY_SCORES if pattern.search(text))
+    return max(-1.0, min(1.0, score))
+
+
+def zh_sub_score(res: dict) -> float:
+    """中文字幕得分 {0, 1}"""
+    if res.get('zh_sub'):
+        return 1.0
+    return 1.0 if _ZH_SUB_PATTERN.search(_text_of(res)) else 0.0
+
+
+def parse_weights(text: str) -> Dict[str, float]:
+    """
+    解析权重配置
+
+    :param text: 如 "resolution=3, zh_sub=2, quality=2, size=1"，未配置的项使用默认值
+    :return: 权重字典
+    """
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in re.split(r'[,，;\s]+', text or ''):
+        if '=' not in part:
+            continue
+        key, _, value = part.partition('=')
+        key = key.strip()
+        if key in weights:
+            try:
+                weights[key] = float(value)
+            except ValueError:
+                pass
+    return weights
+
+
+def score_resources(resources: Sequence[dict], weights: Optional[Dict[str, float]] = None) -> List[float]:
+    """
+    批量计算资源得分
+
+    :param resources: 资源列表
+    :param weights: 权重，默认 DEFAULT_WEIGHTS
+    :return: 与输入顺序一致的得分列表
+    """
+    if not resources:
+        return []
+    weights = weights or DEFAULT_WEIGHTS
+
+    # 提取特征列
+    resolution = [resolution_score(r) for r in resources]
+    quality = [quality_score(r) for r in resources]
+    zh_sub = [zh_sub_score(r) for r in resources]
+    # 体积按对数在本批次内归一化：同一影片体积越大通常码率越高
+    log_size = [math.log1p(parse_size(r.get('size'))) for r in resources]
+    max_log_size = max(log_size) or 1.0
+
+    w_res = weights.get('resolution', 0.0)
+    w_quality = weights.get('quality', 0.0)
+    w_zh = weights.get('zh_sub', 0.0)
+    w_size = weights.get('size', 0.0) / max_log_size
+
+    return [
+        w_res * a + w_quality * b + w_zh * c + w_size * d
+        for a, b, c, d in zip(resolution, quality, zh_sub, log_size)
+    ]
+
+
+def rank_resources(resources: Sequence[dict], weights: Optional[Dict[str, float]] = None) -> List[dict]:
+    """
+    按得分从高到低排序资源，得分相同时保持 API 原顺序
+
+    :param resources: 资源列表
+    :param weights: 权重，默认 DEFAULT_WEIGHTS
+    :return: 排序后的新列表
+    """
+    scores = score_resources(resources, weights)
+    order = sorted(range(len(resources)), key=lambda i: -scores[i])
+    return [resources[i] for i in order]
@@ -0,0 +1,182 @@
+"""
+流量录制
+
+开启后将用户交互按事件写入 JSONL 文件，供 benchmarks/replay_traffic.py 在本地模拟服务上按
+1×/10×/100× 速度回放，复现真实的关键词分布、选择/转存比例和后端延迟。
+
+录制内容经过匿名化，不包含任何原始文本：
+- 用户 ID、搜索关键词替换为带随机密钥的哈希（密钥只在内存中，每个文件不同），同一文件内
+  相同的用户/关键词得到相同的标记，缓存命中和会话顺序得以保留
+- 命令只保留类型和编号（如 pick 1、get 2 magnet、range 1 3），按钮回调只保留插件定义的动作名
+- 记录处理耗时和处理期间各后端调用的耗时（阶段名、毫秒、是否出错）
+
+文件格式：首行为文件头 {"v", "plugin", "start"}，之后每行一个事件：
+    {"t": 相对开始的秒数, "s": "talk"/"action", "u": 用户标记, "c": 渠道, "k": 类型,
+     "a": 参数, "e": 是否带原消息ID, "d": 处理耗时ms, "b": [[阶段, ms, 是否出错], ...]}
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, List, Optional, Tuple
+
+from app.log import logger
+
+try:
+    from .nullbr_core.commands import CALLBACKS, HASH_TALK
+    from .nullbr_core.message_formatter import channel_key
+    from .nullbr_core.metrics import capture
+except ImportError:
+    from nullbr_core.commands import CALLBACKS, HASH_TALK
+    from nullbr_core.message_formatter import channel_key
+    from nullbr_core.metrics import capture
+
+TRAFFIC_FORMAT_VERSION = 1
+
+# 单个录制文件的大小上限，超过后停止录制
+MAX_TRAFFIC_BYTES = 50 * 1024 * 1024
+
+# 缓冲的事件数，达到后写入磁盘
+FLUSH_EVERY = 32
+
+
+class TrafficRecorder:
+    """匿名化的交互事件录制器"""
+
+    def __init__(self, path: str, plugin: str, max_bytes: int = MAX_TRAFFIC_BYTES):
+        """
+        :param path: 录制文件路径（追加写入）
+        :param plugin: 插件名，写入文件头
+        :param max_bytes: 文件大小上限
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._key = os.urandom(16)
+        self._start = time.time()
+        self._buffer: List[str] = []
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.recorded = 0
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._write_line({'v': TRAFFIC_FORMAT_VERSION, 'plugin': plugin, 'start': round(self._start, 3)})
+        self._file.flush()
+
+    def _token(self, value: str, size: int = 5) -> str:
+        return hashlib.blake2b(value.encode('utf-8'), key=self._key, digest_size=size).hexdigest()
+
+    def _keyword(self, keyword: str) -> List[Any]:
+        """关键词 -> [标记, 长度]"""
+        keyword = keyword.strip().lower()
+        return [self._token(keyword), len(keyword)]
+
+    # 分类 ---------------------------------------------------------------------
+
+    def classify_talk(self, text: str) -> Optional[Tuple[str, List[Any]]]:
+        """
+        将用户消息归类为 (类型, 参数)，不是插件交互命令时返回 None
+        """
+        command = HASH_TALK.parse(text)
+        if command is None:
+            return None
+        if command.verb in ('search', 'auto'):
+            return command.verb, self._keyword(command.args[0])
+        return command.verb, list(command.args)
+
+    @staticmethod
+    def classify_action(text: str) -> Tuple[str, List[Any]]:
+        """将按钮回调归类为 (动作, 参数)"""
+        command = CALLBACKS.parse(text)
+        if command is None:
+            return 'unknown', []
+        return command.verb, list(command.args)
+
+    # 录制 ---------------------------------------------------------------------
+
+    @contextmanager
+    def record(self, source: str, event_data: dict):
+        """
+        录制一次事件处理（包住处理函数）
+
+        :param source: talk 或 action
+        :param event_data: 事件数据
+        """
+        if self._stopped:
+            yield
+            return
+        if source == 'talk':
+            if event_data.get('source') == 'nullbr_fallback':
+                yield
+                return
+            kind = self.classify_talk(event_data.get('text'))
+        else:
+            kind = self.classify_action(event_data.get('text'))
+        if kind is None:
+            yield
+            return
+
+        userid = event_data.get('userid')
+        entry = {
+            't': round(time.time() - self._start, 3),
+            's': source,
+            'u': self._token(str(userid), 4) if userid is not None else None,
+            'c': channel_key(event_data.get('channel')) or None,
+            'k': kind[0],
+            'a': kind[1],
+        }
+        if source == 'action':
+            entry['e'] = bool(event_data.get('original_message_id') and event_data.get('original_chat_id'))
+        start = time.perf_counter()
+        with capture() as calls:
+            try:
+                yield
+            finally:
+                entry['d'] = round((time.perf_counter() - start) * 1000, 1)
+                entry['b'] = [[stage, round(seconds * 1000, 1), int(error)] for stage, seconds, error in calls]
+                self._append(entry)
+
+    def _write_line(self, data: dict):
+        line = json.dumps(data, ensure_ascii=False, separators=(',', ':')) + '\n'
+        self._file.write(line)
+        self._size += len(line.encode('utf-8'))
+
+    def _append(self, entry: dict):
+        with self._lock:
+            if self._stopped:
+                return
+            self._buffer.append(json.dumps(entry, ensure_ascii=False, separators=(',', ':')))
+            self.recorded += 1
+            if len(self._buffer) >= FLUSH_EVERY:
+                self._flush()
+
+    def _flush(self):
+        """写出缓冲的事件（锁内调用）"""
+        if not self._buffer:
+            return
+        data = '\n'.join(self._buffer) + '\n'
+        self._buffer.clear()
+        try:
+            self._file.write(data)
+            self._file.flush()
+        except OSError as e:
+            logger.error(f"写入流量录制文件失败: {str(e)}")
+            self._stopped = True
+            return
+        self._size += len(data.encode('utf-8'))
+        if self._size >= self.max_bytes:
+            logger.warning(f"流量录制文件已达 {self.max_bytes // 1024 // 1024}MB，停止录制: {self.path}")
+            self._stopped = True
+
+    def close(self):
+        """写出剩余事件并关闭文件"""
+        with self._lock:
+            self._flush()
+            self._stopped = True
+            try:
+                self._file.close()
+            except OSError:
+                pass
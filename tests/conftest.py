@@ -0,0 +1,16 @@
+"""
+测试公共配置
+
+测试与基准脚本共用 benchmarks/ 中的模拟服务（fake_cd2、fake_nullbr 等）和插件包加载方式：
+插件目录以裸包形式注册（不执行 __init__.py），各模块可单独导入。
+
+插件模块依赖 MoviePilot 的 app.log，运行测试需将 MoviePilot 源码目录加入 PYTHONPATH:
+    PYTHONPATH=/path/to/MoviePilot python -m pytest tests
+未找到 MoviePilot 时相关测试模块整体跳过。
+"""
+import os
+import sys
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks")
+if BENCHMARKS_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARKS_DIR)
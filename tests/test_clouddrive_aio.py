@@ -0,0 +1,240 @@
+"""
+CloudDrive2 客户端：经进程内模拟服务（benchmarks/fake_cd2.py）测试
+
+- CloudDrive2AioFacade 的批量调用（*_many）、错误与超时路径、关闭与重建事件循环
+- CloudDrive2Client 按地址共享 channel 的引用计数与关闭
+"""
+import importlib
+import time
+
+import pytest
+
+pytest.importorskip("app.log", reason="需要 MoviePilot 源码（PYTHONPATH）")
+pytest.importorskip("grpc", reason="需要 grpcio")
+
+import fake_cd2  # noqa: E402
+from _common import load_plugin_package  # noqa: E402
+
+_pkg = load_plugin_package("nullbr_search_pro")
+cd2 = importlib.import_module(f"{_pkg}.clouddrive_client")
+clouddrive_aio = importlib.import_module(f"{_pkg}.clouddrive_aio")
+
+TOKEN = "test-token"
+MAGNETS = [f"magnet:?xt=urn:btih:{i:040x}" for i in range(12)]
+
+
+@pytest.fixture
+def cd2_server():
+    server, servicer, address = fake_cd2.start_fake_server(api_token=TOKEN)
+    yield servicer, address
+    server.stop(None)
+
+
+@pytest.fixture
+def facade(cd2_server):
+    _, address = cd2_server
+    facade = clouddrive_aio.CloudDrive2AioFacade(f"http://{address}", api_token=TOKEN, max_concurrency=4)
+    yield facade
+    facade.close()
+
+
+@pytest.fixture
+def channels():
+    """每个测试结束后关闭并清空模块级 channel 缓存"""
+    yield cd2._channels
+    with cd2._channels_lock:
+        for cached in cd2._channels.values():
+            cached.close()
+        cd2._channels.clear()
+
+
+# 异步门面 -------------------------------------------------------------------
+
+def test_add_offline_files_many(cd2_server, facade):
+    servicer, _ = cd2_server
+    results = facade.add_offline_files_many(MAGNETS, to_folder="/115/Offline")
+    assert results == [{'success': True, 'message': ''}] * len(MAGNETS)
+    assert servicer.calls["AddOfflineFiles"] == len(MAGNETS)
+    assert sorted(f.url for f in servicer.offline_files) == sorted(MAGNETS)
+
+
+def test_add_offline_files_many_is_concurrent_and_bounded(cd2_server, facade):
+    servicer, _ = cd2_server
+    servicer.latency = 0.1
+    start = time.perf_counter()
+    facade.add_offline_files_many(MAGNETS[:8])
+    elapsed = time.perf_counter() - start
+    # max_concurrency=4：8 个请求至少两轮，且明显快于逐个提交（0.8s）
+    assert 0.2 <= elapsed < 0.7
+
+
+def test_get_offline_status_many(cd2_server, facade):
+    facade.add_offline_files_many(MAGNETS[:3])
+    results = facade.get_offline_status_many(["/115/Offline", "/115/Other"])
+    assert len(results) == 2
+    for result in results:
+        assert sorted(f.url for f in result['offlineFiles']) == sorted(MAGNETS[:3])
+        assert 'error' not in result
+
+
+def test_many_reports_failures_in_place(cd2_server, facade):
+    servicer, _ = cd2_server
+    servicer.rejected_urls.add(MAGNETS[1])
+    results = facade.add_offline_files_many(MAGNETS[:3])
+    assert results[0]['success'] and results[2]['success']
+    assert results[1]['success'] is False
+    assert "invalid url" in results[1]['message']
+    assert len(servicer.offline_files) == 2
+
+
+def test_invalid_token(cd2_server):
+    _, address = cd2_server
+    facade = clouddrive_aio.CloudDrive2AioFacade(address, api_token="wrong")
+    try:
+        with pytest.raises(ValueError, match="invalid token"):
+            facade.add_offline_files(MAGNETS[0])
+        results = facade.add_offline_files_many(MAGNETS[:2])
+        assert [r['success'] for r in results] == [False, False]
+        status = facade.get_offline_status_many(["/115/Offline"])
+        assert status[0]['offlineFiles'] == [] and status[0]['error']
+    finally:
+        facade.close()
+
+
+def test_rpc_timeout(cd2_server, facade, monkeypatch):
+    servicer, _ = cd2_server
+    servicer.latency = 0.5
+    monkeypatch.setitem(cd2.RPC_TIMEOUTS, "AddOfflineFiles", 0.1)
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match="(?i)deadline"):
+        facade.add_offline_files(MAGNETS[0])
+    results = facade.add_offline_files_many(MAGNETS[:4])
+    assert time.perf_counter() - start < 1.0
+    assert [r['success'] for r in results] == [False] * 4
+
+
+def test_unreachable_server_times_out(monkeypatch):
+    # wait_for_ready：连接不上时等待到超时为止，而不是无限阻塞
+    monkeypatch.setitem(cd2.RPC_TIMEOUTS, "AddOfflineFiles", 0.2)
+    facade = clouddrive_aio.CloudDrive2AioFacade("127.0.0.1:1", api_token=TOKEN)
+    try:
+        with pytest.raises(ValueError):
+            facade.add_offline_files(MAGNETS[0])
+    finally:
+        facade.close()
+
+
+def test_close_stops_loop_and_can_restart(cd2_server, facade):
+    facade.add_offline_files(MAGNETS[0])
+    thread = facade._thread
+    assert thread.is_alive()
+
+    facade.close()
+    assert not thread.is_alive()
+    assert facade._loop is None and facade._client._channel is None
+    facade.close()  # 重复关闭无副作用
+
+    # 关闭后再次调用时重新启动事件循环并建立 channel
+    assert facade.add_offline_files(MAGNETS[1]) == {'success': True, 'message': ''}
+    assert facade._thread is not thread and facade._thread.is_alive()
+
+
+def test_close_without_calls():
+    facade = clouddrive_aio.CloudDrive2AioFacade("127.0.0.1:1", api_token=TOKEN)
+    facade.close()
+    assert facade._thread is None
+
+
+# 同步客户端的共享 channel ----------------------------------------------------
+
+def test_clients_share_channel_by_address(cd2_server, channels):
+    _, address = cd2_server
+    first = cd2.CloudDrive2Client(address, api_token=TOKEN)
+    second = cd2.CloudDrive2Client(f"http://{address}/", api_token=TOKEN)
+    first.add_offline_files(MAGNETS[0])
+    second.add_offline_files(MAGNETS[1])
+
+    cached = channels[address]
+    assert first._cached_channel is cached and second._cached_channel is cached
+    assert cached.refs == 2
+
+    first.close()
+    first.close()  # 重复关闭不会重复释放引用
+    assert cached.refs == 1
+    second.close()
+    assert cached.refs == 0
+
+    # 无引用的 channel 保留在缓存中，插件重载后复用同一连接
+    third = cd2.CloudDrive2Client(address, api_token=TOKEN)
+    assert third.get_system_info()['systemReady']
+    assert third._cached_channel is cached and cached.refs == 1
+    third.close()
+
+
+def test_unused_channel_closed_when_address_changes(cd2_server, channels):
+    servicer, address = cd2_server
+    old = cd2.CloudDrive2Client(address, api_token=TOKEN)
+    old.add_offline_files(MAGNETS[0])
+    cached = channels[address]
+    old.close()
+
+    server, _, other_address = fake_cd2.start_fake_server(api_token=TOKEN)
+    try:
+        new = cd2.CloudDrive2Client(other_address, api_token=TOKEN)
+        new.add_offline_files(MAGNETS[1])
+        assert address not in channels
+        assert cached.state == cd2.grpc.ChannelConnectivity.SHUTDOWN
+        new.close()
+    finally:
+        server.stop(None)
+
+
+def test_channel_in_use_is_kept_when_address_changes(cd2_server, channels):
+    _, address = cd2_server
+    busy = cd2.CloudDrive2Client(address, api_token=TOKEN)
+    busy.add_offline_files(MAGNETS[0])
+
+    server, _, other_address = fake_cd2.start_fake_server(api_token=TOKEN)
+    try:
+        other = cd2.CloudDrive2Client(other_address, api_token=TOKEN)
+        other.add_offline_files(MAGNETS[1])
+        assert address in channels and channels[address].refs == 1
+        assert busy.add_offline_files(MAGNETS[2])['success']
+        other.close()
+    finally:
+        busy.close()
+        server.stop(None)
+
+
+def test_sync_client_consumes_cached_quota(cd2_server, channels):
+    servicer, address = cd2_server
+    servicer.quota_total = 5
+    client = cd2.CloudDrive2Client(address, api_token=TOKEN)
+    assert client.get_offline_quota()['left'] == 5
+    client.add_offline_files("\n".join(MAGNETS[:2]))
+    # 提交成功后在本地扣减，缓存期内不再查询
+    assert client.get_offline_quota()['left'] == 3
+    assert servicer.calls["GetOfflineQuotaInfo"] == 1
+    client.close()
+
+
+def test_zeroed_quota_is_unknown(cd2_server, channels):
+    # 不支持配额的后端返回全零的 OfflineQuotaInfo，不应拒绝提交
+    servicer, address = cd2_server
+    servicer.quota_total = 0
+    client = cd2.CloudDrive2Client(address, api_token=TOKEN)
+    assert client.get_offline_quota() is None
+    assert client.trim_to_quota(MAGNETS[:3]) == (MAGNETS[:3], [], None)
+    assert client.get_offline_quota() is None  # 缓存命中时同样视为未知
+    assert servicer.calls["GetOfflineQuotaInfo"] == 1
+    client.close()
+
+
+def test_trim_to_quota(cd2_server, channels):
+    servicer, address = cd2_server
+    servicer.quota_total = 2
+    client = cd2.CloudDrive2Client(address, api_token=TOKEN)
+    accepted, rejected, quota = client.trim_to_quota(MAGNETS[:3])
+    assert accepted == MAGNETS[:2] and rejected == MAGNETS[2:3]
+    assert quota == {'total': 2, 'used': 0, 'left': 2}
+    client.close()
@@ -0,0 +1,88 @@
+"""
+命令语法：与原逐条判断的参照实现（见 benchmarks/bench_commands.py）解析结果一致
+
+随机拼接 #、!、数字、资源类型、区间、问号、全角字符、空白等片段做模糊校验，另以边界用例
+固定少见形式（全角数字、大小写、多余分隔符等）的解析结果。
+"""
+import importlib
+import random
+
+import pytest
+
+from _common import load_plugin_package
+from bench_commands import random_text, reference_callback, reference_hash, reference_plain
+
+_pkg = load_plugin_package("nullbr_search_pro")
+commands = importlib.import_module(f"{_pkg}.nullbr_core.commands")
+
+FUZZ_CASES = 100000
+
+GRAMMARS = (
+    ("HASH_TALK", commands.HASH_TALK, reference_hash),
+    ("PLAIN_TALK", commands.PLAIN_TALK, reference_plain),
+    ("CALLBACKS", commands.CALLBACKS, reference_callback),
+)
+
+
+def _parsed(grammar, text):
+    command = grammar.parse(text)
+    return (command.verb, command.args) if command else None
+
+
+@pytest.mark.parametrize("name,grammar,reference", GRAMMARS, ids=[name for name, _, _ in GRAMMARS])
+def test_grammar_matches_reference_on_random_input(name, grammar, reference):
+    rng = random.Random(name)
+    mismatches = []
+    for _ in range(FUZZ_CASES):
+        text = random_text(rng)
+        got, want = _parsed(grammar, text), reference(text)
+        if got != want:
+            mismatches.append((text, got, want))
+    assert not mismatches[:20]
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("#1", ('pick', (1,))),
+    ("# １２ ", ('pick', (12,))),
+    ("#²", ('search', ('²',))),
+    ("#2.magnet", ('get', (2, 'magnet'))),
+    ("#2.MAGNET", ('search', ('2.MAGNET',))),
+    ("#2.", ('search', ('2.',))),
+    ("#1 - 3", ('range', (1, 3))),
+    ("#1-3-5", ('search', ('1-3-5',))),
+    ("#12abc", ('search', ('12abc',))),
+    ("#NeXt", ('next', ())),
+    ("#more", ('next', ())),
+    ("#刷新", ('refresh', ())),
+    ("# REFRESH", ('refresh', ())),
+    ("#刷新 流浪地球", ('search', ('刷新 流浪地球',))),
+    ("#! 阿凡达", ('auto', ('阿凡达',))),
+    ("#!", None),
+    ("# ", None),
+    ("今天吃什么", None),
+])
+def test_hash_talk_boundaries(text, expected):
+    assert _parsed(commands.HASH_TALK, text) == expected
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("select_1", ('select', (1,))),
+    ("transfer_12", ('transfer', (12,))),
+    ("get_2", ('get', (2, '115'))),
+    ("get_3_ed2k", ('get', (3, 'ed2k'))),
+    ("get_3_", None),
+    ("get_3_foo", None),
+    ("get__magnet", None),
+    ("select_", None),
+    ("select_1_2", None),
+    ("offline_refresh", ('offline_refresh', ())),
+    (" back ", ('back', ())),
+    ("unknown", None),
+])
+def test_callback_boundaries(text, expected):
+    assert _parsed(commands.CALLBACKS, text) == expected
+
+
+def test_rule_group_count_must_match_converters():
+    with pytest.raises(ValueError):
+        commands.Grammar((commands.Rule('pick', r'(\d+)'),))
@@ -0,0 +1,67 @@
+"""
+企业微信消息格式化：与原 _format_message_for_wechat（参照实现见 benchmarks/bench_wechat_format.py）逐字节一致
+
+金样语料覆盖帮助文本、搜索结果、资源列表、离线任务列表及空行/缩进等边界情况，
+另以随机拼接的行片段做模糊校验；渠道识别与按渠道缓存的格式化函数也与原 post_message 的判断一致。
+"""
+import importlib
+import random
+
+import pytest
+
+from _common import load_plugin_package
+from bench_wechat_format import FakeChannel, legacy_format, legacy_post, magnet_list, search_list
+
+_pkg = load_plugin_package("nullbr_search_pro")
+message_formatter = importlib.import_module(f"{_pkg}.nullbr_core.message_formatter")
+
+GOLDEN_CORPUS = [
+    "",
+    "\n\n\n",
+    "单行文本",
+    "  首尾空白  \n\t制表符\t\n",
+    "🎬 Nullbr资源搜索帮助：\n\n📋 使用方法:\n1. 发送 影片名? 搜索\n2. 发送 编号 选择\n"
+    "   缩进的详情行\n---\n💡 提示：支持115/磁力/ED2K\n",
+    "✅ 转存成功：流浪地球\n📁 保存路径: /115/Downloads\n",
+    "❌ 转存失败：链接已失效\n\n\n\n请重试",
+    "✅ 没有冒号的标题\n🎯 全角冒号：在行尾：",
+    "10.magnet\n10abc\n【x】非编号\n【12】编号\n----\n--不是分隔符\n",
+    "**1.** 离线任务\n   📦 1.2 GB | ⏳ 下载中 | 45%\n**2.** 另一个\n",
+    magnet_list(3),
+    search_list(5),
+]
+
+LINE_FRAGMENTS = ('', ' ', '\t', '🎬', '🎯', '✅', '❌', '：', ':', '1.', '12.', '1', '.', '【3】', '【x】',
+                  '---', '--', '💡', '📋', '📁', '流浪地球', 'magnet', '**1.**', '   ')
+
+
+@pytest.mark.parametrize("text", GOLDEN_CORPUS)
+def test_golden_corpus_matches_legacy(text):
+    assert message_formatter.format_for_wechat(text) == legacy_format(text)
+
+
+def test_golden_literal():
+    text = "✅ 转存成功：流浪地球\n📁 保存路径: /115/Downloads\n\n\n1. 第一项\n   详情\n💡 提示"
+    assert message_formatter.format_for_wechat(text) == (
+        "✅ 转存成功：流浪地球\n\n📁 保存路径: /115/Downloads\n\n1. 第一项\n详情\n\n💡 提示"
+    )
+
+
+def test_fuzz_matches_legacy():
+    rng = random.Random(0)
+    for _ in range(20000):
+        lines = [''.join(rng.choice(LINE_FRAGMENTS) for _ in range(rng.randint(0, 4)))
+                 for _ in range(rng.randint(0, 6))]
+        text = '\n'.join(lines)
+        assert message_formatter.format_for_wechat(text) == legacy_format(text), repr(text)
+
+
+@pytest.mark.parametrize("channel", [
+    FakeChannel("Wechat"), FakeChannel("WeCom"), FakeChannel("Telegram"), FakeChannel("Slack"),
+    "wechat", "wework-app", "telegram", "", None, ["unhashable", "wechat"],
+])
+def test_channel_formatter_matches_legacy_post(channel):
+    text = search_list(3)
+    assert message_formatter.get_formatter(channel)(text) == legacy_post(channel, text)
+    # 第二次调用走缓存
+    assert message_formatter.get_formatter(channel)(text) == legacy_post(channel, text)
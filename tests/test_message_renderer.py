@@ -0,0 +1,136 @@
+"""
+消息渲染：金样输出、快速路径与逐条计数路径的输出一致、字节上限与分页边界
+
+RecordPager 的快速路径（整页渲染后一次性检查长度）只是优化，任何参数下都必须与逐条按字节计数的结果
+完全相同，测试中将 FAST_PATH_ITEMS 置 0 得到逐条计数路径的输出作为对照。
+"""
+import importlib
+import itertools
+
+import pytest
+
+from _common import load_plugin_package
+
+_pkg = load_plugin_package("nullbr_search_pro")
+message_renderer = importlib.import_module(f"{_pkg}.nullbr_core.message_renderer")
+
+MAGNET = message_renderer.RESOURCE_TEMPLATES['magnet']
+
+
+def make_resources(n: int) -> list:
+    return [{
+        'name': f"Movie.Name.{2000 + i % 20}.2160p.WEB-DL-GROUP{i}",
+        'size': f"{10 + i % 50}.{i % 100:02d} GB",
+        'resolution': '2160p' if i % 2 else '1080p',
+        'zh_sub': i % 3 == 0,
+        'magnet': f"magnet:?xt=urn:btih:{i:040x}",
+    } for i in range(n)]
+
+
+def render(resources, limit, max_items=None, template=MAGNET):
+    """单条消息：取分页器的首页"""
+    return message_renderer.RecordPager(
+        header="🎯 「流浪地球」的magnet资源:\n\n",
+        items=resources,
+        template=template,
+        limit=limit,
+        footer=f"📊 共找到 {len(resources)} 个资源\n\n",
+        page_size=max_items,
+        more_text="... 还有 {remaining} 个资源未显示\n\n",
+    ).next_page()
+
+
+def pages(resources, limit, page_size):
+    pager = message_renderer.RecordPager(
+        header="📥 列表\n\n", items=resources, template=MAGNET, limit=limit,
+        footer="💡 结尾\n", page_size=page_size
+    )
+    result = []
+    while pager.has_next:
+        result.append(pager.next_page())
+    assert pager.next_page() is None
+    return result
+
+
+GOLDEN_MAGNET_2 = (
+    "🎯 「流浪地球」的magnet资源:\n\n"
+    "【1】Movie.Name.2000.2160p.WEB-DL-GROUP0\n"
+    "💾 大小: 10.00 GB\n"
+    "📺 分辨率: 1080p\n"
+    "🈴 中文字幕: ✅\n"
+    "🧲 磁力: magnet:?xt=urn:btih:0000000000000000000000000000000000000000\n"
+    "───────────────\n"
+    "【2】Movie.Name.2001.2160p.WEB-DL-GROUP1\n"
+    "💾 大小: 11.01 GB\n"
+    "📺 分辨率: 2160p\n"
+    "🈴 中文字幕: ❌\n"
+    "🧲 磁力: magnet:?xt=urn:btih:0000000000000000000000000000000000000001\n"
+    "───────────────\n"
+    "... 还有 1 个资源未显示\n\n"
+    "📊 共找到 3 个资源\n\n"
+)
+
+
+def test_golden_output():
+    result = render(make_resources(3), limit=10000, max_items=2)
+    assert result.text == GOLDEN_MAGNET_2
+    assert (result.rendered, result.total) == (2, 3)
+
+
+@pytest.mark.parametrize("n", [1, 10, 11, 35])
+@pytest.mark.parametrize("page_size", [None, 3, 10])
+@pytest.mark.parametrize("limit", [150, 700, 2048, 10000])
+def test_pager_fast_path_matches_budgeted(monkeypatch, n, page_size, limit):
+    resources = make_resources(n)
+    fast = pages(resources, limit, page_size)
+    monkeypatch.setattr(message_renderer, "FAST_PATH_ITEMS", 0)
+    assert pages(resources, limit, page_size) == fast
+    # 每条记录恰好出现一次
+    assert sum(page.rendered for page in fast) == n
+
+
+def test_first_page_respects_byte_limit():
+    for limit in (700, 1200, 2048):
+        result = render(make_resources(50), limit, max_items=10)
+        assert len(result.text.encode('utf-8')) <= limit
+        assert 0 < result.rendered < 10
+
+
+def test_oversized_record_gets_own_page():
+    resources = make_resources(3)
+    resources[1]['name'] = "长" * 500
+    result = pages(resources, limit=600, page_size=10)
+    assert [page.rendered for page in result] == [1, 1, 1]
+    assert "长" * 500 in result[1].text
+
+
+def test_records_rendered_lazily():
+    resources = make_resources(100)
+    calls = []
+
+    def template(index, res, ctx):
+        calls.append(index)
+        return MAGNET(index, res, ctx)
+
+    result = render(resources, limit=1 << 30, max_items=5, template=template)
+    assert result.rendered == 5 and calls == [1, 2, 3, 4, 5]
+
+    # 超出字节上限后不再渲染后续记录
+    calls.clear()
+    result = render(resources, limit=600, max_items=50, template=template)
+    assert result.rendered < 50 and len(calls) <= result.rendered + 1
+
+
+def test_batch_rows_render():
+    row_found = {'query': '流浪地球', 'item': {
+        'title': '流浪地球', 'media_type': 'movie', 'release_date': '2019-02-05',
+        '115-flg': 1, 'magnet-flg': 0}, 'transfer': '✅ 115: 资源 · 转存成功'}
+    row_missing = {'query': '不存在', 'item': None}
+    text = ''.join(itertools.starmap(message_renderer.BATCH_TEMPLATE, (
+        (1, row_found, {'enabled_types': ('115', 'magnet')}),
+        (2, row_missing, {}),
+    )))
+    assert text == ("1. 流浪地球 → 流浪地球 (2019) 电影\n"
+                    "   115✅ 磁力❌\n"
+                    "   ✅ 115: 资源 · 转存成功\n"
+                    "2. 不存在 → ❌ 未找到\n")
@@ -0,0 +1,119 @@
+"""
+Nullbr 客户端缓存：经进程内模拟服务（benchmarks/fake_nullbr.py）测试
+
+- 有结果的查询只在 enable_result_cache 后缓存，用户请求与预热请求的有效期不同
+- refresh 忽略缓存，forget_title 清除一部影片的资源列表缓存
+- 无结果缓存始终开启
+"""
+import importlib
+import os
+
+import pytest
+
+pytest.importorskip("app.log", reason="需要 MoviePilot 源码（PYTHONPATH）")
+pytest.importorskip("requests", reason="需要 requests")
+
+from _common import load_plugin_package  # noqa: E402
+from fake_nullbr import start_fake_nullbr  # noqa: E402
+
+# 模拟服务在本机，避免经过系统代理
+os.environ.setdefault("NO_PROXY", "127.0.0.1,localhost")
+
+_pkg = load_plugin_package("nullbr_search_pro")
+nullbr_client = importlib.import_module(f"{_pkg}.nullbr_core.nullbr_client")
+
+
+@pytest.fixture
+def nullbr():
+    server, state, base_url = start_fake_nullbr()
+    client = nullbr_client.NullbrApiClient(state.app_id, state.api_key)
+    client._base_url = base_url
+    yield client, state
+    client.close()
+    server.shutdown()
+
+
+def _expire(store, key, ttl):
+    """将缓存条目的时间戳提前到有效期之外"""
+    store._data[key]['timestamp'] -= ttl + 1
+
+
+def test_results_not_cached_by_default(nullbr):
+    client, state = nullbr
+    assert client.search("流浪地球")['items']
+    assert client.search("流浪地球")['items']
+    assert state.calls['search'] == 2
+
+
+def test_user_results_cached_for_minutes_when_enabled(nullbr):
+    client, state = nullbr
+    client.enable_result_cache(True)
+    client.search("流浪地球")
+    client.search("流浪地球")
+    assert state.calls['search'] == 1
+    assert nullbr_client.RESULT_CACHE_TTL < 3600
+
+    _expire(client._results, ('search', "流浪地球", 1), nullbr_client.RESULT_CACHE_TTL)
+    client.search("流浪地球")
+    assert state.calls['search'] == 2
+
+
+def test_refresh_bypasses_cache(nullbr):
+    client, state = nullbr
+    client.enable_result_cache(True)
+    client.search("流浪地球")
+    client.search("流浪地球", refresh=True)
+    assert state.calls['search'] == 2
+
+
+def test_warmed_results_outlive_user_ttl(nullbr):
+    client, state = nullbr
+    client.enable_result_cache(True)
+    key = ('search', "流浪地球", 1)
+    client.search("流浪地球", warm=True)
+    assert key in client._warmed and key not in client._results
+
+    # 预热结果按 WARM_CACHE_TTL 保存，超过用户结果的有效期后仍然命中
+    client._warmed._data[key]['timestamp'] -= nullbr_client.RESULT_CACHE_TTL + 1
+    client.search("流浪地球")
+    assert state.calls['search'] == 1
+
+    # 用户刷新后的新结果替换预热结果
+    client.search("流浪地球", refresh=True)
+    assert key in client._results and key not in client._warmed
+
+
+def test_disable_clears_cached_results(nullbr):
+    client, state = nullbr
+    client.enable_result_cache(True)
+    client.search("流浪地球")
+    client.search("三体", warm=True)
+    client.enable_result_cache(False)
+    assert len(client._results) == 0 and len(client._warmed) == 0
+    client.search("流浪地球")
+    assert state.calls['search'] == 3
+
+
+def test_forget_title_refetches_resources(nullbr):
+    client, state = nullbr
+    client.enable_result_cache(True)
+    assert client.get_movie_resources(1234, "magnet")['magnet']
+    client.get_movie_resources(1234, "magnet")
+    assert state.calls['movie/{id}/magnet'] == 1
+
+    client.forget_title('movie', 1234)
+    client.get_movie_resources(1234, "magnet")
+    assert state.calls['movie/{id}/magnet'] == 2
+
+
+def test_negative_cache_independent_of_result_cache():
+    server, state, base_url = start_fake_nullbr(empty_rate=1.0)
+    client = nullbr_client.NullbrApiClient(state.app_id, state.api_key)
+    client._base_url = base_url
+    try:
+        assert client.search("无此片") is not None
+        assert client.search("无此片") == {'items': []}
+        assert state.calls['search'] == 1
+    finally:
+        client.close()
+        server.shutdown()
@@ -0,0 +1,64 @@
+"""离线任务去重索引：资源哈希解析、时间戳单位、容量淘汰与离线列表同步"""
+import importlib
+import time
+from types import SimpleNamespace
+
+from _common import load_plugin_package
+
+_pkg = load_plugin_package("nullbr_search_pro")
+offline_index = importlib.import_module(f"{_pkg}.offline_index")
+OfflineIndex = offline_index.OfflineIndex
+
+HASH = "a" * 40
+MAGNET = f"magnet:?xt=urn:btih:{HASH.upper()}&dn=test"
+
+
+def test_parse_resource_hash():
+    assert offline_index.parse_resource_hash(MAGNET) == f"btih:{HASH}"
+    assert offline_index.parse_resource_hash(
+        "ed2k://|file|a.mkv|123|0123456789ABCDEF0123456789ABCDEF|/") == "ed2k:0123456789abcdef0123456789abcdef"
+    assert offline_index.parse_resource_hash("https://example.com/a.torrent") is None
+
+
+def test_normalize_timestamp():
+    now = time.time()
+    seconds = now - 3600
+    assert offline_index.normalize_timestamp(seconds) == seconds
+    assert abs(offline_index.normalize_timestamp(seconds * 1000) - seconds) < 1e-3
+    assert abs(offline_index.normalize_timestamp(seconds * 1_000_000) - seconds) < 1e-3
+    for invalid in (0, None, "x", now + 86400):
+        assert offline_index.normalize_timestamp(invalid) >= now
+
+
+def test_add_evicts_oldest_inserted(monkeypatch):
+    monkeypatch.setattr(OfflineIndex, "MAX_ENTRIES", 3)
+    index = OfflineIndex()
+    for i in range(3):
+        index.add(f"k{i}", added=1000 + i)
+    index.add("k0", added=2000)  # 重新提交移到末尾
+    index.add("k3")
+    assert list(index.to_dict()) == ["k2", "k0", "k3"]
+
+
+def test_load_sorts_by_time_and_normalizes_units(monkeypatch):
+    monkeypatch.setattr(OfflineIndex, "MAX_ENTRIES", 2)
+    base = time.time() - 3600
+    index = OfflineIndex({
+        "new": {'title': 'n', 'time': base + 20},
+        "ms": {'title': 'm', 'time': (base + 10) * 1000},
+        "old": {'title': 'o', 'time': base},
+    })
+    assert list(index.to_dict()) == ["ms", "new"]
+    assert index.get("ms")['time'] < base + 11
+
+
+def test_sync_normalizes_add_time_and_tracks_progress():
+    index = OfflineIndex()
+    added_ms = int((time.time() - 60) * 1000)
+    task = SimpleNamespace(infoHash=HASH, url=MAGNET, name="test", add_time=added_ms)
+    assert index.sync([task]) == 1
+    key = f"btih:{HASH}"
+    assert key in index and index.progress(key) is task
+    assert abs(index.get(key)['time'] - added_ms / 1000) < 1e-3
+    assert index.sync([]) == 0
+    assert index.progress(key) is None and key in index
@@ -0,0 +1,51 @@
+"""
+资源列表：显示的编号与 #N / transfer_N / #N-M 使用的转存缓存一致
+
+没有链接的资源不显示也不进入缓存，第 N 个显示的资源就是缓存中的第 N 项。
+"""
+import re
+
+import pytest
+
+pytest.importorskip("app.log", reason="需要 MoviePilot 源码（PYTHONPATH）")
+
+from _common import load_plugin  # noqa: E402
+
+RESOURCES = {'magnet': [
+    {'name': 'No.Link.2160p', 'size': '50 GB', 'resolution': '2160p'},
+    {'name': 'First.Linked.1080p', 'size': '8 GB', 'resolution': '1080p',
+     'magnet': 'magnet:?xt=urn:btih:' + '1' * 40},
+    {'name': 'Second.Linked.720p', 'size': '4 GB', 'resolution': '720p',
+     'magnet': 'magnet:?xt=urn:btih:' + '2' * 40},
+]}
+
+
+@pytest.fixture(params=["nullbr_search", "nullbr_search_pro"])
+def plugin(request):
+    plugin = load_plugin(request.param)()
+    plugin._enabled = True
+    sent = []
+    plugin.post_message = lambda **kwargs: sent.append(kwargs)
+    return plugin, sent
+
+
+def test_pick_matches_displayed_number(plugin):
+    plugin, sent = plugin
+    plugin.format_and_send_resources(RESOURCES, 'magnet', '流浪地球', 'wechat', 'u1')
+    listing = sent[-1]['text']
+    assert 'No.Link' not in listing
+    assert '共找到 2 个资源' in listing
+    second = re.search(r'【2】(.+)', listing).group(1)
+
+    plugin._talk_handlers['pick'](2, 'wechat', 'u1')
+    assert sent[-1]['title'] == '资源详情'
+    assert f"📂 名称: {second}\n" in sent[-1]['text']
+
+    cache = plugin._user_resource_cache.get('u1')['resources']
+    assert len(cache) == 2 and cache[1]['title'] == second
+
+
+def test_only_unlinked_resources_reports_none(plugin):
+    plugin, sent = plugin
+    plugin.format_and_send_resources({'magnet': RESOURCES['magnet'][:1]}, 'magnet', '流浪地球', 'wechat', 'u1')
+    assert sent[-1]['title'] == '无资源'
@@ -0,0 +1,39 @@
+"""资源排序：体积解析与排序不因异常体积字符串失败"""
+import importlib
+
+import pytest
+
+from _common import load_plugin_package
+
+_pkg = load_plugin_package("nullbr_search_pro")
+resource_ranker = importlib.import_module(f"{_pkg}.resource_ranker")
+parse_size = resource_ranker.parse_size
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("83.03 GB", int(83.03 * 1024 ** 3)),
+    ("700MB", 700 * 1024 ** 2),
+    ("1.2 TiB", int(1.2 * 1024 ** 4)),
+    ("1,024 MB", 1024 * 1024 ** 2),
+    ("1,234,567", 1234567),
+    ("512", 512),
+    (2048, 2048),
+    (1.5e9, 1500000000),
+])
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
+
+
+@pytest.mark.parametrize("text", [". GB", "..", "未知", "", None, "GB", float("nan"), float("inf")])
+def test_parse_size_invalid_returns_zero(text):
+    assert parse_size(text) == 0
+
+
+def test_rank_resources_tolerates_bad_sizes():
+    resources = [
+        {'name': 'A.2160p.REMUX', 'size': '. GB'},
+        {'name': 'B.1080p.WEB-DL', 'size': '1,024 MB'},
+        {'name': 'C.720p', 'size': None},
+    ]
+    ranked = resource_ranker.rank_resources(resources)
+    assert [r['name'][0] for r in ranked] == ['A', 'B', 'C']